@@ -69,9 +69,9 @@ async def start_automation(
     Inicia el servicio de trading automático.
     """
     try:
-        # Validar que no esté corriendo
+        # Validar que no esté corriendo para este usuario
         auto_service = get_auto_execution_service()
-        if auto_service.running:
+        if auto_service.is_running(int(current_user.id)):
             raise HTTPException(status_code=400, detail="La automatización ya está activa")
         
         # Validar configuración
@@ -95,7 +95,7 @@ async def start_automation(
         return {
             "success": True,
             "message": "Automatización iniciada correctamente",
-            "status": auto_service.get_automation_status(),
+            "status": auto_service.get_automation_status(int(current_user.id)),
             "started_at": datetime.now(timezone.utc).isoformat()
         }
         
@@ -115,10 +115,10 @@ async def stop_automation(
     try:
         auto_service = get_auto_execution_service()
         
-        if not auto_service.running:
+        if not auto_service.is_running(int(current_user.id)):
             raise HTTPException(status_code=400, detail="La automatización no está activa")
         
-        success = await auto_service.stop_automation()
+        success = await auto_service.stop_automation(int(current_user.id))
         
         if not success:
             raise HTTPException(status_code=400, detail="Error al detener automatización")
@@ -136,7 +136,7 @@ async def stop_automation(
             "success": True,
             "message": "Automatización detenida correctamente",
             "stopped_at": datetime.now(timezone.utc).isoformat(),
-            "final_status": auto_service.get_automation_status()
+            "final_status": auto_service.get_automation_status(int(current_user.id))
         }
         
     except Exception as e:
@@ -154,7 +154,7 @@ async def get_automation_status(
     """
     try:
         auto_service = get_auto_execution_service()
-        status = auto_service.get_automation_status()
+        status = auto_service.get_automation_status(int(current_user.id))
         
         # Sincronizar estado en vivo con la Base de Datos para evitar el "efecto espejismo" de memoria RAM
         from app.infrastructure.database.models import AutomationConfig
@@ -180,11 +180,8 @@ async def emergency_stop(
     try:
         auto_service = get_auto_execution_service()
         
-        # Activar parada de emergencia
-        auto_service.emergency_stop = True
-        
-        # Detener servicio
-        await auto_service.stop_automation()
+        # Detener la automatización del usuario con parada de emergencia
+        await auto_service.stop_automation(int(current_user.id), emergency=True)
         
         logger.warning(f"🚨 PARADA DE EMERGENCIA activada por usuario {current_user.id}")
         
@@ -210,11 +207,12 @@ async def get_signal_queue(
     """
     try:
         auto_service = get_auto_execution_service()
-        queue_status = auto_service.signal_queue.get_queue_status()
+        signal_queue = auto_service.queue_for(int(current_user.id))
+        queue_status = signal_queue.get_queue_status()
         
         # Obtener señales pendientes
         pending_signals = []
-        for symbol, data in auto_service.signal_queue.approved_signals.items():
+        for symbol, data in signal_queue.approved_signals.items():
             if not data['executed']:
                 pending_signals.append({
                     'symbol': symbol,
@@ -261,7 +259,7 @@ async def get_signal_queue(
             combined.append(item)
             
         # Luego agregar los de memoria si no están duplicados
-        for item in auto_service.signal_queue.execution_history:
+        for item in signal_queue.execution_history:
             dt = item['executed_at']
             sig = f"{item['symbol']}_{dt.strftime('%Y-%m-%d %H:%M') if hasattr(dt, 'strftime') else str(dt)[:16]}"
             if sig not in seen_signatures:
@@ -348,6 +346,7 @@ async def update_automation_settings(
             db.add(config)
         
         db.commit()
+        get_auto_execution_service().invalidate_settings(int(current_user.id))
         logger.info(f"⚙️ Configuración guardada en DB para usuario {current_user.id}")
         
         return {
@@ -474,7 +473,7 @@ async def get_automation_performance(
             "worst_trade": round(float(worst_trade or 0.0), 2),
             "avg_trade": round(float(avg_trade or 0.0), 2),
             "trades": formatted_trades,
-            "queue_status": auto_service.signal_queue.get_queue_status()
+            "queue_status": auto_service.queue_for(int(current_user.id)).get_queue_status()
         }
         
     except Exception as e:
@@ -713,15 +712,16 @@ async def test_signal_generation(
             "timestamp": datetime.now(timezone.utc).replace(tzinfo=None)
         }
         
-        # Obtener configuración para el símbolo
-        settings = await auto_service._get_symbol_settings(symbol)
+        # Obtener configuración del usuario para el símbolo
+        user_state = await auto_service.get_user_state(int(current_user.id))
+        settings = user_state.symbol_params()
         
-        # Agregar a la cola de señales aprobadas
-        auto_service.signal_queue.add_approved_signal(signal, settings)
+        # Agregar a la cola de señales aprobadas del usuario
+        user_state.signal_queue.add_approved_signal(signal, settings)
         auto_service.add_scan_log(symbol, f"🔥 ¡SEÑAL DE PRUEBA APROBADA! Añadida a cola para ejecución: BUY")
         
         # Ejecutar señales pendientes inmediatamente de forma asíncrona
-        asyncio.create_task(auto_service._execute_pending_signals())
+        asyncio.create_task(auto_service._execute_user_signals(user_state))
         
         logger.info(f"🧪 Señal de prueba inyectada con éxito para {symbol} a precio {current_price}")
         
@@ -2,14 +2,14 @@
 SIC Ultra - Endpoints de Base de Conocimientos
 
 Gestiona la educación continua del agente:
-- Subir libros de trading y finanzas
+- Subir libros de trading y finanzas (ingesta en segundo plano)
 - Buscar conocimiento
 - Ver estadísticas de aprendizaje
 """
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 import os
 import shutil
@@ -20,6 +20,8 @@ from app.ml.knowledge_base import (
     get_ollama_rag,
     BOOKS_DIR
 )
+from app.ml.knowledge_ingestion import get_ingestion_queue
+from app.ml.rag_cache import get_retrieval_cache
 
 
 router = APIRouter()
@@ -36,6 +38,7 @@ class SearchRequest(BaseModel):
     query: str
     n_results: int = 5
     category: Optional[str] = None
+    mode: Literal["hybrid", "dense", "lexical"] = "hybrid"
 
 
 # === Endpoints ===
@@ -84,8 +87,7 @@ async def upload_book(
         
         logger.info("✅ Archivo guardado correctamente")
 
-        # Procesar y añadir a base de conocimientos
-        logger.info("🧠 Obteniendo KnowledgeBase...")
+        # Procesar en la cola de ingesta (fuera del event loop)
         kb = get_knowledge_base()
         
         if not kb.is_ready:
@@ -95,28 +97,55 @@ async def upload_book(
                 detail="Base de conocimientos no inicializada. Verifica ChromaDB."
             )
         
-        logger.info("⚙️ Procesando documento en ChromaDB...")
-        result = kb.add_document(
+        job = get_ingestion_queue().submit(
             file_path=file_path,
             title=title or os.path.splitext(file.filename)[0],
             category=category
         )
         
-        if "error" in result:
-            logger.error(f"❌ Error en add_document: {result['error']}")
-            raise HTTPException(status_code=500, detail=result["error"])
-        
-        logger.success(f"🎉 Libro procesado exitosamente: {result['title']}")
         return {
-            "message": f"📚 Libro '{result['title']}' añadido exitosamente",
-            **result
+            "message": f"📚 Libro '{job.title}' encolado para procesamiento",
+            "job_id": job.job_id,
+            "status": job.status,
+            "status_url": f"/api/v1/knowledge/ingestion/{job.job_id}"
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"❌ CRITICAL ERROR en upload_book: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 
+@router.get("/ingestion")
+async def list_ingestion_jobs(limit: int = 50, token: str = Depends(oauth2_scheme)):
+    """
+    📥 Jobs de ingesta recientes (más nuevos primero).
+    """
+    verify_token(token)
+    
+    return {
+        "jobs": [job.to_dict() for job in get_ingestion_queue().list_jobs(limit)],
+        "timestamp": datetime.utcnow()
+    }
+
+
+@router.get("/ingestion/{job_id}")
+async def get_ingestion_job(job_id: str, token: str = Depends(oauth2_scheme)):
+    """
+    ⏳ Progreso de la ingesta de un libro.
+    
+    status: queued | running | completed | failed
+    """
+    verify_token(token)
+    
+    job = get_ingestion_queue().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de ingesta no encontrado")
+    
+    return job.to_dict()
+
+
 @router.post("/search")
 async def search_knowledge(
     request: SearchRequest,
@@ -137,11 +166,13 @@ async def search_knowledge(
     results = kb.search(
         query=request.query,
         n_results=request.n_results,
-        category=request.category
+        category=request.category,
+        mode=request.mode
     )
     
     return {
         "query": request.query,
+        "mode": request.mode,
         "count": len(results),
         "results": results
     }
@@ -159,6 +190,7 @@ async def get_stats(token: str = Depends(oauth2_scheme)):
     
     return {
         **stats,
+        "retrieval_cache": get_retrieval_cache().get_stats(),
         "books_directory": BOOKS_DIR,
         "timestamp": datetime.utcnow()
     }
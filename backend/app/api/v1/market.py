@@ -12,10 +12,15 @@ from datetime import datetime
 
 from app.api.v1.auth import oauth2_scheme, verify_token
 from app.infrastructure.binance.client import get_binance_client
+from app.services.order_book import get_order_book_manager
+from app.services.trade_flow import get_trade_flow_manager
 
 
 router = APIRouter()
 
+# Ventana de trades usada por /order-flow (CVD y ejecuciones por nivel)
+FLOW_WINDOW_SECONDS = 3600
+
 
 # === Schemas ===
 
@@ -24,6 +29,7 @@ class OrderFlowLevel(BaseModel):
     bid_volume: float
     ask_volume: float
     delta: float  # bid_volume - ask_volume
+    traded_volume: float = 0.0  # Ejecutado en el bucket durante la ventana
     trades: int
     spoofing_risk: str  # LOW, MEDIUM, HIGH
 
@@ -34,6 +40,8 @@ class OrderFlowResponse(BaseModel):
     cvd: float  # Cumulative Volume Delta
     spoofing_alerts: List[str]
     liquidity_zones: List[float]
+    imbalance: Optional[float] = None  # Imbalance de nocional dentro de ±1%
+    large_prints: List[Dict] = []
     timestamp: datetime
 
 
@@ -44,6 +52,34 @@ class ATRResponse(BaseModel):
     timestamp: datetime
 
 
+# === Helpers ===
+
+async def _synced_book(symbol: str):
+    """Order book local sincronizado (lo empieza a seguir si hace falta)"""
+    manager = get_order_book_manager()
+    book = manager.get_book(symbol)
+    if book is None or not book.synced:
+        try:
+            book = await manager.track(symbol)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    if not book.synced:
+        raise HTTPException(status_code=503, detail=f"Order book de {symbol.upper()} sincronizando, reintenta en unos segundos")
+    return book
+
+
+async def _tracked_flow(symbol: str):
+    """Flujo de trades del símbolo (lo empieza a seguir si hace falta)"""
+    manager = get_trade_flow_manager()
+    flow = manager.get(symbol)
+    if flow is None:
+        try:
+            flow = await manager.track(symbol)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    return flow
+
+
 # === Endpoints ===
 
 @router.get("/order-flow", response_model=OrderFlowResponse)
@@ -56,86 +92,114 @@ async def get_order_flow(
     Obtener datos de order flow para análisis de microestructura.
     
     Incluye:
-    - Bid/Ask volume por nivel de precio
+    - Bid/Ask volume por bucket de precio (el del footprint) y lo ejecutado en él
     - Delta (diferencia entre compras y ventas)
-    - CVD (Cumulative Volume Delta)
+    - CVD (Cumulative Volume Delta) de trades reales
     - Detección de spoofing
     - Zonas de liquidez
+    
+    Se sirve desde memoria: order book local (diff-depth) y flujo de trades
+    (aggTrade). La primera consulta de un símbolo nuevo espera a que el libro
+    sincronice; el flujo de trades empieza a acumular desde ese momento.
     """
     verify_token(token)
     
-    client = get_binance_client()
+    flow = await _tracked_flow(symbol)
+    window = max(1, FLOW_WINDOW_SECONDS // flow.bar_seconds)
+    
+    book = await _synced_book(symbol)
     
-    # Obtener order book
-    depth = client.client.get_order_book(symbol=symbol, limit=limit)
+    depth = book.levels(limit)
+    
+    # Libro y trades a la misma resolución: buckets del footprint
+    profile = flow.depth_profile(depth['bids'], depth['asks'], window)
     
     levels = []
-    cumulative_delta = 0.0
     spoofing_alerts = []
-    liquidity_zones = []
-    
-    # Calcular volumen promedio para detectar muros
-    all_volumes = []
-    for bid in depth['bids']:
-        all_volumes.append(float(bid[1]))
-    for ask in depth['asks']:
-        all_volumes.append(float(ask[1]))
     
+    # Calcular volumen promedio por bucket para detectar muros
+    all_volumes = [v for b in profile for v in (b["bid_volume"], b["ask_volume"]) if v > 0]
     avg_volume = sum(all_volumes) / len(all_volumes) if all_volumes else 0
     
-    # Procesar niveles de precio
-    max_len = min(len(depth['bids']), len(depth['asks']))
-    
-    for i in range(max_len):
-        bid_price = float(depth['bids'][i][0])
-        bid_volume = float(depth['bids'][i][1])
-        ask_price = float(depth['asks'][i][0])
-        ask_volume = float(depth['asks'][i][1])
-        
-        # Precio medio del nivel
-        mid_price = (bid_price + ask_price) / 2
-        
-        # Delta = compras - ventas
-        delta = bid_volume - ask_volume
-        cumulative_delta += delta
-        
-        # Estimación de trades (en producción vendría de stream de trades)
-        estimated_trades = int((bid_volume + ask_volume) * 0.1)
-        
-        # Detectar spoofing: volumen grande pero pocos trades
-        volume_ratio = estimated_trades / (bid_volume + ask_volume) if (bid_volume + ask_volume) > 0 else 0
+    for bucket in profile:
+        price = bucket["price"]
+        bid_volume, ask_volume = bucket["bid_volume"], bucket["ask_volume"]
+        traded = bucket["traded_volume"]
         
+        # Detectar spoofing: muro grande en un bucket donde apenas se ejecuta volumen
         spoofing_risk = "LOW"
-        if bid_volume > avg_volume * 10 and volume_ratio < 0.05:
+        if bid_volume > avg_volume * 10 and traded < bid_volume * 0.05:
             spoofing_risk = "HIGH"
-            spoofing_alerts.append(f"⚠️ Posible BID spoofing en ${mid_price:.2f}")
-        elif ask_volume > avg_volume * 10 and volume_ratio < 0.05:
+            spoofing_alerts.append(f"⚠️ Posible BID spoofing en ${price:.2f}")
+        elif ask_volume > avg_volume * 10 and traded < ask_volume * 0.05:
             spoofing_risk = "HIGH"
-            spoofing_alerts.append(f"⚠️ Posible ASK spoofing en ${mid_price:.2f}")
+            spoofing_alerts.append(f"⚠️ Posible ASK spoofing en ${price:.2f}")
         elif bid_volume > avg_volume * 5 or ask_volume > avg_volume * 5:
             spoofing_risk = "MEDIUM"
         
-        # Identificar zonas de liquidez (muros grandes)
-        if bid_volume > avg_volume * 7:
-            liquidity_zones.append(bid_price)
-        if ask_volume > avg_volume * 7:
-            liquidity_zones.append(ask_price)
-        
         levels.append({
-            "price": mid_price,
+            "price": price,
             "bid_volume": bid_volume,
             "ask_volume": ask_volume,
-            "delta": delta,
-            "trades": estimated_trades,
+            "delta": bid_volume - ask_volume,  # Volumen en reposo
+            "traded_volume": traded,
+            "trades": bucket["trades"],
             "spoofing_risk": spoofing_risk
         })
     
+    # Zonas de liquidez: muros dentro de ±2% sobre todo el libro local
+    walls = book.walls(percent=2.0, factor=7.0, top=5)
+    liquidity_zones = [w["price"] for w in walls["bids"] + walls["asks"]]
+    
     return {
-        "symbol": symbol,
+        "symbol": book.symbol,
         "levels": levels,
-        "cvd": cumulative_delta,
+        "cvd": flow.cvd(window),
         "spoofing_alerts": spoofing_alerts[:5],  # Máximo 5 alertas
         "liquidity_zones": liquidity_zones[:10],  # Máximo 10 zonas
+        "imbalance": round(book.imbalance(1.0), 4),
+        "large_prints": list(flow.large_prints)[-5:],
+        "timestamp": datetime.utcnow()
+    }
+
+
+@router.get("/footprint")
+async def get_footprint(
+    symbol: str = Query(..., description="Trading pair"),
+    bars: int = Query(15, ge=1, le=240, description="Barras a agregar"),
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    👣 Footprint, barras de volume delta y CVD desde el flujo de trades en memoria.
+    """
+    verify_token(token)
+    
+    flow = await _tracked_flow(symbol)
+    
+    return {
+        **flow.summary(bars),
+        "bars": flow.bars(bars),
+        "footprint": flow.footprint(bars),
+        "timestamp": datetime.utcnow()
+    }
+
+
+@router.get("/order-book")
+async def get_local_order_book(
+    symbol: str = Query(..., description="Trading pair"),
+    percent: float = Query(1.0, gt=0, le=10, description="Rango ±% del mid para profundidad e imbalance"),
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    📚 Estado del order book local: profundidad, imbalance y muros desde memoria.
+    """
+    verify_token(token)
+    
+    book = await _synced_book(symbol)
+    
+    return {
+        **book.summary(percent),
+        "walls": book.walls(percent=max(percent, 2.0)),
         "timestamp": datetime.utcnow()
     }
 
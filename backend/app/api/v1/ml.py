@@ -6,14 +6,18 @@ Endpoints para entrenar y gestionar los modelos de IA.
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 import pandas as pd
 
 from app.api.v1.auth import oauth2_scheme, verify_token
 from app.infrastructure.binance.client import get_binance_client
-from app.ml.models import get_lstm_predictor, get_xgb_classifier, get_ensemble
-from app.ml.indicators import calculate_rsi, calculate_macd, calculate_atr
+from app.ml.models import get_lstm_predictor
+from app.ml.inference_service import get_inference_service
+from app.ml.feature_store import get_feature_store
+from app.ml.retraining import get_retraining_scheduler
+from app.ml.model_registry import get_model_registry
+from app.ml.pattern_outcomes import DEFAULT_HORIZON, get_pattern_outcomes, rebuild_pattern_outcomes
 
 
 router = APIRouter()
@@ -33,56 +37,67 @@ class PredictRequest(BaseModel):
     interval: str = "1h"
 
 
+class BatchPredictRequest(BaseModel):
+    symbols: List[str]
+    interval: str = "1h"
+
+
 # === Helper Functions ===
 
-def get_training_data(symbol: str, interval: str, limit: int) -> pd.DataFrame:
-    """
-    Obtener datos de Binance y preparar para entrenamiento.
+def get_training_data(
+    symbol: str,
+    interval: str,
+    limit: int,
+    include_live: bool = False,
+    as_of: Optional[datetime] = None
+) -> pd.DataFrame:
     """
-    binance = get_binance_client()
-    candles = binance.get_klines(symbol, interval, limit)
-    
-    if not candles:
-        raise ValueError(f"No se pudieron obtener datos de {symbol}")
-    
-    # Crear DataFrame
-    df = pd.DataFrame(candles)
+    Obtener features desde el feature store y preparar para entrenamiento.
     
-    # Calcular indicadores
-    closes = df['close'].tolist()
-    highs = df['high'].tolist()
-    lows = df['low'].tolist()
+    Solo se descargan las velas que faltan desde la última sincronización;
+    los indicadores se calculan una vez y de forma incremental.
     
-    # RSI
-    rsi = calculate_rsi(closes, 14)
-    df['rsi'] = [None] * (len(closes) - len(rsi)) + rsi
+    Args:
+        include_live: Añadir la vela en formación (solo para predicción)
+        as_of: Lectura point-in-time (solo velas cerradas en ese instante)
+    """
+    store = get_feature_store()
+    candles = store.refresh(symbol, interval)
     
-    # MACD
-    macd = calculate_macd(closes)
-    macd_hist = macd.get('histogram', [])
-    df['macd'] = [None] * (len(closes) - len(macd_hist)) + macd_hist
+    df = store.read(symbol, interval, as_of=as_of, limit=limit)
     
-    # ATR
-    atr = calculate_atr(highs, lows, closes, 14)
-    df['atr'] = [None] * (len(closes) - len(atr)) + atr
+    if include_live and candles:
+        live = store.preview(symbol, interval, candles[-1])
+        live['timestamp'] = pd.to_datetime(live['timestamp'], unit='s')
+        if live['timestamp'] not in set(df['timestamp']):
+            df = pd.concat([df, pd.DataFrame([live])], ignore_index=True)
     
-    # Limpiar NaN
-    df = df.dropna()
+    if df.empty:
+        raise ValueError(f"No se pudieron obtener datos de {symbol}")
     
     return df
 
 
 def train_models_background(symbol: str, interval: str, limit: int, epochs: int):
     """
-    Función de background para entrenar modelos.
+    Función de background para entrenar modelos (desde cero).
+    
+    Cada ejecución queda registrada en el historial del scheduler.
     """
     try:
-        df = get_training_data(symbol, interval, limit)
-        
-        ensemble = get_ensemble()
-        result = ensemble.train(df)
-        
-        return result
+        return get_retraining_scheduler().retrain(
+            symbol, interval, full=True, limit=limit, epochs=epochs
+        )
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def retrain_models_background(symbol: str, interval: str):
+    """
+    Función de background para re-entrenamiento incremental (warm-start).
+    """
+    try:
+        return get_retraining_scheduler().retrain(symbol, interval)
     except Exception as e:
         return {"error": str(e)}
 
@@ -151,10 +166,9 @@ async def get_ml_prediction(
     verify_token(token)
     
     try:
-        df = get_training_data(symbol.upper(), interval, 100)
+        df = get_training_data(symbol.upper(), interval, 100, include_live=True)
         
-        ensemble = get_ensemble()
-        prediction = ensemble.predict(df)
+        prediction = await get_inference_service().predict("ensemble", df)
         
         return {
             "symbol": symbol.upper(),
@@ -181,10 +195,9 @@ async def get_lstm_prediction(
     verify_token(token)
     
     try:
-        df = get_training_data(symbol.upper(), interval, 100)
+        df = get_training_data(symbol.upper(), interval, 100, include_live=True)
         
-        lstm = get_lstm_predictor()
-        prediction = lstm.predict(df)
+        prediction = await get_inference_service().predict("lstm", df)
         
         if not prediction:
             return {
@@ -203,6 +216,38 @@ async def get_lstm_prediction(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/lstm/predict-batch")
+async def get_lstm_batch_prediction(
+    request: BatchPredictRequest,
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    📈 Predicción LSTM para varios símbolos en un solo forward pass.
+    
+    Apila las ventanas de todos los símbolos en un único batch,
+    en vez de invocar el modelo una vez por símbolo.
+    """
+    verify_token(token)
+    
+    frames = {}
+    errors = {}
+    for symbol in dict.fromkeys(s.upper() for s in request.symbols):
+        try:
+            frames[symbol] = get_training_data(symbol, request.interval, 100, include_live=True)
+        except Exception as e:
+            errors[symbol] = str(e)
+    
+    lstm = get_lstm_predictor()
+    predictions = lstm.predict_batch(frames)
+    
+    return {
+        "interval": request.interval,
+        "predictions": predictions,
+        "errors": errors,
+        "trained": any(p is not None for p in predictions.values())
+    }
+
+
 @router.get("/xgboost/predict/{symbol}")
 async def get_xgboost_prediction(
     symbol: str,
@@ -220,10 +265,9 @@ async def get_xgboost_prediction(
     verify_token(token)
     
     try:
-        df = get_training_data(symbol.upper(), interval, 100)
+        df = get_training_data(symbol.upper(), interval, 100, include_live=True)
         
-        xgb = get_xgb_classifier()
-        prediction = xgb.predict(df)
+        prediction = await get_inference_service().predict("xgboost", df)
         
         if not prediction:
             return {
@@ -242,6 +286,124 @@ async def get_xgboost_prediction(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/retrain")
+async def retrain_models(
+    request: PredictRequest,
+    background_tasks: BackgroundTasks,
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    🔁 Re-entrenamiento incremental (warm-start) con las velas nuevas.
+    
+    - XGBoost continúa el boosting desde el booster actual
+    - LSTM hace fine-tuning desde su último checkpoint
+    - El modelo nuevo solo se promueve si mejora en validación
+    """
+    verify_token(token)
+    
+    background_tasks.add_task(
+        retrain_models_background,
+        request.symbol.upper(),
+        request.interval
+    )
+    
+    return {
+        "message": f"🔁 Re-entrenamiento incremental iniciado para {request.symbol.upper()}",
+        "symbol": request.symbol.upper(),
+        "interval": request.interval,
+        "status": "TRAINING",
+        "note": "Use /ml/training/runs para ver el resultado."
+    }
+
+
+@router.get("/training/runs")
+async def get_training_runs(limit: int = 50, token: str = Depends(oauth2_scheme)):
+    """
+    📜 Historial de entrenamientos: duración, rango de datos, métricas y promoción.
+    """
+    verify_token(token)
+    
+    return {
+        "runs": get_retraining_scheduler().get_runs(limit),
+        "timestamp": datetime.utcnow()
+    }
+
+
+@router.get("/training/status")
+async def get_training_status(token: str = Depends(oauth2_scheme)):
+    """
+    🕒 Edad de los modelos y estado del scheduler de re-entrenamiento.
+    """
+    verify_token(token)
+    
+    return {
+        **get_retraining_scheduler().get_status(),
+        "timestamp": datetime.utcnow()
+    }
+
+
+@router.post("/patterns/outcomes/rebuild")
+async def rebuild_pattern_table(
+    background_tasks: BackgroundTasks,
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    📐 Re-medir la precisión de los patrones sobre todo el histórico del feature store.
+    
+    Job offline: forward returns por patrón, temporalidad y régimen.
+    """
+    verify_token(token)
+    
+    background_tasks.add_task(rebuild_pattern_outcomes)
+    
+    return {
+        "message": "📐 Reconstrucción de la tabla de patrones iniciada",
+        "status": "BUILDING",
+        "note": "Use /ml/patterns/outcomes para ver el resultado."
+    }
+
+
+@router.get("/patterns/outcomes")
+async def get_pattern_table(
+    interval: str = "1h",
+    horizon: int = DEFAULT_HORIZON,
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    📐 Precisión medida de cada patrón por régimen (muestras, aciertos, retorno medio).
+    """
+    verify_token(token)
+    
+    table = get_pattern_outcomes()
+    if table is None:
+        raise HTTPException(status_code=404, detail="Tabla de patrones no construida")
+    if horizon not in table.horizons:
+        raise HTTPException(status_code=400, detail=f"Horizonte no medido. Disponibles: {list(table.horizons)}")
+    
+    return {
+        "interval": interval,
+        "horizon": horizon,
+        "built_at": table.built_at,
+        "patterns": table.summary(interval, horizon),
+        "timestamp": datetime.utcnow()
+    }
+
+
+@router.get("/inference/metrics")
+async def get_inference_metrics(token: str = Depends(oauth2_scheme)):
+    """
+    ⏱️ Métricas del servicio de inferencia (micro-batching).
+    
+    Latencia p50/p99 y tamaño de batch por modelo.
+    """
+    verify_token(token)
+    
+    return {
+        **get_inference_service().get_metrics(),
+        "timestamp": datetime.utcnow()
+    }
+
+
 @router.get("/status")
 async def get_ml_status(token: str = Depends(oauth2_scheme)):
     """
@@ -250,21 +412,33 @@ async def get_ml_status(token: str = Depends(oauth2_scheme)):
     verify_token(token)
     
     import os
-    models_dir = os.path.join(os.path.dirname(__file__), "..", "ml", "models")
+    from app.ml.models import MODELS_DIR, get_xgb_classifier
+    
+    registry = get_model_registry()
+    lstm_versions = registry.list_versions("lstm")
+    xgb_versions = registry.list_versions("xgboost")
+    
+    lstm_exists = bool(lstm_versions) or os.path.exists(os.path.join(MODELS_DIR, "lstm_price_predictor.keras"))
+    xgb_exists = bool(xgb_versions) or os.path.exists(os.path.join(MODELS_DIR, "xgboost_classifier.json"))
     
-    lstm_exists = os.path.exists(os.path.join(models_dir, "lstm_price_predictor.keras"))
-    xgb_exists = os.path.exists(os.path.join(models_dir, "xgboost_classifier.json"))
+    lstm, xgb = get_lstm_predictor(), get_xgb_classifier()
     
     return {
         "models": {
             "lstm": {
                 "name": "LSTM Price Predictor",
                 "trained": lstm_exists,
+                "loaded": lstm.model is not None,
+                "version": lstm.version,
+                "versions": lstm_versions,
                 "description": "Red neuronal LSTM para predicción de precios"
             },
             "xgboost": {
                 "name": "XGBoost Signal Classifier",
                 "trained": xgb_exists,
+                "loaded": xgb.model is not None,
+                "version": xgb.version,
+                "versions": xgb_versions,
                 "description": "Clasificador para señales BUY/SELL/HOLD"
             }
         },
@@ -4,6 +4,7 @@ SIC Ultra - Mercado P2P VES
 Arbitraje USDT/VES con datos REALES del mercado P2P de Binance.
 """
 
+import math
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Union
@@ -52,6 +53,26 @@ class P2PStats(BaseModel):
     timestamp: datetime
 
 
+# === Helpers ===
+
+def _parse_amounts(amounts: Optional[str]) -> Optional[List[float]]:
+    """Montos fiat separados por coma (400 si alguno no es un número positivo)"""
+    if not amounts:
+        return None
+    parsed = []
+    for raw in amounts.split(","):
+        if not raw.strip():
+            continue
+        try:
+            value = float(raw)
+        except ValueError:
+            value = float("nan")
+        if not math.isfinite(value) or value <= 0:
+            raise HTTPException(status_code=400, detail=f"Monto inválido: '{raw.strip()}'")
+        parsed.append(value)
+    return parsed or None
+
+
 # === Endpoints ===
 
 @router.get("/market", response_model=P2PMarket)
@@ -119,6 +140,38 @@ async def get_p2p_stats(
     return summary
 
 
+@router.get("/book")
+async def get_p2p_book(
+    fiat: str = "VES",
+    asset: str = "USDT",
+    pages: int = 5,
+    payment_methods: Optional[str] = None,  # Separados por coma: cada uno es una búsqueda
+    amounts: Optional[str] = None,          # Montos fiat separados por coma
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    📚 Libro P2P profundo (compra y venta) combinando varias páginas por
+    método de pago y monto, ordenado por precio con profundidad acumulada.
+    """
+    verify_token(token)
+    
+    pay_types = [p.strip() for p in payment_methods.split(",") if p.strip()] if payment_methods else None
+    trans_amounts = _parse_amounts(amounts)
+    
+    client = get_p2p_client()
+    books = await client.get_order_books(
+        fiat, asset, pages=min(max(pages, 1), 20), pay_types=pay_types, trans_amounts=trans_amounts
+    )
+    
+    if not books["BUY"]["offers"] and not books["SELL"]["offers"]:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No hay ofertas P2P disponibles para {asset}/{fiat}"
+        )
+    
+    return books
+
+
 @router.get("/buy")
 async def get_buy_offers(
     fiat: str = "VES",
@@ -18,6 +18,8 @@ from app.infrastructure.database.models import User, VirtualWallet as VirtualWal
 
 from app.api.v1.auth import get_current_user, oauth2_scheme, verify_token
 from app.infrastructure.binance.client import get_binance_client
+from app.ml.trade_metrics import FUTURES_CLOSE_REASON, closes_position, closing_trades, get_trade_metrics
+from app.services.excursion_tracker import futures_key, get_excursion_tracker, spot_key
 from loguru import logger
 
 
@@ -158,22 +160,21 @@ def calculate_level(total_trades: int, total_pnl: float, win_rate: float) -> dic
         "progress_percent": (points_in_level / points_needed * 100) if points_needed > 0 else 0
     }
 
-def analyze_patterns(trades: List[VirtualTradeModel]) -> List[str]:
+def analyze_patterns(winning_trades: int) -> List[str]:
     """
     Analizar patrones dominados basado en historial.
     Por ahora mock-logic inteligente: Si tiene > 3 trades ganadores, asumimos dominio de básicos.
     En v2, esto leería tags de los trades si existieran.
     """
     patterns = []
-    winning = [t for t in trades if (t.pnl or 0) > 0]
     
-    if len(winning) >= 3:
+    if winning_trades >= 3:
         patterns.append("RSI Divergence")
-    if len(winning) >= 10:
+    if winning_trades >= 10:
         patterns.append("MACD Cross")
-    if len(winning) >= 20:
+    if winning_trades >= 20:
         patterns.append("Support/Resistance")
-    if len(winning) >= 50:
+    if winning_trades >= 50:
         patterns.append("Breakout Master")
         
     return patterns
@@ -286,12 +287,7 @@ async def get_virtual_wallet(
     trades_count = db.query(VirtualTradeModel).filter(VirtualTradeModel.wallet_id == wallet.id).count()
     
     # Calculate win rate
-    sell_trades = db.query(VirtualTradeModel).filter(
-        VirtualTradeModel.wallet_id == wallet.id,
-        VirtualTradeModel.side == "SELL"
-    ).all()
-    winning = [t for t in sell_trades if (t.pnl or 0) > 0]
-    win_rate = (len(winning) / len(sell_trades) * 100) if sell_trades else 0
+    win_rate = practice_metrics(db, user_id, wallet.id).win_rate
     
     return VirtualWallet(
         initial_capital=initial_capital,
@@ -305,6 +301,24 @@ async def get_virtual_wallet(
     )
 
 
+def record_closed_trade(user_id: int, trade: VirtualTradeModel):
+    """Actualizar las métricas incrementales si el trade cierra una posición (spot o futuros)."""
+    if closes_position(trade.side, trade.market_type, trade.reason):
+        get_trade_metrics().record(user_id, "practice", trade.pnl or 0.0, trade.strategy, trade.symbol)
+
+
+def practice_metrics(db: Session, user_id: int, wallet_id: int):
+    """Métricas de trades cerrados de práctica (O(1) tras la primera reconstrucción)."""
+    metrics = get_trade_metrics()
+    metrics.ensure(user_id, "practice", lambda: db.query(
+        VirtualTradeModel.pnl, VirtualTradeModel.strategy, VirtualTradeModel.symbol
+    ).filter(
+        VirtualTradeModel.wallet_id == wallet_id,
+        closing_trades(VirtualTradeModel)
+    ).order_by(VirtualTradeModel.created_at).all())
+    return metrics.get(user_id, "practice")
+
+
 def require_valid_token(token: str) -> dict:
     """Verifica token y lanza excepción si es inválido."""
     payload = verify_token(token)
@@ -324,7 +338,7 @@ async def get_trade_stats(
     user_id = current_user.id
     
     wallet = get_or_create_wallet(db, user_id)
-    trades = db.query(VirtualTradeModel).filter(VirtualTradeModel.wallet_id == wallet.id).all()
+    trades_count = db.query(VirtualTradeModel).filter(VirtualTradeModel.wallet_id == wallet.id).count()
     balances = json.loads(wallet.balances) if wallet.balances else {"USDT": 50.0}
     binance = get_binance_client()
     
@@ -348,7 +362,7 @@ async def get_trade_stats(
     roi_percent = ((current_value - initial_capital) / initial_capital) * 100 if initial_capital > 0 else 0
     total_pnl = current_value - initial_capital
     
-    if not trades:
+    if not trades_count:
         return {
             "total_trades": 0,
             "winning_trades": 0,
@@ -369,8 +383,10 @@ async def get_trade_stats(
         }
     
     # Calcular P&L no realizado para posiciones abiertas (BUY sin SELL correspondiente)
-    buy_trades = [t for t in trades if t.side == 'BUY']
-    sell_trades = [t for t in trades if t.side == 'SELL']
+    buy_trades = db.query(VirtualTradeModel).filter(
+        VirtualTradeModel.wallet_id == wallet.id,
+        VirtualTradeModel.side == "BUY"
+    ).all()
     
     for buy in buy_trades:
         try:
@@ -379,32 +395,27 @@ async def get_trade_stats(
         except:
             pass
     
-    # Calcular estadísticas de trades cerrados (ventas)
-    realized_pnl = sum(t.pnl for t in sell_trades if t.pnl)
-    winning = [t for t in sell_trades if t.pnl and t.pnl > 0]
-    losing = [t for t in sell_trades if t.pnl and t.pnl < 0]
-    
-    win_rate = (len(winning) / len(sell_trades) * 100) if sell_trades else 0
-    
-    pnls = [t.pnl for t in sell_trades if t.pnl]
+    # Estadísticas de trades cerrados (ventas): acumuladores incrementales
+    closed = practice_metrics(db, user_id, wallet.id)
+    win_rate = closed.win_rate
     
     # Calcular Gamificación
-    gamification = calculate_level(len(trades), total_pnl, win_rate)
-    patterns = analyze_patterns(sell_trades)
+    gamification = calculate_level(trades_count, total_pnl, win_rate)
+    patterns = analyze_patterns(closed.wins)
     
     return {
-        "total_trades": len(trades),
-        "winning_trades": len(winning),
-        "losing_trades": len(losing),
+        "total_trades": trades_count,
+        "winning_trades": closed.wins,
+        "losing_trades": closed.losses,
         "win_rate": round(win_rate, 1),
         "total_pnl": round(total_pnl, 2),
         "unrealized_pnl": round(unrealized_pnl, 2),
         "roi_percent": round(roi_percent, 2),
         "initial_capital": initial_capital,
         "current_value": round(current_value, 2),
-        "best_trade": round(max(pnls), 2) if pnls else None,
-        "worst_trade": round(min(pnls), 2) if pnls else None,
-        "avg_trade": round(sum(pnls) / len(pnls), 2) if pnls else None,
+        "best_trade": round(closed.best, 2) if closed.best is not None else None,
+        "worst_trade": round(closed.worst, 2) if closed.worst is not None else None,
+        "avg_trade": round(closed.mean, 2) if closed.count else None,
         "level": gamification["level"],
         "xp": gamification["xp"],
         "next_level_xp": gamification["next_level_xp"],
@@ -600,6 +611,13 @@ async def execute_virtual_order(
             VirtualTradeModel.side == "BUY"
         ).order_by(VirtualTradeModel.created_at.desc()).first()
         
+        # MAE/MFE por tick desde la compra (cierre total o parcial)
+        tracker = get_excursion_tracker()
+        if base_asset in balances:
+            excursion = tracker.peek(spot_key(user_id, symbol), execution_price)
+        else:
+            excursion = tracker.close(spot_key(user_id, symbol), execution_price)
+        
         if last_buy:
             entry_price = last_buy.price
             pnl_amount = (execution_price - entry_price) * order.quantity
@@ -627,6 +645,7 @@ async def execute_virtual_order(
                     pnl=pnl_amount,
                     signals_used=signals_used,
                     patterns_detected=patterns_detected,
+                    excursion=excursion,
                     db_session=db
                 )
                 logger.info(f"🧠 AI aprendió del trade virtual {symbol}: PnL ${pnl_amount:.2f}")
@@ -636,6 +655,11 @@ async def execute_virtual_order(
     db.add(new_trade)
     db.commit()
     db.refresh(new_trade)
+    record_closed_trade(user_id, new_trade)
+    if new_trade.side == "BUY":
+        get_excursion_tracker().scale_in(
+            spot_key(user_id, symbol), symbol, "LONG", execution_price, order.quantity, current_asset_balance
+        )
     
     logger.success(f"📈 {action} virtual: {order.quantity} {base_asset} @ ${execution_price:.2f} (Total: ${total_amount:.2f})")
     
@@ -806,6 +830,7 @@ async def reset_virtual_wallet(
     db.query(VirtualTradeModel).filter(VirtualTradeModel.wallet_id == wallet.id).delete()
     
     db.commit()
+    get_trade_metrics().rebuild(user_id, "practice", [])  # Sin trades: métricas de práctica a cero
     
     return {
         "message": "✅ Wallet virtual reseteada con éxito ($50 USDT + $10 en cada cripto)",
@@ -1060,6 +1085,7 @@ async def open_futures_position(
     )
     db.add(new_trade)
     db.commit()
+    get_excursion_tracker().open(futures_key(new_position.id), symbol, side, current_price)
     
     return FuturesPositionResponse(
         id=new_position.id,
@@ -1126,7 +1152,7 @@ async def close_futures_position(
         side="SELL" if pos.side == "LONG" else "BUY",
         type="MARKET",
         strategy="MANUAL",
-        reason=f"Cierre de Contrato Futuro {pos.side} {pos.leverage}x (Precio entrada: ${pos.entry_price}, Precio salida: ${current_price})",
+        reason=f"{FUTURES_CLOSE_REASON} {pos.side} {pos.leverage}x (Precio entrada: ${pos.entry_price}, Precio salida: ${current_price})",
         quantity=pos.size,
         price=current_price,
         pnl=round(realized_pnl, 4),
@@ -1134,6 +1160,8 @@ async def close_futures_position(
     )
     db.add(new_trade)
     
+    excursion = get_excursion_tracker().close(futures_key(pos.id), current_price)
+    
     # === AI LEARNING INTEGRATION FOR FUTURES ===
     try:
         from app.ml.trading_agent import get_trading_agent
@@ -1151,6 +1179,7 @@ async def close_futures_position(
             pnl=realized_pnl,
             signals_used=signals_used,
             patterns_detected=patterns_detected,
+            excursion=excursion,
             db_session=db
         )
         logger.info(f"🧠 [IA Aprendizaje Futuros] La IA aprendió del cierre de futuros virtual {pos.symbol} ({pos.side}): PnL realizado = ${realized_pnl:.4f}")
@@ -1160,6 +1189,7 @@ async def close_futures_position(
     # Eliminar la posición de la DB
     db.delete(pos)
     db.commit()
+    record_closed_trade(user_id, new_trade)
     
     return {
         "status": "success",
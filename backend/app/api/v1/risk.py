@@ -4,9 +4,9 @@ SIC Ultra - Risk Management API
 Kelly Criterion y análisis de correlación.
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, List, Optional
 
 from app.api.v1.auth import oauth2_scheme, verify_token
 
@@ -30,8 +30,15 @@ class KellyResponse(BaseModel):
 
 
 class CorrelationData(BaseModel):
-    asset_pairs: Dict[str, float]  # {"BTC-SPX": 0.65, ...}
+    asset_pairs: Dict[str, float]  # {"ETHUSDT-SOLUSDT": 0.82, ...}
     interpretation: str
+    symbols: List[str] = []
+    matrix: List[List[float]] = []
+    clusters: List[List[str]] = []
+    cluster_exposure: List[Dict] = []
+    interval: Optional[str] = None
+    window: Optional[int] = None
+    updated_at: Optional[str] = None
 
 
 # === Endpoints ===
@@ -98,34 +105,44 @@ async def get_macro_correlation(
     token: str = Depends(oauth2_scheme)
 ):
     """
-    Correlaciones macro (simuladas).
+    Correlaciones rolling entre los activos operados.
     
-    En producción:
-    - Fetch real correlation data de APIs financieras
-    - Calcular correlación entre BTC y S&P500, Gold, DXY, etc
+    - Matriz de correlación de retornos sobre la ventana de velas cerradas
+    - Clusters de activos correlacionados (comparten presupuesto de riesgo)
+    - Exposición abierta por cluster
     """
     verify_token(token)
     
-    # SIMULACIÓN - En producción usarías datos reales
-    correlations = {
-        "BTC-SPX": 0.65,  # BTC vs S&P500 (equity risk-on)
-        "BTC-GOLD": 0.42,  # BTC vs Gold (safe haven)
-        "BTC-DXY": -0.58,  # BTC vs US Dollar Index (inverse)
-        "BTC-VIX": -0.35,  # BTC vs VIX (fear index)
-        "ETH-BTC": 0.88,  # ETH sigue a BTC
-        "ALTS-BTC": 0.72  # Altcoins correlacionan con BTC
-    }
+    from app.services.correlation_matrix import get_correlation_service
+    service = get_correlation_service()
+    snapshot = service.snapshot()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Matriz de correlación sincronizando")
     
-    interpretation = """
-📊 **Interpretación:**
-- **BTC-SPX (0.65)**: Alta correlación con equities. BTC actúa como risk-on asset.
-- **BTC-DXY (-0.58)**: Correlación negativa con USD. Dólar fuerte = BTC débil.
-- **ETH-BTC (0.88)**: ETH muy correlacionado, movimientos similares.
-
-💡 **Estrategia**: Cuando stocks caen, espera caída en BTC. Diversifica fuera de crypto.
-    """
+    exposure = {}
+    try:
+        from app.services.auto_execution import get_auto_execution_service
+        exposure = get_auto_execution_service().open_exposure
+    except Exception:
+        pass
+    
+    pairs = snapshot["pairs"]
+    top = sorted(pairs.items(), key=lambda kv: -abs(kv[1]))[:3]
+    grouped = [c for c in snapshot["clusters"] if len(c) > 1]
+    lines = ["📊 **Interpretación:**"]
+    lines += [f"- **{pair} ({value:+.2f})**: {'se mueven juntos' if value > 0 else 'se mueven en contra'}." for pair, value in top]
+    if grouped:
+        lines.append(f"\n💡 **Clusters** (ρ >= {snapshot['cluster_threshold']}): " + "; ".join("/".join(c) for c in grouped)
+                     + ". Sus posiciones comparten un único presupuesto de riesgo.")
     
     return CorrelationData(
-        asset_pairs=correlations,
-        interpretation=interpretation.strip()
+        asset_pairs=pairs,
+        interpretation="\n".join(lines),
+        symbols=snapshot["symbols"],
+        matrix=snapshot["matrix"],
+        clusters=snapshot["clusters"],
+        cluster_exposure=service.cluster_exposure(exposure),
+        interval=snapshot["interval"],
+        window=snapshot["window"],
+        updated_at=snapshot["updated_at"]
     )
@@ -638,6 +638,50 @@ async def get_strategy_weights(token: str = Depends(oauth2_scheme)):
 
 # === WebSocket para señales en tiempo real ===
 
+LLM_STREAM_COMMANDS = ("ai", "ai-verdict", "rag")
+
+
+async def _stream_llm_analysis(websocket: WebSocket, symbol: str, mode: str):
+    """
+    Análisis LLM en streaming: un mensaje `llm_token` por fragmento y
+    `llm_verdict` al final (mismo parseo que el análisis no-streaming).
+    
+    mode: "ai" (análisis completo), "ai-verdict" (se corta al tener
+    SIGNAL y CONFIDENCE) o "rag" (Ollama + base de conocimientos).
+    """
+    from app.ml.llm_connector import get_llm_manager
+    from app.ml.knowledge_base import get_ollama_rag
+    
+    base_signal = await asyncio.to_thread(get_signal_generator().analyze, symbol)
+    if not base_signal:
+        await websocket.send_json({"type": "no_signal", "symbol": symbol, "message": "Sin datos de mercado"})
+        return
+    
+    indicators = base_signal.get('timeframes', {}).get('1h', {}).get('indicators', {})
+    patterns = [r for r in base_signal.get('reasoning', []) if '📊' in r]
+    price = base_signal.get('current_price', 0)
+    
+    async def on_token(delta: str):
+        await websocket.send_json({"type": "llm_token", "symbol": symbol, "delta": delta})
+    
+    if mode == "rag":
+        result = await get_ollama_rag().stream_with_knowledge(symbol, price, indicators, patterns, on_token)
+    else:
+        result = await get_llm_manager().stream_market_analysis(
+            symbol, price, indicators, patterns, [], on_token, verdict_only=(mode == "ai-verdict")
+        )
+    
+    if not result:
+        await websocket.send_json({"type": "llm_unavailable", "symbol": symbol, "message": "Ningún LLM respondió"})
+        return
+    
+    await websocket.send_json({
+        "type": "llm_verdict",
+        **result,
+        "timestamp": result["timestamp"].isoformat()
+    })
+
+
 @router.websocket("/ws")
 async def websocket_signals(websocket: WebSocket):
     """
@@ -647,6 +691,7 @@ async def websocket_signals(websocket: WebSocket):
     - "scan": Escanear mercado inmediatamente
     - "analyze:BTCUSDT": Analizar símbolo específico
     - "performance": Ver rendimiento del agente
+    - "ai:BTCUSDT" / "ai-verdict:BTCUSDT" / "rag:BTCUSDT": Análisis LLM en streaming
     """
     await manager.connect(websocket)
     
@@ -654,7 +699,7 @@ async def websocket_signals(websocket: WebSocket):
         await websocket.send_json({
             "type": "connected",
             "message": "🤖 Conectado al Agente IA de Trading",
-            "commands": ["scan", "analyze:SYMBOL", "performance"],
+            "commands": ["scan", "analyze:SYMBOL", "performance", "ai:SYMBOL", "ai-verdict:SYMBOL", "rag:SYMBOL"],
             "timestamp": datetime.utcnow().isoformat()
         })
         
@@ -715,6 +760,10 @@ async def websocket_signals(websocket: WebSocket):
                             "message": "Sin señal clara (HOLD)"
                         })
                 
+                elif data.split(":")[0] in LLM_STREAM_COMMANDS and ":" in data:
+                    mode, symbol = data.split(":", 1)
+                    await _stream_llm_analysis(websocket, symbol.upper(), mode)
+                
                 elif data == "performance":
                     agent = get_trading_agent()
                     stats = agent.get_performance_stats()
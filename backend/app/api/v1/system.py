@@ -4,6 +4,8 @@ SIC Ultra - API de Control del Sistema
 Endpoints para gestionar servicios del sistema operativo desde el dashboard:
 - Estado de Ollama (activo / inactivo)
 - Encender / Apagar Ollama
+- Reporte de tiempo de arranque (imports y carga de modelos)
+- Salud y métricas de los proveedores LLM
 """
 
 import subprocess
@@ -11,6 +13,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import Dict
 
 from app.api.v1.auth import get_current_user
+from app.infrastructure.startup_report import get_startup_report
+from app.ml.llm_connector import get_llm_manager
 from app.infrastructure.database.models import User
 
 router = APIRouter()
@@ -109,3 +113,19 @@ async def stop_ollama(current_user: User = Depends(get_current_user)) -> Dict:
             detail=f"No se pudo detener Ollama. Error: {result['stderr']}"
         )
     return {"success": True, "message": "🔴 Ollama detenido correctamente.", "action": "stop"}
+
+
+@router.get("/startup-report")
+async def startup_report(top: int = 15, current_user: User = Depends(get_current_user)) -> Dict:
+    """
+    Desglose del arranque: segundos de import por módulo y carga de cada modelo ML.
+    """
+    return get_startup_report(top)
+
+
+@router.get("/llm")
+async def llm_metrics(current_user: User = Depends(get_current_user)) -> Dict:
+    """
+    Estado de cada proveedor LLM: salud, latencia EWMA, tasa de error y límites.
+    """
+    return get_llm_manager().get_metrics()
@@ -13,6 +13,7 @@ from loguru import logger
 
 from app.api.v1.auth import oauth2_scheme, verify_token
 from app.infrastructure.binance.client import get_binance_client
+from app.services.account_snapshot import get_account_stream
 from app.config import settings
 
 
@@ -55,9 +56,18 @@ async def get_wallet(token: str = Depends(oauth2_scheme)):
     Obtener tu cartera de Binance REAL.
     
     Muestra todos los activos con balance > 0 y su valor en USD.
+    Se sirve desde el snapshot del user-data stream; REST solo si no está al día.
     """
     verify_token(token)
     
+    account_stream = get_account_stream()
+    if account_stream.is_fresh():
+        return {
+            **account_stream.snapshot.wallet(),
+            "last_update": datetime.utcnow(),
+            "connected": True
+        }
+    
     client = get_binance_client()
     
     if not client.is_connected():
@@ -122,6 +132,18 @@ async def get_balance(asset: str, token: str = Depends(oauth2_scheme)):
     """
     verify_token(token)
     
+    account_stream = get_account_stream()
+    if account_stream.is_fresh():
+        snapshot = account_stream.snapshot
+        balance = snapshot.balance(asset)
+        if balance is None:
+            raise HTTPException(status_code=404, detail=f"Activo {asset} no encontrado")
+        usd_value = snapshot.usd_value(balance['asset'], balance['total'])
+        return {
+            **balance,
+            "usd_value": round(usd_value, 8) if usd_value else None
+        }
+    
     client = get_binance_client()
     balance = client.get_balance(asset.upper())
     
@@ -199,10 +221,12 @@ async def get_connection_status(token: str = Depends(oauth2_scheme)):
     """
     verify_token(token)
     
-    client = get_binance_client()
+    account_stream = get_account_stream()
+    connected = account_stream.connected or get_binance_client().is_connected()
     
     return {
-        "connected": client.is_connected(),
+        "connected": connected,
         "testnet": settings.binance_testnet,
+        "account_stream": account_stream.get_status(),
         "timestamp": datetime.utcnow()
     }
@@ -89,6 +89,69 @@ class Settings(BaseSettings):
     openrouter_api_key: str = ""    # https://openrouter.ai
     openrouter_model: str = "nvidia/nemotron-3-super-120b-a12b:free"  # Modelo gratuito activo
     centibot_url: str = "http://localhost:7500/api/send"
+    llm_verdict_cache_enabled: bool = True  # Reutilizar veredictos hasta el cierre de vela
+    llm_verdict_cache_size: int = 256
+    llm_health_probe_interval_seconds: float = 30.0  # Sondeo de salud de proveedores en background
+    
+    # === P2P (libro profundo) ===
+    p2p_book_max_concurrency: int = 4    # Páginas en vuelo a la vez contra Binance
+    p2p_book_cache_seconds: int = 10     # TTL del libro combinado
+    
+    # === Order book local (diff-depth) ===
+    order_book_stream_enabled: bool = True
+    order_book_snapshot_limit: int = 1000  # Niveles del snapshot REST inicial
+    order_book_record_dir: str = ""        # Grabar snapshots + diffs en JSONL (replay)
+    order_book_max_symbols: int = 20       # Libros añadidos en caliente (además de los de arranque)
+    order_book_idle_seconds: float = 900.0 # Sin consultas en este tiempo: se deja de seguir
+    
+    # === Flujo de trades (aggTrade: CVD, footprint) ===
+    trade_flow_stream_enabled: bool = True
+    trade_flow_bar_seconds: int = 60       # Duración de cada barra
+    trade_flow_max_bars: int = 240         # Barras retenidas (4h con barras de 1m)
+    trade_flow_large_factor: float = 10.0  # Print grande = nocional >= factor × media
+    trade_flow_max_symbols: int = 20       # Flujos añadidos en caliente (además de los de arranque)
+    trade_flow_idle_seconds: float = 900.0 # Sin consultas en este tiempo: se deja de seguir
+    excursion_stream_enabled: bool = True  # MAE/MFE por tick de las posiciones abiertas
+    
+    # === ML Inference (micro-batching) ===
+    ml_inference_max_batch: int = 32       # Máximo de requests por forward pass
+    ml_inference_max_wait_ms: float = 5.0  # Ventana de agrupación
+    
+    # === ML Re-entrenamiento incremental ===
+    ml_retraining_enabled: bool = False
+    ml_retrain_symbols: str = "BTCUSDT"      # Separados por coma
+    ml_retrain_interval: str = "1h"
+    ml_retrain_max_age_hours: float = 24.0
+    
+    # === Correlación entre activos (sizing por cluster) ===
+    correlation_stream_enabled: bool = True
+    correlation_interval: str = "1h"
+    correlation_window: int = 168               # Velas en la ventana rolling (7 días en 1h)
+    correlation_cluster_threshold: float = 0.7  # ρ mínimo para agrupar símbolos
+    correlation_cluster_budget: float = 1.5     # Presupuesto de un cluster = factor × posición máxima
+
+    # === Cuenta Binance (user-data stream) ===
+    account_stream_enabled: bool = True
+    account_keepalive_seconds: float = 1800.0  # Renovar listenKey (caduca a los 60 min)
+    account_reconcile_seconds: float = 900.0   # Reconciliación REST periódica
+
+    # === Automatización multiusuario ===
+    automation_settings_ttl_seconds: float = 300.0  # Recarga de respaldo si la BD cambia fuera de la API
+
+    # === Riesgo Monte Carlo ===
+    risk_mc_paths: int = 10_000             # Trayectorias simuladas
+    risk_mc_horizon_trades: int = 100       # Trades por trayectoria
+    risk_mc_ruin_drawdown: float = 0.5      # Ruina = caída del 50% del capital
+    risk_reference_capital: float = 1000.0  # Capital de referencia para las métricas del agente
+
+    # === Knowledge Base (ingesta de libros) ===
+    knowledge_ingest_workers: int = 2       # Hilos de embeddings por libro
+    knowledge_embed_batch_size: int = 64    # Chunks por lote de embeddings
+    rag_cache_size: int = 512               # Entradas LRU (embeddings y resultados)
+    rag_cache_ttl_seconds: float = 900.0
+    
+    # === ML Carga de modelos ===
+    ml_warmup_on_startup: bool = True  # Cargar modelos en background tras el arranque (lazy si False)
     
     # === Admin Account (OBLIGATORIO desde .env) ===
     admin_email: str = Field(..., min_length=5)  # Obligatorio desde .env
@@ -226,7 +226,13 @@ class BinanceClient:
             logger.error(f"Error obteniendo ticker 24h de {symbol}: {e}")
             return None
     
-    def get_klines(self, symbol: str, interval: str = '1h', limit: int = 100) -> List[Dict]:
+    def get_klines(
+        self,
+        symbol: str,
+        interval: str = '1h',
+        limit: int = 100,
+        end_time: Optional[datetime] = None
+    ) -> List[Dict]:
         """
         Obtener velas/candlesticks para gráficos.
         
@@ -234,16 +240,16 @@ class BinanceClient:
             symbol: Par de trading
             interval: 1m, 5m, 15m, 1h, 4h, 1d
             limit: Número de velas (máx 1000)
+            end_time: Solo velas abiertas hasta ese instante (paginar hacia atrás)
         """
         if not self.client:
             return []
             
         try:
-            klines = self.client.get_klines(
-                symbol=symbol.upper(),
-                interval=interval,
-                limit=limit
-            )
+            params = {'symbol': symbol.upper(), 'interval': interval, 'limit': limit}
+            if end_time is not None:
+                params['endTime'] = int(end_time.timestamp() * 1000)
+            klines = self.client.get_klines(**params)
             
             return [
                 {
@@ -264,7 +270,14 @@ class BinanceClient:
         """
         Calcular valor total de la wallet en USD.
         Convierte todos los activos a USDT.
+        
+        Usa el snapshot del user-data stream si está al día (sin REST).
         """
+        from app.services.account_snapshot import get_account_stream
+        account_stream = get_account_stream()
+        if account_stream.is_fresh():
+            return account_stream.snapshot.total_usd()
+        
         balances = self.get_balances(hide_zero=True)
         prices = self.get_all_prices()
         total_usd = 0.0
@@ -1,12 +1,20 @@
 """
 SIC Ultra - Cliente P2P de Binance
 
-Obtener ofertas del mercado P2P USDT/VES.
+Obtener ofertas del mercado P2P USDT/VES:
+- Páginas sueltas (get_offers, caché de 10s por página)
+- Libro profundo por lado (get_order_book): varias páginas por método de
+  pago y monto en paralelo acotado, combinado, ordenado por precio y
+  cacheado como libro completo
+
+Todas las requests comparten un único httpx.AsyncClient (pool keep-alive).
 """
 
+import asyncio
 import httpx
 import json
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from loguru import logger
 
@@ -14,6 +22,23 @@ from app.config import settings
 from app.infrastructure.redis_client import get_redis_client
 
 
+def _parse_offer(item: Dict) -> Dict:
+    """Oferta normalizada a partir de un item de la API de anuncios"""
+    adv = item.get("adv", {})
+    advertiser = item.get("advertiser", {})
+    return {
+        "adv_no": adv.get("advNo"),
+        "advertiser": advertiser.get("nickName", "Anónimo"),
+        "price": float(adv.get("price", 0)),
+        "available": float(adv.get("surplusAmount", 0)),
+        "min_amount": float(adv.get("minSingleTransAmount", 0)),
+        "max_amount": float(adv.get("maxSingleTransAmount", 0)),
+        "payment_methods": [p.get("identifier", "") for p in adv.get("tradeMethods", [])],
+        "completion_rate": float(advertiser.get("monthFinishRate", 0)) * 100,
+        "orders_count": advertiser.get("monthOrderCount", 0)
+    }
+
+
 class BinanceP2PClient:
     """
     Cliente para obtener datos del mercado P2P de Binance.
@@ -22,12 +47,75 @@ class BinanceP2PClient:
     """
     
     BASE_URL = "https://p2p.binance.com/bapi/c2c/v2/friendly/c2c/adv/search"
+    MAX_ROWS = 20  # Máximo de filas por página que acepta la API
     
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None):
         self.headers = {
             "Content-Type": "application/json",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
+        self.max_concurrency = max_concurrency or getattr(settings, 'p2p_book_max_concurrency', 4)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+    
+    # === Pool HTTP ===
+    
+    def _bind_loop(self):
+        """Pool y semáforo pertenecen a un event loop: se recrean si cambia."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client = None
+            self._loop = loop
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        self._bind_loop()
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=10.0,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        return self._client
+    
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    async def _fetch_page(
+        self,
+        fiat: str,
+        asset: str,
+        trade_type: str,
+        page: int,
+        rows: int,
+        pay_types: Optional[List[str]],
+        trans_amount: Optional[float]
+    ) -> List[Dict]:
+        """Una página de anuncios, sin caché (como máximo `max_concurrency` en vuelo)"""
+        payload = {
+            "fiat": fiat.upper(),
+            "asset": asset.upper(),
+            "tradeType": trade_type.upper(),
+            "page": page,
+            "rows": rows,
+            "payTypes": pay_types if pay_types else [],
+            "transAmount": trans_amount,
+            "publisherType": None
+        }
+        client = self.client
+        async with self._semaphore:
+            response = await client.post(self.BASE_URL, json=payload)
+        response.raise_for_status()
+        return [_parse_offer(item) for item in response.json().get("data") or []]
+    
+    # === Ofertas (una página) ===
     
     async def get_offers(
         self,
@@ -56,56 +144,137 @@ class BinanceP2PClient:
             logger.warning(f"Error leyendo caché P2P: {e}")
 
         # 2. Consultar externamente si no existe en caché (Cache Miss)
-        payload = {
+        try:
+            offers = await self._fetch_page(fiat, asset, trade_type, page, rows, pay_types, trans_amount)
+        except Exception as e:
+            logger.error(f"Error obteniendo ofertas P2P: {e}")
+            return []
+        
+        # 3. Almacenar en caché por 10 segundos para proteger límites e IP de Binance
+        try:
+            redis_client.set(cache_key, json.dumps(offers), ex=10)
+            logger.info(f"💾 [CACHE STORE] Guardadas {len(offers)} ofertas P2P en caché para key: {cache_key}")
+        except Exception as cache_err:
+            logger.warning(f"Error escribiendo caché P2P: {cache_err}")
+        
+        return offers
+    
+    # === Libro profundo (muchas páginas) ===
+    
+    async def get_order_book(
+        self,
+        fiat: str = "VES",
+        asset: str = "USDT",
+        trade_type: str = "BUY",
+        pages: int = 5,
+        rows: int = MAX_ROWS,
+        pay_types: Optional[List[str]] = None,
+        trans_amounts: Optional[List[float]] = None
+    ) -> Dict:
+        """
+        Libro de un lado combinando `pages` páginas por cada método de pago
+        y monto pedido (cada uno es una búsqueda distinta en Binance).
+        
+        La página 1 de todas las búsquedas va en paralelo; las siguientes solo
+        se piden para búsquedas cuya página 1 vino llena. Las ofertas repetidas
+        entre búsquedas se combinan por número de anuncio.
+        
+        Returns:
+            Dict con `offers` ordenadas del mejor precio al peor (BUY: ascendente,
+            SELL: descendente) y `cum_available` (profundidad acumulada en asset).
+        """
+        side = trade_type.upper()
+        rows = min(rows, self.MAX_ROWS)
+        searches: List[Tuple[Optional[str], Optional[float]]] = [
+            (pay_type, amount)
+            for pay_type in (pay_types or [None])
+            for amount in (trans_amounts or [None])
+        ]
+        cache_key = (
+            f"p2p:book:{fiat.upper()}:{asset.upper()}:{side}:{pages}:{rows}:"
+            f"{','.join(sorted(pay_types or []))}:{','.join(str(a) for a in sorted(trans_amounts or []))}"
+        )
+        
+        redis_client = get_redis_client()
+        try:
+            cached_data = redis_client.get(cache_key)
+            if cached_data:
+                return json.loads(cached_data)
+        except Exception as e:
+            logger.warning(f"Error leyendo caché P2P: {e}")
+        
+        start = time.perf_counter()
+        stats = {"requests": 0, "failed_requests": 0}
+        
+        async def fetch(search, page) -> List[Dict]:
+            pay_type, amount = search
+            stats["requests"] += 1
+            try:
+                return await self._fetch_page(
+                    fiat, asset, side, page, rows, [pay_type] if pay_type else None, amount
+                )
+            except Exception as e:
+                stats["failed_requests"] += 1
+                logger.warning(f"⚠️ Página P2P {side} {pay_type or 'todos'} p{page} falló: {e}")
+                return []
+        
+        first_pages = await asyncio.gather(*(fetch(search, 1) for search in searches))
+        more = [
+            (search, page)
+            for search, offers in zip(searches, first_pages) if len(offers) >= rows
+            for page in range(2, pages + 1)
+        ]
+        next_pages = await asyncio.gather(*(fetch(search, page) for search, page in more))
+        
+        book = {
             "fiat": fiat.upper(),
             "asset": asset.upper(),
-            "tradeType": trade_type.upper(),
-            "page": page,
-            "rows": rows,
-            "payTypes": pay_types if pay_types else [],
-            "transAmount": trans_amount,
-            "publisherType": None
+            "trade_type": side,
+            "offers": self.merge_offers(side, list(first_pages) + list(next_pages)),
+            "searches": len(searches),
+            **stats,
+            "fetch_ms": round((time.perf_counter() - start) * 1000, 1),
+            "timestamp": datetime.utcnow().isoformat()
         }
+        book["total_available"] = book["offers"][-1]["cum_available"] if book["offers"] else 0.0
+        
+        # Si fallaron todas las páginas el libro vacío no se cachea: la próxima petición reintenta
+        if stats["failed_requests"] == stats["requests"]:
+            return book
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.BASE_URL,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                offers = []
-                for item in data.get("data", []):
-                    adv = item.get("adv", {})
-                    advertiser = item.get("advertiser", {})
-                    
-                    offers.append({
-                        "advertiser": advertiser.get("nickName", "Anónimo"),
-                        "price": float(adv.get("price", 0)),
-                        "available": float(adv.get("surplusAmount", 0)),
-                        "min_amount": float(adv.get("minSingleTransAmount", 0)),
-                        "max_amount": float(adv.get("maxSingleTransAmount", 0)),
-                        "payment_methods": [p.get("identifier", "") for p in adv.get("tradeMethods", [])],
-                        "completion_rate": float(advertiser.get("monthFinishRate", 0)) * 100,
-                        "orders_count": advertiser.get("monthOrderCount", 0)
-                    })
-                
-                # 3. Almacenar en caché por 10 segundos para proteger límites e IP de Binance
-                try:
-                    redis_client.set(cache_key, json.dumps(offers), ex=10)
-                    logger.info(f"💾 [CACHE STORE] Guardadas {len(offers)} ofertas P2P en caché para key: {cache_key}")
-                except Exception as cache_err:
-                    logger.warning(f"Error escribiendo caché P2P: {cache_err}")
-                
-                return offers
-                
-        except Exception as e:
-            logger.error(f"Error obteniendo ofertas P2P: {e}")
-            return []
+            redis_client.set(cache_key, json.dumps(book), ex=getattr(settings, 'p2p_book_cache_seconds', 10))
+        except Exception as cache_err:
+            logger.warning(f"Error escribiendo caché P2P: {cache_err}")
+        
+        return book
+    
+    @staticmethod
+    def merge_offers(trade_type: str, pages: List[List[Dict]]) -> List[Dict]:
+        """Combinar páginas sin duplicados, del mejor precio al peor, con profundidad acumulada"""
+        merged: Dict = {}
+        for offers in pages:
+            for offer in offers:
+                key = offer.get("adv_no") or (offer["advertiser"], offer["price"])
+                merged.setdefault(key, offer)
+        
+        # Comprar cripto: precio más bajo primero; vender: más alto primero. A igual precio, más liquidez.
+        sign = 1 if trade_type.upper() == "BUY" else -1
+        book = sorted(merged.values(), key=lambda o: (sign * o["price"], -o["available"]))
+        
+        cumulative = 0.0
+        for offer in book:
+            cumulative += offer["available"]
+            offer["cum_available"] = round(cumulative, 8)
+        return book
+    
+    async def get_order_books(self, fiat: str = "VES", asset: str = "USDT", **kwargs) -> Dict[str, Dict]:
+        """Ambos lados del libro en paralelo"""
+        buy, sell = await asyncio.gather(
+            self.get_order_book(fiat, asset, "BUY", **kwargs),
+            self.get_order_book(fiat, asset, "SELL", **kwargs)
+        )
+        return {"BUY": buy, "SELL": sell}
     
     async def get_buy_offers(self, fiat: str = "VES", asset: str = "USDT", rows: int = 10, pay_types: Optional[List[str]] = None, trans_amount: Optional[float] = None) -> List[Dict]:
         """Obtener ofertas para COMPRAR cripto (pagas fiat)"""
@@ -119,8 +288,10 @@ class BinanceP2PClient:
         """
         Obtener resumen del mercado P2P con mejores precios y spread.
         """
-        buy_offers = await self.get_buy_offers(fiat, asset, rows=5)
-        sell_offers = await self.get_sell_offers(fiat, asset, rows=5)
+        buy_offers, sell_offers = await asyncio.gather(
+            self.get_buy_offers(fiat, asset, rows=5),
+            self.get_sell_offers(fiat, asset, rows=5)
+        )
         
         if not buy_offers and not sell_offers:
             return {
@@ -0,0 +1,82 @@
+"""
+SIC Ultra - Streams WebSocket de Binance
+
+Conexión a streams combinados de mercado (`/stream?streams=a/b/c`):
+cada mensaje llega como {"stream": "btcusdt@depth@100ms", "data": {...}}.
+La reconexión es responsabilidad del consumidor (cada servicio decide cómo
+resincronizar su estado tras un corte).
+"""
+
+import json
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+from loguru import logger
+
+from app.config import settings
+
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+    logger.warning("⚠️ websockets no disponible. Streams de Binance deshabilitados.")
+
+
+STREAM_BASE_URL = "wss://stream.binance.com:9443"
+TESTNET_STREAM_BASE_URL = "wss://testnet.binance.vision"
+
+
+def combined_stream_url(streams: Iterable[str], testnet: Optional[bool] = None) -> str:
+    testnet = settings.binance_testnet if testnet is None else testnet
+    base = TESTNET_STREAM_BASE_URL if testnet else STREAM_BASE_URL
+    return f"{base}/stream?streams={'/'.join(streams)}"
+
+
+class BinanceStream:
+    """
+    Una conexión a un stream combinado.
+
+    Permite añadir y quitar streams en caliente (SUBSCRIBE / UNSUBSCRIBE) sin reconectar.
+    """
+
+    def __init__(self, streams: Iterable[str], testnet: Optional[bool] = None):
+        self.streams = list(dict.fromkeys(streams))
+        self.testnet = testnet
+        self._ws = None
+        self._request_id = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None
+
+    async def subscribe(self, streams: Iterable[str]):
+        new = [s for s in streams if s not in self.streams]
+        if not new:
+            return
+        self.streams.extend(new)
+        if self._ws is not None:
+            self._request_id += 1
+            await self._ws.send(json.dumps({"method": "SUBSCRIBE", "params": new, "id": self._request_id}))
+
+    async def unsubscribe(self, streams: Iterable[str]):
+        gone = [s for s in streams if s in self.streams]
+        if not gone:
+            return
+        self.streams = [s for s in self.streams if s not in gone]
+        if self._ws is not None:
+            self._request_id += 1
+            await self._ws.send(json.dumps({"method": "UNSUBSCRIBE", "params": gone, "id": self._request_id}))
+
+    async def messages(self) -> AsyncIterator[Tuple[str, dict]]:
+        """(stream, data) hasta que se cierre la conexión"""
+        if not WEBSOCKETS_AVAILABLE:
+            raise RuntimeError("websockets no está instalado")
+        async with websockets.connect(combined_stream_url(self.streams, self.testnet), ping_interval=20) as ws:
+            self._ws = ws
+            try:
+                async for raw in ws:
+                    message = json.loads(raw)
+                    if "stream" in message:  # Las respuestas a SUBSCRIBE llegan sin stream
+                        yield message["stream"], message["data"]
+            finally:
+                self._ws = None
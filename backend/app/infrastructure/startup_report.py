@@ -0,0 +1,143 @@
+"""
+SIC Ultra - Reporte de Tiempo de Arranque
+
+Mide cuánto cuesta arrancar la API:
+- Tiempo de import por módulo (self-time, sin contar sub-imports) agregado
+  por paquete raíz (tensorflow, chromadb, app.api.v1.knowledge, ...)
+- Tiempo de carga de cada modelo ML (lazy o warm-up en background)
+
+El `ImportTimer` se instala al inicio de app.main, antes de los imports pesados.
+"""
+
+import importlib.abc
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Envuelve el loader real para medir exec_module."""
+
+    def __init__(self, loader, timer: "ImportTimer"):
+        self._loader = loader
+        self._timer = timer
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._timer._enter()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer._exit(module.__name__, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Meta path finder que cronometra cada import nuevo.
+
+    Guarda el tiempo inclusivo y el self-time (inclusivo menos sub-imports)
+    de cada módulo, para no contar dos veces dependencias anidadas.
+    """
+
+    def __init__(self):
+        self.inclusive: Dict[str, float] = {}
+        self.self_time: Dict[str, float] = {}
+        self.installed_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._local = threading.local()
+
+    def install(self):
+        if self not in sys.meta_path:
+            self.installed_at = time.perf_counter()
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+            self.finished_at = time.perf_counter()
+
+    def find_spec(self, fullname, path, target=None):
+        # Delegar al resto de finders y envolver el loader encontrado
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def _stack(self) -> List[float]:
+        if not hasattr(self._local, "children"):
+            self._local.children = []
+        return self._local.children
+
+    def _enter(self):
+        self._stack().append(0.0)
+
+    def _exit(self, name: str, elapsed: float):
+        stack = self._stack()
+        children = stack.pop()
+        self.inclusive[name] = elapsed
+        self.self_time[name] = max(0.0, elapsed - children)
+        if stack:
+            stack[-1] += elapsed
+
+    def by_package(self, top: int = 15) -> List[Dict]:
+        """Self-time agregado por paquete raíz (app.* se desglosa por módulo)."""
+        totals: Dict[str, Dict] = {}
+        for name, seconds in self.self_time.items():
+            key = name if name.startswith("app.") else name.split(".")[0]
+            entry = totals.setdefault(key, {"module": key, "seconds": 0.0, "modules": 0})
+            entry["seconds"] += seconds
+            entry["modules"] += 1
+
+        ranked = sorted(totals.values(), key=lambda e: e["seconds"], reverse=True)[:top]
+        for entry in ranked:
+            entry["seconds"] = round(entry["seconds"], 4)
+        return ranked
+
+
+import_timer = ImportTimer()
+
+_model_loads: List[Dict] = []
+_loads_lock = threading.Lock()
+
+
+def record_load(component: str, seconds: float, **detail):
+    """Registrar el coste de cargar un componente pesado (modelos ML, embeddings...)."""
+    with _loads_lock:
+        _model_loads.append({
+            "component": component,
+            "seconds": round(seconds, 4),
+            "loaded_at": datetime.utcnow().isoformat(),
+            **detail
+        })
+
+
+def get_startup_report(top: int = 15) -> Dict:
+    """Desglose de imports y cargas de modelos desde el arranque."""
+    total_imports = sum(import_timer.self_time.values())
+    startup = None
+    if import_timer.installed_at is not None and import_timer.finished_at is not None:
+        startup = round(import_timer.finished_at - import_timer.installed_at, 4)
+
+    with _loads_lock:
+        loads = list(_model_loads)
+
+    return {
+        "startup_seconds": startup,
+        "import_seconds": round(total_imports, 4),
+        "modules_imported": len(import_timer.self_time),
+        "imports_by_module": import_timer.by_package(top),
+        "model_loads": loads,
+    }
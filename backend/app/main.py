@@ -5,6 +5,10 @@ Punto de entrada principal de la aplicación.
 Configura middleware, routers y eventos de startup/shutdown.
 """
 
+# Cronometrar imports desde el primer momento (reporte de arranque)
+from app.infrastructure.startup_report import import_timer
+import_timer.install()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -139,25 +143,15 @@ async def lifespan(app: FastAPI):
         db = SessionLocal()
         try:
             # Buscar configuraciones que tengan enabled = True
+            from app.services.automation_users import settings_from_config
+            
             active_configs = db.query(AutomationConfig).filter(AutomationConfig.enabled == True).all()
+            auto_service = get_auto_execution_service()
             for config in active_configs:
-                auto_service = get_auto_execution_service()
-                
-                settings_dict = {
-                    'max_daily_trades': config.max_daily_trades,
-                    'max_position_size': config.max_position_size,
-                    'min_signal_confidence': config.min_signal_confidence,
-                    'allowed_tiers': config.allowed_tiers or ['S', 'A'],
-                    'risk_level': config.risk_level,
-                    'pause_on_high_volatility': config.pause_on_high_volatility,
-                    'check_interval_seconds': config.check_interval_seconds,
-                    'practice_mode_only': config.practice_mode_only
-                }
-                
-                # Iniciar la automatización en background para el usuario
-                logger.info(f"🔄 Restaurando bot IA 24/7 persistido para usuario {config.user_id}...")
-                await auto_service.start_automation(config.user_id, settings_dict)
-                logger.success(f"🤖 Bot IA 24/7 restaurado con éxito para usuario {config.user_id}")
+                # Suscribir al usuario al bucle compartido (ya está enabled en BD)
+                await auto_service.start_automation(int(config.user_id), settings_from_config(config), persist=False)
+            if active_configs:
+                logger.success(f"🤖 Bot IA 24/7 restaurado para {len(active_configs)} usuario(s)")
         except Exception as err:
             logger.error(f"❌ Error en consulta de restauración de automatización: {err}")
         finally:
@@ -165,6 +159,79 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ No se pudo restaurar la automatización: {e}")
 
+    # Scheduler de re-entrenamiento ML incremental (opcional)
+    if settings.ml_retraining_enabled:
+        try:
+            from app.ml.retraining import get_retraining_scheduler
+            await get_retraining_scheduler().start()
+        except Exception as e:
+            logger.error(f"❌ No se pudo iniciar el re-entrenamiento ML: {e}")
+
+    # Order books locales (diff-depth) para order flow sin llamadas REST por request
+    if settings.order_book_stream_enabled:
+        try:
+            from app.services.order_book import get_order_book_manager
+            from app.services.market_scanner import get_market_scanner
+            await get_order_book_manager().start(get_market_scanner().symbols)
+        except Exception as e:
+            logger.error(f"❌ No se pudieron iniciar los order books locales: {e}")
+
+    # Flujo de trades (CVD, footprint, prints grandes) desde aggTrade
+    if settings.trade_flow_stream_enabled:
+        try:
+            from app.services.trade_flow import get_trade_flow_manager
+            from app.services.market_scanner import get_market_scanner
+            await get_trade_flow_manager().start(get_market_scanner().symbols)
+        except Exception as e:
+            logger.error(f"❌ No se pudo iniciar el flujo de trades: {e}")
+
+    # Excursiones (MAE/MFE) por tick de las posiciones abiertas
+    try:
+        from app.services.excursion_tracker import get_excursion_tracker, restore_open_positions
+        from app.infrastructure.database.session import SessionLocal
+        from app.infrastructure.database.models import VirtualPosition
+        tracker = get_excursion_tracker()
+        await tracker.start()
+        db = SessionLocal()
+        try:
+            restored = restore_open_positions(tracker, db.query(VirtualPosition).all())
+        finally:
+            db.close()
+        if restored:
+            logger.info(f"📏 {len(restored)} posiciones de futuros retomadas para MAE/MFE")
+    except Exception as e:
+        logger.error(f"❌ No se pudo iniciar el seguimiento de excursiones: {e}")
+
+    # Matriz de correlación rolling (sizing por cluster de activos correlacionados)
+    if settings.correlation_stream_enabled:
+        try:
+            from app.services.correlation_matrix import get_correlation_service
+            from app.services.market_scanner import get_market_scanner
+            await get_correlation_service().start(get_market_scanner().symbols)
+        except Exception as e:
+            logger.error(f"❌ No se pudo iniciar la matriz de correlación: {e}")
+
+    # Snapshot de la cuenta real (user-data stream): /wallet sin REST por request
+    if settings.account_stream_enabled:
+        try:
+            from app.services.account_snapshot import get_account_stream
+            await get_account_stream().start()
+        except Exception as e:
+            logger.error(f"❌ No se pudo iniciar el stream de cuenta: {e}")
+
+    # Sondeo de salud de proveedores LLM (el LLMManager elige por estado, sin sondear inline)
+    try:
+        from app.ml.llm_connector import get_llm_manager
+        await get_llm_manager().start()
+    except Exception as e:
+        logger.error(f"❌ No se pudo iniciar el sondeo de LLMs: {e}")
+
+    # Warm-up de modelos ML en segundo plano: la API ya acepta requests
+    if settings.ml_warmup_on_startup:
+        from app.ml.models import warm_up_models
+        asyncio.create_task(asyncio.to_thread(warm_up_models))
+
+    import_timer.uninstall()
     logger.success("✅ SIC Ultra iniciado correctamente")
     
     yield  # App running
@@ -189,6 +256,52 @@ async def lifespan(app: FastAPI):
     except:
         pass
 
+    # Detener scheduler de re-entrenamiento ML
+    if settings.ml_retraining_enabled:
+        try:
+            from app.ml.retraining import get_retraining_scheduler
+            await get_retraining_scheduler().stop()
+        except Exception:
+            pass
+
+    # Detener order books locales
+    try:
+        from app.services.order_book import get_order_book_manager
+        await get_order_book_manager().stop()
+    except Exception:
+        pass
+
+    try:
+        from app.services.trade_flow import get_trade_flow_manager
+        await get_trade_flow_manager().stop()
+    except Exception:
+        pass
+
+    try:
+        from app.services.correlation_matrix import get_correlation_service
+        await get_correlation_service().stop()
+    except Exception:
+        pass
+
+    try:
+        from app.services.excursion_tracker import get_excursion_tracker
+        await get_excursion_tracker().stop()
+    except Exception:
+        pass
+
+    try:
+        from app.services.account_snapshot import get_account_stream
+        await get_account_stream().stop()
+    except Exception:
+        pass
+
+    # Detener sondeo LLM y cerrar pools HTTP
+    try:
+        from app.ml.llm_connector import get_llm_manager
+        await get_llm_manager().stop()
+    except Exception:
+        pass
+
     logger.info("👋 SIC Ultra cerrado")
 
 
@@ -8,6 +8,8 @@ Cada patrón tiene un score de fuerza y dirección.
 from typing import Dict, List, Optional
 from loguru import logger
 
+from app.ml.pattern_engine import PATTERN_DIRECTIONS, pattern_masks
+
 
 def analyze_candle(candle: Dict) -> Dict:
     """
@@ -289,135 +291,60 @@ def is_marubozu(candle: Dict) -> Dict:
     return {"is_marubozu": False, "direction": None}
 
 
+# (nombre, fuerza, descripción) en el orden en que se reportan
+PATTERN_SCORES = [
+    # === Patrones de 1 vela ===
+    ("Doji", 1, "Indecisión en el mercado"),
+    ("Hammer", 2, "Posible reversión alcista"),
+    ("Inverted Hammer", 1.5, "Posible reversión alcista (requiere confirmación)"),
+    ("Shooting Star", 2, "Posible reversión bajista"),
+    ("Hanging Man", 1.5, "Advertencia bajista"),
+    ("BULLISH Marubozu", 2.5, "Dominio total del lado comprador/vendedor"),
+    ("BEARISH Marubozu", 2.5, "Dominio total del lado comprador/vendedor"),
+    # === Patrones de 2 velas ===
+    ("Bullish Engulfing", 3, "Fuerte señal de reversión alcista"),
+    ("Bearish Engulfing", 3, "Fuerte señal de reversión bajista"),
+    # === Patrones de 3 velas ===
+    ("Morning Star", 4, "Señal de reversión alcista muy fuerte"),
+    ("Evening Star", 4, "Señal de reversión bajista muy fuerte"),
+    ("Three White Soldiers", 4, "Fuerte continuación alcista"),
+    ("Three Black Crows", 4, "Fuerte continuación bajista"),
+]
+
+
 def detect_all_patterns(candles: List[Dict]) -> Dict:
     """
     Detectar todos los patrones de velas en las últimas velas.
     
+    Usa las máscaras vectorizadas del motor de patrones (reglas "classic",
+    idénticas a los detectores is_* de este módulo) en la última vela.
+    
     Returns:
         Dict con patrones detectados, su dirección y score
     """
     if len(candles) < 3:
         return {"patterns": [], "bullish_score": 0, "bearish_score": 0}
     
+    masks = pattern_masks(candles[-3:], rules="classic")  # Basta con las 3 últimas velas
+    
     patterns = []
     bullish_score = 0
     bearish_score = 0
     
-    last_candle = candles[-1]
-    
-    # === Patrones de 1 vela ===
-    if is_doji(last_candle):
-        patterns.append({
-            "name": "Doji",
-            "direction": "NEUTRAL",
-            "strength": 1,
-            "description": "Indecisión en el mercado"
-        })
-    
-    if is_hammer(last_candle):
-        patterns.append({
-            "name": "Hammer",
-            "direction": "BULLISH",
-            "strength": 2,
-            "description": "Posible reversión alcista"
-        })
-        bullish_score += 2
-    
-    if is_inverted_hammer(last_candle):
-        patterns.append({
-            "name": "Inverted Hammer",
-            "direction": "BULLISH",
-            "strength": 1.5,
-            "description": "Posible reversión alcista (requiere confirmación)"
-        })
-        bullish_score += 1.5
-    
-    if is_shooting_star(last_candle):
-        patterns.append({
-            "name": "Shooting Star",
-            "direction": "BEARISH",
-            "strength": 2,
-            "description": "Posible reversión bajista"
-        })
-        bearish_score += 2
-    
-    if is_hanging_man(last_candle):
-        patterns.append({
-            "name": "Hanging Man",
-            "direction": "BEARISH",
-            "strength": 1.5,
-            "description": "Advertencia bajista"
-        })
-        bearish_score += 1.5
-    
-    marubozu = is_marubozu(last_candle)
-    if marubozu["is_marubozu"]:
-        patterns.append({
-            "name": f"{marubozu['direction']} Marubozu",
-            "direction": marubozu['direction'],
-            "strength": 2.5,
-            "description": "Dominio total del lado comprador/vendedor"
-        })
-        if marubozu['direction'] == "BULLISH":
-            bullish_score += 2.5
-        else:
-            bearish_score += 2.5
-    
-    # === Patrones de 2 velas ===
-    if is_bullish_engulfing(candles):
-        patterns.append({
-            "name": "Bullish Engulfing",
-            "direction": "BULLISH",
-            "strength": 3,
-            "description": "Fuerte señal de reversión alcista"
-        })
-        bullish_score += 3
-    
-    if is_bearish_engulfing(candles):
-        patterns.append({
-            "name": "Bearish Engulfing",
-            "direction": "BEARISH",
-            "strength": 3,
-            "description": "Fuerte señal de reversión bajista"
-        })
-        bearish_score += 3
-    
-    # === Patrones de 3 velas ===
-    if is_morning_star(candles):
-        patterns.append({
-            "name": "Morning Star",
-            "direction": "BULLISH",
-            "strength": 4,
-            "description": "Señal de reversión alcista muy fuerte"
-        })
-        bullish_score += 4
-    
-    if is_evening_star(candles):
-        patterns.append({
-            "name": "Evening Star",
-            "direction": "BEARISH",
-            "strength": 4,
-            "description": "Señal de reversión bajista muy fuerte"
-        })
-        bearish_score += 4
-    
-    if is_three_white_soldiers(candles):
-        patterns.append({
-            "name": "Three White Soldiers",
-            "direction": "BULLISH",
-            "strength": 4,
-            "description": "Fuerte continuación alcista"
-        })
-        bullish_score += 4
-    
-    if is_three_black_crows(candles):
+    for name, strength, description in PATTERN_SCORES:
+        if not masks[name][-1]:
+            continue
+        direction = PATTERN_DIRECTIONS[name]
         patterns.append({
-            "name": "Three Black Crows",
-            "direction": "BEARISH",
-            "strength": 4,
-            "description": "Fuerte continuación bajista"
+            "name": name,
+            "direction": direction,
+            "strength": strength,
+            "description": description
         })
-        bearish_score += 4
+        if direction == "BULLISH":
+            bullish_score += strength
+        elif direction == "BEARISH":
+            bearish_score += strength
     
     # Determinar dirección predominante
     if bullish_score > bearish_score and bullish_score >= 2:
@@ -20,6 +20,10 @@ from enum import Enum
 import statistics
 from loguru import logger
 
+import numpy as np
+
+from app.ml.pattern_engine import pattern_masks
+
 
 class PatternStrength(Enum):
     """Fuerza del patrón detectado"""
@@ -66,7 +70,8 @@ class CandlestickAnalyzer:
     def analyze(
         self, 
         candles: List[Dict], 
-        timeframe: str = "1h"
+        timeframe: str = "1h",
+        window_size: Optional[int] = 50
     ) -> List[CandlestickPattern]:
         """
         Analizar velas y detectar patrones.
@@ -75,6 +80,7 @@ class CandlestickAnalyzer:
             candles: Lista de velas con formato: 
                      [{"open": float, "high": float, "low": float, "close": float, "volume": float}]
             timeframe: Marco temporal ("1m", "5m", "15m", "1h", "4h", "1d")
+            window_size: Velas recientes a analizar (None = toda la serie)
         
         Returns:
             Lista de patrones detectados, ordenados por confianza (mayor a menor)
@@ -85,17 +91,19 @@ class CandlestickAnalyzer:
         patterns = []
         
         # Analizar solo las últimas velas (más recientes)
-        window_size = min(50, len(candles))
-        recent_candles = candles[-window_size:]
+        recent_candles = candles[-window_size:] if window_size else candles
+        
+        # Todas las máscaras de patrones en una pasada vectorizada
+        masks = pattern_masks(recent_candles, rules="analyzer")
         
         # Detectar patrones de 1 vela
-        patterns.extend(self._detect_single_candle_patterns(recent_candles, timeframe))
+        patterns.extend(self._detect_single_candle_patterns(recent_candles, timeframe, masks))
         
         # Detectar patrones de 2 velas
-        patterns.extend(self._detect_two_candle_patterns(recent_candles, timeframe))
+        patterns.extend(self._detect_two_candle_patterns(recent_candles, timeframe, masks))
         
         # Detectar patrones de 3 velas
-        patterns.extend(self._detect_three_candle_patterns(recent_candles, timeframe))
+        patterns.extend(self._detect_three_candle_patterns(recent_candles, timeframe, masks))
         
         # Filtrar por confianza mínima
         patterns = [p for p in patterns if p.confidence >= self.min_confidence]
@@ -108,16 +116,20 @@ class CandlestickAnalyzer:
     def _detect_single_candle_patterns(
         self, 
         candles: List[Dict], 
-        timeframe: str
+        timeframe: str,
+        masks: Optional[Dict[str, np.ndarray]] = None
     ) -> List[CandlestickPattern]:
         """Detectar patrones de una sola vela"""
         patterns = []
+        masks = masks if masks is not None else pattern_masks(candles, rules="analyzer")
+        trend = self._prior_trend(candles)  # Tendencia previa de cada vela, sin copiar el historial
         
-        for i in range(len(candles)):
+        # Solo se recorren las velas con algún patrón
+        for i in np.flatnonzero(masks["Doji"] | masks["Hammer"] | masks["Shooting Star"]):
             candle = candles[i]
             
             # Doji - Indecisión del mercado
-            if self._is_doji(candle):
+            if masks["Doji"][i]:
                 patterns.append(CandlestickPattern(
                     name="Doji",
                     name_es="Doji (Indecisión)",
@@ -127,14 +139,14 @@ class CandlestickAnalyzer:
                     timeframe=timeframe,
                     description_es="Indecisión en el mercado - precio de apertura y cierre muy similares. Posible cambio de tendencia.",
                     confidence=65.0,
-                    candle_index=i,
+                    candle_index=int(i),
                     icon="⚖️",
                     color="yellow"
                 ))
             
             # Hammer - Patrón alcista
-            if i > 0 and self._is_hammer(candle, candles[i-1]):
-                strength = self._calculate_hammer_strength(candle, candles[:i])
+            if masks["Hammer"][i]:
+                strength = self._calculate_hammer_strength(candle, trend[i] < 0)
                 patterns.append(CandlestickPattern(
                     name="Hammer",
                     name_es="Martillo Alcista",
@@ -144,14 +156,14 @@ class CandlestickAnalyzer:
                     timeframe=timeframe,
                     description_es="Martillo alcista detectado - reversión al alza probable. El precio fue rechazado a la baja y cerró cerca del máximo.",
                     confidence=70.0 + (strength * 15),  # 70-85%
-                    candle_index=i,
+                    candle_index=int(i),
                     icon="🔨",
                     color="green"
                 ))
             
             # Shooting Star - Patrón bajista
-            if i > 0 and self._is_shooting_star(candle, candles[i-1]):
-                strength = self._calculate_shooting_star_strength(candle, candles[:i])
+            if masks["Shooting Star"][i]:
+                strength = self._calculate_shooting_star_strength(candle, trend[i] > 0)
                 patterns.append(CandlestickPattern(
                     name="Shooting Star",
                     name_es="Estrella Fugaz Bajista",
@@ -161,7 +173,7 @@ class CandlestickAnalyzer:
                     timeframe=timeframe,
                     description_es="Estrella fugaz detectada - reversión a la baja probable. El precio fue rechazado al alza y cerró cerca del mínimo.",
                     confidence=70.0 + (strength * 15),  # 70-85%
-                    candle_index=i,
+                    candle_index=int(i),
                     icon="⭐",
                     color="red"
                 ))
@@ -171,18 +183,20 @@ class CandlestickAnalyzer:
     def _detect_two_candle_patterns(
         self, 
         candles: List[Dict], 
-        timeframe: str
+        timeframe: str,
+        masks: Optional[Dict[str, np.ndarray]] = None
     ) -> List[CandlestickPattern]:
         """Detectar patrones de dos velas"""
         patterns = []
+        masks = masks if masks is not None else pattern_masks(candles, rules="analyzer")
         
-        for i in range(1, len(candles)):
+        for i in np.flatnonzero(masks["Bullish Engulfing"] | masks["Bearish Engulfing"]):
             prev_candle = candles[i-1]
             curr_candle = candles[i]
             
             # Bullish Engulfing - Envolvente alcista
-            if self._is_bullish_engulfing(prev_candle, curr_candle):
-                strength = self._calculate_engulfing_strength(prev_candle, curr_candle, candles[:i])
+            if masks["Bullish Engulfing"][i]:
+                strength = self._calculate_engulfing_strength(prev_candle, curr_candle)
                 patterns.append(CandlestickPattern(
                     name="Bullish Engulfing",
                     name_es="Envolvente Alcista",
@@ -192,14 +206,14 @@ class CandlestickAnalyzer:
                     timeframe=timeframe,
                     description_es="Patrón envolvente alcista - la vela verde actual envuelve completamente la vela roja anterior. Fuerte señal de compra.",
                     confidence=75.0 + (strength * 20),  # 75-95%
-                    candle_index=i,
+                    candle_index=int(i),
                     icon="📈",
                     color="green"
                 ))
             
             # Bearish Engulfing - Envolvente bajista
-            if self._is_bearish_engulfing(prev_candle, curr_candle):
-                strength = self._calculate_engulfing_strength(prev_candle, curr_candle, candles[:i])
+            if masks["Bearish Engulfing"][i]:
+                strength = self._calculate_engulfing_strength(prev_candle, curr_candle)
                 patterns.append(CandlestickPattern(
                     name="Bearish Engulfing",
                     name_es="Envolvente Bajista",
@@ -209,7 +223,7 @@ class CandlestickAnalyzer:
                     timeframe=timeframe,
                     description_es="Patrón envolvente bajista - la vela roja actual envuelve completamente la vela verde anterior. Fuerte señal de venta.",
                     confidence=75.0 + (strength * 20),  # 75-95%
-                    candle_index=i,
+                    candle_index=int(i),
                     icon="📉",
                     color="red"
                 ))
@@ -219,19 +233,22 @@ class CandlestickAnalyzer:
     def _detect_three_candle_patterns(
         self, 
         candles: List[Dict], 
-        timeframe: str
+        timeframe: str,
+        masks: Optional[Dict[str, np.ndarray]] = None
     ) -> List[CandlestickPattern]:
         """Detectar patrones de tres velas"""
         patterns = []
+        masks = masks if masks is not None else pattern_masks(candles, rules="analyzer")
+        three = ("Morning Star", "Evening Star", "Three White Soldiers", "Three Black Crows")
         
-        for i in range(2, len(candles)):
+        for i in np.flatnonzero(np.logical_or.reduce([masks[name] for name in three])):
             c1 = candles[i-2]
             c2 = candles[i-1]
             c3 = candles[i]
             
             # Morning Star - Estrella de la mañana (alcista)
-            if self._is_morning_star(c1, c2, c3):
-                strength = self._calculate_star_strength(c1, c2, c3, candles[:i-2])
+            if masks["Morning Star"][i]:
+                strength = self._calculate_star_strength(c1, c2, c3)
                 patterns.append(CandlestickPattern(
                     name="Morning Star",
                     name_es="Estrella de la Mañana",
@@ -241,14 +258,14 @@ class CandlestickAnalyzer:
                     timeframe=timeframe,
                     description_es="Patrón estrella de la mañana - reversión alcista confirmada después de tendencia bajista. Muy fuerte señal de compra.",
                     confidence=80.0 + (strength * 15),  # 80-95%
-                    candle_index=i,
+                    candle_index=int(i),
                     icon="🌅",
                     color="green"
                 ))
             
             # Evening Star - Estrella de la tarde (bajista)
-            if self._is_evening_star(c1, c2, c3):
-                strength = self._calculate_star_strength(c1, c2, c3, candles[:i-2])
+            if masks["Evening Star"][i]:
+                strength = self._calculate_star_strength(c1, c2, c3)
                 patterns.append(CandlestickPattern(
                     name="Evening Star",
                     name_es="Estrella de la Tarde",
@@ -258,13 +275,13 @@ class CandlestickAnalyzer:
                     timeframe=timeframe,
                     description_es="Patrón estrella de la tarde - reversión bajista confirmada después de tendencia alcista. Muy fuerte señal de venta.",
                     confidence=80.0 + (strength * 15),  # 80-95%
-                    candle_index=i,
+                    candle_index=int(i),
                     icon="🌆",
                     color="red"
                 ))
             
             # Three White Soldiers - Tres soldados blancos (alcista)
-            if self._is_three_white_soldiers(c1, c2, c3):
+            if masks["Three White Soldiers"][i]:
                 patterns.append(CandlestickPattern(
                     name="Three White Soldiers",
                     name_es="Tres Soldados Blancos",
@@ -274,13 +291,13 @@ class CandlestickAnalyzer:
                     timeframe=timeframe,
                     description_es="Tres soldados blancos - tres velas verdes consecutivas ascendentes. Tendencia alcista muy fuerte confirmada.",
                     confidence=85.0,
-                    candle_index=i,
+                    candle_index=int(i),
                     icon="⬆️⬆️⬆️",
                     color="green"
                 ))
             
             # Three Black Crows - Tres cuervos negros (bajista)
-            if self._is_three_black_crows(c1, c2, c3):
+            if masks["Three Black Crows"][i]:
                 patterns.append(CandlestickPattern(
                     name="Three Black Crows",
                     name_es="Tres Cuervos Negros",
@@ -290,7 +307,7 @@ class CandlestickAnalyzer:
                     timeframe=timeframe,
                     description_es="Tres cuervos negros - tres velas rojas consecutivas descendentes. Tendencia bajista muy fuerte confirmada.",
                     confidence=85.0,
-                    candle_index=i,
+                    candle_index=int(i),
                     icon="⬇️⬇️⬇️",
                     color="red"
                 ))
@@ -298,6 +315,7 @@ class CandlestickAnalyzer:
         return patterns
     
     # ==================== Pattern Detection Methods ====================
+    # Versión escalar de las reglas: referencia de paridad de app.ml.pattern_engine
     
     def _is_doji(self, candle: Dict) -> bool:
         """Detectar Doji - apertura y cierre casi iguales"""
@@ -426,7 +444,7 @@ class CandlestickAnalyzer:
         body_ratio = body / full_range
         return max(0.0, 1.0 - (body_ratio * 20))
     
-    def _calculate_hammer_strength(self, candle: Dict, context: List[Dict]) -> float:
+    def _calculate_hammer_strength(self, candle: Dict, after_downtrend: bool) -> float:
         """Calcular fuerza del Hammer considerando contexto"""
         lower_shadow = min(candle["open"], candle["close"]) - candle["low"]
         body = abs(candle["close"] - candle["open"])
@@ -438,11 +456,11 @@ class CandlestickAnalyzer:
             shadow_ratio = min(lower_shadow / body / 3, 1.0)  # Normalizar a 1.0
         
         # Verificar si está en tendencia bajista previa (más fuerte)
-        trend_bonus = 0.2 if self._is_downtrend(context) else 0.0
+        trend_bonus = 0.2 if after_downtrend else 0.0
         
         return min(shadow_ratio + trend_bonus, 1.0)
     
-    def _calculate_shooting_star_strength(self, candle: Dict, context: List[Dict]) -> float:
+    def _calculate_shooting_star_strength(self, candle: Dict, after_uptrend: bool) -> float:
         """Calcular fuerza del Shooting Star"""
         upper_shadow = candle["high"] - max(candle["open"], candle["close"])
         body = abs(candle["close"] - candle["open"])
@@ -453,15 +471,14 @@ class CandlestickAnalyzer:
             shadow_ratio = min(upper_shadow / body / 3, 1.0)
         
         # Verificar si está en tendencia alcista previa (más fuerte)
-        trend_bonus = 0.2 if self._is_uptrend(context) else 0.0
+        trend_bonus = 0.2 if after_uptrend else 0.0
         
         return min(shadow_ratio + trend_bonus, 1.0)
     
     def _calculate_engulfing_strength(
         self, 
         prev: Dict, 
-        curr: Dict, 
-        context: List[Dict]
+        curr: Dict
     ) -> float:
         """Calcular fuerza del patrón Engulfing"""
         prev_body = abs(prev["close"] - prev["open"])
@@ -482,8 +499,7 @@ class CandlestickAnalyzer:
         self, 
         c1: Dict, 
         c2: Dict, 
-        c3: Dict, 
-        context: List[Dict]
+        c3: Dict
     ) -> float:
         """Calcular fuerza de Morning/Evening Star"""
         c1_body = abs(c1["close"] - c1["open"])
@@ -500,26 +516,18 @@ class CandlestickAnalyzer:
     
     # ==================== Helper Methods ====================
     
-    def _is_uptrend(self, candles: List[Dict]) -> bool:
-        """Verificar si hay tendencia alcista"""
-        if len(candles) < 5:
-            return False
-        
-        recent = candles[-5:]
-        closes = [c["close"] for c in recent]
-        
-        # Simple: comparar primeras con últimas
-        return closes[-1] > closes[0]
-    
-    def _is_downtrend(self, candles: List[Dict]) -> bool:
-        """Verificar si hay tendencia bajista"""
-        if len(candles) < 5:
-            return False
-        
-        recent = candles[-5:]
-        closes = [c["close"] for c in recent]
+    def _prior_trend(self, candles: List[Dict]) -> np.ndarray:
+        """
+        Tendencia de las 5 velas previas a cada índice: +1 alcista, -1 bajista, 0 sin datos.
         
-        return closes[-1] < closes[0]
+        Compara el cierre de la vela anterior con el de 5 velas atrás; se calcula
+        una vez para toda la serie en lugar de recortar el historial por patrón.
+        """
+        closes = np.fromiter((c["close"] for c in candles), dtype=np.float64, count=len(candles))
+        trend = np.zeros(len(candles))
+        if len(candles) > 5:
+            trend[5:] = np.sign(closes[4:-1] - closes[:-5])
+        return trend
     
     def _get_strength_label(self, strength: float) -> PatternStrength:
         """Convertir fuerza numérica a etiqueta"""
@@ -171,6 +171,10 @@ class EvolutionAgent:
                 db.commit()
                 logger.success(f"🧬 Mutación guardada en DB: {mutation_msg}")
                 
+                # El bot 24/7 cachea la configuración: recargarla en su próximo ciclo
+                from app.services.auto_execution import get_auto_execution_service
+                get_auto_execution_service().invalidate_settings(user_id)
+                
                 # 4. Registrar la lección en la memoria neuronal en agent_memory.json
                 agent = get_trading_agent()
                 if "evolution_history" not in agent.memory.data:
@@ -0,0 +1,488 @@
+"""
+SIC Ultra - Feature Store
+
+Almacén persistente de features para entrenamiento y predicción ML:
+- Definiciones de features versionadas (FEATURE_SET_VERSION)
+- Calculadas una sola vez por (symbol, interval) y guardadas en columnas
+  binarias append-only en disco (una por feature, lectura vía memmap)
+- Actualización incremental: el estado recursivo de cada indicador
+  (EMAs, medias de Wilder, ventanas) se persiste y continúa con las velas nuevas
+- Lecturas point-in-time (`as_of`) para entrenar sin data leakage
+
+Los valores son idénticos a los de app.ml.indicators sobre el histórico completo:
+cada fila solo depende de velas cerradas anteriores o iguales a ella.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+# === Configuración ===
+
+FEATURE_STORE_DIR = os.path.join(os.path.dirname(__file__), "feature_store")
+
+# Incrementar al cambiar cualquier definición: fuerza un rebuild en un directorio nuevo
+FEATURE_SET_VERSION = 1
+
+FEATURE_DEFINITIONS = {
+    "rsi": "RSI(14) con suavizado de Wilder",
+    "macd": "Histograma MACD(12, 26, 9)",
+    "atr": "ATR(14) = EMA del True Range",
+    "close_ret": "Retorno simple del close (pct_change)",
+    "macd_diff": "Diferencia del histograma MACD",
+    "volume_ret": "Cambio relativo del volumen (pct_change)",
+    "sma_diff": "SMA(10) - SMA(50) del close",
+}
+
+CANDLE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+FEATURE_COLUMNS = list(FEATURE_DEFINITIONS.keys())
+ALL_COLUMNS = CANDLE_COLUMNS + FEATURE_COLUMNS
+
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800,
+    "12h": 43200, "1d": 86400, "3d": 259200, "1w": 604800,
+}
+
+# Máximo de velas por request de klines en Binance
+MAX_KLINES = 1000
+
+# Páginas hacia atrás para cubrir un hueco; más atrasado que esto se reconstruye
+MAX_GAP_PAGES = 10
+
+# Filas iniciales sin todas las features (la más lenta: señal MACD en la vela 34)
+WARMUP_ROWS = 50
+
+NAN = float("nan")
+
+
+# === Estado incremental de indicadores ===
+
+class _EMAState:
+    """EMA sembrada con la SMA de los primeros `period` valores (como calculate_ema)."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.count = 0
+        self.total = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.count += 1
+            self.total += x
+            if self.count == self.period:
+                self.value = self.total / self.period
+                return self.value
+            return NAN
+        self.value = (x - self.value) * (2 / (self.period + 1)) + self.value
+        return self.value
+
+
+class _RSIState:
+    """RSI de Wilder (como calculate_rsi)."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.sum_gain = 0.0
+        self.sum_loss = 0.0
+        self.avg_gain: Optional[float] = None
+        self.avg_loss: Optional[float] = None
+
+    def update(self, delta: float) -> float:
+        gain = delta if delta > 0 else 0
+        loss = -delta if delta < 0 else 0
+        self.count += 1
+
+        if self.count <= self.period:
+            self.sum_gain += gain
+            self.sum_loss += loss
+            if self.count == self.period:
+                self.avg_gain = self.sum_gain / self.period
+                self.avg_loss = self.sum_loss / self.period
+            return NAN
+
+        self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+        self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+
+
+class IncrementalFeatures:
+    """
+    Estado completo del feature set para un (symbol, interval).
+
+    `step()` consume una vela cerrada y devuelve sus features en O(1).
+    """
+
+    def __init__(self):
+        self.prev_close: Optional[float] = None
+        self.prev_volume: Optional[float] = None
+        self.prev_hist: Optional[float] = None
+        self.rsi = _RSIState(14)
+        self.ema_fast = _EMAState(12)
+        self.ema_slow = _EMAState(26)
+        self.macd_signal = _EMAState(9)
+        self.atr = _EMAState(14)
+        self.closes: deque = deque(maxlen=50)
+
+    def step(self, high: float, low: float, close: float, volume: float) -> Dict[str, float]:
+        out = {name: NAN for name in FEATURE_COLUMNS}
+
+        fast = self.ema_fast.update(close)
+        slow = self.ema_slow.update(close)
+        if not math.isnan(slow):
+            signal = self.macd_signal.update(fast - slow)
+            if not math.isnan(signal):
+                hist = (fast - slow) - signal
+                out["macd"] = hist
+                if self.prev_hist is not None:
+                    out["macd_diff"] = hist - self.prev_hist
+                self.prev_hist = hist
+
+        if self.prev_close is not None:
+            out["rsi"] = self.rsi.update(close - self.prev_close)
+            true_range = max(
+                high - low,
+                abs(high - self.prev_close),
+                abs(low - self.prev_close)
+            )
+            out["atr"] = self.atr.update(true_range)
+            out["close_ret"] = close / self.prev_close - 1 if self.prev_close else NAN
+        if self.prev_volume is not None:
+            out["volume_ret"] = volume / self.prev_volume - 1 if self.prev_volume else NAN
+
+        self.closes.append(close)
+        if len(self.closes) == 50:
+            closes = list(self.closes)
+            out["sma_diff"] = sum(closes[-10:]) / 10 - sum(closes) / 50
+
+        self.prev_close = close
+        self.prev_volume = volume
+        return out
+
+    def to_dict(self) -> Dict:
+        state = {k: v for k, v in self.__dict__.items() if k != "closes"}
+        for key in ("rsi", "ema_fast", "ema_slow", "macd_signal", "atr"):
+            state[key] = dict(state[key].__dict__)
+        state["closes"] = list(self.closes)
+        return state
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> "IncrementalFeatures":
+        features = cls()
+        for key, value in state.items():
+            if key == "closes":
+                features.closes.extend(value)
+            elif isinstance(value, dict):
+                getattr(features, key).__dict__.update(value)
+            else:
+                setattr(features, key, value)
+        return features
+
+
+# === Feature Store ===
+
+class FeatureStore:
+    """
+    Almacén columnar por (symbol, interval).
+
+    Layout: {root}/v{version}/{SYMBOL}_{interval}/{columna}.f64 + meta.json.
+    meta.json guarda filas confirmadas, último timestamp y el estado incremental;
+    se escribe después de las columnas, así que un crash a mitad de escritura
+    nunca expone filas parciales.
+    """
+
+    def __init__(self, root: str = FEATURE_STORE_DIR, version: int = FEATURE_SET_VERSION):
+        self.root = os.path.join(root, f"v{version}")
+        self.version = version
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    # === Helpers ===
+
+    def _key(self, symbol: str, interval: str) -> str:
+        return f"{symbol.upper()}_{interval}"
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, self._key(symbol, interval))
+
+    def _lock(self, symbol: str, interval: str) -> threading.Lock:
+        key = self._key(symbol, interval)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _load_meta(self, symbol: str, interval: str) -> Optional[Dict]:
+        path = os.path.join(self._dir(symbol, interval), "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_meta(self, symbol: str, interval: str, meta: Dict):
+        path = os.path.join(self._dir(symbol, interval), "meta.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _to_epoch(ts) -> float:
+        if isinstance(ts, datetime):
+            return ts.timestamp()
+        if isinstance(ts, pd.Timestamp):
+            return ts.to_pydatetime().timestamp()
+        return float(ts)
+
+    # === Escritura ===
+
+    def sync(self, symbol: str, interval: str, candles: List[Dict], now: Optional[float] = None) -> int:
+        """
+        Añadir velas cerradas nuevas y calcular solo sus features.
+
+        Las velas con timestamp <= al último guardado se ignoran; la vela en
+        formación (aún no cerrada a `now`) no se persiste. Un lote que no
+        empalma con lo guardado (ni solapa ni empieza en la vela siguiente)
+        se rechaza: dejaría un hueco y el estado incremental lo cruzaría.
+
+        Returns:
+            Número de filas añadidas
+        """
+        step = INTERVAL_SECONDS.get(interval)
+        if step is None:
+            raise ValueError(f"Intervalo no soportado: {interval}")
+        now = time.time() if now is None else now
+
+        with self._lock(symbol, interval):
+            meta = self._load_meta(symbol, interval) or {
+                "symbol": symbol.upper(),
+                "interval": interval,
+                "feature_set_version": self.version,
+                "features": FEATURE_DEFINITIONS,
+                "rows": 0,
+                "last_timestamp": None,
+                "state": IncrementalFeatures().to_dict(),
+            }
+            last_ts = meta["last_timestamp"]
+
+            ordered = sorted(candles, key=lambda c: self._to_epoch(c["timestamp"]))
+            if last_ts is not None and ordered and self._to_epoch(ordered[0]["timestamp"]) > last_ts + step:
+                logger.warning(
+                    f"⚠️ Feature store {self._key(symbol, interval)}: lote no contiguo "
+                    f"(hueco desde {datetime.fromtimestamp(last_ts)}), no se añade"
+                )
+                return 0
+
+            new_rows = []
+            for candle in ordered:
+                ts = self._to_epoch(candle["timestamp"])
+                if last_ts is not None and ts <= last_ts:
+                    continue
+                if ts + step > now:
+                    break  # Vela en formación
+                new_rows.append((ts, candle))
+                last_ts = ts
+
+            if not new_rows:
+                return 0
+
+            state = IncrementalFeatures.from_dict(meta["state"])
+            columns = self._compute_rows(state, new_rows)
+
+            directory = self._dir(symbol, interval)
+            os.makedirs(directory, exist_ok=True)
+            for name in ALL_COLUMNS:
+                path = os.path.join(directory, f"{name}.f64")
+                # Descartar bytes huérfanos de una escritura interrumpida
+                if os.path.exists(path) and os.path.getsize(path) != meta["rows"] * 8:
+                    with open(path, "r+b") as f:
+                        f.truncate(meta["rows"] * 8)
+                with open(path, "ab") as f:
+                    np.asarray(columns[name], dtype="<f8").tofile(f)
+
+            meta["rows"] += len(new_rows)
+            meta["last_timestamp"] = last_ts
+            meta["state"] = state.to_dict()
+            meta["updated_at"] = datetime.utcnow().isoformat()
+            self._save_meta(symbol, interval, meta)
+
+            logger.debug(f"🗄️ Feature store {self._key(symbol, interval)}: +{len(new_rows)} filas")
+            return len(new_rows)
+
+    def refresh(self, symbol: str, interval: str, now: Optional[float] = None) -> List[Dict]:
+        """
+        Descargar solo las velas que faltan desde la última sincronización
+        y persistir las cerradas.
+
+        Si el hueco no cabe en un request se pagina hacia atrás hasta solapar
+        con lo guardado; pasadas MAX_GAP_PAGES páginas el almacén se
+        reconstruye desde las velas descargadas.
+
+        Returns:
+            Velas descargadas (la última suele ser la vela en formación)
+        """
+        from app.infrastructure.binance.client import get_binance_client
+
+        client = get_binance_client()
+        now = time.time() if now is None else now
+        behind = self.bars_behind(symbol, interval, now=now)
+
+        # Primer uso: backfill máximo; después solo el hueco + la vela en formación
+        fetch = MAX_KLINES if behind is None else min(behind + 2, MAX_KLINES)
+
+        candles = client.get_klines(symbol, interval, fetch)
+        if not candles:
+            return candles
+
+        last_ts = self._load_meta(symbol, interval)["last_timestamp"] if behind is not None else None
+        pages = 1
+        while last_ts is not None and self._to_epoch(candles[0]["timestamp"]) > last_ts:
+            if pages >= MAX_GAP_PAGES:
+                logger.warning(
+                    f"⚠️ Feature store {self._key(symbol, interval)}: {behind} velas de atraso, "
+                    f"se reconstruye desde {candles[0]['timestamp']}"
+                )
+                self.clear(symbol, interval)
+                break
+            end_time = datetime.fromtimestamp(self._to_epoch(candles[0]["timestamp"]) - 1)
+            older = client.get_klines(symbol, interval, MAX_KLINES, end_time=end_time)
+            if not older:
+                break  # Sin más histórico: sync rechaza el lote si no empalma
+            candles = older + candles
+            pages += 1
+
+        self.sync(symbol, interval, candles, now=now)
+        return candles
+
+    def clear(self, symbol: str, interval: str):
+        """Borrar columnas y estado de (symbol, interval)"""
+        with self._lock(symbol, interval):
+            directory = self._dir(symbol, interval)
+            if not os.path.isdir(directory):
+                return
+            # meta.json primero: sin él las columnas que queden no se leen
+            for name in ["meta.json"] + [f"{column}.f64" for column in ALL_COLUMNS]:
+                path = os.path.join(directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    @staticmethod
+    def _compute_rows(state: IncrementalFeatures, rows: List[Tuple[float, Dict]]) -> Dict[str, List[float]]:
+        columns: Dict[str, List[float]] = {name: [] for name in ALL_COLUMNS}
+        for ts, candle in rows:
+            values = state.step(
+                float(candle["high"]), float(candle["low"]),
+                float(candle["close"]), float(candle["volume"])
+            )
+            columns["timestamp"].append(ts)
+            for name in ("open", "high", "low", "close", "volume"):
+                columns[name].append(float(candle[name]))
+            for name, value in values.items():
+                columns[name].append(value)
+        return columns
+
+    # === Lectura ===
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[datetime]:
+        meta = self._load_meta(symbol, interval)
+        if not meta or meta["last_timestamp"] is None:
+            return None
+        return datetime.fromtimestamp(meta["last_timestamp"])
+
+    def bars_behind(self, symbol: str, interval: str, now: Optional[float] = None) -> Optional[int]:
+        """Velas cerradas que faltan por sincronizar (None si no hay datos)."""
+        meta = self._load_meta(symbol, interval)
+        if not meta or meta["last_timestamp"] is None:
+            return None
+        now = time.time() if now is None else now
+        step = INTERVAL_SECONDS[interval]
+        return max(0, int((now - meta["last_timestamp"]) // step) - 1)
+
+    def read(
+        self,
+        symbol: str,
+        interval: str,
+        as_of: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        dropna: bool = True
+    ) -> pd.DataFrame:
+        """
+        Lectura point-in-time.
+
+        Args:
+            as_of: Solo filas de velas ya cerradas en ese instante (evita leakage)
+            limit: Últimas N filas (después de aplicar `as_of`)
+            dropna: Quitar filas de warm-up con features incompletas
+        """
+        meta = self._load_meta(symbol, interval)
+        if not meta or meta["rows"] == 0:
+            return pd.DataFrame(columns=ALL_COLUMNS)
+
+        rows = meta["rows"]
+        directory = self._dir(symbol, interval)
+        data = {
+            name: np.memmap(os.path.join(directory, f"{name}.f64"), dtype="<f8", mode="r", shape=(rows,))
+            for name in ALL_COLUMNS
+        }
+
+        end = rows
+        if as_of is not None:
+            cutoff = self._to_epoch(as_of) - INTERVAL_SECONDS[interval]
+            end = int(np.searchsorted(data["timestamp"], cutoff, side="right"))
+
+        start = 0
+        if limit is not None:
+            # Margen para las filas de warm-up que descarta dropna
+            start = max(0, end - limit - (WARMUP_ROWS if dropna else 0))
+
+        df = pd.DataFrame({name: np.array(col[start:end]) for name, col in data.items()})
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
+
+        if dropna:
+            df = df.dropna()
+            if limit is not None:
+                df = df.iloc[-limit:]
+
+        return df.reset_index(drop=True)
+
+    def preview(self, symbol: str, interval: str, candle: Dict) -> Dict[str, float]:
+        """
+        Features de una vela en formación a partir del estado guardado,
+        sin persistir nada (para predicción en tiempo real).
+        """
+        meta = self._load_meta(symbol, interval)
+        state = IncrementalFeatures.from_dict(meta["state"]) if meta else IncrementalFeatures()
+        row = self._compute_rows(state, [(self._to_epoch(candle["timestamp"]), candle)])
+        return {name: values[0] for name, values in row.items()}
+
+    def info(self, symbol: str, interval: str) -> Optional[Dict]:
+        meta = self._load_meta(symbol, interval)
+        if not meta:
+            return None
+        return {k: v for k, v in meta.items() if k != "state"}
+
+
+# === Singleton ===
+
+_feature_store: Optional[FeatureStore] = None
+
+
+def get_feature_store() -> FeatureStore:
+    global _feature_store
+    if _feature_store is None:
+        _feature_store = FeatureStore()
+    return _feature_store
@@ -0,0 +1,240 @@
+"""
+SIC Ultra - Servicio de Inferencia con Micro-Batching
+
+Agrupa predicciones concurrentes (LSTM, XGBoost, Ensemble) en micro-batches:
+- Cola de requests en memoria (in-process)
+- Ventana de agrupación de pocos ms o hasta `max_batch` requests
+- Ejecución en un hilo dedicado (no bloquea el event loop)
+- Devuelve futures (concurrent.futures / asyncio)
+- Métricas por modelo: latencia p50/p99 y tamaño de batch
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+# Runner: recibe {request_id: DataFrame} y devuelve {request_id: resultado}
+BatchRunner = Callable[[Dict[str, pd.DataFrame]], Dict[str, Optional[Dict]]]
+
+
+def _default_runners() -> Dict[str, BatchRunner]:
+    """Runners batch de los modelos ML (singletons de app.ml.models)."""
+    from app.ml.models import get_lstm_predictor, get_xgb_classifier, get_ensemble
+
+    return {
+        "lstm": lambda frames: get_lstm_predictor().predict_batch(frames),
+        "xgboost": lambda frames: get_xgb_classifier().predict_batch(frames),
+        "ensemble": lambda frames: get_ensemble().predict_batch(frames),
+    }
+
+
+@dataclass
+class InferenceRequest:
+    """Una predicción pendiente en la cola."""
+    model: str
+    frame: pd.DataFrame
+    future: Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class ModelStats:
+    """Métricas rolling de un modelo (últimas `window` muestras)."""
+
+    def __init__(self, window: int = 1000):
+        self.latencies_ms: Deque[float] = deque(maxlen=window)
+        self.batch_sizes: Deque[int] = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+
+    def record_batch(self, latencies_ms: List[float]):
+        self.latencies_ms.extend(latencies_ms)
+        self.batch_sizes.append(len(latencies_ms))
+        self.requests += len(latencies_ms)
+        self.batches += 1
+
+    def snapshot(self) -> Dict:
+        latencies = np.fromiter(self.latencies_ms, dtype=float)
+        sizes = np.fromiter(self.batch_sizes, dtype=float)
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "errors": self.errors,
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2) if latencies.size else None,
+            "latency_p99_ms": round(float(np.percentile(latencies, 99)), 2) if latencies.size else None,
+            "avg_batch_size": round(float(sizes.mean()), 2) if sizes.size else None,
+            "max_batch_size": int(sizes.max()) if sizes.size else None,
+        }
+
+
+class InferenceService:
+    """
+    Servicio de inferencia in-process con micro-batching.
+
+    Los handlers llaman `submit()` (Future) o `await predict()`; un hilo
+    dedicado drena la cola, agrupa por modelo y ejecuta un forward pass por
+    grupo mediante el `predict_batch` de cada modelo.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 32,
+        max_wait_ms: float = 5.0,
+        runners: Optional[Dict[str, BatchRunner]] = None
+    ):
+        self.max_batch = max(1, max_batch)
+        self.max_wait_ms = max_wait_ms
+        self.runners = runners if runners is not None else _default_runners()
+        self.stats: Dict[str, ModelStats] = {name: ModelStats() for name in self.runners}
+
+        self._queue: "queue.Queue[Optional[InferenceRequest]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._running = False
+
+    # === Ciclo de vida ===
+
+    def start(self):
+        """Arrancar el hilo de inferencia (idempotente)."""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._worker, name="ml-inference", daemon=True
+            )
+            self._thread.start()
+            logger.info(
+                f"🧠 Servicio de inferencia iniciado "
+                f"(max_batch={self.max_batch}, ventana={self.max_wait_ms}ms)"
+            )
+
+    def stop(self, timeout: float = 5.0):
+        """Detener el hilo; los requests pendientes se procesan antes de salir."""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._queue.put(None)
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # === API pública ===
+
+    def submit(self, model: str, frame: pd.DataFrame) -> Future:
+        """Encolar una predicción. Devuelve un Future con el resultado."""
+        if model not in self.runners:
+            raise ValueError(f"Modelo desconocido: {model}")
+        if not self._running:
+            self.start()
+
+        future: Future = Future()
+        self._queue.put(InferenceRequest(model=model, frame=frame, future=future))
+        return future
+
+    async def predict(self, model: str, frame: pd.DataFrame) -> Optional[Dict]:
+        """Versión async de `submit` para handlers de FastAPI."""
+        return await asyncio.wrap_future(self.submit(model, frame))
+
+    def get_metrics(self) -> Dict:
+        """Métricas por modelo más configuración actual."""
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self._queue.qsize(),
+            "running": self._running,
+            "models": {name: stats.snapshot() for name, stats in self.stats.items()},
+        }
+
+    # === Worker ===
+
+    def _collect_batch(self, first: InferenceRequest) -> List[InferenceRequest]:
+        """Agrupar requests que llegan dentro de la ventana (o hasta max_batch)."""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Señal de parada: reinsertar para que el bucle principal salga
+                self._queue.put(None)
+                break
+            batch.append(request)
+
+        return batch
+
+    def _worker(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                if not self._running:
+                    break
+                continue
+
+            batch = self._collect_batch(first)
+
+            by_model: Dict[str, List[InferenceRequest]] = {}
+            for request in batch:
+                by_model.setdefault(request.model, []).append(request)
+
+            for model, requests in by_model.items():
+                self._run_group(model, requests)
+
+    def _run_group(self, model: str, requests: List[InferenceRequest]):
+        # Descartar requests cancelados por el llamador mientras esperaban
+        requests = [r for r in requests if r.future.set_running_or_notify_cancel()]
+        if not requests:
+            return
+
+        frames = {str(i): request.frame for i, request in enumerate(requests)}
+        stats = self.stats[model]
+
+        try:
+            results = self.runners[model](frames)
+        except Exception as e:
+            logger.error(f"Error en batch de inferencia {model}: {e}")
+            stats.errors += len(requests)
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        now = time.perf_counter()
+        latencies = []
+        for i, request in enumerate(requests):
+            latencies.append((now - request.enqueued_at) * 1000)
+            request.future.set_result(results.get(str(i)))
+
+        stats.record_batch(latencies)
+
+
+# === Singleton ===
+
+_inference_service: Optional[InferenceService] = None
+
+
+def get_inference_service() -> InferenceService:
+    global _inference_service
+    if _inference_service is None:
+        from app.config import settings
+        _inference_service = InferenceService(
+            max_batch=settings.ml_inference_max_batch,
+            max_wait_ms=settings.ml_inference_max_wait_ms
+        )
+    return _inference_service
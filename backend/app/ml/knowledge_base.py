@@ -11,41 +11,37 @@ El agente aprende y evoluciona con cada libro que le das.
 """
 
 import os
+import time
 import hashlib
-from typing import List, Dict, Optional
+import threading
+import importlib.util
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 from loguru import logger
 
+from app.infrastructure.startup_report import record_load
+from app.ml.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.ml.rag_cache import get_retrieval_cache
+
+# Dependencias pesadas (chromadb, sentence-transformers/torch) se importan al
+# usarse, no al importar el módulo: así no penalizan el arranque de la API.
+
 # ChromaDB para almacenamiento vectorial
-try:
-    import chromadb
-    from chromadb.config import Settings as ChromaSettings
-    CHROMADB_AVAILABLE = True
-except ImportError:
-    CHROMADB_AVAILABLE = False
+CHROMADB_AVAILABLE = importlib.util.find_spec("chromadb") is not None
+if not CHROMADB_AVAILABLE:
     logger.warning("⚠️ ChromaDB no disponible")
 
 # Sentence Transformers para embeddings
-try:
-    from sentence_transformers import SentenceTransformer
-    EMBEDDINGS_AVAILABLE = True
-except ImportError:
-    EMBEDDINGS_AVAILABLE = False
+EMBEDDINGS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+if not EMBEDDINGS_AVAILABLE:
     logger.warning("⚠️ Sentence Transformers no disponible")
 
 # Procesadores de documentos
-try:
-    from PyPDF2 import PdfReader
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-
-try:
-    from docx import Document as DocxDocument
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+PDF_AVAILABLE = importlib.util.find_spec("PyPDF2") is not None
+DOCX_AVAILABLE = importlib.util.find_spec("docx") is not None
 
 
 # === Configuración ===
@@ -53,6 +49,10 @@ except ImportError:
 KNOWLEDGE_DIR = os.path.join(os.path.dirname(__file__), "knowledge_base")
 CHROMA_DIR = os.path.join(KNOWLEDGE_DIR, "chroma_db")
 BOOKS_DIR = os.path.join(KNOWLEDGE_DIR, "books")
+LEXICAL_INDEX_PATH = os.path.join(KNOWLEDGE_DIR, "bm25_index.json")
+
+# Candidatos por ranking (denso y léxico) antes de fusionar: n_results * factor
+HYBRID_CANDIDATES = 4
 
 # Crear directorios
 os.makedirs(CHROMA_DIR, exist_ok=True)
@@ -70,46 +70,65 @@ class DocumentProcessor:
     @staticmethod
     def extract_text(file_path: str) -> str:
         """Extraer texto de cualquier documento soportado"""
+        return "".join(DocumentProcessor.iter_text(file_path))
+    
+    @staticmethod
+    def iter_text(file_path: str) -> Iterator[str]:
+        """
+        Extraer texto en streaming (una página PDF / párrafo DOCX / bloque TXT
+        por iteración), sin materializar el libro completo en memoria.
+        """
         path = Path(file_path)
         extension = path.suffix.lower()
         
         if extension == ".pdf":
-            return DocumentProcessor._extract_pdf(file_path)
+            return DocumentProcessor._iter_pdf(file_path)
         elif extension == ".docx":
-            return DocumentProcessor._extract_docx(file_path)
+            return DocumentProcessor._iter_docx(file_path)
         elif extension in [".txt", ".md"]:
-            return DocumentProcessor._extract_text(file_path)
+            return DocumentProcessor._iter_text(file_path)
         elif extension in [".png", ".jpg", ".jpeg"]:
-            return f"[IMAGEN] Imagen de trading procesada: {Path(file_path).name}"
+            return iter([f"[IMAGEN] Imagen de trading procesada: {Path(file_path).name}"])
         else:
             raise ValueError(f"Formato no soportado: {extension}")
     
     @staticmethod
-    def _extract_pdf(file_path: str) -> str:
+    def _iter_pdf(file_path: str) -> Iterator[str]:
         if not PDF_AVAILABLE:
             raise ImportError("PyPDF2 no instalado")
         
+        from PyPDF2 import PdfReader
+        
         reader = PdfReader(file_path)
-        text = ""
         for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+            yield (page.extract_text() or "") + "\n"
     
     @staticmethod
-    def _extract_docx(file_path: str) -> str:
+    def _iter_docx(file_path: str) -> Iterator[str]:
         if not DOCX_AVAILABLE:
             raise ImportError("python-docx no instalado")
         
+        from docx import Document as DocxDocument
+        
         doc = DocxDocument(file_path)
-        text = ""
         for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+            yield paragraph.text + "\n"
     
     @staticmethod
-    def _extract_text(file_path: str) -> str:
+    def _iter_text(file_path: str, block_size: int = 1 << 16) -> Iterator[str]:
         with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+            carry = ""
+            for block in iter(lambda: f.read(block_size), ""):
+                # No cortar una palabra entre dos bloques
+                block = carry + block
+                cut = max(block.rfind(" "), block.rfind("\n"))
+                if cut == -1:
+                    carry = block
+                    continue
+                carry = block[cut + 1:]
+                yield block[:cut + 1]
+            if carry:
+                yield carry
     
     @staticmethod
     def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
@@ -132,6 +151,29 @@ class DocumentProcessor:
             start = end - overlap
         
         return chunks
+    
+    @staticmethod
+    def iter_chunks(
+        segments: Iterable[str],
+        chunk_size: int = 1000,
+        overlap: int = 200
+    ) -> Iterator[str]:
+        """
+        Versión streaming de `chunk_text`: mismos chunks, pero consumiendo el
+        texto por segmentos y con memoria acotada a un chunk.
+        """
+        step = chunk_size - overlap
+        buffer: List[str] = []
+        
+        for segment in segments:
+            buffer.extend(segment.split())
+            while len(buffer) >= chunk_size:
+                yield " ".join(buffer[:chunk_size])
+                del buffer[:step]
+        
+        while buffer:
+            yield " ".join(buffer[:chunk_size])
+            del buffer[:step]
 
 
 # === Knowledge Base ===
@@ -144,12 +186,27 @@ class KnowledgeBase:
     búsqueda semántica rápida.
     """
     
-    def __init__(self):
-        self.embedding_model = None
+    def __init__(
+        self,
+        collection=None,
+        embedding_model=None,
+        lexical_index: Optional[BM25Index] = None
+    ):
+        """
+        Args:
+            collection / embedding_model / lexical_index: Inyectables (tests, scripts).
+                Sin `collection` se conecta a ChromaDB persistente.
+        """
+        self.embedding_model = embedding_model
         self.client = None
-        self.collection = None
-        
-        self._initialize()
+        self.collection = collection
+        self.lexical_index = lexical_index if lexical_index is not None else BM25Index(LEXICAL_INDEX_PATH)
+        self._lexical_checked = False
+        self._model_lock = threading.Lock()
+        self._model_loading = False
+        
+        if collection is None:
+            self._initialize()
     
     def _initialize(self):
         """Inicializar base de datos vectorial"""
@@ -158,6 +215,9 @@ class KnowledgeBase:
             return
         
         try:
+            started = time.perf_counter()
+            import chromadb
+            
             # Cliente ChromaDB persistente
             self.client = chromadb.PersistentClient(path=CHROMA_DIR)
             
@@ -166,6 +226,7 @@ class KnowledgeBase:
                 name="trading_knowledge",
                 metadata={"description": "Base de conocimientos de trading y finanzas"}
             )
+            record_load("chromadb", time.perf_counter() - started)
             
             logger.success(f"✅ Base de conocimientos inicializada (ChromaDB conectada). Documentos: {self.collection.count()}")
             
@@ -174,15 +235,52 @@ class KnowledgeBase:
             
     def _load_embedding_model(self):
         """Carga el modelo de embeddings SentenceTransformer bajo demanda para no congelar el loop principal."""
-        if self.embedding_model is None:
+        with self._model_lock:
+            if self.embedding_model is not None:
+                return
             if not EMBEDDINGS_AVAILABLE:
                 logger.error("Sentence Transformers no disponible")
                 raise ImportError("Sentence Transformers no disponible para generar embeddings")
             
             logger.info("📚 Cargando modelo de embeddings bajo demanda (SentenceTransformer)...")
+            started = time.perf_counter()
+            from sentence_transformers import SentenceTransformer
+            
             self.embedding_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+            record_load("embeddings", time.perf_counter() - started)
             logger.success("✅ Modelo de embeddings cargado exitosamente bajo demanda.")
     
+    def _load_embedding_model_async(self):
+        """Lanzar la carga del modelo en un hilo (la búsqueda léxica cubre mientras tanto)."""
+        if self.embedding_model is not None or self._model_loading or not EMBEDDINGS_AVAILABLE:
+            return
+        self._model_loading = True
+        threading.Thread(target=self._load_embedding_model_background, name="kb-embeddings", daemon=True).start()
+    
+    def _load_embedding_model_background(self):
+        """Cuerpo del hilo de carga: si falla, la próxima búsqueda lo reintenta."""
+        try:
+            self._load_embedding_model()
+        except Exception as e:
+            logger.error(f"Error cargando el modelo de embeddings: {e}")
+        finally:
+            self._model_loading = False
+    
+    def _ensure_lexical_index(self):
+        """Construir el índice BM25 desde ChromaDB si no existe (colecciones previas)."""
+        if self._lexical_checked:
+            return
+        self._lexical_checked = True
+        if len(self.lexical_index) or not self.collection.count():
+            return
+        
+        started = time.perf_counter()
+        data = self.collection.get(include=["documents", "metadatas"])
+        for chunk_id, document, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+            self.lexical_index.add(chunk_id, document, (metadata or {}).get("category"))
+        self.lexical_index.save()
+        logger.info(f"🔤 Índice BM25 reconstruido: {len(self.lexical_index)} chunks en {time.perf_counter() - started:.2f}s")
+    
     @property
     def is_ready(self) -> bool:
         return self.collection is not None
@@ -194,13 +292,44 @@ class KnowledgeBase:
         category: str = "general"
     ) -> Dict:
         """
-        Añadir un documento a la base de conocimientos.
+        Añadir un documento a la base de conocimientos (síncrono).
+        
+        Para libros grandes usar la cola de ingesta (app.ml.knowledge_ingestion),
+        que ejecuta `ingest_document` fuera del event loop.
         
         Args:
             file_path: Ruta al archivo (PDF, DOCX, TXT)
             title: Título del documento
             category: Categoría (trading, finanzas, psicologia, etc.)
         """
+        try:
+            return self.ingest_document(file_path, title, category)
+        except Exception as e:
+            return {"error": f"Error procesando documento: {e}"}
+    
+    def ingest_document(
+        self,
+        file_path: str,
+        title: Optional[str] = None,
+        category: str = "general",
+        progress: Optional[Callable[[Dict], None]] = None,
+        batch_size: int = 64,
+        executor: Optional[Executor] = None,
+        workers: int = 1
+    ) -> Dict:
+        """
+        Ingesta en streaming: páginas → chunks → embeddings por lotes → ChromaDB.
+        
+        - Los chunks se embeben en lotes de `batch_size` (en `executor` si se da)
+          y cada lote se escribe en ChromaDB en cuanto está listo.
+        - El ID de cada chunk deriva del hash de su contenido: al re-subir un
+          libro solo se embeben los chunks nuevos o modificados; los que ya no
+          existen se borran.
+        
+        Args:
+            progress: Callback con contadores parciales tras cada escritura
+            workers: Hilos de `executor` (acota los lotes en vuelo a 2 por worker)
+        """
         if not self.is_ready:
             return {"error": "Base de conocimientos no inicializada"}
         
@@ -208,54 +337,134 @@ class KnowledgeBase:
         if not path.exists():
             return {"error": f"Archivo no encontrado: {file_path}"}
         
-        # Extraer texto
-        try:
-            text = DocumentProcessor.extract_text(file_path)
-            logger.info(f"📄 Texto extraído: {len(text)} caracteres")
-        except Exception as e:
-            return {"error": f"Error extrayendo texto: {e}"}
-        
-        # Dividir en chunks
-        chunks = DocumentProcessor.chunk_text(text, chunk_size=500, overlap=100)
-        logger.info(f"📝 Chunks creados: {len(chunks)}")
-        
-        # Asegurar que el modelo esté cargado y crear embeddings
-        self._load_embedding_model()
-        embeddings = self.embedding_model.encode(chunks).tolist()
-        
-        # Generar IDs únicos
-        doc_id = hashlib.md5(file_path.encode()).hexdigest()[:8]
-        ids = [f"{doc_id}_{i}" for i in range(len(chunks))]
-        
-        # Metadatos
+        self._ensure_lexical_index()
         title = title or path.stem
-        metadatas = [
-            {
-                "source": path.name,
-                "title": title,
-                "category": category,
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                "added_at": datetime.utcnow().isoformat()
-            }
-            for i in range(len(chunks))
-        ]
+        doc_id = hashlib.md5(file_path.encode()).hexdigest()[:8]
+        added_at = datetime.utcnow().isoformat()
+        
+        # Chunks ya almacenados de este libro (solo los que tienen hash de contenido)
+        existing = self.collection.get(where={"source": path.name}, include=["metadatas"])
+        existing_ids = set(existing["ids"])
+        hashed_ids = {
+            chunk_id for chunk_id, meta in zip(existing["ids"], existing["metadatas"])
+            if meta and meta.get("content_hash")
+        }
         
-        # Añadir a ChromaDB
-        self.collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=chunks,
-            metadatas=metadatas
+        counts = {"chunks": 0, "embedded": 0, "reused": 0, "removed": 0}
+        keep_ids = set()
+        occurrences: Dict[str, int] = {}
+        new_batch: List = []
+        reused_batch: List = []
+        pending: Deque[Tuple[Future, List]] = deque()
+        max_in_flight = 2 * max(1, workers)
+        
+        def encode(texts: List[str]) -> List:
+            return self.embedding_model.encode(texts).tolist()
+        
+        def write(batch: List, embeddings: List):
+            self.collection.upsert(
+                ids=[item[0] for item in batch],
+                embeddings=embeddings,
+                documents=[item[1] for item in batch],
+                metadatas=[item[2] for item in batch]
+            )
+            for chunk_id, chunk, metadata in batch:
+                self.lexical_index.add(chunk_id, chunk, metadata["category"])
+            counts["embedded"] += len(batch)
+            if progress:
+                progress(dict(counts))
+        
+        def submit(batch: List):
+            texts = [item[1] for item in batch]
+            if executor is None:
+                write(batch, encode(texts))
+                return
+            pending.append((executor.submit(encode, texts), batch))
+            # Acotar lotes en vuelo: memoria constante aunque el libro sea enorme
+            while len(pending) >= max_in_flight:
+                future, done_batch = pending.popleft()
+                write(done_batch, future.result())
+        
+        def flush_reused():
+            # Contenido idéntico: solo se actualizan metadatos (sin re-embeber)
+            self.collection.update(
+                ids=[item[0] for item in reused_batch],
+                metadatas=[item[1] for item in reused_batch]
+            )
+            for chunk_id, metadata, chunk in reused_batch:
+                if chunk_id in self.lexical_index:
+                    self.lexical_index.set_category(chunk_id, metadata["category"])
+                else:
+                    self.lexical_index.add(chunk_id, chunk, metadata["category"])
+            counts["reused"] += len(reused_batch)
+            reused_batch.clear()
+            if progress:
+                progress(dict(counts))
+        
+        # Cualquier escritura (aunque la ingesta falle a mitad) cambia la
+        # colección: los resultados cacheados dejan de ser válidos
+        try:
+            segments = DocumentProcessor.iter_text(file_path)
+            for index, chunk in enumerate(DocumentProcessor.iter_chunks(segments, chunk_size=500, overlap=100)):
+                content_hash = hashlib.sha256(chunk.encode()).hexdigest()[:16]
+                occurrences[content_hash] = occurrences.get(content_hash, 0) + 1
+                chunk_id = f"{doc_id}_{content_hash}"
+                if occurrences[content_hash] > 1:
+                    chunk_id = f"{chunk_id}_{occurrences[content_hash]}"
+                keep_ids.add(chunk_id)
+                counts["chunks"] += 1
+            
+                metadata = {
+                    "source": path.name,
+                    "title": title,
+                    "category": category,
+                    "chunk_index": index,
+                    "content_hash": content_hash,
+                    "added_at": added_at
+                }
+            
+                if chunk_id in hashed_ids:
+                    reused_batch.append((chunk_id, metadata, chunk))
+                    if len(reused_batch) >= batch_size:
+                        flush_reused()
+                    continue
+            
+                if not new_batch:
+                    # Cargar el modelo solo si de verdad hay algo que embeber
+                    self._load_embedding_model()
+                new_batch.append((chunk_id, chunk, metadata))
+                if len(new_batch) >= batch_size:
+                    submit(new_batch)
+                    new_batch = []
+            
+            if new_batch:
+                submit(new_batch)
+            while pending:
+                future, done_batch = pending.popleft()
+                write(done_batch, future.result())
+            if reused_batch:
+                flush_reused()
+            
+            # Chunks que ya no están en el libro (o IDs legacy sin hash)
+            stale = list(existing_ids - keep_ids)
+            if stale:
+                self.collection.delete(ids=stale)
+                counts["removed"] = len(stale)
+                self.lexical_index.remove(stale)
+            self.lexical_index.save()
+        finally:
+            get_retrieval_cache().invalidate_results()
+        
+        logger.success(
+            f"✅ Documento añadido: {title} ({counts['chunks']} chunks, "
+            f"{counts['embedded']} embebidos, {counts['reused']} reutilizados)"
         )
         
-        logger.success(f"✅ Documento añadido: {title} ({len(chunks)} chunks)")
-        
         return {
             "success": True,
             "title": title,
             "category": category,
-            "chunks": len(chunks),
+            **counts,
             "total_documents": self.collection.count()
         }
     
@@ -263,7 +472,8 @@ class KnowledgeBase:
         self, 
         query: str, 
         n_results: int = 5,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        mode: str = "hybrid"
     ) -> List[Dict]:
         """
         Buscar conocimiento relevante.
@@ -272,38 +482,101 @@ class KnowledgeBase:
             query: Pregunta o contexto de búsqueda
             n_results: Número de resultados
             category: Filtrar por categoría
+            mode: "hybrid" (BM25 + denso fusionados con RRF), "dense" o "lexical".
+                En "hybrid", si el modelo de embeddings aún no está cargado se
+                responde solo con BM25 y el modelo se carga en segundo plano.
         """
         if not self.is_ready:
             return []
         
-        # Asegurar que el modelo esté cargado y generar embedding de la query
-        self._load_embedding_model()
-        query_embedding = self.embedding_model.encode([query]).tolist()
-        
+        self._ensure_lexical_index()
+        if mode == "hybrid" and not len(self.lexical_index):
+            mode = "dense"
+        
+        cache = get_retrieval_cache()
+        cached = cache.get_results(query, n_results, category, mode)
+        if cached is not None:
+            return cached
+        
+        n_candidates = n_results if mode == "dense" else n_results * HYBRID_CANDIDATES
+        encode_seconds = 0.0
+        dense: List[Dict] = []
+        
+        if mode in ("hybrid", "dense"):
+            # Embedding de la query (cacheado por texto normalizado)
+            embedding = cache.get_embedding(query)
+            if embedding is None:
+                if mode == "hybrid" and self.embedding_model is None:
+                    # Fast path: sin esperar a cargar SentenceTransformer
+                    self._load_embedding_model_async()
+                    return self.search(query, n_results, category, mode="lexical")
+                self._load_embedding_model()
+                started = time.perf_counter()
+                embedding = self.embedding_model.encode([query])[0].tolist()
+                encode_seconds = time.perf_counter() - started
+                cache.put_embedding(query, embedding, encode_seconds)
+            dense = self._dense_search(embedding, n_candidates, category)
+        
+        if mode == "dense":
+            formatted = dense
+        else:
+            lexical = self.lexical_index.search(query, n_candidates, category)
+            if mode == "lexical":
+                top_score = lexical[0][1] if lexical else 1.0
+                ranked = [(chunk_id, score / top_score) for chunk_id, score in lexical[:n_results]]
+            else:
+                rankings = [r for r in ([d["id"] for d in dense], [chunk_id for chunk_id, _ in lexical]) if r]
+                ranked = reciprocal_rank_fusion(rankings)[:n_results]
+            formatted = self._hydrate(ranked, {d["id"]: d for d in dense})
+        
+        formatted = [{k: v for k, v in r.items() if k != "id"} for r in formatted]
+        cache.put_results(query, n_results, category, formatted, encode_seconds, mode)
+        return formatted
+    
+    def _dense_search(self, embedding: List[float], n_results: int, category: Optional[str]) -> List[Dict]:
+        """Consulta vectorial en ChromaDB (mejor primero)."""
         # Filtro por categoría
         where = {"category": category} if category else None
         
-        # Buscar
         results = self.collection.query(
-            query_embeddings=query_embedding,
-            n_results=n_results,
+            query_embeddings=[embedding],
+            n_results=max(1, min(n_results, self.collection.count())),
             where=where,
             include=["documents", "metadatas", "distances"]
         )
         
-        # Formatear resultados
         formatted = []
         for i, doc in enumerate(results["documents"][0]):
             formatted.append({
+                "id": results["ids"][0][i],
                 "content": doc,
                 "source": results["metadatas"][0][i]["source"],
                 "title": results["metadatas"][0][i]["title"],
                 "category": results["metadatas"][0][i]["category"],
                 "relevance": round(1 - results["distances"][0][i], 3)  # Distancia a similitud
             })
-        
         return formatted
     
+    def _hydrate(self, ranked: List[Tuple[str, float]], known: Dict[str, Dict]) -> List[Dict]:
+        """Completar contenido y metadatos de los IDs rankeados (los que no vinieron del denso)."""
+        missing = [chunk_id for chunk_id, _ in ranked if chunk_id not in known]
+        if missing:
+            data = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, doc, meta in zip(data["ids"], data["documents"], data["metadatas"]):
+                known[chunk_id] = {
+                    "id": chunk_id,
+                    "content": doc,
+                    "source": meta["source"],
+                    "title": meta["title"],
+                    "category": meta["category"],
+                }
+        
+        return [
+            {**known[chunk_id], "relevance": round(score, 3)}
+            for chunk_id, score in ranked
+            if chunk_id in known
+        ]
+    
     def get_trading_context(self, market_situation: str) -> str:
         """
         Obtener contexto de trading relevante para una situación.
@@ -313,7 +586,11 @@ class KnowledgeBase:
         """
         # Buscar conocimiento relevante
         results = self.search(market_situation, n_results=3)
-        
+        return self.format_context(results)
+    
+    @staticmethod
+    def format_context(results: List[Dict]) -> str:
+        """Formatear resultados de `search` como contexto para el prompt."""
         if not results:
             return "No hay conocimiento relevante en la base de conocimientos."
         
@@ -364,36 +641,33 @@ class OllamaWithKnowledge:
     
     Antes de responder, busca conocimiento relevante
     en los libros que le has dado.
-    """
     
-    BASE_URL = "http://localhost:11434/api/generate"
+    Comparte con el LLMManager el OllamaProvider (pool HTTP, límite de
+    concurrencia y estado de salud del sondeo en background).
+    """
     
     def __init__(self, model: str = None):
         self.model = model or settings.ollama_model
-        self.knowledge = KnowledgeBase()
+        self.knowledge = get_knowledge_base()
+    
+    @property
+    def provider(self):
+        from app.ml.llm_connector import get_llm_manager
+        return get_llm_manager().get_provider("OllamaProvider")
     
     @property
     def is_available(self) -> bool:
-        try:
-            import httpx
-            response = httpx.get("http://localhost:11434/api/tags", timeout=2.0)
-            return response.status_code == 200
-        except:
-            return False
+        provider = self.provider
+        return provider is not None and provider.is_available()
     
-    async def analyze_with_knowledge(
+    def _build_prompt(
         self,
         symbol: str,
         price: float,
         indicators: Dict,
         patterns: List[str]
-    ) -> Optional[Dict]:
-        """
-        Análisis de mercado usando conocimiento de libros.
-        """
-        if not self.is_available:
-            return None
-        
+    ) -> Tuple[str, List[Dict]]:
+        """Prompt enriquecido con los libros y los chunks usados"""
         # Construir descripción de la situación
         situation = f"""
         Análisis de {symbol} a ${price}.
@@ -403,8 +677,17 @@ class OllamaWithKnowledge:
         Patrones: {', '.join(patterns) if patterns else 'ninguno'}.
         """
         
-        # Buscar conocimiento relevante
-        knowledge_context = self.knowledge.get_trading_context(situation)
+        # Buscar conocimiento relevante (una sola búsqueda para contexto y `knowledge_used`).
+        # La query omite el precio: cambia en cada tick y no aporta a la recuperación.
+        rsi = indicators.get('rsi')
+        retrieval_query = (
+            f"RSI: {round(rsi) if isinstance(rsi, (int, float)) else 'N/A'}, "
+            f"MACD: {'positivo' if indicators.get('macd_hist', 0) > 0 else 'negativo'}, "
+            f"Tendencia: {indicators.get('trend', 'N/A')}. "
+            f"Patrones: {', '.join(patterns) if patterns else 'ninguno'}."
+        )
+        knowledge = self.knowledge.search(retrieval_query, n_results=3)
+        knowledge_context = self.knowledge.format_context(knowledge)
         
         # Construir prompt enriquecido
         prompt = f"""Eres un experto en trading con décadas de experiencia.
@@ -423,33 +706,72 @@ proporciona:
 
 Responde en español, sé conciso pero preciso.
 """
+        return prompt, knowledge
+    
+    async def analyze_with_knowledge(
+        self,
+        symbol: str,
+        price: float,
+        indicators: Dict,
+        patterns: List[str]
+    ) -> Optional[Dict]:
+        """
+        Análisis de mercado usando conocimiento de libros.
+        """
+        if not self.is_available:
+            return None
         
-        try:
-            import httpx
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    self.BASE_URL,
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "keep_alive": -1
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "analysis": data.get("response", ""),
-                        "model": self.model,
-                        "knowledge_used": len(self.knowledge.search(situation, 3)) > 0,
-                        "timestamp": datetime.utcnow()
-                    }
-                    
-        except Exception as e:
-            logger.error(f"Error en Ollama: {e}")
+        prompt, knowledge = self._build_prompt(symbol, price, indicators, patterns)
+        provider = self.provider
+        analysis = await provider.run(lambda: provider.generate(prompt, model=self.model))
+        if analysis is None:
+            return None
         
-        return None
+        return {
+            "analysis": analysis,
+            "model": self.model,
+            "knowledge_used": len(knowledge) > 0,
+            "timestamp": datetime.utcnow()
+        }
+    
+    async def stream_with_knowledge(
+        self,
+        symbol: str,
+        price: float,
+        indicators: Dict,
+        patterns: List[str],
+        on_token=None,
+        verdict_only: bool = False
+    ) -> Optional[Dict]:
+        """
+        `analyze_with_knowledge` en streaming: los tokens van a `on_token`
+        según los genera Ollama; con `verdict_only` se corta al tener SEÑAL y CONFIANZA.
+        """
+        from app.ml.llm_connector import consume_stream, get_llm_manager
+        
+        if not self.is_available:
+            return None
+        
+        prompt, knowledge = self._build_prompt(symbol, price, indicators, patterns)
+        provider = self.provider
+        analysis, early_stop = await consume_stream(
+            provider.run_stream(lambda: provider.generate_stream(prompt, model=self.model)),
+            on_token,
+            verdict_only
+        )
+        if not analysis:
+            return None
+        
+        verdict = get_llm_manager()._parse_llm_response(analysis, symbol, price, source=provider.name)
+        return {
+            "analysis": analysis,
+            "signal": verdict["signal"],
+            "confidence": verdict["confidence"],
+            "early_stop": early_stop,
+            "model": self.model,
+            "knowledge_used": len(knowledge) > 0,
+            "timestamp": datetime.utcnow()
+        }
 
 
 # === API para gestionar conocimientos ===
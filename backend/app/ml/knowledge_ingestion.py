@@ -0,0 +1,171 @@
+"""
+SIC Ultra - Cola de Ingesta de Documentos
+
+Procesa los libros subidos fuera del request HTTP:
+- Cola FIFO en memoria con un hilo dedicado (un libro a la vez)
+- Embeddings por lotes en un pool de workers (`KnowledgeBase.ingest_document`)
+- Progreso consultable por job: chunks procesados, embebidos, reutilizados
+"""
+
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+MAX_JOBS_KEPT = 200
+
+
+@dataclass
+class IngestionJob:
+    """Estado de la ingesta de un documento."""
+    job_id: str
+    file_path: str
+    title: Optional[str]
+    category: str
+    status: str = "queued"  # queued, running, completed, failed
+    chunks: int = 0
+    embedded: int = 0
+    reused: int = 0
+    removed: int = 0
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class IngestionQueue:
+    """
+    Cola de ingesta de la base de conocimientos.
+
+    `submit()` devuelve el job al instante; el hilo de ingesta lo procesa
+    después (extracción, chunking y embeddings en streaming).
+    """
+
+    def __init__(
+        self,
+        knowledge_base_factory: Optional[Callable] = None,
+        workers: int = 2,
+        batch_size: int = 64
+    ):
+        self.knowledge_base_factory = knowledge_base_factory or _default_knowledge_base
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+
+        self._queue: "queue.Queue[IngestionJob]" = queue.Queue()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kb-embed")
+            self._thread = threading.Thread(target=self._worker, name="kb-ingestion", daemon=True)
+            self._thread.start()
+
+    # === API pública ===
+
+    def submit(self, file_path: str, title: Optional[str] = None, category: str = "general") -> IngestionJob:
+        """Encolar un documento para ingesta."""
+        job = IngestionJob(
+            job_id=uuid.uuid4().hex[:12],
+            file_path=file_path,
+            title=title,
+            category=category
+        )
+        with self._lock:
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > MAX_JOBS_KEPT:
+                oldest_id, oldest = next(iter(self.jobs.items()))
+                if oldest.status in ("queued", "running"):
+                    break
+                self.jobs.pop(oldest_id)
+
+        self._ensure_worker()
+        self._queue.put(job)
+        logger.info(f"📥 Documento encolado para ingesta: {file_path} (job {job.job_id})")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self, limit: int = 50) -> List[IngestionJob]:
+        return list(self.jobs.values())[-limit:][::-1]
+
+    def wait(self):
+        """Bloquear hasta vaciar la cola (útil en scripts y tests)."""
+        self._queue.join()
+
+    # === Worker ===
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: IngestionJob):
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+
+        def on_progress(counts: Dict):
+            for key, value in counts.items():
+                setattr(job, key, value)
+
+        try:
+            kb = self.knowledge_base_factory()
+            result = kb.ingest_document(
+                job.file_path,
+                title=job.title,
+                category=job.category,
+                progress=on_progress,
+                batch_size=self.batch_size,
+                executor=self._pool,
+                workers=self.workers
+            )
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            on_progress({key: result[key] for key in ("chunks", "embedded", "reused", "removed")})
+            job.title = result["title"]
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"❌ Error en ingesta de {job.file_path}: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+
+
+def _default_knowledge_base():
+    from app.ml.knowledge_base import get_knowledge_base
+    return get_knowledge_base()
+
+
+# === Singleton ===
+
+_ingestion_queue: Optional[IngestionQueue] = None
+
+
+def get_ingestion_queue() -> IngestionQueue:
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        from app.config import settings
+        _ingestion_queue = IngestionQueue(
+            workers=settings.knowledge_ingest_workers,
+            batch_size=settings.knowledge_embed_batch_size
+        )
+    return _ingestion_queue
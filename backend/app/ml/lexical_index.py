@@ -0,0 +1,179 @@
+"""
+SIC Ultra - Índice Léxico BM25 de la Base de Conocimientos
+
+Índice invertido local que se mantiene junto a la colección de ChromaDB:
+- Se actualiza en la ingesta (chunks añadidos / eliminados)
+- Encuentra términos exactos que la búsqueda densa suele perder
+  ("Wyckoff", "divergencia RSI", "funding")
+- No necesita el modelo de embeddings: sirve de fast path mientras carga
+
+Solo se persiste el índice directo (términos por chunk); el invertido se
+reconstruye en memoria al cargar.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a al algo como con de del e el en es esta este esto ha la las lo los mas o para
+pero por que se si sin sobre su sus un una uno y ya
+an and are as at be by for from has in is it of on or that the this to was with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sin acentos, sin stopwords ni tokens de un carácter."""
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [t for t in _TOKEN.findall(text) if len(t) > 1 and t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    BM25 (Okapi) sobre chunks identificados por el mismo ID que en ChromaDB.
+
+    Args:
+        path: Archivo JSON de persistencia (None = solo memoria)
+        k1, b: Parámetros estándar de BM25
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Dict] = {}        # chunk_id → {"tf": {...}, "len": n, "category": c}
+        self._postings: Dict[str, Dict[str, int]] = {}  # término → {chunk_id: tf}
+        self._total_len = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            self._load()
+
+    # === Persistencia ===
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                docs = json.load(f)["docs"]
+        except Exception as e:
+            logger.warning(f"⚠️ Índice BM25 ilegible, se reconstruirá: {e}")
+            return
+        for chunk_id, doc in docs.items():
+            self._insert(chunk_id, doc)
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"docs": self._docs}, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    # === Escritura ===
+
+    def _insert(self, chunk_id: str, doc: Dict):
+        self._docs[chunk_id] = doc
+        self._total_len += doc["len"]
+        for term, tf in doc["tf"].items():
+            self._postings.setdefault(term, {})[chunk_id] = tf
+
+    def _remove(self, chunk_id: str):
+        doc = self._docs.pop(chunk_id, None)
+        if doc is None:
+            return
+        self._total_len -= doc["len"]
+        for term in doc["tf"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def add(self, chunk_id: str, text: str, category: Optional[str] = None):
+        """Indexar (o re-indexar) un chunk."""
+        tokens = tokenize(text)
+        doc = {"tf": dict(Counter(tokens)), "len": len(tokens), "category": category}
+        with self._lock:
+            self._remove(chunk_id)
+            self._insert(chunk_id, doc)
+            self._dirty = True
+
+    def set_category(self, chunk_id: str, category: Optional[str]):
+        with self._lock:
+            doc = self._docs.get(chunk_id)
+            if doc is not None and doc["category"] != category:
+                doc["category"] = category
+                self._dirty = True
+
+    def remove(self, chunk_ids: List[str]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+            self._dirty = True
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._docs
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # === Búsqueda ===
+
+    def search(self, query: str, n_results: int = 5, category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Top-n (chunk_id, score BM25) para la query."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs or not terms:
+                return []
+            avg_len = self._total_len / n_docs
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    doc = self._docs[chunk_id]
+                    if category and doc["category"] != category:
+                        continue
+                    norm = tf + self.k1 * (1 - self.b + self.b * doc["len"] / avg_len)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        return heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fusionar rankings (listas de IDs, mejor primero) con RRF.
+
+    Score normalizado a [0, 1]: 1.0 = primero en todos los rankings.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, 1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1 / (k + rank)
+    best_possible = len(rankings) / (k + 1)
+    return sorted(
+        ((chunk_id, score / best_possible) for chunk_id, score in scores.items()),
+        key=lambda item: item[1],
+        reverse=True
+    )
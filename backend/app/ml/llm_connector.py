@@ -10,19 +10,132 @@ El LLM analiza el contexto del mercado y proporciona
 razonamiento avanzado para las señales de trading.
 """
 
+import asyncio
+import json
+import re
+import time
 import httpx
-from typing import Optional, Dict, List
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Optional, Dict, List, Tuple
 from datetime import datetime
 from loguru import logger
 from abc import ABC, abstractmethod
 
 from app.config import settings
+from app.ml.llm_pool import LLMHealthProber, ProviderHealth, TokenBucket
+
+
+# === Streaming ===
+
+TokenCallback = Callable[[str], Awaitable[None]]
+
+_SIGNAL_RE = re.compile(r'(?:SIGNAL|SEÑAL):\s*\**\s*(BUY|SELL|HOLD|COMPRA|VENTA|MANTENER)\b')
+_CONFIDENCE_RE = re.compile(r'(?:CONFIDENCE|CONFIANZA):\s*\**\s*(\d+)')
+_SIGNAL_ALIASES = {"BUY": "BUY", "COMPRA": "BUY", "SELL": "SELL", "VENTA": "SELL"}
+_CONFIDENCE_DONE_RE = re.compile(r'(?:CONFIDENCE|CONFIANZA):\s*\**\s*\d+(?=\D)')
+
+
+def verdict_ready(text: str) -> bool:
+    """SIGNAL y CONFIDENCE ya completos en el texto recibido (el número terminado)"""
+    upper = text.upper()
+    return bool(_SIGNAL_RE.search(upper) and _CONFIDENCE_DONE_RE.search(upper))
+
+
+async def consume_stream(
+    deltas: AsyncIterator[str],
+    on_token: Optional[TokenCallback] = None,
+    verdict_only: bool = False
+) -> Tuple[str, bool]:
+    """
+    Acumular un stream de tokens reenviando cada fragmento a `on_token`.
+    
+    Con `verdict_only` se corta en cuanto hay veredicto (SIGNAL + CONFIDENCE):
+    al cerrar el generador se cierra la conexión y el proveedor deja de generar.
+    
+    Returns:
+        (texto recibido, True si se cortó antes del final)
+    """
+    text = ""
+    async with aclosing(deltas) as stream:
+        async for delta in stream:
+            text += delta
+            if on_token:
+                await on_token(delta)
+            if verdict_only and verdict_ready(text):
+                return text, True
+    return text, False
+
+
+async def _stream_chat_completion(client: httpx.AsyncClient, url: str, headers: Dict, payload: Dict) -> AsyncIterator[str]:
+    """Deltas de contenido de una API compatible con OpenAI (Server-Sent Events)"""
+    async with client.stream("POST", url, headers=headers, json=payload) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            choices = json.loads(data).get("choices") or [{}]
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
 
 
 # === Base LLM Interface ===
 
 class LLMProvider(ABC):
-    """Interface base para proveedores de LLM"""
+    """
+    Interface base para proveedores de LLM.
+    
+    Cada proveedor mantiene un `httpx.AsyncClient` de larga duración
+    (pool keep-alive), un semáforo de concurrencia y un token bucket.
+    La disponibilidad sale de `health` (sondeos + llamadas reales), nunca
+    de una conexión bloqueante en el camino de la request.
+    """
+    
+    timeout: float = 15.0
+    max_concurrency: int = 4
+    rate_per_minute: float = 60.0
+    
+    def __init__(self):
+        self.health = ProviderHealth()
+        self.limiter = TokenBucket(self.rate_per_minute)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+    
+    @property
+    def name(self) -> str:
+        return self.__class__.__name__
+    
+    def _bind_loop(self):
+        """Semáforo y pool pertenecen a un event loop: se recrean si cambia (p.ej. asyncio.run en un hilo)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client = None
+            self._loop = loop
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartido con keep-alive"""
+        self._bind_loop()
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        return self._client
+    
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
     
     @abstractmethod
     async def analyze(self, prompt: str) -> Optional[str]:
@@ -30,9 +143,82 @@ class LLMProvider(ABC):
         pass
     
     @abstractmethod
-    def is_available(self) -> bool:
-        """Verificar si el proveedor está disponible"""
+    def is_configured(self) -> bool:
+        """Credenciales / URL configuradas (sin red)"""
         pass
+    
+    def is_available(self) -> bool:
+        """Configurado y no caído según el último estado de salud"""
+        return self.is_configured() and self.health.state != "down"
+    
+    @property
+    def saturated(self) -> bool:
+        return self.health.in_flight >= self.max_concurrency or self.limiter.available < 1
+    
+    async def probe(self) -> bool:
+        """
+        Sondeo de salud. Por defecto solo configuración: las APIs remotas
+        se evalúan por el resultado de las llamadas reales (sin gastar tokens).
+        """
+        return self.is_configured()
+    
+    async def run(self, request: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """Ejecutar una request respetando límites y registrando latencia / errores."""
+        self._bind_loop()
+        await self.limiter.acquire()
+        async with self._semaphore:
+            self.health.in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = await request()
+            except Exception as e:
+                self.health.record_failure(str(e) or e.__class__.__name__)
+                logger.error(f"❌ Error en proveedor LLM ({self.name}): {e}")
+                return None
+            finally:
+                self.health.in_flight -= 1
+            if response:
+                self.health.record_success(time.perf_counter() - start)
+            else:
+                self.health.record_failure("respuesta vacía")
+            return response
+    
+    async def complete(self, prompt: str) -> Optional[str]:
+        return await self.run(lambda: self.analyze(prompt))
+    
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Tokens de la respuesta. Por defecto, la respuesta completa en un único fragmento."""
+        response = await self.analyze(prompt)
+        if response:
+            yield response
+    
+    async def run_stream(self, request: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """`run` para streams: mismos límites; un corte anticipado del consumidor cuenta como éxito."""
+        self._bind_loop()
+        await self.limiter.acquire()
+        async with self._semaphore:
+            self.health.in_flight += 1
+            start = time.perf_counter()
+            received = False
+            try:
+                async with aclosing(request()) as deltas:
+                    async for delta in deltas:
+                        if delta:
+                            received = True
+                            yield delta
+            except GeneratorExit:
+                self.health.record_success(time.perf_counter() - start)
+                raise
+            except Exception as e:
+                self.health.record_failure(str(e) or e.__class__.__name__)
+                logger.error(f"❌ Error en stream LLM ({self.name}): {e}")
+                return
+            finally:
+                self.health.in_flight -= 1
+            if received:
+                self.health.record_success(time.perf_counter() - start)
+            else:
+                self.health.record_failure("respuesta vacía")
 
 
 
@@ -43,38 +229,40 @@ class SmartPoolProvider(LLMProvider):
     Conector para CENTIBOT SmartPool (Alto Nivel / Multimodelo)
     """
     
+    timeout = 10.0
+    rate_per_minute = 120.0
+    
     def __init__(self):
+        super().__init__()
         self.url = getattr(settings, 'centibot_url', "http://localhost:7500/api/send")
         
-    def is_available(self) -> bool:
-        try:
-            import socket
-            from urllib.parse import urlparse
-            parsed = urlparse(self.url)
-            host = parsed.hostname or "localhost"
-            port = parsed.port or 7500
-            
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(0.5)
-                s.connect((host, port))
-                return True
-        except Exception:
-            return False
+    def is_configured(self) -> bool:
+        return bool(self.url)
+    
+    async def probe(self) -> bool:
+        """Conexión TCP asíncrona al host de CentiBot"""
+        from urllib.parse import urlparse
+        parsed = urlparse(self.url)
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(parsed.hostname or "localhost", parsed.port or 7500),
+            timeout=0.5
+        )
+        writer.close()
+        return True
             
     async def analyze(self, prompt: str) -> Optional[str]:
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    self.url,
-                    json={
-                        "text": f"Eres el SmartPool de análisis institucional. Analiza estos datos y da una señal clara:\n\n{prompt}\n\nResponde estrictamente con: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ..."
-                    }
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("status") == "ok":
-                        return data.get("response", "")
-                return None
+            response = await self.client.post(
+                self.url,
+                json={
+                    "text": f"Eres el SmartPool de análisis institucional. Analiza estos datos y da una señal clara:\n\n{prompt}\n\nResponde estrictamente con: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ..."
+                }
+            )
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("status") == "ok":
+                    return data.get("response", "")
+            return None
         except Exception as e:
             logger.error(f"SmartPool connection error: {e}")
             return None
@@ -95,51 +283,51 @@ class DeepSeekProvider(LLMProvider):
     BASE_URL = "https://api.deepseek.com/v1/chat/completions"
     
     def __init__(self, api_key: Optional[str] = None):
+        super().__init__()
         self.api_key = api_key or getattr(settings, 'deepseek_api_key', None)
         self.model = "deepseek-chat"  # Modelo principal
     
-    def is_available(self) -> bool:
+    def is_configured(self) -> bool:
         return bool(self.api_key)
     
     async def analyze(self, prompt: str) -> Optional[str]:
-        if not self.is_available():
+        if not self.is_configured():
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                response = await client.post(
-                    self.BASE_URL,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": """Eres un analista de trading profesional. 
-                                Analizas datos de mercado y proporcionas señales claras.
-                                Responde siempre en español y sé conciso.
-                                Formato: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ..."""
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "temperature": 0.3,
-                        "max_tokens": 500
-                    }
-                )
+            response = await self.client.post(
+                self.BASE_URL,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.model,
+                    "messages": [
+                        {
+                            "role": "system",
+                            "content": """Eres un analista de trading profesional. 
+                            Analizas datos de mercado y proporcionas señales claras.
+                            Responde siempre en español y sé conciso.
+                            Formato: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ..."""
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    "temperature": 0.3,
+                    "max_tokens": 500
+                }
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data["choices"][0]["message"]["content"]
+            else:
+                logger.error(f"DeepSeek error: {response.status_code}")
+                return None
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data["choices"][0]["message"]["content"]
-                else:
-                    logger.error(f"DeepSeek error: {response.status_code}")
-                    return None
-                    
         except Exception as e:
             logger.error(f"DeepSeek connection error: {e}")
             return None
@@ -159,54 +347,65 @@ class OpenAIProvider(LLMProvider):
     BASE_URL = "https://api.openai.com/v1/chat/completions"
     
     def __init__(self, api_key: Optional[str] = None):
+        super().__init__()
         self.api_key = api_key or getattr(settings, 'openai_api_key', None)
         self.model = "gpt-4-turbo-preview"
     
-    def is_available(self) -> bool:
+    def is_configured(self) -> bool:
         return bool(self.api_key)
     
+    def _headers(self) -> Dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _payload(self, prompt: str, stream: bool = False) -> Dict:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": """You are a professional crypto trading analyst.
+                    Analyze market data and provide clear signals.
+                    Always respond in Spanish. Be concise.
+                    Format: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ..."""
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "max_tokens": 500
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+    
     async def analyze(self, prompt: str) -> Optional[str]:
-        if not self.is_available():
+        if not self.is_configured():
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                response = await client.post(
-                    self.BASE_URL,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": """You are a professional crypto trading analyst.
-                                Analyze market data and provide clear signals.
-                                Always respond in Spanish. Be concise.
-                                Format: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ..."""
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "temperature": 0.3,
-                        "max_tokens": 500
-                    }
-                )
+            response = await self.client.post(self.BASE_URL, headers=self._headers(), json=self._payload(prompt))
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data["choices"][0]["message"]["content"]
+            else:
+                logger.error(f"OpenAI error: {response.status_code}")
+                return None
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data["choices"][0]["message"]["content"]
-                else:
-                    logger.error(f"OpenAI error: {response.status_code}")
-                    return None
-                    
         except Exception as e:
             logger.error(f"OpenAI connection error: {e}")
             return None
+    
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async for delta in _stream_chat_completion(
+            self.client, self.BASE_URL, self._headers(), self._payload(prompt, stream=True)
+        ):
+            yield delta
 
 
 # === Ollama Provider (Local, Gratis) ===
@@ -225,47 +424,86 @@ class OllamaProvider(LLMProvider):
     """
     
     BASE_URL = "http://localhost:11434/api/generate"
+    TAGS_URL = "http://localhost:11434/api/tags"
+    
+    timeout = 60.0
+    max_concurrency = 1  # Un solo modelo en la GPU/CPU local: las requests se encolan
+    rate_per_minute = 600.0
     
     def __init__(self, model: Optional[str] = None):
+        super().__init__()
         self.model = model or getattr(settings, 'ollama_model', 'gemma:2b')
     
-    def is_available(self) -> bool:
-        try:
-            import socket
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(0.5)
-                s.connect(("localhost", 11434))
-                return True
-        except Exception:
-            return False
+    def is_configured(self) -> bool:
+        return True
     
-    async def analyze(self, prompt: str) -> Optional[str]:
+    async def probe(self) -> bool:
+        # Cliente propio sin pool: el compartido tiene una sola conexión y la
+        # ocupa la generación en curso (el sondeo daría PoolTimeout -> "caído")
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            response = await client.get(self.TAGS_URL)
+        return response.status_code == 200
+    
+    async def generate(self, prompt: str, model: Optional[str] = None) -> Optional[str]:
+        """Prompt crudo a /api/generate (sin plantilla de señal)"""
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    self.BASE_URL,
-                    json={
-                        "model": self.model,
-                        "prompt": f"""Eres un analista de trading profesional.
-                        Analiza estos datos y da una señal clara.
-                        
-                        {prompt}
-                        
-                        Responde con: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ...""",
-                        "stream": False,
-                        "keep_alive": -1
-                    }
-                )
+            response = await self.client.post(
+                self.BASE_URL,
+                json={
+                    "model": model or self.model,
+                    "prompt": prompt,
+                    "stream": False,
+                    "keep_alive": -1
+                }
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("response", "")
+            else:
+                return None
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("response", "")
-                else:
-                    return None
-                    
         except Exception as e:
             logger.error(f"Ollama connection error: {e}")
             return None
+    
+    async def generate_stream(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[str]:
+        """Prompt crudo a /api/generate con `stream: true` (NDJSON, un fragmento por línea)"""
+        async with self.client.stream(
+            "POST",
+            self.BASE_URL,
+            json={
+                "model": model or self.model,
+                "prompt": prompt,
+                "stream": True,
+                "keep_alive": -1
+            }
+        ) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    return
+    
+    def _signal_prompt(self, prompt: str) -> str:
+        return f"""Eres un analista de trading profesional.
+                        Analiza estos datos y da una señal clara.
+                        
+                        {prompt}
+                        
+                        Responde con: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ..."""
+    
+    async def analyze(self, prompt: str) -> Optional[str]:
+        return await self.generate(self._signal_prompt(prompt))
+    
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async for delta in self.generate_stream(self._signal_prompt(prompt)):
+            yield delta
 
 
 # === OpenRouter Provider (Online, Multi-Modelo) ===
@@ -289,64 +527,79 @@ class OpenRouterProvider(LLMProvider):
     
     BASE_URL = "https://openrouter.ai/api/v1/chat/completions"
     
+    timeout = 30.0
+    max_concurrency = 2
+    rate_per_minute = 20.0  # Límite de los modelos :free
+    
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+        super().__init__()
         self.api_key = api_key or getattr(settings, 'openrouter_api_key', '')
         # Modelo por defecto: Llama 3.1 8B GRATUITO
         self.model = model or getattr(settings, 'openrouter_model', 'meta-llama/llama-3.1-8b-instruct:free')
     
-    def is_available(self) -> bool:
+    def is_configured(self) -> bool:
         return bool(self.api_key and self.api_key.strip())
     
+    def _headers(self) -> Dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://sic-ultra.local",
+            "X-Title": "SIC Ultra - Trading AI"
+        }
+    
+    def _payload(self, prompt: str, stream: bool = False) -> Dict:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": (
+                        "Eres un analista de trading cripto profesional de nivel institucional. "
+                        "Tu misión es analizar datos de mercado en tiempo real y proporcionar "
+                        "señales de alta precisión para el sistema SIC Ultra. "
+                        "Responde siempre en español. Sé conciso y directo. "
+                        "Formato estricto: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ..."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.2,
+            "max_tokens": 400
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+    
     async def analyze(self, prompt: str) -> Optional[str]:
-        if not self.is_available():
+        if not self.is_configured():
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    self.BASE_URL,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "https://sic-ultra.local",
-                        "X-Title": "SIC Ultra - Trading AI"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": (
-                                    "Eres un analista de trading cripto profesional de nivel institucional. "
-                                    "Tu misión es analizar datos de mercado en tiempo real y proporcionar "
-                                    "señales de alta precisión para el sistema SIC Ultra. "
-                                    "Responde siempre en español. Sé conciso y directo. "
-                                    "Formato estricto: SIGNAL: BUY/SELL/HOLD, CONFIDENCE: %, REASON: ..."
-                                )
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "temperature": 0.2,
-                        "max_tokens": 400
-                    }
-                )
+            response = await self.client.post(self.BASE_URL, headers=self._headers(), json=self._payload(prompt))
+            
+            if response.status_code == 200:
+                data = response.json()
+                content = data["choices"][0]["message"]["content"]
+                model_used = data.get("model", self.model)
+                logger.info(f"🌐 OpenRouter respuesta OK. Modelo: {model_used}")
+                return content
+            else:
+                logger.error(f"OpenRouter error {response.status_code}: {response.text[:200]}")
+                return None
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    content = data["choices"][0]["message"]["content"]
-                    model_used = data.get("model", self.model)
-                    logger.info(f"🌐 OpenRouter respuesta OK. Modelo: {model_used}")
-                    return content
-                else:
-                    logger.error(f"OpenRouter error {response.status_code}: {response.text[:200]}")
-                    return None
-                    
         except Exception as e:
             logger.error(f"OpenRouter connection error: {e}")
             return None
+    
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async for delta in _stream_chat_completion(
+            self.client, self.BASE_URL, self._headers(), self._payload(prompt, stream=True)
+        ):
+            yield delta
 
 
 # === LLM Manager ===
@@ -362,28 +615,44 @@ class LLMManager:
     4. OpenRouter (🌐 multi-modelo online - NUEVO)
     5. Ollama (local y gratis)
     6. Sin LLM (usa solo ML local)
+    
+    La prioridad se ajusta con el estado de salud: los proveedores caídos
+    se saltan y los degradados o saturados pasan al final de la cola.
     """
     
-    def __init__(self):
-        self.providers: List[LLMProvider] = [
+    def __init__(self, providers: Optional[List[LLMProvider]] = None):
+        self.providers: List[LLMProvider] = providers if providers is not None else [
             SmartPoolProvider(),
             DeepSeekProvider(),
             OpenAIProvider(),
             OpenRouterProvider(),  # 🌐 NUEVO: OpenRouter antes que Ollama
             OllamaProvider()
         ]
-        self._active_provider: Optional[LLMProvider] = None
-        self._find_active_provider()
-    
-    def _find_active_provider(self):
-        """Encontrar el primer proveedor disponible"""
-        for provider in self.providers:
-            if provider.is_available():
-                self._active_provider = provider
-                logger.info(f"🤖 LLM activo: {provider.__class__.__name__}")
-                return
+        self.prober = LLMHealthProber(
+            self.providers,
+            interval_seconds=getattr(settings, 'llm_health_probe_interval_seconds', 30.0)
+        )
+        self._last_provider: Optional[LLMProvider] = None
         
-        logger.warning("⚠️ Ningún LLM disponible. Usando solo ML local.")
+        configured = [p.name for p in self.providers if p.is_configured()]
+        if configured:
+            logger.info(f"🤖 LLMs configurados: {', '.join(configured)}")
+        else:
+            logger.warning("⚠️ Ningún LLM configurado. Usando solo ML local.")
+    
+    def get_provider(self, name: str) -> Optional[LLMProvider]:
+        return next((p for p in self.providers if p.name == name), None)
+    
+    def ranked_providers(self) -> List[LLMProvider]:
+        """Proveedores disponibles: sanos y con capacidad primero, luego por prioridad"""
+        candidates = [(i, p) for i, p in enumerate(self.providers) if p.is_available()]
+        candidates.sort(key=lambda item: (item[1].health.state == "degraded", item[1].saturated, item[0]))
+        return [p for _, p in candidates]
+    
+    @property
+    def _active_provider(self) -> Optional[LLMProvider]:
+        ranked = self.ranked_providers()
+        return ranked[0] if ranked else None
     
     @property
     def is_available(self) -> bool:
@@ -391,9 +660,77 @@ class LLMManager:
     
     @property
     def provider_name(self) -> str:
-        if self._active_provider:
-            return self._active_provider.__class__.__name__
-        return "None"
+        provider = self._last_provider or self._active_provider
+        return provider.name if provider else "None"
+    
+    async def start(self):
+        """Iniciar el sondeo de salud en segundo plano"""
+        await self.prober.start()
+    
+    async def stop(self):
+        """Detener el sondeo y cerrar los pools HTTP"""
+        await self.prober.stop()
+        for provider in self.providers:
+            await provider.aclose()
+    
+    async def _ensure_probed(self):
+        if not self.prober.running and any(p.health.last_probe is None for p in self.providers):
+            await self.prober.probe_all()  # Sin prober en marcha: un sondeo inicial
+    
+    async def _complete(self, prompt: str) -> Tuple[Optional[str], Optional[LLMProvider]]:
+        """Enviar el prompt al mejor proveedor, con fallback al siguiente."""
+        await self._ensure_probed()
+        
+        for provider in self.ranked_providers():
+            response = await provider.complete(prompt)
+            if response:
+                if self._last_provider is not None and provider is not self._last_provider:
+                    logger.success(f"🤖 LLM activo cambiado dinámicamente a: {provider.name}")
+                self._last_provider = provider
+                return response, provider
+            logger.warning(f"🔄 Fallback LLM: {provider.name} no respondió. Probando el siguiente...")
+        return None, None
+    
+    async def analyze(self, prompt: str) -> Optional[str]:
+        """Prompt libre (sin plantilla de mercado) con selección y fallback de proveedor"""
+        response, _ = await self._complete(prompt)
+        return response
+    
+    async def _stream(
+        self,
+        prompt: str,
+        on_token: Optional[TokenCallback],
+        verdict_only: bool
+    ) -> Tuple[str, Optional[LLMProvider], bool]:
+        """Como `_complete` pero en streaming; solo hay fallback si no llegó ningún token."""
+        await self._ensure_probed()
+        
+        for provider in self.ranked_providers():
+            text, early_stop = await consume_stream(
+                provider.run_stream(lambda: provider.stream(prompt)), on_token, verdict_only
+            )
+            if text:
+                self._last_provider = provider
+                return text, provider, early_stop
+            logger.warning(f"🔄 Fallback LLM: {provider.name} no respondió. Probando el siguiente...")
+        return "", None, False
+    
+    def get_metrics(self) -> Dict:
+        return {
+            "active_provider": self.provider_name,
+            "prober_running": self.prober.running,
+            "probe_interval_seconds": self.prober.interval_seconds,
+            "providers": {
+                p.name: {
+                    "configured": p.is_configured(),
+                    "max_concurrency": p.max_concurrency,
+                    "rate_per_minute": p.rate_per_minute,
+                    "tokens_available": round(p.limiter.available, 2),
+                    **p.health.to_dict()
+                }
+                for p in self.providers
+            }
+        }
     
     async def analyze_market(
         self,
@@ -401,7 +738,8 @@ class LLMManager:
         current_price: float,
         indicators: Dict,
         patterns: List[str],
-        recent_signals: List[Dict]
+        recent_signals: List[Dict],
+        candle_interval: Optional[str] = None
     ) -> Optional[Dict]:
         """
         Análisis de mercado usando LLM.
@@ -410,12 +748,35 @@ class LLMManager:
         - Señal con razonamiento
         - Nivel de confianza
         - Factores de riesgo
+        
+        Con `candle_interval` el veredicto se cachea por estado cuantizado
+        hasta el cierre de esa vela y las llamadas idénticas en vuelo se
+        comparten (ver app.ml.llm_verdict_cache).
         """
-        if not self._active_provider:
+        if not self.is_available:
             return None
         
+        if candle_interval and settings.llm_verdict_cache_enabled:
+            from app.ml.llm_verdict_cache import get_llm_verdict_cache, next_candle_close, quantize_state
+            key = quantize_state(symbol, current_price, indicators, patterns)
+            return await get_llm_verdict_cache().get_or_compute(
+                key,
+                next_candle_close(candle_interval),
+                lambda: self._analyze_market(symbol, current_price, indicators, patterns, recent_signals)
+            )
+        
+        return await self._analyze_market(symbol, current_price, indicators, patterns, recent_signals)
+    
+    def _build_market_prompt(
+        self,
+        symbol: str,
+        current_price: float,
+        indicators: Dict,
+        patterns: List[str],
+        recent_signals: List[Dict]
+    ) -> str:
         # Construir prompt con contexto
-        prompt = f"""
+        return f"""
         ANÁLISIS DE MERCADO: {symbol}
         
         📊 Precio actual: ${current_price:,.2f}
@@ -438,39 +799,50 @@ class LLMManager:
         4. RISK: factores de riesgo a considerar
         5. TARGETS: niveles de entrada, stop-loss y take-profit sugeridos
         """
-        
-        response = None
-        tried_providers = []
-        
-        # Intentar con el proveedor activo primero
-        if self._active_provider:
-            tried_providers.append(self._active_provider)
-            try:
-                response = await self._active_provider.analyze(prompt)
-            except Exception as e:
-                logger.error(f"❌ Error en proveedor LLM activo ({self._active_provider.__class__.__name__}): {e}")
-        
-        # Si el proveedor activo falla o no devuelve respuesta, intentar con los demás proveedores disponibles
-        if not response:
-            for provider in self.providers:
-                if provider not in tried_providers and provider.is_available():
-                    logger.warning(f"🔄 Fallback LLM: El proveedor activo falló. Intentando con {provider.__class__.__name__}...")
-                    tried_providers.append(provider)
-                    try:
-                        response = await provider.analyze(prompt)
-                        if response:
-                            # Actualizar el proveedor activo para futuras llamadas
-                            self._active_provider = provider
-                            logger.success(f"🤖 LLM activo cambiado dinámicamente a: {provider.__class__.__name__}")
-                            break
-                    except Exception as e:
-                        logger.error(f"❌ Error en proveedor de fallback LLM ({provider.__class__.__name__}): {e}")
-        
+    
+    async def _analyze_market(
+        self,
+        symbol: str,
+        current_price: float,
+        indicators: Dict,
+        patterns: List[str],
+        recent_signals: List[Dict]
+    ) -> Optional[Dict]:
+        prompt = self._build_market_prompt(symbol, current_price, indicators, patterns, recent_signals)
+        response, provider = await self._complete(prompt)
         if response:
-            return self._parse_llm_response(response, symbol, current_price)
+            return self._parse_llm_response(response, symbol, current_price, source=provider.name)
             
         return None
     
+    async def stream_market_analysis(
+        self,
+        symbol: str,
+        current_price: float,
+        indicators: Dict,
+        patterns: List[str],
+        recent_signals: List[Dict],
+        on_token: Optional[TokenCallback] = None,
+        verdict_only: bool = False
+    ) -> Optional[Dict]:
+        """
+        `analyze_market` en streaming: cada fragmento se reenvía a `on_token`
+        (p.ej. un WebSocket) según llega.
+        
+        Con `verdict_only` la generación se corta al tener SIGNAL y CONFIDENCE.
+        """
+        if not self.is_available:
+            return None
+        
+        prompt = self._build_market_prompt(symbol, current_price, indicators, patterns, recent_signals)
+        text, provider, early_stop = await self._stream(prompt, on_token, verdict_only)
+        if not text:
+            return None
+        
+        result = self._parse_llm_response(text, symbol, current_price, source=provider.name)
+        result["early_stop"] = early_stop
+        return result
+    
     def _format_recent_signals(self, signals: List[Dict]) -> str:
         if not signals:
             return "No hay señales previas"
@@ -481,7 +853,7 @@ class LLMManager:
         
         return "\n".join(lines)
     
-    def _parse_llm_response(self, response: str, symbol: str, price: float) -> Dict:
+    def _parse_llm_response(self, response: str, symbol: str, price: float, source: Optional[str] = None) -> Dict:
         """Parsear respuesta del LLM"""
         result = {
             "symbol": symbol,
@@ -489,20 +861,18 @@ class LLMManager:
             "signal": "HOLD",
             "confidence": 50,
             "reasoning": response,
-            "source": self.provider_name,
+            "source": source or self.provider_name,
             "timestamp": datetime.utcnow()
         }
         
-        # Extraer señal
+        # Extraer señal (SIGNAL/SEÑAL, en inglés o español)
         response_upper = response.upper()
-        if "SIGNAL: BUY" in response_upper or "SEÑAL: COMPRA" in response_upper:
-            result["signal"] = "BUY"
-        elif "SIGNAL: SELL" in response_upper or "SEÑAL: VENTA" in response_upper:
-            result["signal"] = "SELL"
+        signal_match = _SIGNAL_RE.search(response_upper)
+        if signal_match:
+            result["signal"] = _SIGNAL_ALIASES.get(signal_match.group(1), "HOLD")
         
         # Extraer confianza
-        import re
-        confidence_match = re.search(r'CONFIDENCE:\s*(\d+)', response_upper)
+        confidence_match = _CONFIDENCE_RE.search(response_upper)
         if confidence_match:
             result["confidence"] = min(int(confidence_match.group(1)), 100)
         
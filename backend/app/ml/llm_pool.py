@@ -0,0 +1,183 @@
+"""
+SIC Ultra - Pool de Proveedores LLM
+
+Piezas compartidas por los proveedores de app.ml.llm_connector:
+- TokenBucket: límite de requests por minuto (async, sin bloquear el loop)
+- ProviderHealth: latencia EWMA, tasa de error EWMA y circuit breaker
+- LLMHealthProber: sondeo periódico en segundo plano, para que el
+  LLMManager elija proveedor por estado en lugar de sondear en cada llamada
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+
+class TokenBucket:
+    """
+    Token bucket asíncrono.
+
+    Args:
+        rate_per_minute: Tokens repuestos por minuto
+        capacity: Ráfaga máxima (por defecto, la tasa por minuto / 6)
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, rate_per_minute / 6)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def acquire(self):
+        while not self.try_acquire():
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ProviderHealth:
+    """
+    Estado de salud de un proveedor, alimentado por llamadas reales y sondeos.
+
+    Tras `failure_threshold` fallos consecutivos el circuito se abre durante
+    `cooldown_seconds`; pasado ese tiempo el proveedor vuelve a probarse.
+    """
+
+    def __init__(self, alpha: float = 0.2, failure_threshold: int = 3, cooldown_seconds: float = 60.0):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.reachable: Optional[bool] = None  # Resultado del último sondeo (None = sin sondear)
+        self.open_until = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.last_error: Optional[str] = None
+        self.last_probe: Optional[float] = None
+        self.probe_latency: Optional[float] = None
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else (1 - self.alpha) * current + self.alpha * value
+
+    def record_success(self, latency: float):
+        self.calls += 1
+        self.latency_ewma = self._ewma(self.latency_ewma, latency)
+        self.error_rate = self._ewma(self.error_rate, 0.0)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.reachable = True  # Una respuesta real desmiente un sondeo fallido anterior
+
+    def record_failure(self, error: str):
+        self.calls += 1
+        self.failures += 1
+        self.error_rate = self._ewma(self.error_rate, 1.0)
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.consecutive_failures >= self.failure_threshold:
+            self.open_until = time.monotonic() + self.cooldown_seconds
+
+    def record_probe(self, ok: bool, latency: float, error: Optional[str] = None):
+        self.reachable = ok
+        self.last_probe = time.time()
+        self.probe_latency = latency
+        if not ok:
+            self.last_error = error or "sondeo fallido"
+
+    @property
+    def state(self) -> str:
+        if self.reachable is False or time.monotonic() < self.open_until:
+            return "down"
+        if self.consecutive_failures or self.error_rate >= 0.5:
+            return "degraded"
+        if self.reachable is None and not self.calls:
+            return "unknown"
+        return "up"
+
+    def to_dict(self) -> Dict:
+        return {
+            "state": self.state,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "calls": self.calls,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "consecutive_failures": self.consecutive_failures,
+            "probe_latency_ms": round(self.probe_latency * 1000, 1) if self.probe_latency is not None else None,
+            "last_probe": self.last_probe,
+            "last_error": self.last_error,
+        }
+
+
+class LLMHealthProber:
+    """
+    Sondea todos los proveedores en paralelo cada `interval_seconds`.
+
+    Los proveedores exponen `async probe() -> bool` y un `health` (ProviderHealth).
+    """
+
+    def __init__(self, providers: List, interval_seconds: float = 30.0, timeout: float = 2.0):
+        self.providers = providers
+        self.interval_seconds = interval_seconds
+        self.timeout = timeout
+        self.running = False
+        self._task = None
+
+    async def probe_all(self):
+        await asyncio.gather(*(self._probe(p) for p in self.providers))
+
+    async def _probe(self, provider):
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(provider.probe(), timeout=self.timeout)
+            error = None
+        except Exception as e:
+            ok, error = False, str(e) or e.__class__.__name__
+        was_reachable = provider.health.reachable
+        provider.health.record_probe(ok, time.perf_counter() - start, error)
+        if was_reachable is not None and was_reachable != ok:
+            logger.info(f"🩺 LLM {provider.name}: {'disponible' if ok else 'no disponible'}")
+
+    async def start(self):
+        """Iniciar el sondeo en segundo plano"""
+        if self.running:
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        """Detener el sondeo"""
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run_loop(self):
+        while self.running:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"❌ Error sondeando proveedores LLM: {e}")
+            await asyncio.sleep(self.interval_seconds)
@@ -0,0 +1,176 @@
+"""
+SIC Ultra - Cache de Veredictos LLM
+
+El bucle de automatización consulta al LLM en cada ciclo por cada señal
+técnica no-HOLD, aunque los indicadores apenas cambien entre ciclos.
+Este cache guarda el veredicto por estado de mercado cuantizado:
+
+- Clave: símbolo + RSI por tramos + signo del MACD + tendencia + ATR
+  relativo por tramos + conjunto de patrones
+- Validez: hasta el cierre de la vela en curso (los indicadores de una
+  vela abierta solo se mueven dentro del mismo tramo)
+- Deduplicación: prompts idénticos en vuelo comparten una sola llamada;
+  si el llamador abandona por timeout la llamada sigue y llena el cache
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from loguru import logger
+
+from app.ml.feature_store import INTERVAL_SECONDS
+
+
+RSI_BUCKET = 5.0         # Puntos de RSI por tramo
+ATR_BUCKET_PCT = 0.25    # % del precio por tramo de ATR
+
+
+def _bucket(value, size: float) -> Optional[int]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(value):
+        return None
+    return int(value // size)
+
+
+def _sign(value) -> Optional[int]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return (value > 0) - (value < 0)
+
+
+def quantize_state(
+    symbol: str,
+    current_price: float,
+    indicators: Dict,
+    patterns: List[str]
+) -> Tuple:
+    """
+    Clave estable del estado de mercado que ve el prompt del LLM.
+
+    Sin ATR explícito se usa la alineación de EMAs del generador técnico
+    como tendencia (es lo que cambia el veredicto, no el precio exacto).
+    """
+    atr = indicators.get("atr")
+    atr_pct = atr / current_price * 100 if isinstance(atr, (int, float)) and current_price else None
+    return (
+        symbol.upper(),
+        _bucket(indicators.get("rsi"), RSI_BUCKET),
+        _sign(indicators.get("macd")),
+        indicators.get("trend") or indicators.get("ema_alignment"),
+        _bucket(atr_pct, ATR_BUCKET_PCT),
+        frozenset(patterns or ()),
+    )
+
+
+def next_candle_close(interval: str, now: Optional[float] = None) -> float:
+    """Epoch (s) del cierre de la vela en curso para `interval`."""
+    seconds = INTERVAL_SECONDS[interval]
+    now = time.time() if now is None else now
+    return (math.floor(now / seconds) + 1) * seconds
+
+
+class LLMVerdictCache:
+    """
+    Veredictos del LLM por estado cuantizado, con deduplicación en vuelo.
+
+    Args:
+        max_size: Entradas máximas (LRU)
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._verdicts: "OrderedDict[Hashable, Tuple[float, Dict]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"hits": 0, "misses": 0, "deduplicated": 0, "expired": 0, "failures": 0}
+
+    def _get(self, key: Hashable, now: float) -> Optional[Dict]:
+        entry = self._verdicts.get(key)
+        if entry is None:
+            return None
+        expires_at, verdict = entry
+        if now >= expires_at:
+            del self._verdicts[key]
+            self.stats["expired"] += 1
+            return None
+        self._verdicts.move_to_end(key)
+        return verdict
+
+    def _put(self, key: Hashable, verdict: Dict, expires_at: float):
+        self._verdicts[key] = (expires_at, verdict)
+        self._verdicts.move_to_end(key)
+        while len(self._verdicts) > self.max_size:
+            self._verdicts.popitem(last=False)
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        expires_at: float,
+        compute: Callable[[], Awaitable[Optional[Dict]]]
+    ) -> Optional[Dict]:
+        """
+        Veredicto cacheado, el de una llamada idéntica en curso, o uno nuevo.
+
+        Las respuestas vacías (proveedor caído) no se cachean.
+        """
+        verdict = self._get(key, time.time())
+        if verdict is not None:
+            self.stats["hits"] += 1
+            return {**verdict, "cached": True}
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["deduplicated"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(self._compute(key, expires_at, compute))
+            self._in_flight[key] = task
+
+        # shield: un timeout del llamador no cancela la llamada compartida
+        verdict = await asyncio.shield(task)
+        return dict(verdict) if verdict is not None else None
+
+    async def _compute(self, key: Hashable, expires_at: float, compute) -> Optional[Dict]:
+        try:
+            verdict = await compute()
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.error(f"❌ Error obteniendo veredicto LLM: {e}")
+            verdict = None
+        finally:
+            self._in_flight.pop(key, None)
+        if verdict is not None:
+            self._put(key, verdict, expires_at)
+        return verdict
+
+    def invalidate(self):
+        self._verdicts.clear()
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["deduplicated"]
+        return {
+            **self.stats,
+            "hit_rate": round((self.stats["hits"] + self.stats["deduplicated"]) / lookups, 3) if lookups else None,
+            "cached_verdicts": len(self._verdicts),
+            "in_flight": len(self._in_flight),
+        }
+
+
+# === Singleton ===
+
+_verdict_cache: Optional[LLMVerdictCache] = None
+
+
+def get_llm_verdict_cache() -> LLMVerdictCache:
+    global _verdict_cache
+    if _verdict_cache is None:
+        from app.config import settings
+        _verdict_cache = LLMVerdictCache(max_size=settings.llm_verdict_cache_size)
+    return _verdict_cache
@@ -0,0 +1,196 @@
+"""
+SIC Ultra - Registro de Modelos Versionados
+
+Cada entrenamiento promovido se guarda como una versión inmutable:
+- {root}/{modelo}/v{N}/ con los artefactos (modelo, scaler, encoder...)
+- manifest.json con checksum SHA-256 de cada artefacto y metadatos
+  (métricas, rango de datos, modo de entrenamiento)
+- index.json con la versión actual (permite rollback con `set_current`)
+
+Al cargar se verifican los checksums; una versión corrupta se salta y se usa
+la anterior válida.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+
+REGISTRY_DIR = os.path.join(os.path.dirname(__file__), "models", "registry")
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 de un archivo (o de todos los archivos de un directorio)."""
+    digest = hashlib.sha256()
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    for file_path in paths:
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Registro de artefactos versionados con checksums y metadatos."""
+
+    def __init__(self, root: str = REGISTRY_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    # === Helpers ===
+
+    def _model_dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _read_json(self, path: str) -> Optional[Dict]:
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_json(self, path: str, data: Dict):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(tmp, path)
+
+    def _index(self, name: str) -> Dict:
+        return self._read_json(os.path.join(self._model_dir(name), "index.json")) or {
+            "current": None, "versions": []
+        }
+
+    # === Escritura ===
+
+    def register(self, name: str, artifacts: Dict[str, str], metadata: Optional[Dict] = None) -> Dict:
+        """
+        Registrar una nueva versión copiando los artefactos.
+
+        Args:
+            artifacts: {rol: ruta} p.ej. {"model": ".../lstm.keras", "scaler": ".../scaler.pkl"}
+            metadata: Métricas, rango de datos, modo de entrenamiento...
+
+        Returns:
+            Manifest de la versión (pasa a ser la actual)
+        """
+        with self._lock:
+            index = self._index(name)
+            version = max(index["versions"], default=0) + 1
+            version_dir = os.path.join(self._model_dir(name), f"v{version}")
+            os.makedirs(version_dir, exist_ok=True)
+
+            files = {}
+            for role, src in artifacts.items():
+                dst = os.path.join(version_dir, os.path.basename(src))
+                if os.path.isdir(src):
+                    shutil.copytree(src, dst)
+                else:
+                    shutil.copy2(src, dst)
+                files[role] = {"file": os.path.basename(src), "sha256": file_checksum(dst)}
+
+            manifest = {
+                "name": name,
+                "version": version,
+                "created_at": datetime.utcnow().isoformat(),
+                "artifacts": files,
+                "metadata": metadata or {},
+            }
+            self._write_json(os.path.join(version_dir, "manifest.json"), manifest)
+
+            index["versions"].append(version)
+            index["current"] = version
+            self._write_json(os.path.join(self._model_dir(name), "index.json"), index)
+
+        logger.info(f"📦 Modelo {name} registrado como v{version}")
+        return manifest
+
+    def set_current(self, name: str, version: int):
+        """Cambiar la versión actual (rollback / roll-forward)."""
+        with self._lock:
+            index = self._index(name)
+            if version not in index["versions"]:
+                raise ValueError(f"Versión inexistente: {name} v{version}")
+            index["current"] = version
+            self._write_json(os.path.join(self._model_dir(name), "index.json"), index)
+
+    # === Lectura ===
+
+    def manifest(self, name: str, version: int) -> Optional[Dict]:
+        return self._read_json(os.path.join(self._model_dir(name), f"v{version}", "manifest.json"))
+
+    def verify(self, name: str, version: int) -> bool:
+        """Comprobar que todos los artefactos existen y coinciden con su checksum."""
+        manifest = self.manifest(name, version)
+        if not manifest:
+            return False
+        version_dir = os.path.join(self._model_dir(name), f"v{version}")
+        for role, info in manifest["artifacts"].items():
+            path = os.path.join(version_dir, info["file"])
+            if not os.path.exists(path) or file_checksum(path) != info["sha256"]:
+                logger.error(f"❌ Checksum inválido: {name} v{version} ({role})")
+                return False
+        return True
+
+    def resolve(self, name: str, version: Optional[int] = None) -> Optional[Dict]:
+        """
+        Manifest con rutas absolutas de la versión pedida (o la actual).
+
+        Si la versión actual está corrupta, cae a la versión válida más reciente.
+        """
+        index = self._index(name)
+        if version is not None:
+            candidates = [version]
+        elif index["current"] is not None:
+            older = sorted((v for v in index["versions"] if v < index["current"]), reverse=True)
+            candidates = [index["current"]] + older
+        else:
+            return None
+
+        for candidate in candidates:
+            if not self.verify(name, candidate):
+                continue
+            manifest = self.manifest(name, candidate)
+            version_dir = os.path.join(self._model_dir(name), f"v{candidate}")
+            manifest["paths"] = {
+                role: os.path.join(version_dir, info["file"])
+                for role, info in manifest["artifacts"].items()
+            }
+            return manifest
+        return None
+
+    def list_versions(self, name: str) -> List[Dict]:
+        index = self._index(name)
+        versions = []
+        for version in sorted(index["versions"], reverse=True):
+            manifest = self.manifest(name, version) or {}
+            versions.append({
+                "version": version,
+                "current": version == index["current"],
+                "created_at": manifest.get("created_at"),
+                "metadata": manifest.get("metadata", {}),
+                "artifacts": manifest.get("artifacts", {}),
+            })
+        return versions
+
+
+# === Singleton ===
+
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
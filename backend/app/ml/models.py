@@ -9,37 +9,37 @@ Estos modelos se entrenan con datos históricos y mejoran con el tiempo.
 """
 
 import os
+import time
+import threading
+import importlib.util
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
 from datetime import datetime
 from loguru import logger
+from numpy.lib.stride_tricks import sliding_window_view
 import joblib
 import warnings
 warnings.filterwarnings('ignore')
 
-# TensorFlow/Keras para LSTM
-try:
+from app.infrastructure.startup_report import record_load
+from app.ml.model_registry import get_model_registry
+
+if TYPE_CHECKING:
     import tensorflow as tf
-    from tensorflow import keras
-    from keras.models import Sequential, load_model
-    from keras.layers import LSTM, Dense, Dropout, BatchNormalization
-    from keras.callbacks import EarlyStopping, ModelCheckpoint
-    from keras.optimizers import Adam
-    TENSORFLOW_AVAILABLE = True
-except ImportError:
-    TENSORFLOW_AVAILABLE = False
+
+# TensorFlow/Keras (LSTM) y XGBoost/sklearn (clasificador) se importan de forma
+# perezosa dentro de los métodos: importarlos aquí costaba varios segundos en
+# el arranque de la API aunque ningún endpoint ML se usara.
+TENSORFLOW_AVAILABLE = importlib.util.find_spec("tensorflow") is not None
+if not TENSORFLOW_AVAILABLE:
     logger.warning("⚠️ TensorFlow no disponible. LSTM deshabilitado.")
 
-# XGBoost para clasificación
-try:
-    import xgboost as xgb
-    from sklearn.preprocessing import StandardScaler, LabelEncoder
-    from sklearn.model_selection import train_test_split
-    from sklearn.metrics import accuracy_score, classification_report
-    XGBOOST_AVAILABLE = True
-except ImportError:
-    XGBOOST_AVAILABLE = False
+XGBOOST_AVAILABLE = (
+    importlib.util.find_spec("xgboost") is not None
+    and importlib.util.find_spec("sklearn") is not None
+)
+if not XGBOOST_AVAILABLE:
     logger.warning("⚠️ XGBoost no disponible. Clasificador deshabilitado.")
 
 
@@ -48,6 +48,14 @@ except ImportError:
 MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
 os.makedirs(MODELS_DIR, exist_ok=True)
 
+LSTM_FEATURE_COLUMNS = ['close', 'high', 'low', 'volume', 'rsi', 'macd', 'atr']
+
+# Features del clasificador que el feature store entrega ya calculadas
+STORE_FEATURE_COLUMNS = ['close_ret', 'macd_diff', 'volume_ret', 'sma_diff']
+
+# A partir de este número de secuencias el LSTM entrena vía tf.data en streaming
+STREAMING_MIN_SEQUENCES = 20_000
+
 
 # === LSTM Price Predictor ===
 
@@ -61,36 +69,72 @@ class LSTMPricePredictor:
     - Output: Precio predicho para próximo período
     """
     
+    registry_name = "lstm"
+    
     def __init__(self, sequence_length: int = 60, features: int = 7):
         self.sequence_length = sequence_length
         self.features = features
         self.model = None
-        self.scaler = StandardScaler()
+        self.scaler = None
+        self.version: Optional[int] = None
         self.model_path = os.path.join(MODELS_DIR, "lstm_price_predictor.keras")
         self.scaler_path = os.path.join(MODELS_DIR, "lstm_scaler.pkl")
-        self._load_or_create_model()
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._trained = False
     
-    def _load_or_create_model(self):
-        """Cargar modelo existente o crear uno nuevo"""
+    def ensure_loaded(self):
+        """
+        Carga perezosa: el modelo se lee de disco en el primer uso, no al construir.
+        
+        Prioridad: versión actual del registro (checksums verificados) y, si no
+        existe, los artefactos legacy de MODELS_DIR.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+    
+    def _load(self):
         if not TENSORFLOW_AVAILABLE:
             return
         
-        if os.path.exists(self.model_path):
-            try:
-                self.model = load_model(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
-                logger.info("✅ Modelo LSTM cargado desde disco")
-            except Exception as e:
-                logger.warning(f"⚠️ Error cargando modelo: {e}")
-                self._create_model()
+        from keras.models import load_model
+        
+        manifest = get_model_registry().resolve(self.registry_name)
+        if manifest:
+            model_path, scaler_path = manifest["paths"]["model"], manifest["paths"]["scaler"]
+        elif os.path.exists(self.model_path):
+            model_path, scaler_path = self.model_path, self.scaler_path
         else:
-            self._create_model()
+            return
+        
+        started = time.perf_counter()
+        try:
+            self.model = load_model(model_path)
+            self.scaler = joblib.load(scaler_path)
+            self.version = manifest["version"] if manifest else None
+            self._trained = True
+            record_load("lstm", time.perf_counter() - started, version=self.version)
+            logger.info(f"✅ Modelo LSTM cargado desde disco (v{self.version or 'legacy'})")
+        except Exception as e:
+            logger.warning(f"⚠️ Error cargando modelo: {e}")
+            self.model = None
     
     def _create_model(self):
         """Crear arquitectura LSTM"""
         if not TENSORFLOW_AVAILABLE:
             return
         
+        from keras.models import Sequential
+        from keras.layers import LSTM, Dense, Dropout, BatchNormalization
+        from keras.optimizers import Adam
+        
+        self._loaded = True
+        self._trained = False
+        self.version = None
         self.model = Sequential([
             # Primera capa LSTM
             LSTM(128, return_sequences=True, 
@@ -118,6 +162,10 @@ class LSTMPricePredictor:
         
         logger.info("🧠 Modelo LSTM creado (nuevo)")
     
+    def artifacts(self) -> Dict[str, str]:
+        """Archivos que forman una versión en el registro de modelos."""
+        return {"model": self.model_path, "scaler": self.scaler_path}
+    
     def prepare_data(self, df: pd.DataFrame, fit_scaler: bool = False) -> Tuple[np.ndarray, np.ndarray]:
         """
         Preparar datos para entrenamiento/predicción.
@@ -128,9 +176,12 @@ class LSTMPricePredictor:
             fit_scaler: True SOLO durante training. False durante predict.
                        Esto evita data leakage al no re-entrenar el scaler.
         """
-        # Features a usar
-        feature_cols = ['close', 'high', 'low', 'volume', 'rsi', 'macd', 'atr']
-        available_cols = [c for c in feature_cols if c in df.columns]
+        data_scaled = self._scale(df, fit_scaler=fit_scaler)
+        return self.build_sequences(data_scaled)
+    
+    def _scale(self, df: pd.DataFrame, fit_scaler: bool = False) -> np.ndarray:
+        """Extraer features disponibles y normalizarlas (float32 contiguo)."""
+        available_cols = [c for c in LSTM_FEATURE_COLUMNS if c in df.columns]
         
         if len(available_cols) < 3:
             raise ValueError("Datos insuficientes. Mínimo: close, high, low")
@@ -139,17 +190,66 @@ class LSTMPricePredictor:
         
         # Normalizar — CRITICAL: fit_transform SOLO en training
         if fit_scaler:
+            from sklearn.preprocessing import StandardScaler
+            self.scaler = StandardScaler()
             data_scaled = self.scaler.fit_transform(data)
         else:
             data_scaled = self.scaler.transform(data)
         
-        # Crear secuencias
-        X, y = [], []
-        for i in range(self.sequence_length, len(data_scaled)):
-            X.append(data_scaled[i-self.sequence_length:i])
-            y.append(data_scaled[i, 0])  # Predecir close
+        return np.ascontiguousarray(data_scaled, dtype=np.float32)
+    
+    def build_sequences(self, data_scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Crear secuencias (ventana deslizante) sin copiar datos.
+        
+        Devuelve vistas con strides sobre `data_scaled`:
+        X[k] = data_scaled[k:k+sequence_length], y[k] = close en k+sequence_length.
+        Las vistas son de solo lectura; la memoria extra es O(1) en vez de
+        O(n * sequence_length * features) del bucle con copias.
+        """
+        n_rows, n_features = data_scaled.shape
+        if n_rows <= self.sequence_length:
+            return (
+                np.empty((0, self.sequence_length, n_features), dtype=data_scaled.dtype),
+                np.empty((0,), dtype=data_scaled.dtype)
+            )
+        
+        windows = sliding_window_view(
+            data_scaled, (self.sequence_length, n_features)
+        )[:, 0]
         
-        return np.array(X), np.array(y)
+        # La última ventana no tiene target (no hay vela siguiente)
+        return windows[:-1], data_scaled[self.sequence_length:, 0]
+    
+    def make_dataset(
+        self,
+        data_scaled: np.ndarray,
+        start: int,
+        stop: int,
+        batch_size: int = 32
+    ) -> "tf.data.Dataset":
+        """
+        Pipeline tf.data en streaming para históricos largos.
+        
+        Solo la serie base vive en memoria del grafo; cada batch arma sus
+        ventanas con `tf.gather` a partir de los índices de target [start, stop).
+        """
+        import tensorflow as tf
+        
+        base = tf.constant(data_scaled, dtype=tf.float32)
+        offsets = tf.range(-self.sequence_length, 0, dtype=tf.int64)
+        
+        def _gather(target_idx):
+            windows = tf.gather(base, target_idx[:, None] + offsets[None, :])
+            targets = tf.gather(base[:, 0], target_idx)
+            return windows, targets
+        
+        return (
+            tf.data.Dataset.range(start, stop)
+            .batch(batch_size)
+            .map(_gather, num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE)
+        )
     
     def train(self, df: pd.DataFrame, epochs: int = 50, batch_size: int = 32):
         """
@@ -159,12 +259,14 @@ class LSTMPricePredictor:
             logger.error("TensorFlow no disponible")
             return None
         
-        X, y = self.prepare_data(df, fit_scaler=True)  # FIT scaler solo en training
+        from keras.callbacks import EarlyStopping, ModelCheckpoint
+        from sklearn.model_selection import train_test_split
         
-        # Split train/validation
-        X_train, X_val, y_train, y_val = train_test_split(
-            X, y, test_size=0.2, shuffle=False
-        )
+        self.ensure_loaded()
+        if self.model is None:
+            self._create_model()
+        
+        data_scaled = self._scale(df, fit_scaler=True)  # FIT scaler solo en training
         
         # Callbacks
         callbacks = [
@@ -172,23 +274,122 @@ class LSTMPricePredictor:
             ModelCheckpoint(self.model_path, save_best_only=True)
         ]
         
-        # Entrenar
-        history = self.model.fit(
-            X_train, y_train,
-            validation_data=(X_val, y_val),
-            epochs=epochs,
-            batch_size=batch_size,
-            callbacks=callbacks,
-            verbose=1
-        )
+        n_sequences = len(data_scaled) - self.sequence_length
+        
+        if n_sequences >= STREAMING_MIN_SEQUENCES:
+            # Histórico largo: streaming por batches, sin materializar X
+            n_val = int(np.ceil(n_sequences * 0.2))
+            split = len(data_scaled) - n_val
+            
+            history = self.model.fit(
+                self.make_dataset(data_scaled, self.sequence_length, split, batch_size),
+                validation_data=self.make_dataset(data_scaled, split, len(data_scaled), batch_size),
+                epochs=epochs,
+                callbacks=callbacks,
+                verbose=1
+            )
+        else:
+            X, y = self.build_sequences(data_scaled)
+            
+            # Split train/validation
+            X_train, X_val, y_train, y_val = train_test_split(
+                X, y, test_size=0.2, shuffle=False
+            )
+            
+            # Entrenar
+            history = self.model.fit(
+                X_train, y_train,
+                validation_data=(X_val, y_val),
+                epochs=epochs,
+                batch_size=batch_size,
+                callbacks=callbacks,
+                verbose=1
+            )
         
         # Guardar scaler
         joblib.dump(self.scaler, self.scaler_path)
+        self._trained = True
         
         logger.info(f"✅ LSTM entrenado. Val Loss: {min(history.history['val_loss']):.6f}")
         
         return history
     
+    def is_trained(self) -> bool:
+        """True si hay modelo entrenado (o cargado de disco) y scaler ajustado."""
+        self.ensure_loaded()
+        return (
+            self._trained
+            and self.model is not None
+            and hasattr(self.scaler, "mean_")
+        )
+    
+    def fine_tune(
+        self,
+        df: pd.DataFrame,
+        epochs: int = 5,
+        batch_size: int = 32,
+        learning_rate: float = 1e-4
+    ) -> Optional[Dict]:
+        """
+        Warm-start: continuar entrenando desde el último checkpoint solo con datos nuevos.
+        
+        El scaler NO se re-ajusta (los pesos dependen de su escala). El candidato
+        solo reemplaza al modelo actual si mejora la pérdida de validación
+        (último 20% cronológico de los datos nuevos).
+        
+        Args:
+            df: Datos nuevos precedidos de `sequence_length` filas de contexto
+        """
+        if not TENSORFLOW_AVAILABLE or not self.is_trained():
+            return None
+        
+        import keras
+        from keras.callbacks import EarlyStopping
+        from keras.optimizers import Adam
+        
+        X, y = self.build_sequences(self._scale(df))
+        if len(X) < 10:
+            return {"promoted": False, "reason": "Datos nuevos insuficientes", "sequences": len(X)}
+        
+        split = len(X) - int(np.ceil(len(X) * 0.2))
+        X_train, X_val = X[:split], X[split:]
+        y_train, y_val = y[:split], y[split:]
+        
+        incumbent_loss = float(self.model.evaluate(X_val, y_val, verbose=0)[0])
+        
+        candidate = keras.models.clone_model(self.model)
+        candidate.set_weights(self.model.get_weights())
+        candidate.compile(
+            optimizer=Adam(learning_rate=learning_rate),
+            loss='mse',
+            metrics=['mae']
+        )
+        candidate.fit(
+            X_train, y_train,
+            validation_data=(X_val, y_val),
+            epochs=epochs,
+            batch_size=batch_size,
+            callbacks=[EarlyStopping(patience=2, restore_best_weights=True)],
+            verbose=0
+        )
+        candidate_loss = float(candidate.evaluate(X_val, y_val, verbose=0)[0])
+        
+        promoted = candidate_loss < incumbent_loss
+        if promoted:
+            candidate.save(self.model_path)
+            joblib.dump(self.scaler, self.scaler_path)
+            self.model = candidate
+            logger.info(f"✅ LSTM fine-tune promovido. Val Loss: {incumbent_loss:.6f} → {candidate_loss:.6f}")
+        else:
+            logger.info(f"↩️ LSTM fine-tune descartado. Val Loss: {candidate_loss:.6f} >= {incumbent_loss:.6f}")
+        
+        return {
+            "promoted": promoted,
+            "sequences": len(X),
+            "incumbent_val_loss": incumbent_loss,
+            "candidate_val_loss": candidate_loss
+        }
+    
     def predict(self, recent_data: pd.DataFrame) -> Optional[Dict]:
         """
         Predecir próximo precio.
@@ -199,25 +400,55 @@ class LSTMPricePredictor:
         Returns:
             Dict con precio predicho y dirección
         """
-        if not TENSORFLOW_AVAILABLE or self.model is None:
-            return None
+        return self.predict_batch({"_": recent_data}).get("_")
+    
+    def predict_batch(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Optional[Dict]]:
+        """
+        Predecir próximo precio para muchos símbolos en un solo forward pass.
         
-        try:
-            feature_cols = ['close', 'high', 'low', 'volume', 'rsi', 'macd', 'atr']
-            available_cols = [c for c in feature_cols if c in recent_data.columns]
-            
-            data = recent_data[available_cols].values[-self.sequence_length:]
-            data_scaled = self.scaler.transform(data)
-            
-            X = np.array([data_scaled])
-            prediction_scaled = self.model.predict(X, verbose=0)[0][0]
+        Args:
+            frames: {symbol: DataFrame con últimos `sequence_length` registros}
             
-            # Desnormalizar
-            dummy = np.zeros((1, len(available_cols)))
-            dummy[0, 0] = prediction_scaled
-            prediction = self.scaler.inverse_transform(dummy)[0, 0]
+        Returns:
+            {symbol: Dict de predicción (mismo formato que `predict`) o None}
+        """
+        results: Dict[str, Optional[Dict]] = {symbol: None for symbol in frames}
+        
+        self.ensure_loaded()
+        if not TENSORFLOW_AVAILABLE or self.model is None or self.scaler is None or not frames:
+            return results
+        
+        symbols, windows, current_prices = [], [], []
+        for symbol, recent_data in frames.items():
+            if recent_data is None or len(recent_data) < self.sequence_length:
+                continue
+            try:
+                data_scaled = self._scale(recent_data.iloc[-self.sequence_length:])
+            except Exception as e:
+                logger.error(f"Error preparando datos LSTM para {symbol}: {e}")
+                continue
+            symbols.append(symbol)
+            windows.append(data_scaled)
+            current_prices.append(float(recent_data['close'].iloc[-1]))
+        
+        if not windows:
+            return results
+        
+        try:
+            X = np.stack(windows)
+            predictions_scaled = np.asarray(self.model.predict_on_batch(X)).reshape(-1)
             
-            current_price = recent_data['close'].iloc[-1]
+            # Desnormalizar (solo la columna close)
+            prediction_prices = (
+                predictions_scaled * self.scaler.scale_[0] + self.scaler.mean_[0]
+            )
+        except Exception as e:
+            logger.error(f"Error en predicción LSTM: {e}")
+            return results
+        
+        timestamp = datetime.utcnow()
+        for symbol, prediction, current_price in zip(symbols, prediction_prices, current_prices):
+            prediction = float(prediction)
             change_percent = ((prediction - current_price) / current_price) * 100
             
             if change_percent > 1:
@@ -227,19 +458,17 @@ class LSTMPricePredictor:
             else:
                 direction = "NEUTRAL"
             
-            return {
+            results[symbol] = {
                 "predicted_price": round(prediction, 2),
                 "current_price": current_price,
                 "change_percent": round(change_percent, 2),
                 "direction": direction,
                 "confidence": min(abs(change_percent) * 10, 100),
                 "model": "LSTM",
-                "timestamp": datetime.utcnow()
+                "timestamp": timestamp
             }
-            
-        except Exception as e:
-            logger.error(f"Error en predicción LSTM: {e}")
-            return None
+        
+        return results
 
 
 # === XGBoost Signal Classifier ===
@@ -254,38 +483,69 @@ class XGBoostSignalClassifier:
     - HOLD: Mantener posición
     """
     
+    registry_name = "xgboost"
+    
     def __init__(self):
         self.model = None
-        self.scaler = StandardScaler()
-        self.label_encoder = LabelEncoder()
+        self.scaler = None
+        self.label_encoder = None
+        self.version: Optional[int] = None
         self.model_path = os.path.join(MODELS_DIR, "xgboost_classifier.json")
         self.scaler_path = os.path.join(MODELS_DIR, "xgb_scaler.pkl")
         self.encoder_path = os.path.join(MODELS_DIR, "xgb_encoder.pkl")
-        self._load_or_create_model()
+        self._loaded = False
+        self._load_lock = threading.Lock()
     
-    def _load_or_create_model(self):
-        """Cargar modelo existente o crear uno nuevo"""
+    def ensure_loaded(self):
+        """
+        Carga perezosa desde el registro de modelos (o artefactos legacy).
+        
+        Ver `LSTMPricePredictor.ensure_loaded`.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+    
+    def _load(self):
         if not XGBOOST_AVAILABLE:
             return
         
-        if os.path.exists(self.model_path):
-            try:
-                self.model = xgb.XGBClassifier()
-                self.model.load_model(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
-                self.label_encoder = joblib.load(self.encoder_path)
-                logger.info("✅ Modelo XGBoost cargado desde disco")
-            except Exception as e:
-                logger.warning(f"⚠️ Error cargando modelo: {e}")
-                self._create_model()
+        import xgboost as xgb
+        
+        manifest = get_model_registry().resolve(self.registry_name)
+        if manifest:
+            paths = manifest["paths"]
+        elif os.path.exists(self.model_path):
+            paths = {"model": self.model_path, "scaler": self.scaler_path, "encoder": self.encoder_path}
         else:
-            self._create_model()
+            return
+        
+        started = time.perf_counter()
+        try:
+            self.model = xgb.XGBClassifier()
+            self.model.load_model(paths["model"])
+            self.scaler = joblib.load(paths["scaler"])
+            self.label_encoder = joblib.load(paths["encoder"])
+            self.version = manifest["version"] if manifest else None
+            record_load("xgboost", time.perf_counter() - started, version=self.version)
+            logger.info(f"✅ Modelo XGBoost cargado desde disco (v{self.version or 'legacy'})")
+        except Exception as e:
+            logger.warning(f"⚠️ Error cargando modelo: {e}")
+            self.model = None
     
     def _create_model(self):
         """Crear modelo XGBoost con hiperparámetros optimizados"""
         if not XGBOOST_AVAILABLE:
             return
         
+        import xgboost as xgb
+        from sklearn.preprocessing import StandardScaler, LabelEncoder
+        
+        self._loaded = True
+        self.version = None
         self.model = xgb.XGBClassifier(
             n_estimators=200,
             max_depth=6,
@@ -300,19 +560,28 @@ class XGBoostSignalClassifier:
         )
         
         # Inicializar encoder con clases
+        self.scaler = StandardScaler()
+        self.label_encoder = LabelEncoder()
         self.label_encoder.fit(['HOLD', 'BUY', 'SELL'])
         
         logger.info("🌲 Modelo XGBoost creado (nuevo)")
     
+    def artifacts(self) -> Dict[str, str]:
+        """Archivos que forman una versión en el registro de modelos."""
+        return {"model": self.model_path, "scaler": self.scaler_path, "encoder": self.encoder_path}
+    
     def prepare_features(self, df: pd.DataFrame) -> np.ndarray:
         """
         Crear features para el clasificador.
         """
         features = []
         
+        # Columnas ya calculadas por el feature store (mismas definiciones)
+        precomputed = set(STORE_FEATURE_COLUMNS).issubset(df.columns)
+        
         # Precio relativo
         if 'close' in df.columns:
-            features.append(df['close'].pct_change())
+            features.append(df['close_ret'] if precomputed else df['close'].pct_change())
         
         # RSI
         if 'rsi' in df.columns:
@@ -321,7 +590,7 @@ class XGBoostSignalClassifier:
         # MACD
         if 'macd' in df.columns:
             features.append(df['macd'])
-            features.append(df['macd'].diff())
+            features.append(df['macd_diff'] if precomputed else df['macd'].diff())
         
         # Volatilidad (ATR)
         if 'atr' in df.columns:
@@ -333,10 +602,12 @@ class XGBoostSignalClassifier:
         
         # Volume change
         if 'volume' in df.columns:
-            features.append(df['volume'].pct_change())
+            features.append(df['volume_ret'] if precomputed else df['volume'].pct_change())
         
         # SMA crossover signals
-        if 'close' in df.columns:
+        if precomputed:
+            features.append(df['sma_diff'])
+        elif 'close' in df.columns:
             sma_10 = df['close'].rolling(10).mean()
             sma_50 = df['close'].rolling(50).mean()
             features.append(sma_10 - sma_50)
@@ -375,6 +646,13 @@ class XGBoostSignalClassifier:
             logger.error("XGBoost no disponible")
             return None
         
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, classification_report
+        
+        self.ensure_loaded()
+        if self.model is None:
+            self._create_model()
+        
         X = self.prepare_features(df)
         y_raw = self.create_labels(df, future_periods)
         
@@ -421,41 +699,146 @@ class XGBoostSignalClassifier:
             )
         }
     
-    def predict(self, recent_data: pd.DataFrame) -> Optional[Dict]:
+    def is_trained(self) -> bool:
+        """True si el booster ya fue entrenado (o cargado desde disco)."""
+        self.ensure_loaded()
+        if self.model is None:
+            return False
+        try:
+            self.model.get_booster()
+            return True
+        except Exception:
+            return False
+    
+    def fine_tune(self, df: pd.DataFrame, future_periods: int = 5, n_rounds: int = 50) -> Optional[Dict]:
         """
-        Predecir señal de trading.
+        Warm-start: añadir `n_rounds` árboles al booster actual usando solo datos nuevos.
+        
+        Scaler y label encoder se mantienen (los árboles existentes dependen de ellos).
+        Las últimas `future_periods` filas se descartan: su label aún no se conoce.
+        El candidato solo se promueve si mejora el accuracy de validación.
         """
-        if not XGBOOST_AVAILABLE or self.model is None:
+        if not XGBOOST_AVAILABLE or not self.is_trained():
             return None
         
+        import xgboost as xgb
+        from sklearn.metrics import accuracy_score
+        
+        X = self.prepare_features(df)
+        y_raw = self.create_labels(df, future_periods)
+        
+        min_len = min(len(X), len(y_raw))
+        labeled = min_len - future_periods
+        X = X[-min_len:][:labeled]
+        y_raw = y_raw[-min_len:][:labeled]
+        
+        if len(X) < 20:
+            return {"promoted": False, "reason": "Datos nuevos insuficientes", "rows": len(X)}
+        
+        y = self.label_encoder.transform(y_raw)
+        X_scaled = self.scaler.transform(X)
+        
+        split = len(X_scaled) - int(np.ceil(len(X_scaled) * 0.2))
+        X_train, X_val = X_scaled[:split], X_scaled[split:]
+        y_train, y_val = y[:split], y[split:]
+        
+        incumbent_acc = accuracy_score(y_val, self.model.predict(X_val))
+        
+        candidate = xgb.XGBClassifier(**self.model.get_params())
+        candidate.set_params(n_estimators=n_rounds)
         try:
-            X = self.prepare_features(recent_data)
-            if len(X) == 0:
-                return None
+            candidate.fit(
+                X_train, y_train,
+                eval_set=[(X_val, y_val)],
+                xgb_model=self.model.get_booster(),
+                verbose=False
+            )
+        except Exception as e:
+            # p.ej. una clase ausente en la ventana nueva
+            logger.warning(f"⚠️ Warm-start XGBoost no aplicable: {e}")
+            return {"promoted": False, "reason": str(e), "rows": len(X)}
+        
+        candidate_acc = accuracy_score(y_val, candidate.predict(X_val))
+        
+        promoted = candidate_acc > incumbent_acc
+        if promoted:
+            candidate.save_model(self.model_path)
+            joblib.dump(self.scaler, self.scaler_path)
+            joblib.dump(self.label_encoder, self.encoder_path)
+            self.model = candidate
+            logger.info(f"✅ XGBoost warm-start promovido. Accuracy: {incumbent_acc:.2%} → {candidate_acc:.2%}")
+        else:
+            logger.info(f"↩️ XGBoost warm-start descartado. Accuracy: {candidate_acc:.2%} <= {incumbent_acc:.2%}")
+        
+        return {
+            "promoted": promoted,
+            "rows": len(X),
+            "incumbent_accuracy": incumbent_acc,
+            "candidate_accuracy": candidate_acc
+        }
+    
+    def predict(self, recent_data: pd.DataFrame) -> Optional[Dict]:
+        """
+        Predecir señal de trading.
+        """
+        return self.predict_batch({"_": recent_data}).get("_")
+    
+    def predict_batch(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Optional[Dict]]:
+        """
+        Predecir señal para muchos símbolos con una sola llamada al booster.
+        
+        Args:
+            frames: {symbol: DataFrame con historial reciente}
             
-            X_scaled = self.scaler.transform(X[-1:])
+        Returns:
+            {symbol: Dict de predicción (mismo formato que `predict`) o None}
+        """
+        results: Dict[str, Optional[Dict]] = {symbol: None for symbol in frames}
+        
+        self.ensure_loaded()
+        if not XGBOOST_AVAILABLE or not self.is_trained() or not frames:
+            return results
+        
+        symbols, rows = [], []
+        for symbol, recent_data in frames.items():
+            try:
+                X = self.prepare_features(recent_data)
+            except Exception as e:
+                logger.error(f"Error preparando features XGBoost para {symbol}: {e}")
+                continue
+            if len(X) == 0:
+                continue
+            symbols.append(symbol)
+            rows.append(X[-1])
+        
+        if not rows:
+            return results
+        
+        try:
+            X_scaled = self.scaler.transform(np.vstack(rows))
             
             # Predicción
-            prediction = self.model.predict(X_scaled)[0]
-            probabilities = self.model.predict_proba(X_scaled)[0]
-            
-            signal = self.label_encoder.inverse_transform([prediction])[0]
-            confidence = max(probabilities) * 100
-            
-            return {
+            predictions = self.model.predict(X_scaled)
+            probabilities = self.model.predict_proba(X_scaled)
+            signals = self.label_encoder.inverse_transform(predictions)
+        except Exception as e:
+            logger.error(f"Error en predicción XGBoost: {e}")
+            return results
+        
+        timestamp = datetime.utcnow()
+        for symbol, signal, probs in zip(symbols, signals, probabilities):
+            results[symbol] = {
                 "signal": signal,
-                "confidence": round(confidence, 1),
+                "confidence": round(max(probs) * 100, 1),
                 "probabilities": {
                     cls: round(prob * 100, 1) 
-                    for cls, prob in zip(self.label_encoder.classes_, probabilities)
+                    for cls, prob in zip(self.label_encoder.classes_, probs)
                 },
                 "model": "XGBoost",
-                "timestamp": datetime.utcnow()
+                "timestamp": timestamp
             }
-            
-        except Exception as e:
-            logger.error(f"Error en predicción XGBoost: {e}")
-            return None
+        
+        return results
 
 
 # === Ensemble Model ===
@@ -469,9 +852,15 @@ class EnsemblePredictor:
     - Combinar ambos para decisión final más robusta
     """
     
-    def __init__(self):
-        self.lstm = LSTMPricePredictor()
-        self.xgb = XGBoostSignalClassifier()
+    def __init__(
+        self,
+        lstm: Optional[LSTMPricePredictor] = None,
+        xgb: Optional[XGBoostSignalClassifier] = None
+    ):
+        # Por defecto comparte los singletons: una sola carga por modelo y
+        # el ensemble ve las versiones que promueve el re-entrenamiento
+        self.lstm = lstm or get_lstm_predictor()
+        self.xgb = xgb or get_xgb_classifier()
         self.is_trained = False
     
     def train(self, df: pd.DataFrame):
@@ -499,6 +888,22 @@ class EnsemblePredictor:
         lstm_pred = self.lstm.predict(recent_data)
         xgb_pred = self.xgb.predict(recent_data)
         
+        return self._combine(lstm_pred, xgb_pred)
+    
+    def predict_batch(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict]:
+        """
+        Predicción combinada para muchos símbolos (un forward pass por modelo).
+        """
+        lstm_preds = self.lstm.predict_batch(frames)
+        xgb_preds = self.xgb.predict_batch(frames)
+        
+        return {
+            symbol: self._combine(lstm_preds.get(symbol), xgb_preds.get(symbol))
+            for symbol in frames
+        }
+    
+    def _combine(self, lstm_pred: Optional[Dict], xgb_pred: Optional[Dict]) -> Dict:
+        """Consenso entre la predicción LSTM y la clasificación XGBoost."""
         # Combinar resultados
         signals = []
         confidences = []
@@ -573,3 +978,19 @@ def get_ensemble() -> EnsemblePredictor:
     if _ensemble is None:
         _ensemble = EnsemblePredictor()
     return _ensemble
+
+
+def warm_up_models():
+    """
+    Cargar los modelos en memoria (pensado para un hilo en segundo plano).
+    
+    La API acepta requests mientras tanto; un request que llegue antes
+    simplemente espera a la carga en curso (lock por modelo).
+    """
+    started = time.perf_counter()
+    for model in (get_lstm_predictor(), get_xgb_classifier()):
+        try:
+            model.ensure_loaded()
+        except Exception as e:
+            logger.error(f"❌ Error en warm-up de {model.registry_name}: {e}")
+    logger.info(f"🔥 Warm-up de modelos ML completado en {time.perf_counter() - started:.2f}s")
@@ -22,6 +22,7 @@ import statistics
 
 from app.infrastructure.binance.p2p import BinanceP2PClient
 from app.ml.llm_connector import get_llm_manager
+from app.ml.p2p_arbitrage import SpreadHistory, solve_arbitrage
 
 
 class OpportunityType(str, Enum):
@@ -111,18 +112,21 @@ class P2PTraderStudy:
         return analysis
     
     def get_best_traders(self, offers: List[Dict], min_trust: int = 70) -> List[Dict]:
-        """Obtener los mejores traders de una lista de ofertas"""
+        """Obtener los mejores traders de una lista de ofertas normalizadas (BinanceP2PClient)"""
         traders = []
         
         for offer in offers:
-            advertiser = offer.get("advertiser", {})
-            analysis = self.analyze_trader(advertiser)
+            analysis = self.analyze_trader({
+                "advertiserNo": offer.get("advertiser", "unknown"),
+                "monthFinishRate": offer.get("completion_rate", 0) / 100,
+                "monthOrderCount": offer.get("orders_count", 0)
+            })
             
             if analysis["trust_score"] >= min_trust:
                 traders.append({
                     **analysis,
-                    "price": float(offer.get("adv", {}).get("price", 0)),
-                    "available": float(offer.get("adv", {}).get("tradableQuantity", 0))
+                    "price": offer.get("price", 0),
+                    "available": offer.get("available", 0)
                 })
         
         return sorted(traders, key=lambda x: x["trust_score"], reverse=True)
@@ -143,7 +147,7 @@ class P2POpportunityFinder:
         self.p2p_client = BinanceP2PClient()
         self.trader_study = P2PTraderStudy()
         self.llm_manager = get_llm_manager()
-        self.historical_spreads = []
+        self.historical_spreads = SpreadHistory()
 
     async def analyze_offer_context(self, best_offer: Dict, market_data: Dict, criteria: Optional[Dict] = None) -> str:
         """
@@ -182,28 +186,30 @@ class P2POpportunityFinder:
         Usa emojis. Enfócate en la seguridad, rapidez o beneficio económico de acuerdo al perfil seleccionado.
         """
         
-        response = await self.llm_manager._active_provider.analyze(prompt)
+        response = await self.llm_manager.analyze(prompt)
         return response if response else f"Oportunidad verificada por algoritmos de alta frecuencia bajo perfil {profile_desc}."
     
     async def find_opportunities(
         self,
         amount_usdt: float = 100,
-        min_score: int = 60
+        min_score: int = 60,
+        payment_methods: Optional[List[str]] = None
     ) -> List[GoldenOpportunity]:
         """
         Buscar todas las oportunidades de oro disponibles.
         """
         opportunities = []
         
-        # Obtener datos del mercado
-        buy_offers = await self.p2p_client.get_offers("BUY", "USDT", "VES", rows=20)
-        sell_offers = await self.p2p_client.get_offers("SELL", "USDT", "VES", rows=20)
+        # Obtener ambos libros completos (ordenados del mejor precio al peor)
+        books = await self.p2p_client.get_order_books("VES", "USDT", pages=3)
+        buy_offers = books["BUY"]["offers"]
+        sell_offers = books["SELL"]["offers"]
         
         if not buy_offers or not sell_offers:
             return []
         
         # 1. Buscar arbitraje
-        arb = await self._find_arbitrage(buy_offers, sell_offers, amount_usdt)
+        arb = await self._find_arbitrage(buy_offers, sell_offers, amount_usdt, payment_methods)
         if arb and arb.score >= min_score:
             opportunities.append(arb)
         
@@ -227,38 +233,24 @@ class P2POpportunityFinder:
         self,
         buy_offers: List,
         sell_offers: List,
-        amount: float
+        amount: float,
+        payment_methods: Optional[List[str]] = None
     ) -> Optional[GoldenOpportunity]:
-        """Detectar oportunidad de arbitraje"""
-        
-        if not buy_offers or not sell_offers:
-            return None
-        
-        # Mejor precio de compra (el más bajo)
-        best_buy = min(
-            [float(o.get("adv", {}).get("price", 999999)) for o in buy_offers]
-        )
+        """
+        Detectar oportunidad de arbitraje recorriendo la profundidad de ambos libros.
         
-        # Mejor precio de venta (el más alto)
-        best_sell = max(
-            [float(o.get("adv", {}).get("price", 0)) for o in sell_offers]
-        )
+        El spread es el ponderado por volumen (VWAP) para `amount` USDT, respetando
+        límites por orden y métodos de pago compatibles (ver app.ml.p2p_arbitrage).
+        """
         
-        # Calcular spread
-        spread_percent = ((best_sell - best_buy) / best_buy) * 100
+        solution = solve_arbitrage(buy_offers, sell_offers, amount, payment_methods)
+        if solution is None:
+            return None
         
-        # Guardar histórico
-        self.historical_spreads.append({
-            "timestamp": datetime.utcnow(),
-            "spread": spread_percent
-        })
+        spread_percent = solution.spread_percent
         
-        # Mantener solo últimas 24 horas
-        cutoff = datetime.utcnow() - timedelta(hours=24)
-        self.historical_spreads = [
-            s for s in self.historical_spreads 
-            if s["timestamp"] > cutoff
-        ]
+        # Guardar histórico (ring buffer de tamaño fijo)
+        self.historical_spreads.append(spread_percent)
         
         # Calcular score basado en spread
         if spread_percent < 0.5:
@@ -276,8 +268,8 @@ class P2POpportunityFinder:
         else:
             score = 50
         
-        # Calcular ganancia potencial
-        potential_profit = amount * (spread_percent / 100)
+        # Ganancia potencial sobre el volumen realmente ejecutable (en USDT)
+        potential_profit = solution.profit_fiat / solution.buy_vwap
         
         # Evaluar riesgo
         risk_factors = []
@@ -291,24 +283,36 @@ class P2POpportunityFinder:
             risk_factors.append("Monto alto - mayor exposición")
             risk_level = "MEDIUM"
         
+        if not solution.fully_fillable:
+            risk_factors.append(f"Profundidad insuficiente - solo {solution.fillable_amount:,.2f} USDT ejecutables")
+            risk_level = "MEDIUM"
+            score -= 10
+        
+        reasoning = [
+            f"🔥 Spread VWAP para {solution.fillable_amount:,.2f} USDT: {spread_percent:.2f}%",
+            f"💰 Comprar a: {solution.buy_vwap:,.2f} VES/USDT ({len(solution.buy_legs)} anuncios)",
+            f"💵 Vender a: {solution.sell_vwap:,.2f} VES/USDT ({len(solution.sell_legs)} anuncios)",
+            f"💳 Método de pago: {solution.payment_method or 'cualquiera'}",
+            f"📈 Ganancia potencial: ${potential_profit:.2f} ({spread_percent:.2f}%)",
+            f"📦 Volumen máximo rentable: {solution.max_profitable_volume:,.2f} USDT",
+        ]
+        history = self.historical_spreads.stats()
+        if history["count"] >= 30:
+            reasoning.append(f"📊 Spread 24h: media {history['mean']:.2f}% (z={history['zscore']:+.1f})")
+        reasoning.append("⚡ Ejecutar rápido antes de que cambie el spread")
+        
         return GoldenOpportunity(
             type=OpportunityType.ARBITRAGE,
             score=score,
             action="BUY_THEN_SELL",
-            current_price=best_buy,
-            target_price=best_sell,
+            current_price=solution.buy_vwap,
+            target_price=solution.sell_vwap,
             potential_profit_percent=round(spread_percent, 2),
             risk_level=risk_level,
             risk_factors=risk_factors if risk_factors else ["Operación estándar"],
             valid_until=datetime.utcnow() + timedelta(minutes=15),
             best_time=None,
-            reasoning=[
-                f"🔥 Spread actual: {spread_percent:.2f}%",
-                f"💰 Comprar a: {best_buy:,.2f} VES/USDT",
-                f"💵 Vender a: {best_sell:,.2f} VES/USDT",
-                f"📈 Ganancia potencial: ${potential_profit:.2f} ({spread_percent:.2f}%)",
-                "⚡ Ejecutar rápido antes de que cambie el spread"
-            ]
+            reasoning=reasoning
         )
     
     def _analyze_timing(self) -> Optional[GoldenOpportunity]:
@@ -395,8 +399,8 @@ class P2POpportunityFinder:
         if not buy_offers or not sell_offers:
             return {"error": "No hay datos disponibles"}
         
-        buy_prices = [float(o.get("adv", {}).get("price", 0)) for o in buy_offers]
-        sell_prices = [float(o.get("adv", {}).get("price", 0)) for o in sell_offers]
+        buy_prices = [o["price"] for o in buy_offers]
+        sell_prices = [o["price"] for o in sell_offers]
         
         best_buy = min(buy_prices)
         worst_buy = max(buy_prices)
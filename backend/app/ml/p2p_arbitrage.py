@@ -0,0 +1,245 @@
+"""
+SIC Ultra - Solver de Arbitraje P2P por Profundidad
+
+Recorre los libros completos de compra y venta (app.infrastructure.binance.p2p
+`get_order_book`) en lugar de comparar solo el mejor precio de cada lado:
+- Respeta los límites por orden de cada anuncio (min/max en fiat) y su saldo
+- Solo combina anuncios que aceptan el mismo método de pago (el fiat que
+  entra por la venta tiene que poder pagar la compra)
+- Calcula el volumen ejecutable y el spread ponderado por volumen (VWAP)
+  para un monto objetivo, y el volumen máximo con spread marginal positivo
+
+El histórico de spreads vive en un ring buffer NumPy de tamaño fijo.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+# === Histórico de spreads ===
+
+class SpreadHistory:
+    """
+    Ring buffer de (timestamp, spread %) con capacidad fija.
+
+    Por defecto guarda 24h de refrescos cada 10s.
+    """
+
+    def __init__(self, capacity: int = 8640):
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._spreads = np.zeros(capacity, dtype=np.float64)
+        self._next = 0
+        self._count = 0
+
+    def append(self, spread: float, timestamp: Optional[float] = None):
+        self._timestamps[self._next] = time.time() if timestamp is None else timestamp
+        self._spreads[self._next] = spread
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def values(self, since_seconds: Optional[float] = None, now: Optional[float] = None) -> np.ndarray:
+        """Spreads en orden cronológico (opcionalmente solo los últimos `since_seconds`)"""
+        if self._count < self.capacity:
+            timestamps, spreads = self._timestamps[:self._count], self._spreads[:self._count]
+        else:
+            order = np.r_[self._next:self.capacity, 0:self._next]
+            timestamps, spreads = self._timestamps[order], self._spreads[order]
+        if since_seconds is not None:
+            cutoff = (time.time() if now is None else now) - since_seconds
+            spreads = spreads[timestamps > cutoff]
+        return spreads
+
+    def stats(self, since_seconds: Optional[float] = 86400) -> Dict:
+        values = self.values(since_seconds)
+        if not len(values):
+            return {"count": 0}
+        std = float(values.std())
+        return {
+            "count": int(len(values)),
+            "mean": round(float(values.mean()), 4),
+            "std": round(std, 4),
+            "p90": round(float(np.percentile(values, 90)), 4),
+            "zscore": round(float((values[-1] - values.mean()) / std), 2) if std > 0 else 0.0,
+        }
+
+
+# === Solver ===
+
+@dataclass
+class ArbitrageSolution:
+    """Mejor ejecución buy → sell para un método de pago"""
+    payment_method: Optional[str]
+    target_amount: float
+    fillable_amount: float
+    buy_vwap: float
+    sell_vwap: float
+    spread_percent: float
+    profit_fiat: float
+    max_profitable_volume: float
+    buy_legs: List[Dict] = field(default_factory=list)
+    sell_legs: List[Dict] = field(default_factory=list)
+
+    @property
+    def fully_fillable(self) -> bool:
+        return self.fillable_amount >= self.target_amount * (1 - 1e-9)
+
+
+class _SideArrays:
+    """Columnas NumPy de un lado del libro (ya ordenado del mejor precio al peor)"""
+
+    def __init__(self, offers: List[Dict]):
+        self.offers = offers
+        self.price = np.array([o["price"] for o in offers], dtype=np.float64)
+        available = np.array([o["available"] for o in offers], dtype=np.float64)
+        max_fiat = np.array([o.get("max_amount") or np.inf for o in offers], dtype=np.float64)
+        min_fiat = np.array([o.get("min_amount") or 0.0 for o in offers], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Límites por orden en unidades del asset
+            self.cap = np.where(self.price > 0, np.minimum(available, max_fiat / self.price), 0.0)
+            self.min_qty = np.where(self.price > 0, min_fiat / self.price, np.inf)
+        self.usable = (self.cap > 0) & (self.cap >= self.min_qty)
+
+    def subset(self, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        index = np.flatnonzero(mask & self.usable)
+        return index, self.price[index], self.cap[index], self.min_qty[index]
+
+
+def _fill(price: np.ndarray, cap: np.ndarray, min_qty: np.ndarray, target: float) -> np.ndarray:
+    """
+    Cantidades por anuncio para llenar `target` del mejor precio al peor.
+
+    Todos los anuncios previos al cruce se toman completos (cumsum). El anuncio
+    donde se cruza el objetivo recibe el resto si supera su ticket mínimo; si no,
+    el resto se busca en los siguientes.
+    """
+    fills = np.zeros_like(cap)
+    if target <= 0 or not len(cap):
+        return fills
+    cumulative = np.cumsum(cap)
+    k = int(np.searchsorted(cumulative, target))
+    if k >= len(cap):
+        return cap.copy()  # Libro insuficiente: todo lo disponible
+
+    fills[:k] = cap[:k]
+    remaining = target - (cumulative[k - 1] if k else 0.0)
+    for j in range(k, len(cap)):
+        if remaining <= 1e-12:
+            break
+        if remaining >= min_qty[j]:
+            take = min(remaining, cap[j])
+            fills[j] = take
+            remaining -= take
+    return fills
+
+
+def _vwap(price: np.ndarray, fills: np.ndarray) -> float:
+    total = fills.sum()
+    return float((price * fills).sum() / total) if total > 0 else 0.0
+
+
+def max_profitable_volume(buy_price: np.ndarray, buy_cap: np.ndarray,
+                          sell_price: np.ndarray, sell_cap: np.ndarray) -> float:
+    """Volumen donde el precio marginal de venta sigue por encima del de compra"""
+    if not len(buy_cap) or not len(sell_cap):
+        return 0.0
+    buy_cum, sell_cum = np.cumsum(buy_cap), np.cumsum(sell_cap)
+    breakpoints = np.union1d(buy_cum, sell_cum)
+    breakpoints = breakpoints[breakpoints <= min(buy_cum[-1], sell_cum[-1])]
+    starts = np.r_[0.0, breakpoints[:-1]]
+    # Precio marginal de cada tramo [start, end): el anuncio que lo cubre en cada lado
+    marginal_buy = buy_price[np.searchsorted(buy_cum, starts, side="right")]
+    marginal_sell = sell_price[np.searchsorted(sell_cum, starts, side="right")]
+    losing = np.flatnonzero(marginal_sell <= marginal_buy)
+    return float(starts[losing[0]] if len(losing) else breakpoints[-1])
+
+
+def _legs(offers: List[Dict], index: np.ndarray, fills: np.ndarray) -> List[Dict]:
+    return [
+        {"advertiser": offers[i]["advertiser"], "price": offers[i]["price"], "amount": round(float(qty), 6)}
+        for i, qty in zip(index, fills) if qty > 0
+    ]
+
+
+def _method_mask(offers: List[Dict], method: Optional[str]) -> np.ndarray:
+    if method is None:
+        return np.ones(len(offers), dtype=bool)
+    method = method.lower()
+    return np.array([method in (m.lower() for m in o.get("payment_methods", [])) for o in offers], dtype=bool)
+
+
+def solve_arbitrage(
+    buy_offers: List[Dict],
+    sell_offers: List[Dict],
+    target_amount: float,
+    payment_methods: Optional[Iterable[str]] = None
+) -> Optional[ArbitrageSolution]:
+    """
+    Mejor arbitraje comprar (buy_offers) → vender (sell_offers) para `target_amount` del asset.
+
+    Args:
+        buy_offers: Ofertas donde compras el asset, del precio más bajo al más alto
+        sell_offers: Ofertas donde vendes el asset, del precio más alto al más bajo
+        target_amount: Cantidad del asset a rotar (p.ej. USDT)
+        payment_methods: Métodos de pago del usuario (None = todos los presentes en ambos libros)
+
+    Returns:
+        La solución con mayor ganancia entre los métodos de pago compatibles
+        (None si ningún método aparece en ambos lados).
+    """
+    if not buy_offers or not sell_offers:
+        return None
+
+    buy, sell = _SideArrays(buy_offers), _SideArrays(sell_offers)
+    methods: Set[str] = (
+        {m for o in buy_offers for m in o.get("payment_methods", [])}
+        & {m for o in sell_offers for m in o.get("payment_methods", [])}
+    )
+    if payment_methods is not None:
+        wanted = {m.lower() for m in payment_methods}
+        methods = {m for m in methods if m.lower() in wanted}
+    candidates: List[Optional[str]] = sorted(methods) if methods else []
+    if not candidates and payment_methods is None and not any(o.get("payment_methods") for o in buy_offers + sell_offers):
+        candidates = [None]  # Libros sin métodos de pago informados
+
+    best: Optional[ArbitrageSolution] = None
+    for method in candidates:
+        b_index, b_price, b_cap, b_min = buy.subset(_method_mask(buy_offers, method))
+        s_index, s_price, s_cap, s_min = sell.subset(_method_mask(sell_offers, method))
+        if not len(b_index) or not len(s_index):
+            continue
+
+        b_fills = _fill(b_price, b_cap, b_min, target_amount)
+        s_fills = _fill(s_price, s_cap, s_min, target_amount)
+        volume = min(b_fills.sum(), s_fills.sum())
+        if volume <= 0:
+            continue
+        if volume < target_amount:
+            # Un lado se queda corto: ambos se rehacen para el volumen común
+            b_fills = _fill(b_price, b_cap, b_min, volume)
+            s_fills = _fill(s_price, s_cap, s_min, volume)
+            volume = min(b_fills.sum(), s_fills.sum())
+
+        buy_vwap, sell_vwap = _vwap(b_price, b_fills), _vwap(s_price, s_fills)
+        solution = ArbitrageSolution(
+            payment_method=method,
+            target_amount=target_amount,
+            fillable_amount=round(float(volume), 6),
+            buy_vwap=round(buy_vwap, 6),
+            sell_vwap=round(sell_vwap, 6),
+            spread_percent=round((sell_vwap - buy_vwap) / buy_vwap * 100, 4) if buy_vwap else 0.0,
+            profit_fiat=round(float(volume) * (sell_vwap - buy_vwap), 2),
+            max_profitable_volume=round(max_profitable_volume(b_price, b_cap, s_price, s_cap), 6),
+            buy_legs=_legs(buy_offers, b_index, b_fills),
+            sell_legs=_legs(sell_offers, s_index, s_fills),
+        )
+        if best is None or solution.profit_fiat > best.profit_fiat:
+            best = solution
+
+    return best
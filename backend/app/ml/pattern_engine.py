@@ -0,0 +1,163 @@
+"""
+SIC Ultra - Motor Vectorizado de Patrones de Velas
+
+Evalúa todos los patrones de 1, 2 y 3 velas como máscaras booleanas NumPy
+sobre la serie completa, en una sola pasada:
+- Cuerpo, sombras, rango y sus ratios se calculan una vez como arrays
+- Cada patrón es una expresión sobre esos arrays (desplazados 1-2 velas
+  para los patrones multi-vela); la máscara en `i` indica que el patrón
+  termina en la vela `i`
+
+Dos conjuntos de reglas, idénticos a los detectores escalares existentes:
+- "classic": app.ml.candle_patterns (is_hammer, is_morning_star, ...)
+- "analyzer": CandlestickAnalyzer._is_* (app.ml.candlestick_analyzer)
+"""
+
+from typing import Callable, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+
+CandleInput = Union[List[Dict], pd.DataFrame]
+
+
+def candle_arrays(candles: CandleInput) -> Dict[str, np.ndarray]:
+    """
+    Arrays base de la serie: OHLC, cuerpo, sombras, rango y ratios.
+
+    Los ratios valen 0 en velas sin rango (como analyze_candle).
+    """
+    if isinstance(candles, pd.DataFrame):
+        o, h, l, c = (candles[col].to_numpy(dtype=np.float64) for col in ("open", "high", "low", "close"))
+    else:
+        o = np.fromiter((x["open"] for x in candles), dtype=np.float64, count=len(candles))
+        h = np.fromiter((x["high"] for x in candles), dtype=np.float64, count=len(candles))
+        l = np.fromiter((x["low"] for x in candles), dtype=np.float64, count=len(candles))
+        c = np.fromiter((x["close"] for x in candles), dtype=np.float64, count=len(candles))
+
+    body = np.abs(c - o)
+    upper = h - np.maximum(c, o)
+    lower = np.minimum(c, o) - l
+    total_range = h - l
+    has_range = total_range > 0
+
+    def ratio(x: np.ndarray) -> np.ndarray:
+        return np.divide(x, total_range, out=np.zeros_like(x), where=has_range)
+
+    return {
+        "open": o, "high": h, "low": l, "close": c,
+        "body": body, "upper": upper, "lower": lower, "range": total_range,
+        "body_ratio": ratio(body), "upper_ratio": ratio(upper), "lower_ratio": ratio(lower),
+        "bullish": c > o, "bearish": c < o,
+    }
+
+
+def _prev(x: np.ndarray, k: int = 1) -> np.ndarray:
+    """x desplazado k velas hacia atrás (las primeras k posiciones quedan en False / NaN)"""
+    out = np.empty_like(x)
+    out[:k] = False if x.dtype == bool else np.nan
+    out[k:] = x[:-k] if k else x
+    return out
+
+
+def _valid_from(mask: np.ndarray, start: int) -> np.ndarray:
+    mask[:start] = False
+    return mask
+
+
+# === Reglas "classic" (app.ml.candle_patterns) ===
+
+def _classic_rules(a: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    br, ur, lr = a["body_ratio"], a["upper_ratio"], a["lower_ratio"]
+    o, c, body = a["open"], a["close"], a["body"]
+    bull = a["bullish"]
+    bear = ~bull  # "not is_bullish": incluye velas planas
+
+    hammer_shape = (br < 0.35) & (lr > 0.55) & (ur < 0.15)
+    inverted_shape = (br < 0.35) & (ur > 0.55) & (lr < 0.15)
+    marubozu = (ur < 0.05) & (lr < 0.05) & (br > 0.9)
+
+    o1, c1, body1, bull1, bear1 = _prev(o), _prev(c), _prev(body), _prev(bull), _prev(bear)
+    o2, c2 = _prev(o, 2), _prev(c, 2)
+    br1, br2 = _prev(br), _prev(br, 2)
+    bull2, bear2 = _prev(bull, 2), _prev(bear, 2)
+    ur1, ur2, lr1, lr2 = _prev(ur), _prev(ur, 2), _prev(lr), _prev(lr, 2)
+
+    with np.errstate(invalid="ignore"):
+        return {
+            "Doji": br < 0.1,
+            "Hammer": hammer_shape,
+            "Inverted Hammer": inverted_shape,
+            "Shooting Star": inverted_shape & bear,
+            "Hanging Man": hammer_shape & bear,
+            "BULLISH Marubozu": marubozu & bull,
+            "BEARISH Marubozu": marubozu & bear,
+            "Bullish Engulfing": _valid_from(bear1 & bull & (o <= c1) & (c >= o1) & (body > body1 * 1.2), 1),
+            "Bearish Engulfing": _valid_from(bull1 & bear & (o >= c1) & (c <= o1) & (body > body1 * 1.2), 1),
+            "Morning Star": _valid_from(
+                bear2 & (br2 > 0.5) & (br1 < 0.3) & bull & (br > 0.5) & (c > (o2 + c2) / 2), 2),
+            "Evening Star": _valid_from(
+                bull2 & (br2 > 0.5) & (br1 < 0.3) & bear & (br > 0.5) & (c < (o2 + c2) / 2), 2),
+            "Three White Soldiers": _valid_from(
+                bull2 & bull1 & bull & (br2 > 0.5) & (br1 > 0.5) & (br > 0.5)
+                & (c2 < c1) & (c1 < c) & (ur2 < 0.2) & (ur1 < 0.2) & (ur < 0.2), 2),
+            "Three Black Crows": _valid_from(
+                bear2 & bear1 & bear & (br2 > 0.5) & (br1 > 0.5) & (br > 0.5)
+                & (c2 > c1) & (c1 > c) & (lr2 < 0.2) & (lr1 < 0.2) & (lr < 0.2), 2),
+        }
+
+
+# === Reglas "analyzer" (CandlestickAnalyzer) ===
+
+def _analyzer_rules(a: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    o, c, body, upper, lower = a["open"], a["close"], a["body"], a["upper"], a["lower"]
+    bull, bear = a["bullish"], a["bearish"]
+
+    o1, c1, body1, bull1, bear1 = _prev(o), _prev(c), _prev(body), _prev(bull), _prev(bear)
+    o2, c2, body2, bull2, bear2 = _prev(o, 2), _prev(c, 2), _prev(body, 2), _prev(bull, 2), _prev(bear, 2)
+
+    with np.errstate(invalid="ignore"):
+        return {
+            "Doji": (a["range"] > 0) & (a["body_ratio"] < 0.05),
+            "Hammer": _valid_from((lower >= 2 * body) & (upper < body * 0.3) & bull, 1),
+            "Shooting Star": _valid_from((upper >= 2 * body) & (lower < body * 0.3) & bear, 1),
+            "Bullish Engulfing": _valid_from(bear1 & bull & (o < c1) & (c > o1), 1),
+            "Bearish Engulfing": _valid_from(bull1 & bear & (o > c1) & (c < o1), 1),
+            "Morning Star": _valid_from(bear2 & (body1 < body2 * 0.3) & bull & (c > (o2 + c2) / 2), 2),
+            "Evening Star": _valid_from(bull2 & (body1 < body2 * 0.3) & bear & (c < (o2 + c2) / 2), 2),
+            "Three White Soldiers": _valid_from(bull2 & bull1 & bull & (c1 > c2) & (c > c1), 2),
+            "Three Black Crows": _valid_from(bear2 & bear1 & bear & (c1 < c2) & (c < c1), 2),
+        }
+
+
+RULE_SETS: Dict[str, Callable[[Dict[str, np.ndarray]], Dict[str, np.ndarray]]] = {
+    "classic": _classic_rules,
+    "analyzer": _analyzer_rules,
+}
+
+PATTERN_DIRECTIONS = {
+    "Doji": "NEUTRAL",
+    "Hammer": "BULLISH",
+    "Inverted Hammer": "BULLISH",
+    "Shooting Star": "BEARISH",
+    "Hanging Man": "BEARISH",
+    "BULLISH Marubozu": "BULLISH",
+    "BEARISH Marubozu": "BEARISH",
+    "Bullish Engulfing": "BULLISH",
+    "Bearish Engulfing": "BEARISH",
+    "Morning Star": "BULLISH",
+    "Evening Star": "BEARISH",
+    "Three White Soldiers": "BULLISH",
+    "Three Black Crows": "BEARISH",
+}
+
+
+def pattern_masks(candles: CandleInput, rules: str = "classic") -> Dict[str, np.ndarray]:
+    """Máscara booleana por patrón sobre toda la serie"""
+    return RULE_SETS[rules](candle_arrays(candles))
+
+
+def pattern_hits(candles: CandleInput, rules: str = "classic") -> Dict[str, np.ndarray]:
+    """Índices (vela final) de cada patrón detectado en la serie"""
+    return {name: np.flatnonzero(mask) for name, mask in pattern_masks(candles, rules).items()}
@@ -0,0 +1,332 @@
+"""
+SIC Ultra - Tabla de Resultados Históricos de Patrones
+
+Job offline que mide la precisión REAL de cada patrón:
+- Recorre el histórico del feature store de cada (symbol, interval)
+- Detecta patrones de velas (app.ml.pattern_engine) y de indicadores
+  (los mismos que PatternRecognizer: RSI extremo, cruces MACD, squeeze)
+  como máscaras vectorizadas sobre toda la serie
+- Etiqueta cada vela con su régimen (RegimeDetector.detect_history)
+- Mide el retorno a varios horizontes y si fue a favor de la dirección esperada
+
+El resultado es una tabla compacta (arrays [patrón, temporalidad, régimen, horizonte])
+persistida en .npz; las consultas del agente son un lookup O(1).
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.ml.feature_store import INTERVAL_SECONDS, FeatureStore, get_feature_store
+from app.ml.pattern_engine import PATTERN_DIRECTIONS, pattern_masks
+from app.ml.regime_detector import REGIME_ORDER, get_regime_detector
+
+
+TABLE_PATH = os.path.join(os.path.dirname(__file__), "models", "pattern_outcomes.npz")
+
+# Horizontes de medición (en velas)
+HORIZONS = (1, 4, 12)
+DEFAULT_HORIZON = 4
+
+REGIMES = tuple(regime.value for regime in REGIME_ORDER)
+ALL_REGIMES = "ALL"
+
+# Peso máximo (en trades equivalentes) del histórico frente a los resultados en vivo
+MAX_PRIOR_WEIGHT = 50
+
+
+# === Etiquetado ===
+
+def regime_labels(df: pd.DataFrame) -> np.ndarray:
+    """
+    Régimen por vela (índices de REGIMES) con RegimeDetector.detect_history.
+
+    Solo usa velas anteriores o iguales a cada fila.
+    """
+    return get_regime_detector().detect_history(df)["regime"]
+
+
+def indicator_masks(df: pd.DataFrame) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Patrones de PatternRecognizer como máscaras sobre la serie.
+
+    Returns:
+        {nombre: (máscara, dirección)} con dirección +1/-1 por vela
+    """
+    n = len(df)
+    close = df["close"].to_numpy(dtype=np.float64)
+    rsi = df["rsi"].to_numpy(dtype=np.float64)
+    hist = df["macd"].to_numpy(dtype=np.float64)
+    h1 = np.concatenate([[np.nan], hist[:-1]])
+    h2 = np.concatenate([[np.nan, np.nan], hist[:-2]])[:n]
+
+    middle = df["close"].rolling(20).mean().to_numpy()
+    std = df["close"].rolling(20).std(ddof=0).to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        band_width = 4 * std / middle
+        squeeze = band_width < 0.04
+        golden = (hist > 0) & (h1 <= 0) & (h2 < 0)
+        death = (hist < 0) & (h1 >= 0) & (h2 > 0)
+        oversold = rsi < 25
+        overbought = rsi > 75
+
+    up, down = np.ones(n, dtype=np.int8), -np.ones(n, dtype=np.int8)
+    return {
+        "rsi_extreme_oversold": (oversold, up),
+        "rsi_extreme_overbought": (overbought, down),
+        "macd_golden_cross": (golden, up),
+        "macd_death_cross": (death, down),
+        "bollinger_squeeze": (squeeze, np.where(close > middle, 1, -1).astype(np.int8)),
+    }
+
+
+def candle_pattern_masks(df: pd.DataFrame) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Patrones de velas direccionales (reglas de CandlestickAnalyzer)"""
+    n = len(df)
+    out = {}
+    for name, mask in pattern_masks(df, rules="analyzer").items():
+        direction = PATTERN_DIRECTIONS[name]
+        if direction == "NEUTRAL":
+            continue
+        sign = 1 if direction == "BULLISH" else -1
+        out[name] = (mask, np.full(n, sign, dtype=np.int8))
+    return out
+
+
+# === Tabla ===
+
+class PatternOutcomeTable:
+    """
+    Conteos por [patrón, temporalidad, régimen, horizonte]:
+    - counts: ocurrencias con horizonte completo
+    - wins: retorno a favor de la dirección esperada
+    - ret_sum: suma de retornos direccionales (%)
+
+    El régimen "ALL" (último índice) agrega todos los regímenes.
+    """
+
+    def __init__(
+        self,
+        patterns: List[str],
+        timeframes: List[str],
+        horizons: Tuple[int, ...] = HORIZONS,
+        counts: Optional[np.ndarray] = None,
+        wins: Optional[np.ndarray] = None,
+        ret_sum: Optional[np.ndarray] = None,
+        built_at: Optional[str] = None
+    ):
+        self.patterns = list(patterns)
+        self.timeframes = list(timeframes)
+        self.regimes = list(REGIMES) + [ALL_REGIMES]
+        self.horizons = tuple(int(h) for h in horizons)
+        shape = (len(self.patterns), len(self.timeframes), len(self.regimes), len(self.horizons))
+        self.counts = counts if counts is not None else np.zeros(shape, dtype=np.int64)
+        self.wins = wins if wins is not None else np.zeros(shape, dtype=np.int64)
+        self.ret_sum = ret_sum if ret_sum is not None else np.zeros(shape, dtype=np.float64)
+        self.built_at = built_at
+        self._p = {name: i for i, name in enumerate(self.patterns)}
+        self._t = {name: i for i, name in enumerate(self.timeframes)}
+        self._r = {name: i for i, name in enumerate(self.regimes)}
+        self._h = {h: i for i, h in enumerate(self.horizons)}
+
+    def _index(self, pattern: str, timeframe: str, regime: str, horizon: int) -> Optional[Tuple[int, int, int, int]]:
+        p, t, h = self._p.get(pattern), self._t.get(timeframe), self._h.get(horizon)
+        if p is None or t is None or h is None:
+            return None
+        # Regímenes que el histórico no etiqueta (p.ej. "NORMAL") usan el agregado
+        return p, t, self._r.get(regime, self._r[ALL_REGIMES]), h
+
+    def add_series(self, df: pd.DataFrame, timeframe: str) -> int:
+        """Acumular los resultados de una serie del feature store. Devuelve ocurrencias medidas."""
+        if len(df) < max(self.horizons) + 3:
+            return 0
+        t = self._t[timeframe]
+        close = df["close"].to_numpy(dtype=np.float64)
+        regimes = regime_labels(df)
+        all_r = self._r[ALL_REGIMES]
+
+        detected = {**indicator_masks(df), **candle_pattern_masks(df)}
+        measured = 0
+        for name, (mask, direction) in detected.items():
+            p = self._p.get(name)
+            if p is None:
+                continue
+            for h_idx, h in enumerate(self.horizons):
+                idx = np.flatnonzero(mask[:len(close) - h])
+                if len(idx) == 0:
+                    continue
+                signed = (close[idx + h] / close[idx] - 1) * 100 * direction[idx]
+                win = signed > 0
+                r = regimes[idx]
+                self.counts[p, t, :len(REGIMES), h_idx] += np.bincount(r, minlength=len(REGIMES))
+                self.wins[p, t, :len(REGIMES), h_idx] += np.bincount(r, weights=win, minlength=len(REGIMES)).astype(np.int64)
+                self.ret_sum[p, t, :len(REGIMES), h_idx] += np.bincount(r, weights=signed, minlength=len(REGIMES))
+                self.counts[p, t, all_r, h_idx] += len(idx)
+                self.wins[p, t, all_r, h_idx] += int(win.sum())
+                self.ret_sum[p, t, all_r, h_idx] += float(signed.sum())
+                if h_idx == 0:
+                    measured += len(idx)
+        return measured
+
+    # === Consultas (O(1)) ===
+
+    def lookup(
+        self,
+        pattern: str,
+        timeframe: str = "1h",
+        regime: str = ALL_REGIMES,
+        horizon: int = DEFAULT_HORIZON
+    ) -> Optional[Dict]:
+        """Estadística de una celda (None si el patrón/temporalidad no se midió)"""
+        key = self._index(pattern, timeframe, regime, horizon)
+        if key is None:
+            return None
+        n = int(self.counts[key])
+        if n == 0 and key[2] != self._r[ALL_REGIMES]:
+            # Régimen sin ocurrencias medidas: usar el agregado
+            key = (key[0], key[1], self._r[ALL_REGIMES], key[3])
+            n = int(self.counts[key])
+        if n == 0:
+            return None
+        return {
+            "samples": n,
+            "wins": int(self.wins[key]),
+            "accuracy": float(self.wins[key] / n),
+            "avg_return_pct": float(self.ret_sum[key] / n),
+        }
+
+    def accuracy(
+        self,
+        pattern: str,
+        timeframe: str = "1h",
+        regime: str = ALL_REGIMES,
+        horizon: int = DEFAULT_HORIZON,
+        default: float = 0.5
+    ) -> float:
+        stats = self.lookup(pattern, timeframe, regime, horizon)
+        return stats["accuracy"] if stats else default
+
+    def summary(self, timeframe: str = "1h", horizon: int = DEFAULT_HORIZON) -> Dict[str, Dict]:
+        """Precisión por patrón y régimen para una temporalidad"""
+        return {
+            pattern: {
+                regime: stats
+                for regime in self.regimes
+                if (stats := self.lookup(pattern, timeframe, regime, horizon))
+            }
+            for pattern in self.patterns
+        }
+
+    # === Persistencia ===
+
+    def save(self, path: str = TABLE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp,
+            patterns=np.array(self.patterns),
+            timeframes=np.array(self.timeframes),
+            horizons=np.array(self.horizons),
+            counts=self.counts,
+            wins=self.wins,
+            ret_sum=self.ret_sum,
+            built_at=np.array(self.built_at or ""),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = TABLE_PATH) -> Optional["PatternOutcomeTable"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return cls(
+                    patterns=data["patterns"].tolist(),
+                    timeframes=data["timeframes"].tolist(),
+                    horizons=tuple(data["horizons"].tolist()),
+                    counts=data["counts"],
+                    wins=data["wins"],
+                    ret_sum=data["ret_sum"],
+                    built_at=str(data["built_at"]) or None,
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Tabla de patrones ilegible: {e}")
+            return None
+
+
+def known_patterns() -> List[str]:
+    names = ["rsi_extreme_oversold", "rsi_extreme_overbought", "macd_golden_cross",
+             "macd_death_cross", "bollinger_squeeze"]
+    return names + [name for name, direction in PATTERN_DIRECTIONS.items() if direction != "NEUTRAL"]
+
+
+def stored_series(store: FeatureStore) -> List[Tuple[str, str]]:
+    """(symbol, interval) con datos en el feature store"""
+    if not os.path.isdir(store.root):
+        return []
+    series = []
+    for key in sorted(os.listdir(store.root)):
+        symbol, _, interval = key.rpartition("_")
+        if symbol and interval in INTERVAL_SECONDS and store.info(symbol, interval):
+            series.append((symbol, interval))
+    return series
+
+
+def build_pattern_outcomes(
+    store: Optional[FeatureStore] = None,
+    series: Optional[List[Tuple[str, str]]] = None,
+    horizons: Tuple[int, ...] = HORIZONS
+) -> PatternOutcomeTable:
+    """
+    Job offline: medir todos los patrones sobre el histórico del feature store.
+
+    Args:
+        series: (symbol, interval) a procesar; por defecto todo lo almacenado
+    """
+    store = store or get_feature_store()
+    series = series if series is not None else stored_series(store)
+    timeframes = sorted({interval for _, interval in series}, key=INTERVAL_SECONDS.get)
+    table = PatternOutcomeTable(known_patterns(), timeframes, horizons)
+
+    for symbol, interval in series:
+        df = store.read(symbol, interval)
+        measured = table.add_series(df, interval)
+        logger.debug(f"📐 Patrones {symbol} {interval}: {len(df)} velas, {measured} ocurrencias")
+
+    table.built_at = datetime.utcnow().isoformat()
+    logger.info(f"📐 Tabla de patrones construida: {len(series)} series, {int(table.counts[..., -1, 0].sum())} ocurrencias")
+    return table
+
+
+# === Singleton ===
+
+_table: Optional[PatternOutcomeTable] = None
+_table_loaded = False
+_table_lock = threading.Lock()
+
+
+def get_pattern_outcomes() -> Optional[PatternOutcomeTable]:
+    """Tabla persistida (None si el job aún no se ejecutó)"""
+    global _table, _table_loaded
+    if not _table_loaded:
+        with _table_lock:
+            if not _table_loaded:
+                _table = PatternOutcomeTable.load()
+                _table_loaded = True
+    return _table
+
+
+def rebuild_pattern_outcomes(path: str = TABLE_PATH, **kwargs) -> PatternOutcomeTable:
+    """Reconstruir, persistir y publicar la tabla para el agente"""
+    global _table, _table_loaded
+    table = build_pattern_outcomes(**kwargs)
+    table.save(path)
+    with _table_lock:
+        _table = table
+        _table_loaded = True
+    return table
@@ -84,11 +84,12 @@ class PostTradeAnalyzer:
         fill_price: float,
         exit_price: float,
         pnl: float,
-        price_history_during_trade: List[float],
+        price_history_during_trade: Optional[List[float]],
         signals_used: List[str],
         patterns_detected: List[str],
         entry_time: Optional[datetime] = None,
-        exit_time: Optional[datetime] = None
+        exit_time: Optional[datetime] = None,
+        excursion=None
     ) -> DeviationReport:
         """
         Analizar un trade completado y generar reporte de desviación.
@@ -99,16 +100,22 @@ class PostTradeAnalyzer:
             exit_price: Precio de cierre
             pnl: Profit/Loss en USD
             price_history_during_trade: Lista de precios durante la vida del trade
+                (ignorada si se pasa `excursion`)
             signals_used: Indicadores usados en la señal
             patterns_detected: Patrones que se detectaron
+            excursion: ExcursionSummary precalculado por el tracker en vivo
+                (app.services.excursion_tracker), con precisión de tick
         """
         # === 1. Slippage ===
         slippage_pct = abs(fill_price - signal_price) / signal_price if signal_price > 0 else 0
         
         # === 2. MAE / MFE ===
-        mae_pct, mfe_pct = self._calculate_excursions(
-            fill_price, price_history_during_trade, direction
-        )
+        if excursion is not None:
+            mae_pct, mfe_pct = excursion.mae_pct, excursion.mfe_pct
+        else:
+            mae_pct, mfe_pct = self._calculate_excursions(
+                fill_price, price_history_during_trade, direction
+            )
         
         # === 3. Efficiency Ratio ===
         actual_pnl_pct = abs(pnl / fill_price) if fill_price > 0 else 0
@@ -120,6 +127,8 @@ class PostTradeAnalyzer:
         hold_duration = 0.0
         if entry_time and exit_time:
             hold_duration = (exit_time - entry_time).total_seconds() / 60
+        elif excursion is not None:
+            hold_duration = excursion.duration_minutes
         
         # === 5. Calidad de Entry ===
         entry_quality = self._rate_quality(slippage_pct, self.SLIPPAGE_THRESHOLDS)
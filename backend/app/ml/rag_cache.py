@@ -0,0 +1,153 @@
+"""
+SIC Ultra - Cache de Recuperación RAG
+
+Cache LRU + TTL en memoria para `KnowledgeBase.search`:
+- Embeddings de queries (evita re-codificar con SentenceTransformer)
+- Resultados top-k por (query, n_results, categoría, modo de búsqueda)
+
+Las claves usan el texto normalizado (minúsculas, espacios colapsados).
+Al añadir documentos se invalidan los resultados; los embeddings siguen
+siendo válidos porque solo dependen del modelo.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Texto canónico de una query: minúsculas y espacios colapsados."""
+    return _WHITESPACE.sub(" ", query).strip().lower()
+
+
+class _LRUTTL:
+    """OrderedDict con expiración por entrada y desalojo LRU."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RetrievalCache:
+    """Cache de embeddings y resultados de búsqueda con métricas de acierto."""
+
+    def __init__(self, max_size: int = 512, ttl_seconds: float = 900):
+        self._embeddings = _LRUTTL(max_size, ttl_seconds)
+        self._results = _LRUTTL(max_size, ttl_seconds)
+        self._lock = threading.Lock()
+        self.stats = {
+            "embedding_hits": 0,
+            "embedding_misses": 0,
+            "result_hits": 0,
+            "result_misses": 0,
+            "encode_seconds": 0.0,
+            "encode_seconds_saved": 0.0,
+            "invalidations": 0,
+        }
+
+    # === Embeddings ===
+
+    def get_embedding(self, query: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._embeddings.get(normalize_query(query))
+            if entry is None:
+                self.stats["embedding_misses"] += 1
+                return None
+            embedding, encode_seconds = entry
+            self.stats["embedding_hits"] += 1
+            self.stats["encode_seconds_saved"] += encode_seconds
+            return embedding
+
+    def put_embedding(self, query: str, embedding: List[float], encode_seconds: float):
+        with self._lock:
+            self._embeddings.put(normalize_query(query), (embedding, encode_seconds))
+            self.stats["encode_seconds"] += encode_seconds
+
+    # === Resultados ===
+
+    def get_results(self, query: str, n_results: int, category: Optional[str],
+                    mode: str = "hybrid") -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._results.get((normalize_query(query), n_results, category, mode))
+            if entry is None:
+                self.stats["result_misses"] += 1
+                return None
+            results, encode_seconds = entry
+            self.stats["result_hits"] += 1
+            self.stats["encode_seconds_saved"] += encode_seconds
+            # Copias: los llamadores pueden modificar los dicts devueltos
+            return [dict(r) for r in results]
+
+    def put_results(self, query: str, n_results: int, category: Optional[str],
+                    results: List[Dict], encode_seconds: float = 0.0, mode: str = "hybrid"):
+        with self._lock:
+            self._results.put(
+                (normalize_query(query), n_results, category, mode),
+                ([dict(r) for r in results], encode_seconds)
+            )
+
+    def invalidate_results(self):
+        """Descartar resultados cacheados (la colección cambió)."""
+        with self._lock:
+            self._results.clear()
+            self.stats["invalidations"] += 1
+
+    # === Métricas ===
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            embedding_lookups = stats["embedding_hits"] + stats["embedding_misses"]
+            result_lookups = stats["result_hits"] + stats["result_misses"]
+            stats["embedding_hit_rate"] = round(stats["embedding_hits"] / embedding_lookups, 3) if embedding_lookups else None
+            stats["result_hit_rate"] = round(stats["result_hits"] / result_lookups, 3) if result_lookups else None
+            stats["encode_seconds"] = round(stats["encode_seconds"], 4)
+            stats["encode_seconds_saved"] = round(stats["encode_seconds_saved"], 4)
+            stats["cached_embeddings"] = len(self._embeddings)
+            stats["cached_results"] = len(self._results)
+            return stats
+
+
+# === Singleton ===
+
+_retrieval_cache: Optional[RetrievalCache] = None
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    global _retrieval_cache
+    if _retrieval_cache is None:
+        from app.config import settings
+        _retrieval_cache = RetrievalCache(
+            max_size=settings.rag_cache_size,
+            ttl_seconds=settings.rag_cache_ttl_seconds
+        )
+    return _retrieval_cache
@@ -9,7 +9,10 @@ Sensor de Cambio de Régimen que identifica si el mercado está en:
 Este módulo ajusta dinámicamente los parámetros de señal del agente IA.
 """
 
+import threading
+from collections import OrderedDict
 import numpy as np
+import pandas as pd
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 from enum import Enum
@@ -24,6 +27,65 @@ class MarketRegime(str, Enum):
     TRANSITIONING = "TRANSITIONING"
 
 
+# Índices usados por detect_history (arrays de régimen por vela)
+REGIME_ORDER = (MarketRegime.TRENDING, MarketRegime.MEAN_REVERTING, MarketRegime.TRANSITIONING)
+
+# Reportes cacheados por (symbol, interval, última vela)
+CACHE_SIZE = 512
+
+# Ventanas de Hurst procesadas por bloque en detect_history (acota la memoria)
+HURST_BATCH_ROWS = 4096
+
+
+def hurst_exponents(windows: np.ndarray, max_lag: int = 20) -> np.ndarray:
+    """
+    Hurst R/S de cada fila de `windows` (shape [n_series, longitud]).
+    
+    Por cada lag, todas las sub-series de todas las filas se procesan a la vez
+    con un reshape [n_series, n_subseries, lag]; después una regresión log-log
+    vectorizada por fila. Mismo resultado que el recorrido sub-serie a sub-serie.
+    """
+    windows = np.atleast_2d(np.asarray(windows, dtype=np.float64))
+    rows, length = windows.shape
+    lags = np.arange(2, max_lag + 1)
+    if length < max_lag * 2:
+        return np.full(rows, 0.5)
+    
+    log_rs = np.empty((rows, len(lags)))
+    for j, lag in enumerate(lags):
+        n_sub = length // lag
+        sub = windows[:, :n_sub * lag].reshape(rows, n_sub, lag)
+        cumulative = np.cumsum(sub - sub.mean(axis=2, keepdims=True), axis=2)
+        r = cumulative.max(axis=2) - cumulative.min(axis=2)
+        s = sub.std(axis=2, ddof=1)
+        s = np.where(s > 0, s, 1e-10)
+        with np.errstate(divide="ignore"):
+            log_rs[:, j] = np.log((r / s).mean(axis=1))
+    
+    x = np.log(lags)
+    n = len(x)
+    with np.errstate(invalid="ignore"):
+        hurst = (n * (log_rs @ x) - x.sum() * log_rs.sum(axis=1)) / (n * (x ** 2).sum() - x.sum() ** 2)
+    # Series planas (R/S = 0) → random walk
+    return np.clip(np.nan_to_num(hurst, nan=0.5), 0.0, 1.0)
+
+
+def _adx_series(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> np.ndarray:
+    """ADX de cada vela (suavizado EMA, causal) para detect_history"""
+    prev_close = close.shift(1)
+    up = high.diff()
+    down = -low.diff()
+    plus_dm = up.where((up > down) & (up > 0), 0.0)
+    minus_dm = down.where((down > up) & (down > 0), 0.0)
+    tr = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    
+    atr = tr.ewm(span=period, adjust=False).mean().replace(0, np.nan)
+    plus_di = 100 * plus_dm.ewm(span=period, adjust=False).mean() / atr
+    minus_di = 100 * minus_dm.ewm(span=period, adjust=False).mean() / atr
+    dx = 100 * (plus_di - minus_di).abs() / (plus_di + minus_di).replace(0, np.nan)
+    return dx.fillna(0).ewm(span=period, adjust=False).mean().to_numpy()
+
+
 @dataclass
 class RegimeReport:
     """Reporte de régimen de mercado actual."""
@@ -74,19 +136,25 @@ class RegimeDetector:
     def __init__(self):
         self._previous_regime: Optional[MarketRegime] = None
         self._regime_history: List[Dict] = []
+        self._cache: "OrderedDict[tuple, RegimeReport]" = OrderedDict()
+        self._cache_lock = threading.Lock()
         logger.info("📊 Regime Detector inicializado")
     
     def detect(
         self,
         candles: List[Dict],
-        indicators: Optional[Dict] = None
+        indicators: Optional[Dict] = None,
+        symbol: Optional[str] = None,
+        interval: str = "1h"
     ) -> RegimeReport:
         """
         Detectar el régimen de mercado actual.
         
         Args:
             candles: Lista de velas OHLCV
-            indicators: Indicadores pre-calculados (opcional)
+            indicators: Indicadores pre-calculados (opcional). Se reutilizan
+                "adx" (salida de calculate_adx) y "bollinger" si vienen.
+            symbol: Habilita la caché por (symbol, interval, última vela)
         
         Returns:
             RegimeReport con régimen detectado y parámetros ajustados
@@ -94,6 +162,122 @@ class RegimeDetector:
         if len(candles) < 50:
             return self._default_report("Datos insuficientes (< 50 velas)")
         
+        key = self._cache_key(candles, symbol, interval)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        report = self._detect(candles, indicators or {})
+        self._cache_put(key, report)
+        return report
+    
+    def detect_many(
+        self,
+        series: Dict[str, List[Dict]],
+        interval: str = "1h",
+        indicators: Optional[Dict[str, Dict]] = None
+    ) -> Dict[str, RegimeReport]:
+        """
+        Régimen de muchos símbolos en una llamada.
+        
+        El Hurst de todas las series con la misma longitud se calcula
+        en un único bloque vectorizado.
+        """
+        indicators = indicators or {}
+        reports: Dict[str, RegimeReport] = {}
+        pending: Dict[int, List[str]] = {}
+        
+        for symbol, candles in series.items():
+            if len(candles) < 50:
+                reports[symbol] = self._default_report("Datos insuficientes (< 50 velas)")
+                continue
+            cached = self._cache_get(self._cache_key(candles, symbol, interval))
+            if cached is not None:
+                reports[symbol] = cached
+            else:
+                pending.setdefault(len(candles), []).append(symbol)
+        
+        for length, symbols in pending.items():
+            closes = np.array([[c["close"] for c in series[s]] for s in symbols], dtype=np.float64)
+            hursts = hurst_exponents(closes)
+            for symbol, hurst in zip(symbols, hursts):
+                report = self._detect(series[symbol], indicators.get(symbol, {}), hurst=float(hurst))
+                self._cache_put(self._cache_key(series[symbol], symbol, interval), report)
+                reports[symbol] = report
+        
+        return reports
+    
+    def detect_history(self, candles, window: int = 100) -> Dict[str, np.ndarray]:
+        """
+        Régimen de cada vela de un histórico completo (batch, sin bucles por vela).
+        
+        ADX y Bollinger se calculan una vez sobre toda la serie (EMAs causales);
+        el Hurst usa las últimas `window` velas de cada posición. Las primeras
+        `window - 1` velas quedan en TRANSITIONING con hurst = 0.5.
+        
+        Args:
+            candles: Lista de velas OHLCV o DataFrame con high/low/close
+        
+        Returns:
+            {"regime": índices en REGIME_ORDER, "adx", "hurst", "compression"}
+        """
+        frame = candles if isinstance(candles, pd.DataFrame) else pd.DataFrame(candles)
+        high, low, close = (frame[col].astype(np.float64) for col in ("high", "low", "close"))
+        n = len(frame)
+        
+        adx = _adx_series(high, low, close)
+        
+        middle = close.rolling(20).mean()
+        width = (4 * close.rolling(20).std(ddof=0) / middle).to_numpy()
+        avg_width = pd.Series(width).rolling(20).mean().to_numpy()
+        with np.errstate(invalid="ignore"):
+            compression = width < avg_width * 0.6
+        
+        hurst = np.full(n, 0.5)
+        if n >= window:
+            windows = np.lib.stride_tricks.sliding_window_view(close.to_numpy(), window)
+            for start in range(0, len(windows), HURST_BATCH_ROWS):
+                block = windows[start:start + HURST_BATCH_ROWS]
+                hurst[window - 1 + start:window - 1 + start + len(block)] = hurst_exponents(block)
+        
+        adx_signal = np.where(adx > 25, 0, np.where(adx < 20, 1, 2))
+        hurst_signal = np.where(hurst > 0.55, 0, np.where(hurst < 0.45, 1, 2))
+        regime = self._resolve_regime_array(adx_signal, hurst_signal, compression)
+        regime[:window - 1] = REGIME_ORDER.index(MarketRegime.TRANSITIONING)
+        
+        return {"regime": regime, "adx": adx, "hurst": hurst, "compression": compression}
+    
+    # === Caché por (symbol, interval, última vela) ===
+    
+    @staticmethod
+    def _cache_key(candles: List[Dict], symbol: Optional[str], interval: str) -> Optional[tuple]:
+        if not symbol:
+            return None
+        last = candles[-1]
+        ts = last.get("timestamp", last.get("open_time"))
+        if ts is None:
+            return None
+        # El close entra en la clave: una vela en formación se re-evalúa al cambiar
+        return (symbol.upper(), interval, str(ts), last["close"], len(candles))
+    
+    def _cache_get(self, key: Optional[tuple]) -> Optional[RegimeReport]:
+        if key is None:
+            return None
+        with self._cache_lock:
+            report = self._cache.get(key)
+            if report is not None:
+                self._cache.move_to_end(key)
+            return report
+    
+    def _cache_put(self, key: Optional[tuple], report: RegimeReport):
+        if key is None:
+            return
+        with self._cache_lock:
+            self._cache[key] = report
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+    
+    def _detect(self, candles: List[Dict], indicators: Dict, hurst: Optional[float] = None) -> RegimeReport:
         closes = [c["close"] for c in candles]
         highs = [c["high"] for c in candles]
         lows = [c["low"] for c in candles]
@@ -101,7 +285,9 @@ class RegimeDetector:
         reasoning = []
         
         # === 1. ADX Analysis ===
-        adx_data = calculate_adx(highs, lows, closes, period=14)
+        adx_data = indicators.get("adx")
+        if not isinstance(adx_data, dict) or not adx_data.get("adx"):
+            adx_data = calculate_adx(highs, lows, closes, period=14)
         adx_value = adx_data["adx"][-1] if adx_data["adx"] else 20.0
         plus_di = adx_data["plus_di"][-1] if adx_data["plus_di"] else 0
         minus_di = adx_data["minus_di"][-1] if adx_data["minus_di"] else 0
@@ -118,7 +304,8 @@ class RegimeDetector:
             reasoning.append(f"ADX={adx_value:.1f} (20-25) → Zona de transición")
         
         # === 2. Hurst Exponent (simplified R/S method) ===
-        hurst = self._calculate_hurst(closes)
+        if hurst is None:
+            hurst = self._calculate_hurst(closes)
         
         if hurst > 0.55:
             hurst_signal = MarketRegime.TRENDING
@@ -131,7 +318,9 @@ class RegimeDetector:
             reasoning.append(f"Hurst={hurst:.3f} (0.45-0.55) → Random walk / indeciso")
         
         # === 3. Volatility Compression (Bollinger Squeeze) ===
-        bb = calculate_bollinger_bands(closes, 20, 2.0)
+        bb = indicators.get("bollinger")
+        if not isinstance(bb, dict) or not bb.get("upper"):
+            bb = calculate_bollinger_bands(closes, 20, 2.0)
         volatility_compression = False
         
         if bb["upper"] and bb["lower"] and bb["middle"]:
@@ -217,44 +406,7 @@ class RegimeDetector:
             return 0.5  # Fallback: random walk
         
         try:
-            ts = np.array(prices)
-            lags = range(2, max_lag + 1)
-            rs_values = []
-            
-            for lag in lags:
-                # Dividir serie en sub-series
-                n_subseries = len(ts) // lag
-                rs_list = []
-                
-                for i in range(n_subseries):
-                    subseries = ts[i * lag:(i + 1) * lag]
-                    mean_val = np.mean(subseries)
-                    deviations = subseries - mean_val
-                    cumulative = np.cumsum(deviations)
-                    
-                    r = np.max(cumulative) - np.min(cumulative)
-                    s = np.std(subseries, ddof=1) if np.std(subseries, ddof=1) > 0 else 1e-10
-                    
-                    rs_list.append(r / s)
-                
-                rs_values.append(np.mean(rs_list))
-            
-            # Regresión log-log para obtener H
-            log_lags = np.log(list(lags))
-            log_rs = np.log(rs_values)
-            
-            # Regresión lineal simple
-            n = len(log_lags)
-            sum_x = np.sum(log_lags)
-            sum_y = np.sum(log_rs)
-            sum_xy = np.sum(log_lags * log_rs)
-            sum_x2 = np.sum(log_lags ** 2)
-            
-            hurst = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x ** 2)
-            
-            # Clamp entre 0 y 1
-            return max(0.0, min(1.0, hurst))
-            
+            return float(hurst_exponents(np.asarray(prices, dtype=np.float64)[None, :], max_lag)[0])
         except Exception as e:
             logger.error(f"Error calculando Hurst Exponent: {e}")
             return 0.5
@@ -283,6 +435,22 @@ class RegimeDetector:
         # Conflicto real (uno trending, otro mean-reverting) → transitioning
         return MarketRegime.TRANSITIONING
     
+    @staticmethod
+    def _resolve_regime_array(
+        adx_signal: np.ndarray,
+        hurst_signal: np.ndarray,
+        compression: np.ndarray
+    ) -> np.ndarray:
+        """_resolve_regime sobre arrays de índices de REGIME_ORDER"""
+        transitioning = REGIME_ORDER.index(MarketRegime.TRANSITIONING)
+        regime = np.where(
+            adx_signal == hurst_signal, adx_signal,
+            np.where(adx_signal == transitioning, hurst_signal,
+                     np.where(hurst_signal == transitioning, adx_signal, transitioning))
+        ).astype(np.int8)
+        regime[compression] = transitioning
+        return regime
+    
     def _default_report(self, reason: str) -> RegimeReport:
         """Reporte por defecto cuando no hay datos suficientes."""
         return RegimeReport(
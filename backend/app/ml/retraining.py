@@ -0,0 +1,315 @@
+"""
+SIC Ultra - Scheduler de Re-entrenamiento Incremental
+
+Mantiene los modelos ML frescos sin re-entrenar desde cero:
+- XGBoost: continúa el boosting desde el booster anterior (warm-start)
+- LSTM: fine-tuning desde el último checkpoint
+- Solo usa velas nuevas desde el último entrenamiento (vía feature store)
+- Promueve el candidato únicamente si mejora en validación
+- Registra cada ejecución: duración, rango de datos y métricas
+- Cada modelo promovido se publica como nueva versión en el registro de modelos
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+from loguru import logger
+
+from app.ml.feature_store import get_feature_store
+from app.ml.model_registry import ModelRegistry, get_model_registry
+
+
+RUNS_PATH = os.path.join(os.path.dirname(__file__), "models", "training_runs.json")
+
+# Filas usadas en el primer entrenamiento (modelo sin artefactos previos)
+COLD_START_ROWS = 500
+
+MAX_RUNS_KEPT = 500
+
+# Warm-starts rechazados seguidos tras los que se re-entrena desde cero
+MAX_REJECTED_WARM_STARTS = 3
+
+
+class RetrainingScheduler:
+    """
+    Re-entrenamiento programado por (symbol, interval).
+
+    Estado persistido en RUNS_PATH:
+    - models[model][SYMBOL_interval]: trained_until (epoch), trained_at (ISO);
+      tras un warm-start rechazado también attempted_at (ISO) y rejected (seguidos)
+    - runs: historial de ejecuciones (más recientes al final)
+    """
+
+    def __init__(
+        self,
+        symbols: Optional[List[str]] = None,
+        interval: str = "1h",
+        max_model_age_hours: float = 24,
+        min_new_rows: int = 24,
+        check_interval: int = 3600,
+        runs_path: str = RUNS_PATH,
+        registry: Optional[ModelRegistry] = None
+    ):
+        self.symbols = symbols or ["BTCUSDT"]
+        self.interval = interval
+        self.max_model_age_hours = max_model_age_hours
+        self.min_new_rows = min_new_rows
+        self.check_interval = check_interval
+        self.runs_path = runs_path
+        self.registry = registry or get_model_registry()
+        self.running = False
+        self._task = None
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    # === Persistencia ===
+
+    def _load(self) -> Dict:
+        if os.path.exists(self.runs_path):
+            try:
+                with open(self.runs_path) as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ Historial de entrenamiento ilegible: {e}")
+        return {"models": {}, "runs": []}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.runs_path), exist_ok=True)
+        tmp = self.runs_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._state, f, indent=2, default=str)
+        os.replace(tmp, self.runs_path)
+
+    def _record(self, run: Dict):
+        with self._lock:
+            self._state["runs"].append(run)
+            self._state["runs"] = self._state["runs"][-MAX_RUNS_KEPT:]
+            if run["mode"] == "full" or run.get("promoted"):
+                self._state["models"].setdefault(run["model"], {})[run["key"]] = {
+                    "trained_until": run["trained_until"],
+                    "trained_at": run["finished_at"],
+                }
+            elif run.get("trained_until") is not None:
+                # Datos consumidos aunque no se promueva: no repetir la misma ventana,
+                # y esperar otro periodo antes de reintentar
+                entry = self._state["models"].setdefault(run["model"], {}).setdefault(run["key"], {})
+                entry["trained_until"] = run["trained_until"]
+                entry["attempted_at"] = run["finished_at"]
+                entry["rejected"] = entry.get("rejected", 0) + 1
+            self._save()
+
+    # === Consultas ===
+
+    def _hours_since(self, model: str, symbol: str, interval: str, field: str) -> Optional[float]:
+        entry = self._state["models"].get(model, {}).get(f"{symbol}_{interval}")
+        if not entry or not entry.get(field):
+            return None
+        return (datetime.utcnow() - datetime.fromisoformat(entry[field])).total_seconds() / 3600
+
+    def model_age_hours(self, model: str, symbol: str, interval: str) -> Optional[float]:
+        """Horas desde la última promoción (None si nunca se entrenó)."""
+        return self._hours_since(model, symbol, interval, "trained_at")
+
+    def get_runs(self, limit: int = 50) -> List[Dict]:
+        return self._state["runs"][-limit:][::-1]
+
+    def get_status(self) -> Dict:
+        status = {}
+        for model, entries in self._state["models"].items():
+            status[model] = {
+                key: {
+                    **entry,
+                    "age_hours": self.model_age_hours(model, *key.rsplit("_", 1))
+                }
+                for key, entry in entries.items()
+            }
+        return {
+            "running": self.running,
+            "symbols": self.symbols,
+            "interval": self.interval,
+            "max_model_age_hours": self.max_model_age_hours,
+            "models": status,
+        }
+
+    # === Entrenamiento ===
+
+    def retrain(
+        self,
+        symbol: str,
+        interval: str,
+        full: bool = False,
+        limit: int = COLD_START_ROWS,
+        epochs: int = 50
+    ) -> Dict:
+        """
+        Re-entrenar ambos modelos para (symbol, interval).
+
+        Args:
+            full: Forzar entrenamiento desde cero con las últimas `limit` filas
+        """
+        from app.ml.models import get_lstm_predictor, get_xgb_classifier
+
+        store = get_feature_store()
+        store.refresh(symbol, interval)
+        df = store.read(symbol, interval)
+        if df.empty:
+            raise ValueError(f"Sin datos en el feature store para {symbol} {interval}")
+
+        results = {}
+        for name, model in (("xgboost", get_xgb_classifier()), ("lstm", get_lstm_predictor())):
+            try:
+                results[name] = self._retrain_model(name, model, symbol, interval, df, full, limit, epochs)
+            except Exception as e:
+                logger.error(f"❌ Error re-entrenando {name} {symbol}: {e}")
+                results[name] = {"error": str(e)}
+        return results
+
+    def _retrain_model(
+        self, name: str, model, symbol: str, interval: str,
+        df: pd.DataFrame, full: bool, limit: int, epochs: int
+    ) -> Dict:
+        key = f"{symbol}_{interval}"
+        entry = self._state["models"].get(name, {}).get(key, {})
+        trained_until = entry.get("trained_until")
+
+        if full or not model.is_trained() or entry.get("rejected", 0) >= MAX_REJECTED_WARM_STARTS:
+            mode = "full"
+            data = df.iloc[-limit:]
+        else:
+            mode = "warm_start"
+            if trained_until is None:
+                data = df.iloc[-limit:]
+            else:
+                new_mask = df["timestamp"] > pd.to_datetime(trained_until, unit="s")
+                first_new = int(new_mask.values.argmax()) if new_mask.any() else len(df)
+                # El LSTM necesita `sequence_length` filas de contexto antes del primer target
+                context = getattr(model, "sequence_length", 0)
+                data = df.iloc[max(0, first_new - context):]
+                if len(df) - first_new < self.min_new_rows:
+                    return {"skipped": True, "reason": "Sin suficientes velas nuevas",
+                            "new_rows": len(df) - first_new}
+
+        started = time.perf_counter()
+        started_at = datetime.utcnow()
+
+        if mode == "full":
+            if name == "lstm":
+                history = model.train(data, epochs=epochs)
+                metrics = {"val_loss": min(history.history["val_loss"])} if history else {}
+            else:
+                result = model.train(data) or {}
+                metrics = {"accuracy": result.get("accuracy")}
+            promoted = True
+        else:
+            metrics = model.fine_tune(data) or {}
+            promoted = bool(metrics.pop("promoted", False))
+
+        # XGBoost no conoce el label de las últimas 5 velas: quedan para la próxima vez
+        labeled_end = data["timestamp"].iloc[-6] if name == "xgboost" and len(data) > 5 else data["timestamp"].iloc[-1]
+
+        run = {
+            "run_id": uuid.uuid4().hex[:12],
+            "model": name,
+            "key": key,
+            "symbol": symbol,
+            "interval": interval,
+            "mode": mode,
+            "promoted": promoted,
+            "started_at": started_at.isoformat(),
+            "finished_at": datetime.utcnow().isoformat(),
+            "duration_s": round(time.perf_counter() - started, 3),
+            "data_start": str(data["timestamp"].iloc[0]),
+            "data_end": str(data["timestamp"].iloc[-1]),
+            "rows": len(data),
+            "trained_until": pd.Timestamp(labeled_end).timestamp(),
+            "metrics": metrics,
+        }
+        if promoted and hasattr(model, "artifacts"):
+            manifest = self.registry.register(name, model.artifacts(), metadata={
+                "run_id": run["run_id"],
+                "symbol": symbol,
+                "interval": interval,
+                "mode": mode,
+                "data_start": run["data_start"],
+                "data_end": run["data_end"],
+                "metrics": metrics,
+            })
+            model.version = manifest["version"]
+            run["version"] = manifest["version"]
+        self._record(run)
+        logger.info(
+            f"🎓 {name} {key} [{mode}] en {run['duration_s']}s "
+            f"({run['rows']} filas) promovido={promoted}"
+        )
+        return run
+
+    def due(self, symbol: str, interval: str) -> bool:
+        """
+        True si algún modelo nunca se entrenó o superó la edad máxima y no hubo
+        un intento rechazado en el último periodo.
+        """
+        for name in ("xgboost", "lstm"):
+            age = self.model_age_hours(name, symbol, interval)
+            if age is None:
+                return True
+            if age >= self.max_model_age_hours:
+                attempted = self._hours_since(name, symbol, interval, "attempted_at")
+                if attempted is None or attempted >= self.max_model_age_hours:
+                    return True
+        return False
+
+    # === Bucle programado ===
+
+    async def start(self):
+        """Iniciar el scheduler en segundo plano"""
+        if self.running:
+            return
+        self.running = True
+        logger.info("🎓 Iniciando scheduler de re-entrenamiento ML...")
+        self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        """Detener el scheduler"""
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        logger.info("🛑 Scheduler de re-entrenamiento detenido.")
+
+    async def _run_loop(self):
+        while self.running:
+            for symbol in self.symbols:
+                if not self.due(symbol, self.interval):
+                    continue
+                try:
+                    await asyncio.to_thread(self.retrain, symbol, self.interval)
+                except Exception as e:
+                    logger.error(f"❌ Error en re-entrenamiento programado de {symbol}: {e}")
+            await asyncio.sleep(self.check_interval)
+
+
+# === Singleton ===
+
+_scheduler: Optional[RetrainingScheduler] = None
+
+
+def get_retraining_scheduler() -> RetrainingScheduler:
+    global _scheduler
+    if _scheduler is None:
+        from app.config import settings
+        _scheduler = RetrainingScheduler(
+            symbols=[s.strip().upper() for s in settings.ml_retrain_symbols.split(",") if s.strip()],
+            interval=settings.ml_retrain_interval,
+            max_model_age_hours=settings.ml_retrain_max_age_hours
+        )
+    return _scheduler
@@ -6,13 +6,19 @@ Motor de gestión de riesgo dinámico que incluye:
 - Anti-Martingale Guard contra rachas de pérdidas
 - Fee Calculator para ajustar targets por comisiones
 - Sharpe Ratio y Z-Score para evaluación de performance
+- Monte Carlo (bootstrap de PnLs): riesgo de ruina, drawdowns, VaR/CVaR
+  y Kelly ajustado por incertidumbre
 
 REGLA DE ORO: Nunca aumentar riesgo para compensar pérdidas.
 """
 
 import math
+import threading
+import time
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+import numpy as np
 from loguru import logger
 
 
@@ -40,6 +46,155 @@ class FeeAdjustedTargets:
     reasoning: str
 
 
+@dataclass
+class MonteCarloReport:
+    """Distribución de resultados simulada a partir del historial de trades."""
+    strategy: str
+    trades: int                 # PnLs históricos usados en el bootstrap
+    paths: int
+    horizon: int                # Trades por trayectoria
+    capital: float
+    risk_of_ruin: float         # P(equity <= capital * (1 - ruin_drawdown)) en el horizonte
+    drawdown_p50: float         # Máximo drawdown por trayectoria (fracción del pico)
+    drawdown_p95: float
+    expected_pnl: float         # PnL medio al final del horizonte (USD)
+    var_95: float               # Pérdida al final del horizonte no superada el 95% de las veces (USD)
+    cvar_95: float              # Pérdida media en el 5% peor (USD)
+    kelly_point: float          # Kelly de la muestra (fracción arriesgada en 1R de pérdida)
+    kelly_fraction: float       # Percentil conservador del Kelly entre remuestreos
+    elapsed_ms: float
+    computed_at: str
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class MonteCarloRiskEngine:
+    """
+    Motor Monte Carlo vectorizado sobre PnLs históricos.
+    
+    - Trayectorias: bootstrap de `paths` × `horizon` PnLs en un único array
+      NumPy; equity, picos y drawdowns con cumsum / maximum.accumulate
+    - Kelly: los PnLs se expresan en múltiplos de la pérdida media (R) y se
+      maximiza E[log(1 + f·R)] por Newton en todos los remuestreos a la vez;
+      el Kelly reportado es un percentil bajo (incertidumbre de la muestra)
+    
+    Los reportes se cachean por estrategia y se recalculan solo cuando cambia
+    el historial (nuevo trade registrado).
+    """
+    
+    MIN_TRADES = 20
+    MAX_TRADES = 500           # Solo los trades más recientes entran en el bootstrap
+    KELLY_RESAMPLES = 500
+    NEWTON_STEPS = 8
+    
+    def __init__(
+        self,
+        paths: int = 10_000,
+        horizon: int = 100,
+        ruin_drawdown: float = 0.5,
+        kelly_percentile: float = 20.0,
+        seed: Optional[int] = None
+    ):
+        self.paths = paths
+        self.horizon = horizon
+        self.ruin_drawdown = ruin_drawdown
+        self.kelly_percentile = kelly_percentile
+        self.seed = seed
+        self._cache: Dict[str, Tuple[tuple, MonteCarloReport]] = {}
+        self._lock = threading.Lock()
+    
+    def evaluate(self, strategy: str, pnls: List[float], capital: float) -> Optional[MonteCarloReport]:
+        """
+        Reporte Monte Carlo de una estrategia (cacheado mientras el historial no cambie).
+        
+        Returns:
+            None si hay menos de MIN_TRADES o no hay ganadores y perdedores
+        """
+        sample = np.asarray(pnls, dtype=np.float64)[-self.MAX_TRADES:]
+        sample = sample[np.isfinite(sample)]
+        if len(sample) < self.MIN_TRADES or capital <= 0 or not (sample > 0).any() or not (sample < 0).any():
+            return None
+        
+        fingerprint = (len(pnls), float(sample.sum()), float(sample[-1]), float(capital))
+        with self._lock:
+            cached = self._cache.get(strategy)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+        
+        report = self._simulate(strategy, sample, capital)
+        with self._lock:
+            self._cache[strategy] = (fingerprint, report)
+        return report
+    
+    def invalidate(self, strategy: Optional[str] = None):
+        with self._lock:
+            if strategy is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(strategy, None)
+    
+    def _simulate(self, strategy: str, pnls: np.ndarray, capital: float) -> MonteCarloReport:
+        start = time.perf_counter()
+        rng = np.random.default_rng(self.seed)
+        n = len(pnls)
+        
+        # === Trayectorias de equity ===
+        equity = capital + np.cumsum(pnls[rng.integers(0, n, size=(self.paths, self.horizon))], axis=1)
+        peaks = np.maximum(np.maximum.accumulate(equity, axis=1), capital)
+        max_drawdown = np.minimum((1 - equity / peaks).max(axis=1), 1.0)
+        ruined = equity.min(axis=1) <= capital * (1 - self.ruin_drawdown)
+        
+        final = equity[:, -1] - capital
+        var_95 = -float(np.percentile(final, 5))
+        tail = final[final <= -var_95]
+        cvar_95 = -float(tail.mean()) if len(tail) else var_95
+        
+        # === Kelly con incertidumbre ===
+        r_multiples = pnls / -pnls[pnls < 0].mean()
+        kelly_point = float(self._kelly(r_multiples[None, :])[0])
+        resampled = r_multiples[rng.integers(0, n, size=(self.KELLY_RESAMPLES, n))]
+        kelly_fraction = float(np.percentile(self._kelly(resampled), self.kelly_percentile))
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.debug(f"🎲 Monte Carlo [{strategy}]: {self.paths} trayectorias en {elapsed_ms:.1f} ms")
+        
+        return MonteCarloReport(
+            strategy=strategy,
+            trades=n,
+            paths=self.paths,
+            horizon=self.horizon,
+            capital=capital,
+            risk_of_ruin=round(float(ruined.mean()), 4),
+            drawdown_p50=round(float(np.percentile(max_drawdown, 50)), 4),
+            drawdown_p95=round(float(np.percentile(max_drawdown, 95)), 4),
+            expected_pnl=round(float(final.mean()), 2),
+            var_95=round(var_95, 2),
+            cvar_95=round(cvar_95, 2),
+            kelly_point=round(kelly_point, 4),
+            kelly_fraction=round(max(kelly_fraction, 0.0), 4),
+            elapsed_ms=round(elapsed_ms, 2),
+            computed_at=datetime.utcnow().isoformat()
+        )
+    
+    @classmethod
+    def _kelly(cls, r: np.ndarray) -> np.ndarray:
+        """
+        argmax_f E[log(1 + f·R)] por fila de `r` (shape [muestras, trades]).
+        
+        Newton desde la aproximación f ≈ E[R] / E[R²], acotado a 1 + f·R > 0.
+        """
+        worst = -r.min(axis=1)
+        cap = np.where(worst > 0, 0.999 / np.where(worst > 0, worst, 1.0), 1.0)
+        f = np.clip(r.mean(axis=1) / (r ** 2).mean(axis=1), 0.0, cap)
+        for _ in range(cls.NEWTON_STEPS):
+            x = r / (1 + f[:, None] * r)
+            gradient = x.mean(axis=1)
+            curvature = (x ** 2).mean(axis=1)
+            f = np.clip(f + gradient / curvature, 0.0, cap)
+        return f
+
+
 class DynamicKellyEngine:
     """
     Position sizing dinámico basado en Kelly Criterion.
@@ -48,6 +203,9 @@ class DynamicKellyEngine:
     ajustado por la confianza de la señal del agente.
     """
     
+    # Riesgo de ruina a partir del cual se recorta la posición a la mitad
+    MAX_RISK_OF_RUIN = 0.05
+    
     def calculate_position_size(
         self,
         capital: float,
@@ -56,7 +214,8 @@ class DynamicKellyEngine:
         avg_loss: float,           # PnL promedio de perdedores (USD, valor positivo)
         signal_confidence: float,  # 0-100 del agente
         max_risk_pct: float = 0.02,  # 2% max por trade
-        consecutive_losses: int = 0
+        consecutive_losses: int = 0,
+        monte_carlo: Optional[MonteCarloReport] = None
     ) -> PositionSizeResult:
         """
         Calcula el tamaño óptimo de posición.
@@ -65,6 +224,8 @@ class DynamicKellyEngine:
         donde b = avg_win/avg_loss, p = win_rate, q = 1-p
         
         Aplicamos Half-Kelly y ajustamos por confianza de señal.
+        Con un reporte Monte Carlo, el Kelly puntual se limita al percentil
+        conservador del bootstrap y un riesgo de ruina alto recorta la posición.
         """
         # Protección: si no hay datos suficientes, ir ultra-conservador
         if avg_loss <= 0 or avg_win <= 0 or capital <= 0:
@@ -96,13 +257,25 @@ class DynamicKellyEngine:
                 reasoning=f"Kelly NEGATIVO ({kelly_raw:.4f}) → Estrategia no rentable, NO OPERAR"
             )
         
+        reasoning_parts = [f"Kelly raw={kelly_raw:.4f}"]
+        kelly = kelly_raw
+        
+        # Monte Carlo: Kelly robusto a la incertidumbre de la muestra
+        if monte_carlo is not None:
+            kelly = min(kelly, monte_carlo.kelly_fraction)
+            reasoning_parts.append(f"Kelly MC conservador={monte_carlo.kelly_fraction:.4f}")
+        
         # Half-Kelly para conservadurismo
-        half_kelly = kelly_raw / 2
+        half_kelly = kelly / 2
         
         # Ajustar por confianza de señal
         confidence_modifier = max(signal_confidence / 100, 0.1)
         adjusted_kelly = half_kelly * confidence_modifier
         
+        if monte_carlo is not None and monte_carlo.risk_of_ruin > self.MAX_RISK_OF_RUIN:
+            adjusted_kelly *= 0.5
+            reasoning_parts.append(f"Riesgo de ruina {monte_carlo.risk_of_ruin:.1%} → posición a la mitad")
+        
         # Anti-Martingale: reducir tras pérdidas consecutivas
         anti_martingale_applied = False
         if consecutive_losses >= 3:
@@ -118,8 +291,7 @@ class DynamicKellyEngine:
         final_fraction = max(0.001, min(adjusted_kelly, max_risk_pct))
         position_size = capital * final_fraction
         
-        reasoning_parts = [
-            f"Kelly raw={kelly_raw:.4f}",
+        reasoning_parts += [
             f"Half-Kelly={half_kelly:.4f}",
             f"Confidence modifier={confidence_modifier:.2f}",
         ]
@@ -392,6 +564,7 @@ class PerformanceMetrics:
 # === Singleton ===
 _kelly_engine: Optional[DynamicKellyEngine] = None
 _fee_calculator: Optional[FeeCalculator] = None
+_monte_carlo_engine: Optional[MonteCarloRiskEngine] = None
 
 
 def get_kelly_engine() -> DynamicKellyEngine:
@@ -406,3 +579,15 @@ def get_fee_calculator() -> FeeCalculator:
     if _fee_calculator is None:
         _fee_calculator = FeeCalculator()
     return _fee_calculator
+
+
+def get_monte_carlo_engine() -> MonteCarloRiskEngine:
+    global _monte_carlo_engine
+    if _monte_carlo_engine is None:
+        from app.config import settings
+        _monte_carlo_engine = MonteCarloRiskEngine(
+            paths=settings.risk_mc_paths,
+            horizon=settings.risk_mc_horizon_trades,
+            ruin_drawdown=settings.risk_mc_ruin_drawdown
+        )
+    return _monte_carlo_engine
@@ -131,7 +131,7 @@ class SignalAuditor:
             risk_factor += 1.0
         
         # === CHECK 3: Regime Alignment ===
-        regime_report = self.regime_detector.detect(candles, indicators)
+        regime_report = self.regime_detector.detect(candles, indicators, symbol=signal.get("symbol"))
         regime_score, regime_detail = self._check_regime_alignment(
             direction, confidence, regime_report
         )
@@ -25,6 +25,8 @@ from app.ml.indicators import (
 )
 from app.ml.candle_patterns import detect_all_patterns
 from app.infrastructure.binance.client import get_binance_client
+from app.ml.feature_store import INTERVAL_SECONDS
+from app.services.trade_flow import get_trade_flow_manager
 
 
 class SignalTier(str, Enum):
@@ -69,6 +71,13 @@ class ProSignalGenerator:
     def __init__(self):
         self.binance = get_binance_client()
     
+    def _flow_volume_check(self, symbol: str, interval: str) -> Optional[Dict]:
+        """Chequeo de volumen desde el flujo de trades en memoria (None si no hay historia suficiente)"""
+        flow = get_trade_flow_manager().get(symbol)
+        if flow is None:
+            return None
+        return flow.volume_check(INTERVAL_SECONDS.get(interval, 0) // flow.bar_seconds)
+    
     def _analyze_timeframe(self, symbol: str, interval: str) -> Dict:
         """
         Analizar un timeframe específico.
@@ -100,6 +109,7 @@ class ProSignalGenerator:
             adx_data = calculate_adx(highs, lows, closes)
             ema_alignment = get_ema_alignment(closes)
             volume_profile = calculate_volume_profile(volumes)
+            flow_volume = self._flow_volume_check(symbol, interval)
             patterns = detect_all_patterns(candles[-5:])  # Últimas 5 velas
             fibonacci = calculate_fibonacci_levels(closes)
             
@@ -221,7 +231,16 @@ class ProSignalGenerator:
                         reasons.append(f"📊 {p['name']}")
             
             # --- Volumen ---
-            if volume_profile["is_high"] and volume_profile["trend"] == "INCREASING":
+            if flow_volume is not None:
+                # Trades reales en memoria: el volumen confirma solo si el delta va a favor
+                if flow_volume["is_high"] and flow_volume["trend"] == "INCREASING":
+                    if bullish_score > bearish_score and flow_volume["delta_ratio"] > 0.1:
+                        bullish_score += 1
+                        reasons.append(f"Volumen comprador confirma (delta {flow_volume['delta_ratio']:+.0%})")
+                    elif bearish_score > bullish_score and flow_volume["delta_ratio"] < -0.1:
+                        bearish_score += 1
+                        reasons.append(f"Volumen vendedor confirma (delta {flow_volume['delta_ratio']:+.0%})")
+            elif volume_profile["is_high"] and volume_profile["trend"] == "INCREASING":
                 # Volumen alto confirma la dirección
                 if bullish_score > bearish_score:
                     bullish_score += 1
@@ -252,7 +271,8 @@ class ProSignalGenerator:
                     "stoch_k": round(stoch_rsi["k"][-1], 1) if stoch_rsi["k"] else None,
                     "adx": round(adx_data["adx"][-1], 1) if adx_data["adx"] else None,
                     "ema_alignment": ema_alignment["alignment"],
-                    "volume_ratio": volume_profile["ratio"],
+                    "volume_ratio": flow_volume["ratio"] if flow_volume else volume_profile["ratio"],
+                    "volume_delta_ratio": flow_volume["delta_ratio"] if flow_volume else None,
                     "patterns": [p["name"] for p in patterns["patterns"]]
                 },
                 "reasons": reasons,
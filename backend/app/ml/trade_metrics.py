@@ -0,0 +1,404 @@
+"""
+SIC Ultra - Métricas de Performance Incrementales
+
+Acumuladores online actualizados con cada trade cerrado, en lugar de
+recalcular sobre la lista completa de trades en cada request:
+- Media/varianza de PnL con Welford (Sharpe sin guardar los retornos)
+- Equity acumulada, pico y máximo drawdown
+- Rachas (runs) para el Z-Score, racha actual
+- Gross profit/loss, mejor/peor trade
+
+Cada trade actualiza sus agregados por (owner, source, strategy, symbol)
+y los rollups "*" de estrategia y símbolo; la lectura de cualquier vista
+es O(1) (las vistas de varias fuentes se combinan con merge()).
+Los acumuladores se persisten en JSON; un scope (owner, source) sin
+historial previo se reconstruye una única vez desde su fuente (BD/memoria).
+"""
+
+import json
+import math
+import os
+import threading
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+
+METRICS_PATH = os.path.join(os.path.dirname(__file__), "models", "trade_metrics.json")
+
+ALL = "*"
+
+# Trades mínimos para que Sharpe y Z-Score sean significativos (igual que PerformanceMetrics)
+MIN_SHARPE_TRADES = 2
+MIN_ZSCORE_TRADES = 10
+
+# Prefijo del `reason` con que se registra el cierre de un contrato de futuros de práctica
+FUTURES_CLOSE_REASON = "Cierre de Contrato Futuro"
+
+
+@dataclass
+class RunningMetrics:
+    """Acumulador O(1) por trade de una serie de PnL"""
+    count: int = 0
+    wins: int = 0
+    losses: int = 0
+    mean: float = 0.0
+    m2: float = 0.0             # Suma de cuadrados de desviaciones (Welford)
+    gross_profit: float = 0.0
+    gross_loss: float = 0.0     # En valor absoluto
+    best: Optional[float] = None
+    worst: Optional[float] = None
+    equity: float = 0.0
+    peak: float = 0.0
+    trough: float = 0.0         # Mínimo de la equity (desde 0)
+    max_drawdown: float = 0.0
+    runs: int = 0
+    first_win: Optional[bool] = None
+    last_win: Optional[bool] = None
+    streak: int = 0             # >0 ganadoras seguidas, <0 perdedoras seguidas
+    lead_streak: int = 0        # Racha inicial (para enlazar series en merge)
+    max_losing_streak: int = 0
+    updated_at: Optional[str] = None
+
+    def update(self, pnl: float):
+        pnl = float(pnl)
+        self.count += 1
+        delta = pnl - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (pnl - self.mean)
+
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+        elif pnl < 0:
+            self.losses += 1
+            self.gross_loss -= pnl
+        self.best = pnl if self.best is None else max(self.best, pnl)
+        self.worst = pnl if self.worst is None else min(self.worst, pnl)
+
+        self.equity += pnl
+        self.peak = max(self.peak, self.equity)
+        self.trough = min(self.trough, self.equity)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.equity)
+
+        # Rachas: mismas reglas que z_score_streaks (ganador = pnl > 0)
+        is_win = pnl > 0
+        if self.first_win is None:
+            self.first_win = is_win
+        if is_win != self.last_win:
+            self.runs += 1
+            self.streak = 0
+        self.last_win = is_win
+        self.streak = self.streak + 1 if is_win else self.streak - 1
+        if self.runs == 1:
+            self.lead_streak = self.streak
+        self.max_losing_streak = max(self.max_losing_streak, -self.streak)
+        self.updated_at = datetime.utcnow().isoformat()
+
+    # === Métricas derivadas ===
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(max(self.variance, 0.0))
+
+    @property
+    def total_pnl(self) -> float:
+        return self.equity
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.count * 100 if self.count else 0.0
+
+    @property
+    def avg_win(self) -> float:
+        return self.gross_profit / self.wins if self.wins else 0.0
+
+    @property
+    def avg_loss(self) -> float:
+        return -self.gross_loss / self.losses if self.losses else 0.0
+
+    @property
+    def expectancy(self) -> float:
+        """p_win × avg_win − p_loss × |avg_loss| = PnL medio por trade"""
+        return (self.gross_profit - self.gross_loss) / self.count if self.count else 0.0
+
+    @property
+    def profit_factor(self) -> float:
+        if self.gross_loss == 0:
+            return float("inf") if self.gross_profit > 0 else 0.0
+        return self.gross_profit / self.gross_loss
+
+    def sharpe_ratio(self, risk_free_rate: float = 0.05, periods_per_year: int = 252) -> float:
+        """Equivalente a PerformanceMetrics.sharpe_ratio sobre todos los trades"""
+        std = self.std
+        if self.count < MIN_SHARPE_TRADES or std == 0:
+            return 0.0
+        sharpe = (self.mean - risk_free_rate / periods_per_year) / std * math.sqrt(periods_per_year)
+        return round(sharpe, 4)
+
+    def z_score(self) -> float:
+        """Equivalente a PerformanceMetrics.z_score_streaks sobre todos los trades"""
+        n, wins = self.count, self.wins
+        losses = n - wins
+        if n < MIN_ZSCORE_TRADES or wins == 0 or losses == 0:
+            return 0.0
+        expected_runs = (2 * wins * losses) / n + 1
+        variance = 2 * wins * losses * (2 * wins * losses - n) / (n * n * (n - 1))
+        if variance <= 0:
+            return 0.0
+        return round((self.runs - expected_runs) / math.sqrt(variance), 4)
+
+    @property
+    def current_drawdown(self) -> float:
+        return self.peak - self.equity
+
+    def merge(self, other: "RunningMetrics"):
+        """
+        Concatenar otra serie a continuación de esta (exacto: Chan et al.
+        para media/M2; rachas y drawdown enlazando ambos extremos).
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            for f in fields(self):
+                setattr(self, f.name, getattr(other, f.name))
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.mean += delta * other.count / n
+        self.count = n
+        self.wins += other.wins
+        self.losses += other.losses
+        self.gross_profit += other.gross_profit
+        self.gross_loss += other.gross_loss
+        self.best = max(self.best, other.best)
+        self.worst = min(self.worst, other.worst)
+
+        self.max_drawdown = max(self.max_drawdown, other.max_drawdown, self.peak - self.equity - other.trough)
+        self.peak = max(self.peak, self.equity + other.peak)
+        self.trough = min(self.trough, self.equity + other.trough)
+        self.equity += other.equity
+
+        joined = self.last_win == other.first_win
+        crossing = self.streak + other.lead_streak if joined else other.lead_streak
+        if joined and self.runs == 1:
+            self.lead_streak = crossing
+        self.streak = crossing if other.runs == 1 else other.streak
+        self.runs += other.runs - (1 if joined else 0)
+        self.max_losing_streak = max(self.max_losing_streak, other.max_losing_streak, -crossing)
+        self.last_win = other.last_win
+        self.updated_at = max(self.updated_at or "", other.updated_at or "") or None
+
+    def to_dict(self) -> Dict:
+        """Resumen para los endpoints"""
+        profit_factor = self.profit_factor
+        return {
+            "total_trades": self.count,
+            "winning_trades": self.wins,
+            "losing_trades": self.losses,
+            "win_rate": round(self.win_rate, 2),
+            "total_pnl": round(self.total_pnl, 2),
+            "gross_profit": round(self.gross_profit, 2),
+            "gross_loss": round(self.gross_loss, 2),
+            "profit_factor": round(profit_factor, 2) if math.isfinite(profit_factor) else None,
+            "expectancy": round(self.expectancy, 2),
+            "avg_win": round(self.avg_win, 2),
+            "avg_loss": round(self.avg_loss, 2),
+            "avg_trade": round(self.mean, 2) if self.count else None,
+            "best_trade": round(self.best, 2) if self.best is not None else None,
+            "worst_trade": round(self.worst, 2) if self.worst is not None else None,
+            "pnl_std": round(self.std, 4),
+            "sharpe_ratio": self.sharpe_ratio(),
+            "z_score": self.z_score(),
+            "max_drawdown": round(self.max_drawdown, 2),
+            "current_drawdown": round(self.current_drawdown, 2),
+            "current_streak": self.streak,
+            "max_losing_streak": self.max_losing_streak,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "RunningMetrics":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in state.items() if k in names})
+
+
+def metrics_from_pnls(pnls: Iterable[float]) -> RunningMetrics:
+    metrics = RunningMetrics()
+    for pnl in pnls:
+        metrics.update(pnl)
+    return metrics
+
+
+def _key(owner: str, source: str, strategy: str, symbol: str) -> str:
+    return "|".join((str(owner), source, strategy, symbol))
+
+
+def _normalize(value: Optional[str]) -> str:
+    return (value or "UNKNOWN").upper()
+
+
+def closes_position(side: Optional[str], market_type: Optional[str] = None, reason: Optional[str] = None) -> bool:
+    """
+    ¿Cierra el trade virtual una posición (y realiza PnL)?
+
+    Spot: las ventas. Futuros: el cierre del contrato, sea de un LONG (SELL)
+    o de un SHORT (BUY); la apertura nunca cuenta.
+    """
+    if (market_type or "SPOT").upper() == "FUTURES":
+        return (reason or "").startswith(FUTURES_CLOSE_REASON)
+    return (side or "").upper() == "SELL"
+
+
+def closing_trades(model):
+    """Filtro SQLAlchemy equivalente a closes_position() para el modelo VirtualTrade"""
+    from sqlalchemy import and_, or_
+    futures = model.market_type == "FUTURES"
+    return or_(
+        and_(futures, model.reason.like(f"{FUTURES_CLOSE_REASON}%")),
+        and_(or_(model.market_type.is_(None), ~futures), model.side == "SELL")
+    )
+
+
+class TradeMetricsStore:
+    """
+    Acumuladores por (owner, source, strategy, symbol) con rollups "*".
+
+    - owner: id de usuario o "agent"
+    - source: origen del trade ("practice", "journal", "agent")
+    """
+
+    def __init__(self, path: str = METRICS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, RunningMetrics] = {}
+        self._seeded: set = set()
+        self._load()
+
+    # === Persistencia ===
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            self._metrics = {k: RunningMetrics.from_state(v) for k, v in state.get("metrics", {}).items()}
+            self._seeded = set(state.get("seeded", []))
+        except Exception as e:
+            logger.warning(f"⚠️ Métricas de trades ilegibles, se reconstruirán: {e}")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({
+                    "seeded": sorted(self._seeded),
+                    "metrics": {k: asdict(m) for k, m in self._metrics.items()},
+                }, f)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron persistir las métricas de trades: {e}")
+
+    def _apply(self, owner: str, source: str, pnl: float, strategy: str, symbol: str):
+        for strat in (strategy, ALL):
+            for sym in (symbol, ALL):
+                self._metrics.setdefault(_key(owner, source, strat, sym), RunningMetrics()).update(pnl)
+
+    # === Escritura ===
+
+    def record(
+        self,
+        owner,
+        source: str,
+        pnl: float,
+        strategy: Optional[str] = None,
+        symbol: Optional[str] = None
+    ):
+        """Registrar un trade cerrado (actualiza 4 acumuladores y persiste)"""
+        with self._lock:
+            self._apply(str(owner), source, pnl, _normalize(strategy), _normalize(symbol))
+            self._save()
+
+    def rebuild(self, owner, source: str, trades: Iterable[Tuple[float, Optional[str], Optional[str]]]):
+        """
+        Reconstruir un scope (owner, source) desde su historial completo.
+
+        Args:
+            trades: (pnl, strategy, symbol) en orden cronológico
+        """
+        owner = str(owner)
+        prefix = _key(owner, source, "", "")[:-1]
+        with self._lock:
+            for key in [k for k in self._metrics if k.startswith(prefix)]:
+                del self._metrics[key]
+            count = 0
+            for pnl, strategy, symbol in trades:
+                self._apply(owner, source, pnl or 0.0, _normalize(strategy), _normalize(symbol))
+                count += 1
+            self._seeded.add(f"{owner}|{source}")
+            self._save()
+        logger.info(f"📊 Métricas reconstruidas para {owner}/{source}: {count} trades")
+
+    def ensure(self, owner, source: str, loader: Callable[[], Iterable[Tuple[float, Optional[str], Optional[str]]]]):
+        """
+        Reconstruir el scope desde `loader` solo la primera vez; después
+        basta con record() en cada cierre y las lecturas son O(1).
+        """
+        if f"{owner}|{source}" in self._seeded:
+            return
+        try:
+            self.rebuild(owner, source, list(loader()))
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo reconstruir {owner}/{source}: {e}")
+
+    # === Lectura ===
+
+    def get(self, owner, source: str, strategy: str = ALL, symbol: str = ALL) -> RunningMetrics:
+        strategy = strategy if strategy == ALL else strategy.upper()
+        symbol = symbol if symbol == ALL else symbol.upper()
+        with self._lock:
+            metrics = self._metrics.get(_key(str(owner), source, strategy, symbol))
+            return RunningMetrics(**asdict(metrics)) if metrics else RunningMetrics()
+
+    def combined(self, owner, sources: Iterable[str]) -> RunningMetrics:
+        """Vista conjunta de varias fuentes (concatenadas en el orden dado)"""
+        total = RunningMetrics()
+        for source in sources:
+            total.merge(self.get(owner, source))
+        return total
+
+    def breakdown(self, owner, source: str, by: str = "strategy") -> Dict[str, Dict]:
+        """Resumen por estrategia o por símbolo"""
+        prefix = _key(str(owner), source, "", "")[:-1]
+        result = {}
+        with self._lock:
+            for key, metrics in self._metrics.items():
+                if not key.startswith(prefix):
+                    continue
+                strategy, symbol = key[len(prefix):].split("|")
+                if by == "strategy" and strategy != ALL and symbol == ALL:
+                    result[strategy] = metrics.to_dict()
+                elif by == "symbol" and symbol != ALL and strategy == ALL:
+                    result[symbol] = metrics.to_dict()
+        return result
+
+
+# === Singleton ===
+
+_trade_metrics: Optional[TradeMetricsStore] = None
+
+
+def get_trade_metrics() -> TradeMetricsStore:
+    global _trade_metrics
+    if _trade_metrics is None:
+        _trade_metrics = TradeMetricsStore()
+    return _trade_metrics
@@ -23,13 +23,16 @@ import random
 
 from app.config import settings
 from app.ml.candlestick_analyzer import CandlestickAnalyzer, CandlestickPattern
+from app.ml.pattern_outcomes import MAX_PRIOR_WEIGHT, get_pattern_outcomes
 
 # RLMF Modules (Signal Intelligence Evolution)
 from app.ml.regime_detector import get_regime_detector, MarketRegime
 from app.ml.signal_auditor import get_signal_auditor
 from app.ml.post_trade_analyzer import get_post_trade_analyzer
+from app.ml.trade_metrics import RunningMetrics, metrics_from_pnls
 from app.ml.risk_engine import (
-    get_kelly_engine, FeeCalculator, AntiMartingaleGuard, PerformanceMetrics
+    get_kelly_engine, get_monte_carlo_engine, FeeCalculator, AntiMartingaleGuard, PerformanceMetrics,
+    MonteCarloReport, PositionSizeResult
 )
 
 
@@ -128,6 +131,13 @@ class AgentMemory:
             
         return data
     
+    def running_metrics(self) -> RunningMetrics:
+        """Acumulador incremental de PnL (se reconstruye una vez desde trade_results si falta)"""
+        state = self.data.get("running_metrics")
+        if state is None:
+            return metrics_from_pnls(t.get("pnl", 0) for t in self.data.get("trade_results", []))
+        return RunningMetrics.from_state(state)
+    
     def save(self):
         """Guardar memoria a archivo con backup atómico"""
         try:
@@ -304,10 +314,14 @@ class PatternRecognizer:
         candles: List[Dict],
         rsi: List[float],
         macd: Dict,
-        bollinger: Dict
+        bollinger: Dict,
+        timeframe: str = "1h"
     ) -> List[MarketPattern]:
         """
         Identificar patrones en los datos actuales.
+        
+        historical_accuracy sale de la tabla de resultados medidos
+        (app.ml.pattern_outcomes); las constantes solo aplican sin tabla.
         """
         patterns = []
         
@@ -324,7 +338,7 @@ class PatternRecognizer:
                 indicators={"rsi": current_rsi},
                 expected_direction="BULLISH",
                 expected_move_percent=3.0,
-                historical_accuracy=0.68
+                historical_accuracy=self._historical_accuracy("rsi_extreme_oversold", timeframe, 0.68)
             ))
         elif current_rsi > 75:
             patterns.append(MarketPattern(
@@ -334,7 +348,7 @@ class PatternRecognizer:
                 indicators={"rsi": current_rsi},
                 expected_direction="BEARISH",
                 expected_move_percent=3.0,
-                historical_accuracy=0.65
+                historical_accuracy=self._historical_accuracy("rsi_extreme_overbought", timeframe, 0.65)
             ))
         
         # MACD Crossovers
@@ -349,7 +363,7 @@ class PatternRecognizer:
                     indicators={"macd_hist": hist[-1]},
                     expected_direction="BULLISH",
                     expected_move_percent=6.0,
-                    historical_accuracy=0.72
+                    historical_accuracy=self._historical_accuracy("macd_golden_cross", timeframe, 0.72)
                 ))
             # Death Cross
             elif hist[-1] < 0 and hist[-2] >= 0 and hist[-3] > 0:
@@ -360,7 +374,7 @@ class PatternRecognizer:
                     indicators={"macd_hist": hist[-1]},
                     expected_direction="BEARISH",
                     expected_move_percent=6.0,
-                    historical_accuracy=0.70
+                    historical_accuracy=self._historical_accuracy("macd_death_cross", timeframe, 0.70)
                 ))
         
         # Bollinger Squeeze
@@ -380,10 +394,15 @@ class PatternRecognizer:
                     indicators={"band_width": band_width},
                     expected_direction=direction,
                     expected_move_percent=7.0,
-                    historical_accuracy=0.67
+                    historical_accuracy=self._historical_accuracy("bollinger_squeeze", timeframe, 0.67)
                 ))
         
         return patterns
+    
+    @staticmethod
+    def _historical_accuracy(pattern: str, timeframe: str, default: float) -> float:
+        table = get_pattern_outcomes()
+        return table.accuracy(pattern, timeframe, default=default) if table else default
 
 
 # === Top Trader Analyzer ===
@@ -527,6 +546,9 @@ class LearningEngine:
         # Registrar en historial de trades (RLMF usa esto)
         if "trade_results" not in self.memory.data:
             self.memory.data["trade_results"] = []
+        metrics = self.memory.running_metrics()
+        metrics.update(pnl)
+        self.memory.data["running_metrics"] = asdict(metrics)
         self.memory.data["trade_results"].append({
             "trade_id": trade_id,
             "pnl": pnl,
@@ -565,16 +587,26 @@ class LearningEngine:
         return weights.get(strategy, 1.0)
     
     def get_pattern_accuracy(self, pattern: str, timeframe: str = "1h", regime: str = "NORMAL") -> float:
-        """Obtener precisión histórica de un patrón multidimensional"""
-        patterns = self.memory.data["patterns_learned"]
+        """
+        Obtener precisión de un patrón multidimensional.
         
-        try:
-            p = patterns[pattern][timeframe][regime]
-            if p["total"] == 0:
-                return 0.5
-            return p["wins"] / p["total"]
-        except KeyError:
+        Combina la tabla histórica (app.ml.pattern_outcomes, lookup O(1)) como
+        prior con los trades en vivo: el histórico pesa como máximo
+        MAX_PRIOR_WEIGHT trades, así los resultados reales acaban dominando.
+        """
+        live = self.memory.data["patterns_learned"].get(pattern, {}).get(timeframe, {}).get(regime)
+        wins = live["wins"] if live else 0
+        total = live["total"] if live else 0
+        
+        table = get_pattern_outcomes()
+        stats = table.lookup(pattern, timeframe, regime) if table else None
+        if stats:
+            weight = min(stats["samples"], MAX_PRIOR_WEIGHT)
+            return (stats["accuracy"] * weight + wins) / (weight + total)
+        
+        if total == 0:
             return 0.5  # Sin datos, asumir 50%
+        return wins / total
 
 
 # === Main Trading Agent ===
@@ -644,6 +676,7 @@ class TradingAgentAI:
         self.fee_calculator = FeeCalculator()
         self.anti_martingale = AntiMartingaleGuard()
         self.performance_metrics = PerformanceMetrics()
+        self.monte_carlo = get_monte_carlo_engine()
         
         logger.info("🤖 Agente IA Trading iniciado (RLMF Evolution Active)")
         logger.info(f"📊 Trades históricos: {self.memory.data['total_trades']}")
@@ -676,7 +709,7 @@ class TradingAgentAI:
         current_price = closes[-1]
         
         # === 0. Detectar Régimen de Mercado (RLMF) ===
-        regime_report = self.regime_detector.detect(candles, indicators)
+        regime_report = self.regime_detector.detect(candles, indicators, symbol=symbol)
         current_regime = regime_report.regime.value
         regime_params = regime_report.params
         
@@ -901,6 +934,7 @@ class TradingAgentAI:
         
         # === 9. RLMF: Signal Quality Audit (Pre-Flight Check) ===
         signal_data = {
+            "symbol": symbol,
             "direction": direction,
             "confidence": round(confidence, 1),
             "entry_price": current_price,
@@ -983,22 +1017,28 @@ class TradingAgentAI:
         signal_price: float = None,
         price_history_during_trade: List[float] = None,
         entry_time: datetime = None,
-        exit_time: datetime = None
+        exit_time: datetime = None,
+        excursion=None,
+        db_session=None
     ):
         """
         Registrar resultado del trade para que el agente aprenda.
         Ahora incluye Post-Trade Analysis (RLMF).
+        
+        Args:
+            excursion: ExcursionSummary del tracker en vivo (MAE/MFE por tick);
+                si falta se usa price_history_during_trade o [entrada, salida]
         """
         # 1. Aprendizaje base (original)
         self.learning.record_trade_result(
             trade_id, symbol, side, entry_price, exit_price,
-            pnl, signals_used, patterns_detected
+            pnl, signals_used, patterns_detected, db_session=db_session
         )
         
         # 2. RLMF: Post-Trade Analysis
         try:
             fill_price = signal_price or entry_price
-            prices_during = price_history_during_trade or [entry_price, exit_price]
+            prices_during = None if excursion is not None else (price_history_during_trade or [entry_price, exit_price])
             
             deviation_report = self.post_trade_analyzer.analyze(
                 trade_id=trade_id,
@@ -1012,7 +1052,8 @@ class TradingAgentAI:
                 signals_used=signals_used,
                 patterns_detected=patterns_detected,
                 entry_time=entry_time,
-                exit_time=exit_time
+                exit_time=exit_time,
+                excursion=excursion
             )
             
             # Aplicar ajustes de peso al learning engine
@@ -1047,13 +1088,16 @@ class TradingAgentAI:
         stats["consecutive_losses"] = self.anti_martingale.get_consecutive_losses(trade_results) if trade_results else 0
         
         if trade_results:
-            returns = [t.get("pnl", 0) for t in trade_results[-500:]]
-            is_win_list = [t.get("pnl", 0) > 0 for t in trade_results[-500:]]
-            
-            stats["sharpe_ratio"] = self.performance_metrics.sharpe_ratio(returns)
-            stats["z_score"] = self.performance_metrics.z_score_streaks(is_win_list)
+            metrics = self.memory.running_metrics()
+            stats["sharpe_ratio"] = metrics.sharpe_ratio()
+            stats["z_score"] = metrics.z_score()
+            stats["max_drawdown"] = round(metrics.max_drawdown, 2)
             stats["signal_approval_rate"] = self.signal_auditor.get_approval_rate()
             stats["regime_stability"] = self.regime_detector.get_regime_stability()
+            
+            # Monte Carlo (cacheado hasta el próximo trade registrado)
+            report = self._monte_carlo_report()
+            stats["monte_carlo"] = report.to_dict() if report else None
         
         # Post-trade learning log
         stats["daily_learning"] = self.post_trade_analyzer.get_daily_learning_log()
@@ -1061,6 +1105,37 @@ class TradingAgentAI:
         
         return stats
     
+    def _monte_carlo_report(self) -> Optional[MonteCarloReport]:
+        trade_results = self.memory.data.get("trade_results", [])
+        returns = [t.get("pnl", 0) for t in trade_results[-500:]]
+        return self.monte_carlo.evaluate("agent", returns, settings.risk_reference_capital)
+    
+    def size_position(
+        self,
+        budget_usd: float,
+        signal_confidence: float,
+        max_risk_pct: float = 0.02
+    ) -> PositionSizeResult:
+        """
+        Tamaño de una entrada con Kelly dinámico sobre el historial del agente.
+        
+        `budget_usd` es el techo (max_risk_pct del capital de referencia), así
+        que el resultado nunca lo supera. El reporte Monte Carlo limita el Kelly
+        a su percentil conservador y recorta la posición si el riesgo de ruina es alto.
+        """
+        trade_results = self.memory.data.get("trade_results", [])
+        metrics = self.memory.running_metrics()
+        return self.kelly_engine.calculate_position_size(
+            capital=budget_usd / max_risk_pct,
+            win_rate=metrics.win_rate,
+            avg_win=metrics.gross_profit / metrics.wins if metrics.wins else 0.0,
+            avg_loss=metrics.gross_loss / metrics.losses if metrics.losses else 0.0,
+            signal_confidence=signal_confidence,
+            max_risk_pct=max_risk_pct,
+            consecutive_losses=self.anti_martingale.get_consecutive_losses(trade_results),
+            monte_carlo=self._monte_carlo_report()
+        )
+    
     def get_learned_patterns(self) -> Dict:
         """Obtener patrones aprendidos con su precisión"""
         patterns = {}
@@ -0,0 +1,392 @@
+"""
+SIC Ultra - Snapshot de la Cuenta Binance (user-data stream)
+
+Mantiene en memoria balances y órdenes abiertas de la cuenta real a partir
+del user-data stream (listenKey), y un ticker compartido (`!miniTicker@arr`)
+para valorarlos:
+- /wallet y get_wallet_value_usd sirven desde el snapshot, sin ping ni
+  `get_account` firmado por request
+- El listenKey se renueva con keepalive (caduca a los 60 min sin él)
+- La reconciliación REST solo corre al (re)conectar tras un corte y de forma
+  periódica (con backoff si falla); cada activo guarda la hora del último cambio y un dato más
+  viejo (REST o evento atrasado) nunca pisa a uno más nuevo
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.infrastructure.binance.streams import BinanceStream
+
+
+USD_ASSETS = ('USDT', 'BUSD', 'USD')
+TICKER_STREAM = "!miniTicker@arr"
+CLOSED_ORDER_STATUSES = ('FILLED', 'CANCELED', 'REJECTED', 'EXPIRED', 'EXPIRED_IN_MATCH')
+RECONCILE_RETRY_SECONDS = 15  # Primer reintento tras un fallo REST; se duplica hasta reconcile_seconds
+
+
+class AccountSnapshot:
+    """Balances, órdenes abiertas y precios de la cuenta (estado puro, sin I/O)"""
+
+    def __init__(self):
+        self.balances: Dict[str, Dict[str, float]] = {}   # asset -> {free, locked}
+        self._balance_ts: Dict[str, int] = {}             # asset -> ms del último cambio aplicado
+        self.open_orders: Dict[int, Dict] = {}            # orderId -> orden
+        self._order_ts: Dict[int, int] = {}               # orderId -> ms del último cambio (también cerradas)
+        self.order_updates: deque = deque(maxlen=50)
+        self.prices: Dict[str, float] = {}
+        self.reconciled_at: Optional[float] = None        # Epoch de la última reconciliación REST
+        self.event_at: Optional[float] = None             # Epoch del último evento de cuenta
+        self.listen_key_expired = False
+
+    @property
+    def ready(self) -> bool:
+        return self.reconciled_at is not None
+
+    # === Reconciliación REST ===
+
+    def reconcile(self, account: Dict, prices: Optional[Dict[str, float]] = None,
+                  open_orders: Optional[List[Dict]] = None, fetched_ms: Optional[int] = None):
+        """
+        Aplicar `get_account` (+ precios y órdenes abiertas) sin pisar cambios más nuevos del stream.
+
+        `fetched_ms` es el instante (ms) en que se pidió el snapshot REST: una orden
+        abierta en memoria que no viene en él solo se da por cerrada si su último
+        cambio es anterior a ese instante.
+        """
+        update_ms = int(account.get('updateTime') or 0)
+        seen = set()
+        for entry in account.get('balances', []):
+            asset = entry['asset']
+            seen.add(asset)
+            self._set_balance(asset, float(entry['free']), float(entry['locked']), update_ms)
+        for asset in [a for a in self.balances if a not in seen and self._balance_ts.get(a, 0) <= update_ms]:
+            del self.balances[asset]
+        if prices:
+            self.prices.update(prices)
+        if open_orders is not None:
+            self._merge_orders(open_orders, fetched_ms if fetched_ms is not None else int(time.time() * 1000))
+        self.reconciled_at = time.time()
+        self.listen_key_expired = False
+
+    @staticmethod
+    def _rest_order(order: Dict) -> Dict:
+        return {
+            'order_id': int(order['orderId']),
+            'symbol': order['symbol'],
+            'side': order['side'],
+            'type': order['type'],
+            'status': order['status'],
+            'price': float(order['price']),
+            'quantity': float(order['origQty']),
+            'filled': float(order['executedQty']),
+            'updated_at': int(order.get('updateTime') or order.get('time') or 0),
+        }
+
+    def _merge_orders(self, open_orders: List[Dict], fetched_ms: int):
+        rest = {int(o['orderId']): self._rest_order(o) for o in open_orders}
+        for order_id, order in rest.items():
+            if order['updated_at'] >= self._order_ts.get(order_id, 0):
+                self.open_orders[order_id] = order
+                self._order_ts[order_id] = order['updated_at']
+        for order_id in [i for i, o in self.open_orders.items() if i not in rest and o['updated_at'] < fetched_ms]:
+            del self.open_orders[order_id]  # Cerrada sin que llegara el evento
+        # Las marcas de órdenes cerradas antes del snapshot ya no hacen falta: REST no las trae
+        for order_id in [i for i, ts in self._order_ts.items() if i not in self.open_orders and ts < fetched_ms]:
+            del self._order_ts[order_id]
+
+    def _set_balance(self, asset: str, free: float, locked: float, ts: int) -> bool:
+        if ts < self._balance_ts.get(asset, 0):
+            return False  # Dato más viejo que el aplicado
+        self._balance_ts[asset] = ts
+        if free + locked > 0:
+            self.balances[asset] = {'free': free, 'locked': locked}
+        else:
+            self.balances.pop(asset, None)
+        return True
+
+    # === Eventos del stream ===
+
+    def apply_event(self, data: Dict) -> Optional[str]:
+        """Aplicar un evento del user-data stream. Devuelve su tipo"""
+        event = data.get('e')
+        if event == 'outboundAccountPosition':
+            ts = int(data.get('u') or data.get('E') or 0)
+            for entry in data.get('B', []):
+                self._set_balance(entry['a'], float(entry['f']), float(entry['l']), ts)
+        elif event == 'executionReport':
+            self._apply_order(data)
+        elif event == 'listenKeyExpired':
+            self.listen_key_expired = True
+        # balanceUpdate (depósitos/retiros) siempre viene seguido de outboundAccountPosition
+        if event:
+            self.event_at = time.time()
+        return event
+
+    def _apply_order(self, data: Dict):
+        order_id = int(data['i'])
+        update = {
+            'order_id': order_id,
+            'symbol': data['s'],
+            'side': data['S'],
+            'type': data['o'],
+            'status': data['X'],
+            'price': float(data['p']),
+            'quantity': float(data['q']),
+            'filled': float(data['z']),
+            'last_fill_price': float(data.get('L') or 0),
+            'updated_at': int(data.get('T') or data.get('E') or 0),
+        }
+        self.order_updates.append(update)
+        if update['updated_at'] < self._order_ts.get(order_id, 0):
+            return  # Evento atrasado
+        self._order_ts[order_id] = update['updated_at']
+        if update['status'] in CLOSED_ORDER_STATUSES:
+            self.open_orders.pop(order_id, None)
+        else:
+            self.open_orders[order_id] = update
+
+    def apply_tickers(self, tickers: List[Dict]) -> int:
+        """Evento `!miniTicker@arr` (lista de {s, c})"""
+        for ticker in tickers:
+            self.prices[ticker['s']] = float(ticker['c'])
+        return len(tickers)
+
+    # === Lectura ===
+
+    def usd_value(self, asset: str, amount: float) -> Optional[float]:
+        if asset in USD_ASSETS:
+            return amount
+        for quote in ('USDT', 'BUSD'):
+            price = self.prices.get(f"{asset}{quote}")
+            if price:
+                return amount * price
+        return None
+
+    def wallet(self) -> Dict:
+        """Balances valorados en USD (mismo formato que /wallet), de mayor a menor valor"""
+        balances = []
+        total_usd = 0.0
+        for asset, b in self.balances.items():
+            total = b['free'] + b['locked']
+            usd_value = self.usd_value(asset, total) or 0.0
+            total_usd += usd_value
+            balances.append({
+                "asset": asset,
+                "free": b['free'],
+                "locked": b['locked'],
+                "total": total,
+                "usd_value": round(usd_value, 8)
+            })
+        balances.sort(key=lambda x: x['usd_value'] or 0, reverse=True)
+        return {"total_usd": round(total_usd, 8), "balances": balances}
+
+    def balance(self, asset: str) -> Optional[Dict]:
+        b = self.balances.get(asset.upper())
+        if b is None:
+            return None
+        return {'asset': asset.upper(), 'free': b['free'], 'locked': b['locked'], 'total': b['free'] + b['locked']}
+
+    def total_usd(self) -> float:
+        return self.wallet()["total_usd"]
+
+
+class AccountStreamService:
+    """User-data stream + ticker compartido sobre una conexión, con keepalive y reconciliación"""
+
+    def __init__(
+        self,
+        keepalive_seconds: float = 1800,
+        reconcile_seconds: float = 900,
+        stale_seconds: float = 120
+    ):
+        self.keepalive_seconds = keepalive_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self.stale_seconds = stale_seconds
+        self.snapshot = AccountSnapshot()
+        self.running = False
+        self.stream_gaps = 0
+        self.gap_at: Optional[float] = None                # Epoch del último corte del stream
+        self.reconcile_failures = 0
+        self._reconcile_attempt_at: Optional[float] = None  # time.monotonic() del último intento REST
+        self._listen_key: Optional[str] = None
+        self._stream: Optional[BinanceStream] = None
+        self._task = None
+        self._reconcile_task = None
+
+    @property
+    def connected(self) -> bool:
+        return bool(self._stream and self._stream.connected)
+
+    def is_fresh(self) -> bool:
+        """
+        ¿Se puede servir desde el snapshot? (stream vivo o reconciliación reciente)
+
+        Tras un corte los eventos perdidos no vuelven con la reconexión: hasta
+        que una reconciliación posterior al corte tenga éxito se va a REST.
+        """
+        if not self.snapshot.ready:
+            return False
+        if self.gap_at is not None and self.snapshot.reconciled_at <= self.gap_at:
+            return False
+        return self.connected or time.time() - self.snapshot.reconciled_at < self.stale_seconds
+
+    # === REST ===
+
+    def _fetch_account(self):
+        from app.infrastructure.binance.client import get_binance_client
+        client = get_binance_client().client
+        account = client.get_account(recvWindow=60000)
+        prices = {t['symbol']: float(t['price']) for t in client.get_all_tickers()}
+        return account, prices, client.get_open_orders(recvWindow=60000)
+
+    async def reconcile(self) -> bool:
+        """Reconciliación REST completa (balances, precios y órdenes abiertas)"""
+        self._reconcile_attempt_at = time.monotonic()
+        fetched_ms = int(time.time() * 1000)
+        try:
+            account, prices, open_orders = await asyncio.to_thread(self._fetch_account)
+        except Exception as e:
+            self.reconcile_failures += 1
+            logger.warning(f"⚠️ Reconciliación de cuenta fallida ({self.reconcile_failures} seguidas): {e}")
+            return False
+        self.reconcile_failures = 0
+        self.snapshot.reconcile(account, prices, open_orders, fetched_ms)
+        logger.debug(f"💼 Cuenta reconciliada por REST: {len(self.snapshot.balances)} activos, "
+                     f"{len(self.snapshot.open_orders)} órdenes abiertas")
+        return True
+
+    def reconcile_due(self, now: Optional[float] = None) -> bool:
+        """
+        ¿Toca reconciliar? Cuenta desde el último *intento*: cada `reconcile_seconds`
+        si fue bien, y con backoff exponencial (acotado) tras fallos consecutivos.
+        """
+        if self._reconcile_attempt_at is None:
+            return True
+        wait = self.reconcile_seconds
+        if self.reconcile_failures:
+            wait = min(wait, RECONCILE_RETRY_SECONDS * 2 ** (self.reconcile_failures - 1))
+        now = now if now is not None else time.monotonic()
+        return now - self._reconcile_attempt_at >= wait
+
+    def _record_gap(self):
+        self.stream_gaps += 1
+        self.gap_at = time.time()
+
+    def _schedule_reconcile(self):
+        if self._reconcile_task is None or self._reconcile_task.done():
+            self._reconcile_task = asyncio.create_task(self.reconcile())
+
+    # === Stream ===
+
+    def handle_message(self, stream: str, data) -> Optional[str]:
+        if stream == TICKER_STREAM:
+            self.snapshot.apply_tickers(data)
+            return None
+        return self.snapshot.apply_event(data)
+
+    async def _keepalive_loop(self, listen_key: str):
+        from app.infrastructure.binance.client import get_binance_client
+        client = get_binance_client().client
+        while True:
+            await asyncio.sleep(self.keepalive_seconds)
+            try:
+                await asyncio.to_thread(client.stream_keepalive, listen_key)
+            except Exception as e:
+                logger.warning(f"⚠️ Keepalive del listenKey fallido: {e}")
+
+    async def start(self):
+        """Arrancar el stream de cuenta (requiere API keys)"""
+        if self.running:
+            return
+        from app.infrastructure.binance.client import get_binance_client
+        if not settings.binance_api_key or get_binance_client().client is None:
+            logger.info("💼 Stream de cuenta no iniciado: sin API keys de Binance")
+            return
+        self.running = True
+        await self.reconcile()
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info("💼 Stream de cuenta (user-data) iniciado")
+
+    async def stop(self):
+        self.running = False
+        for task in (self._task, self._reconcile_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self._listen_key:
+            try:
+                from app.infrastructure.binance.client import get_binance_client
+                await asyncio.to_thread(get_binance_client().client.stream_close, self._listen_key)
+            except Exception:
+                pass
+
+    async def _run_loop(self):
+        from app.infrastructure.binance.client import get_binance_client
+        client = get_binance_client().client
+        while self.running:
+            try:
+                self._listen_key = await asyncio.to_thread(client.stream_get_listen_key)
+            except Exception as e:
+                logger.error(f"❌ No se pudo obtener listenKey: {e}")
+                await asyncio.sleep(30)
+                continue
+            self._stream = BinanceStream([self._listen_key, TICKER_STREAM])
+            keepalive = asyncio.create_task(self._keepalive_loop(self._listen_key))
+            resync = self.stream_gaps > 0  # Tras un corte: reconciliar en cuanto vuelva el stream
+            try:
+                async for stream, data in self._stream.messages():
+                    if resync or self.reconcile_due():
+                        resync = False
+                        self._schedule_reconcile()
+                    if self.handle_message(stream, data) == 'listenKeyExpired':
+                        logger.warning("⚠️ listenKey caducado: renovando stream de cuenta")
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Stream de cuenta caído: {e}")
+            finally:
+                keepalive.cancel()
+            self._record_gap()
+            if self.running:
+                await asyncio.sleep(2)
+
+    def get_status(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            "running": self.running,
+            "stream_connected": self.connected,
+            "fresh": self.is_fresh(),
+            "assets": len(snapshot.balances),
+            "open_orders": len(snapshot.open_orders),
+            "prices": len(snapshot.prices),
+            "stream_gaps": self.stream_gaps,
+            "last_gap_at": datetime.utcfromtimestamp(self.gap_at).isoformat() if self.gap_at else None,
+            "reconcile_failures": self.reconcile_failures,
+            "reconciled_at": datetime.utcfromtimestamp(snapshot.reconciled_at).isoformat() if snapshot.reconciled_at else None,
+            "last_event_at": datetime.utcfromtimestamp(snapshot.event_at).isoformat() if snapshot.event_at else None,
+        }
+
+
+# === Singleton ===
+
+_account_stream: Optional[AccountStreamService] = None
+
+
+def get_account_stream() -> AccountStreamService:
+    global _account_stream
+    if _account_stream is None:
+        _account_stream = AccountStreamService(
+            keepalive_seconds=settings.account_keepalive_seconds,
+            reconcile_seconds=settings.account_reconcile_seconds,
+        )
+    return _account_stream
@@ -4,176 +4,67 @@ Servicio de ejecución automática de señales IA para trading personal.
 """
 
 import asyncio
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+import time
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime
 from loguru import logger
 import json
 
 from app.infrastructure.database.session import SessionLocal
 from app.infrastructure.database.models import User
 from app.services.execution_engine import get_execution_engine
-
-
-class SignalQueue:
-    """Gestiona cola de señales aprobadas para ejecución automática."""
-    
-    def __init__(self):
-        self.approved_signals: Dict[str, Dict] = {}  # symbol -> signal_data
-        self.execution_history: List[Dict] = []
-        self.max_queue_size = 50
-        
-    def add_approved_signal(self, signal: Dict, auto_execute_params: Dict):
-        """Añade señal aprobada a la cola de ejecución."""
-        symbol = signal.get('symbol')
-        if not symbol:
-            return False
-            
-        # Limitar tamaño de cola
-        if len(self.approved_signals) >= self.max_queue_size:
-            self._remove_oldest_signal()
-            
-        self.approved_signals[symbol] = {
-            'signal': signal,
-            'params': auto_execute_params,
-            'added_at': datetime.utcnow(),
-            'expires_at': datetime.utcnow() + timedelta(hours=2),
-            'executed': False
-        }
-        
-        logger.info(f"📋 Señal añadida a cola: {symbol} - {signal.get('confidence', 0)}%")
-        return True
-        
-    def get_executable_signals(self) -> List[Dict]:
-        """Retorna señales listas para ejecución."""
-        executable = []
-        now = datetime.utcnow()
-        
-        for symbol, data in self.approved_signals.items():
-            if (not data['executed'] and 
-                data['expires_at'] > now and
-                self._should_execute_signal(data)):
-                executable.append(data)
-                
-        return executable
-        
-    def mark_executed(self, symbol: str, success: bool, order_id: Optional[str] = None):
-        """Marca señal como ejecutada."""
-        if symbol in self.approved_signals:
-            signal_data = self.approved_signals[symbol]
-            signal_data['executed'] = True
-            signal_data['executed_at'] = datetime.utcnow()
-            signal_data['execution_success'] = success
-            signal_data['order_id'] = order_id
-            
-            # Añadir al historial
-            self.execution_history.append({
-                'symbol': symbol,
-                'signal': signal_data['signal'],
-                'executed_at': signal_data['executed_at'],
-                'success': success,
-                'order_id': order_id
-            })
-            
-            # Limitar historial
-            if len(self.execution_history) > 100:
-                self.execution_history = self.execution_history[-50:]
-                
-            logger.info(f"✅ Señal ejecutada: {symbol} - {'Éxito' if success else 'Fallo'}")
-            
-    def _remove_oldest_signal(self):
-        """Elimina señal más antigua de la cola."""
-        if self.approved_signals:
-            oldest_symbol = min(self.approved_signals.keys(), 
-                              key=lambda k: self.approved_signals[k]['added_at'])
-            del self.approved_signals[oldest_symbol]
-            
-    def _should_execute_signal(self, signal_data: Dict) -> bool:
-        """Valida si la señal debe ser ejecutada ahora."""
-        # Validar confianza mínima
-        min_confidence = signal_data['params'].get('min_confidence', 70)
-        if signal_data['signal'].get('confidence', 0) < min_confidence:
-            return False
-            
-        # Validar tier permitido
-        allowed_tiers = signal_data['params'].get('allowed_tiers', ['S', 'A'])
-        signal_tier = signal_data['signal'].get('tier', 'C')
-        if signal_tier not in allowed_tiers:
-            return False
-            
-        return True
-        
-    def get_queue_status(self) -> Dict:
-        """Retorna estado actual de la cola consultando la base de datos para estadísticas diarias."""
-        db = SessionLocal()
-        try:
-            from app.infrastructure.database.models import VirtualTrade, AgentTrade
-            from datetime import date
-            
-            today = date.today()
-            
-            # Contar trades realizados hoy (VirtualTrade con strategy AI_AUTO + AgentTrade)
-            today_v_trades = db.query(VirtualTrade).filter(
-                VirtualTrade.strategy == "AI_AUTO",
-                VirtualTrade.created_at >= today
-            ).all()
-            
-            today_a_trades = db.query(AgentTrade).filter(
-                AgentTrade.created_at >= today
-            ).all()
-            
-            executed_today = len(today_v_trades) + len(today_a_trades)
-            
-            # Calcular tasa de éxito de las últimas 24 horas (usando AgentTrade como referencia real)
-            yesterday = datetime.utcnow() - timedelta(days=1)
-            recent_trades = db.query(AgentTrade).filter(AgentTrade.created_at >= yesterday).all()
-            
-            if not recent_trades:
-                success_rate_24h = 0.0
-            else:
-                successful = len([t for t in recent_trades if t.pnl > 0])
-                success_rate_24h = (successful / len(recent_trades)) * 100
-                
-        except Exception as e:
-            logger.error(f"❌ Error calculando estadísticas de cola en DB: {e}")
-            executed_today = len([s for s in self.execution_history 
-                                 if s['executed_at'].date() == datetime.utcnow().date()])
-            success_rate_24h = self._calculate_success_rate_24h()
-        finally:
-            db.close()
-            
-        return {
-            'queue_size': len(self.approved_signals),
-            'pending_signals': len([s for s in self.approved_signals.values() if not s['executed']]),
-            'executed_today': executed_today,
-            'success_rate_24h': success_rate_24h
-        }
-        
-    def _calculate_success_rate_24h(self) -> float:
-        """Calcula tasa de éxito últimas 24 horas."""
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_executions = [s for s in self.execution_history 
-                            if s['executed_at'] > yesterday]
-        
-        if not recent_executions:
-            return 0.0
-            
-        successful = len([s for s in recent_executions if s['success']])
-        return (successful / len(recent_executions)) * 100
+from app.services.automation_users import (
+    AutomationUsers, MarketVerdict, UserAutomation, fan_out, settings_from_config
+)
+from app.services.signal_queue import SignalQueue
+from app.ml.llm_verdict_cache import get_llm_verdict_cache
 
 
 class AutoExecutionService:
-    """Servicio principal de ejecución automática de señales."""
+    """
+    Servicio principal de ejecución automática de señales.
+
+    Un único bucle para todos los usuarios suscritos: el análisis de cada símbolo se
+    hace una vez por ciclo y se reparte en memoria según la configuración de cada uno.
+    """
     
     def __init__(self):
-        self.signal_queue = SignalQueue()
+        from app.config import settings
+        self.users = AutomationUsers(self._fetch_user_settings, settings.automation_settings_ttl_seconds)
         # self.signal_generator se inicializará cuando se necesite
         self.execution_engine = get_execution_engine()
         self.running = False
         self.execution_task: Optional[asyncio.Task] = None
-        self.check_interval = 30  # segundos
-        self.max_daily_trades = 10
-        self.emergency_stop = False
+        self.emergency_stop = False  # Parada global (todos los usuarios)
+        self.emergency_stopped: set = set()  # Usuarios detenidos por parada de emergencia
         self.scan_logs: List[Dict] = []
+        self.exposure_by_user: Dict[int, Dict[str, float]] = {}  # USD por símbolo (wallet de práctica)
+        
+    @property
+    def open_exposure(self) -> Dict[str, float]:
+        """Exposición abierta agregada de todos los usuarios (USD por símbolo)"""
+        total: Dict[str, float] = {}
+        for exposure in self.exposure_by_user.values():
+            for symbol, usd in exposure.items():
+                total[symbol] = total.get(symbol, 0.0) + usd
+        return total
+        
+    @property
+    def signal_queue(self) -> SignalQueue:
+        """Cola del único usuario suscrito (compatibilidad); con varios usar queue_for()"""
+        users = self.users.values()
+        return users[0].signal_queue if len(users) == 1 else SignalQueue()
+        
+    def queue_for(self, user_id: int) -> SignalQueue:
+        user = self.users.get(user_id)
+        return user.signal_queue if user else SignalQueue()
+        
+    def is_running(self, user_id: int) -> bool:
+        return self.running and user_id in self.users
+        
+    def invalidate_settings(self, user_id: Optional[int] = None):
+        """La configuración cambió en BD: recargarla en el próximo ciclo"""
+        self.users.invalidate(user_id)
         
     def add_scan_log(self, symbol: str, message: str):
         self.scan_logs.append({
@@ -188,10 +79,10 @@ class AutoExecutionService:
         # También imprimir en los logs del servidor para mayor visibilidad
         logger.info(f"🔍 [Escáner IA - {symbol}] {message}")
         
-    async def start_automation(self, user_id: int, settings: Dict) -> bool:
-        """Inicia el servicio de automatización."""
-        if self.running:
-            logger.warning("⚠️ Automatización ya está activa")
+    async def start_automation(self, user_id: int, settings: Dict, persist: bool = True) -> bool:
+        """Suscribe un usuario a la automatización (arranca el bucle si no corría)."""
+        if self.is_running(user_id):
+            logger.warning(f"⚠️ Automatización ya está activa para usuario {user_id}")
             return False
             
         # Validar configuración
@@ -199,65 +90,81 @@ class AutoExecutionService:
             logger.error("❌ Configuración inválida")
             return False
             
-        # Cargar configuración de usuario
-        await self._load_user_settings(user_id)
+        # La configuración de BD se carga en lote en el próximo ciclo
+        self.users.add(user_id, settings)
+        self.emergency_stopped.discard(user_id)
         
-        self.user_id = user_id
-        self.running = True
-        self.emergency_stop = False
-        self.execution_task = asyncio.create_task(self._automation_loop())
+        if not self.running:
+            self.running = True
+            self.emergency_stop = False
+            self.execution_task = asyncio.create_task(self._automation_loop())
         
         # Persistir estado activo en la base de datos
-        await self._update_enabled_status(user_id, True)
+        if persist:
+            await self._update_enabled_status(user_id, True)
         
-        logger.info(f"🚀 Automatización iniciada para usuario {user_id}")
+        logger.info(f"🚀 Automatización iniciada para usuario {user_id} ({len(self.users)} usuarios activos)")
         return True
         
-    async def stop_automation(self) -> bool:
-        """Detiene el servicio de automatización."""
+    async def stop_automation(self, user_id: Optional[int] = None, emergency: bool = False) -> bool:
+        """Da de baja a un usuario (o a todos si user_id es None); el bucle para sin usuarios."""
         if not self.running:
             return False
             
-        self.running = False
-        
-        if self.execution_task:
-            self.execution_task.cancel()
-            try:
-                await self.execution_task
-            except asyncio.CancelledError:
-                pass
-                
-        # Persistir estado inactivo en la base de datos
-        if hasattr(self, 'user_id'):
-            await self._update_enabled_status(self.user_id, False)
+        user_ids = [u.user_id for u in self.users.values()] if user_id is None else [user_id]
+        if user_id is not None and user_id not in self.users:
+            return False
             
-        logger.info("🛑 Automatización detenida")
+        for uid in user_ids:
+            self.users.remove(uid)
+            self.exposure_by_user.pop(uid, None)
+            # Persistir estado inactivo en la base de datos
+            await self._update_enabled_status(uid, False)
+            if emergency:
+                self.emergency_stopped.add(uid)
+                logger.warning(f"🚨 Parada de emergencia para usuario {uid}")
+                
+        if not len(self.users):
+            self.running = False
+            if self.execution_task and self.execution_task is not asyncio.current_task():
+                self.execution_task.cancel()
+                try:
+                    await self.execution_task
+                except asyncio.CancelledError:
+                    pass
+            logger.info("🛑 Automatización detenida")
         return True
         
     async def _automation_loop(self):
-        """Bucle principal de automatización."""
+        """Bucle principal de automatización (compartido por todos los usuarios)."""
         logger.info("🔄 Iniciando bucle de automatización")
         
-        while self.running and not self.emergency_stop:
+        while self.running and not self.emergency_stop and len(self.users):
             try:
-                # Recargar configuración en caliente desde la base de datos para capturar mutaciones
-                if hasattr(self, 'user_id'):
-                    await self._load_user_settings(self.user_id)
+                now = time.monotonic()
+                
+                # Recargar solo la configuración invalidada (mutaciones, cambios en la API) o caducada
+                reloaded = self.users.refresh(now)
+                if reloaded:
+                    logger.info(f"⚙️ Configuración recargada de BD para {len(reloaded)} usuario(s)")
                     
-                # Verificar condiciones de parada
-                if self._should_stop_automation():
-                    logger.warning("⚠️ Condiciones de parada detectadas")
-                    await self.stop_automation()
-                    break
+                # Verificar condiciones de parada por usuario
+                for user in self.users.values():
+                    if self._should_stop_automation(user):
+                        logger.warning(f"⚠️ Condiciones de parada detectadas para usuario {user.user_id}")
+                        await self.stop_automation(user.user_id)
+                        
+                due = self.users.due(now)
+                if due:
+                    # Un análisis por símbolo para todos los usuarios pendientes
+                    await self._generate_new_signals(due)
+                    self.users.schedule(due, now)
                     
-                # Generar nuevas señales
-                await self._generate_new_signals()
-                
                 # Ejecutar señales pendientes
                 await self._execute_pending_signals()
                 
-                # Esperar siguiente ciclo
-                await asyncio.sleep(self.check_interval)
+                # Esperar al próximo usuario pendiente
+                await asyncio.sleep(self.users.next_wakeup())
                 
             except asyncio.CancelledError:
                 logger.info("📋 Bucle de automatización cancelado")
@@ -265,9 +172,17 @@ class AutoExecutionService:
             except Exception as e:
                 logger.error(f"❌ Error en bucle de automatización: {e}")
                 await asyncio.sleep(5)  # Esperar antes de reintentar
+        
+        self.running = False
                 
-    async def _scan_single_symbol(self, symbol: str):
-        """Escanea un único símbolo de forma asíncrona para procesamiento paralelo concurrente."""
+    async def _scan_single_symbol(self, symbol: str, users: Optional[List[UserAutomation]] = None) -> Optional[MarketVerdict]:
+        """
+        Escanea un único símbolo de forma asíncrona para procesamiento paralelo concurrente.
+        
+        El análisis (generador técnico + SmartPool) se hace una vez y el veredicto se
+        reparte en memoria entre `users` (por defecto, todos los suscritos).
+        """
+        users = self.users.values() if users is None else users
         try:
             # 1. Obtener pre-señal base del generador técnico
             from app.ml.signal_generator import get_signal_generator
@@ -277,31 +192,21 @@ class AutoExecutionService:
             
             if not base_signal:
                 self.add_scan_log(symbol, "Análisis técnico: Señal neutral (confianza insuficiente)")
-                return
+                return None
             
             action = base_signal.get('type', 'HOLD').upper()
             confidence = base_signal.get('confidence', 0)
             
             if action == "HOLD":
                 self.add_scan_log(symbol, "Análisis técnico: HOLD | Sin alineación clara de timeframes.")
-                return
+                return None
                 
-            # Verificar si el tipo de mercado está deshabilitado granularmente
-            is_spot = action in ('BUY', 'SELL')
-            is_futures = action in ('LONG', 'SHORT')
-            
-            spot_enabled = self.settings.get('spot_enabled', True)
-            futures_enabled = self.settings.get('futures_enabled', True)
-            
-            if is_spot and not spot_enabled:
-                self.add_scan_log(symbol, "IA Spot pausada por el usuario")
-                logger.info(f"⏸️ [IA Spot] Señal técnica {action} para {symbol} descartada porque la IA Spot está pausada.")
-                return
-                
-            if is_futures and not futures_enabled:
-                self.add_scan_log(symbol, "IA Futuros pausada por el usuario")
-                logger.info(f"⏸️ [IA Futuros] Señal técnica {action} para {symbol} descartada porque la IA Futuros está pausada.")
-                return
+            # Sin consultar al SmartPool si ningún usuario acepta este tipo de mercado
+            if users and not any(user.market_enabled(action) for user in users):
+                market = "Spot" if action in ('BUY', 'SELL') else "Futuros"
+                self.add_scan_log(symbol, f"IA {market} pausada por todos los usuarios")
+                logger.info(f"⏸️ [IA {market}] Señal técnica {action} para {symbol} descartada porque la IA {market} está pausada.")
+                return None
                 
             # 2. Solicitar 'High-Confidence Institutional Analysis' al SmartPool
             from app.ml.llm_connector import get_llm_manager
@@ -320,7 +225,8 @@ class AutoExecutionService:
                         current_price=base_signal.get('current_price', 0),
                         indicators=indicators,
                         patterns=patterns,
-                        recent_signals=[] 
+                        recent_signals=[],
+                        candle_interval='1h'  # Mismo timeframe que los indicadores del prompt
                     ),
                     timeout=10.0
                 )
@@ -332,6 +238,9 @@ class AutoExecutionService:
                 self.add_scan_log(symbol, f"❌ Error en validación IA: {str(e)}")
             
             signal = base_signal.copy()
+            if smartpool_analysis and smartpool_analysis.get('cached'):
+                self.add_scan_log(symbol, "♻️ Veredicto IA reutilizado (mismo estado de mercado en la vela actual)")
+            
             if smartpool_analysis:
                 logger.info(f"🧠 SmartPool validó {symbol}: {smartpool_analysis.get('signal')} con {smartpool_analysis.get('confidence')}%")
                 # Normalizar el action: BUY/LONG -> BUY, SELL/SHORT -> SELL, resto HOLD
@@ -347,72 +256,72 @@ class AutoExecutionService:
             final_confidence = signal.get('confidence', 0)
             reason = signal.get('reasoning', ["Sin detalles"])[0]
             
-            # Doble verificación posterior al SmartPool
-            is_spot_final = raw_action in ('BUY', 'SELL')
-            is_futures_final = raw_action in ('LONG', 'SHORT')
-            
-            if is_spot_final and not spot_enabled:
-                self.add_scan_log(symbol, "IA Spot pausada por el usuario")
-                logger.info(f"⏸️ [IA Spot] Veredicto SmartPool {raw_action} para {symbol} descartado porque la IA Spot está pausada.")
-                return
-                
-            if is_futures_final and not futures_enabled:
-                self.add_scan_log(symbol, "IA Futuros pausada por el usuario")
-                logger.info(f"⏸️ [IA Futuros] Veredicto SmartPool {raw_action} para {symbol} descartado porque la IA Futuros está pausada.")
-                return
-            
             self.add_scan_log(symbol, f"Resultado SmartPool: {final_action} (Confianza: {final_confidence}%) | {reason}")
             
+            verdict = MarketVerdict(symbol=symbol, signal=signal, raw_action=raw_action)
+            
             # Descartar si el veredicto final es HOLD
             if final_action == "HOLD":
-                return
+                return verdict
                 
-            # Verificar si ya está en cola
-            if symbol in self.signal_queue.approved_signals:
+            # Repartir el veredicto: filtros, tiers, mercado y cola de cada usuario (en memoria)
+            outcome = fan_out(verdict, users)
+            approved = outcome.get('approved', [])
+            if approved:
+                self.add_scan_log(symbol, f"🔥 ¡SEÑAL APROBADA! Añadida a cola para ejecución: {final_action} ({len(approved)} usuario(s))")
+            elif outcome.get('queued'):
                 self.add_scan_log(symbol, f"Señal {final_action} ya se encuentra en cola de ejecución.")
-                return
-                
-            # Añadir a cola si cumple criterios
-            settings = await self._get_symbol_settings(symbol)
-            if self._signal_meets_criteria(signal, settings):
-                self.signal_queue.add_approved_signal(signal, settings)
-                self.add_scan_log(symbol, f"🔥 ¡SEÑAL APROBADA! Añadida a cola para ejecución: {final_action}")
+            elif outcome.get('market_disabled') and not outcome.get('filters'):
+                market = "Spot" if raw_action in ('BUY', 'SELL') else "Futuros"
+                self.add_scan_log(symbol, f"IA {market} pausada por el usuario")
             else:
                 self.add_scan_log(symbol, f"⚠️ Señal descartada por filtros de configuración: {final_action} (Confianza: {final_confidence}%)")
+            return verdict
                 
         except Exception as e:
             logger.error(f"❌ Error generando señal para {symbol}: {e}")
             self.add_scan_log(symbol, f"❌ Error en análisis: {str(e)}")
+            return None
 
-    async def _generate_new_signals(self):
+    async def _generate_new_signals(self, users: Optional[List[UserAutomation]] = None) -> List[MarketVerdict]:
         """Genera nuevas señales para símbolos configurados en paralelo concurrentemente."""
         # Obtener símbolos configurados para automación
         symbols = await self._get_automation_symbols()
         if not symbols:
-            return
+            return []
             
         # Lanzar escaneo paralelo concurrente (Stealth Performance Boost)
-        tasks = [self._scan_single_symbol(symbol) for symbol in symbols]
-        await asyncio.gather(*tasks)
+        tasks = [self._scan_single_symbol(symbol, users) for symbol in symbols]
+        verdicts = await asyncio.gather(*tasks)
+        return [v for v in verdicts if v is not None]
                 
-    async def _execute_pending_signals(self):
-        """Ejecuta señales pendientes en la cola."""
-        executable_signals = self.signal_queue.get_executable_signals()
+    async def _execute_pending_signals(self, users: Optional[List[UserAutomation]] = None):
+        """Ejecuta las señales pendientes de cada usuario (usuarios en paralelo, un precio por símbolo)."""
+        users = self.users.values() if users is None else users
+        prices: Dict[str, asyncio.Future] = {}
+        await asyncio.gather(*(self._execute_user_signals(user, prices) for user in users))
+        
+    async def _execute_user_signals(self, user: UserAutomation, prices: Optional[Dict[str, asyncio.Future]] = None):
+        """Ejecuta señales pendientes en la cola de un usuario."""
+        prices = {} if prices is None else prices
+        executable_signals = user.signal_queue.get_executable_signals()
         
         for signal_data in executable_signals:
             try:
                 symbol = signal_data['signal']['symbol']
                 
                 # Validar límites diarios
-                if not self._check_daily_limits(symbol):
-                    logger.warning(f"⚠️ Límite diario alcanzado para {symbol}")
-                    continue
+                if not user.can_trade():
+                    logger.warning(f"⚠️ Límite diario alcanzado para usuario {user.user_id} ({user.max_daily_trades} trades)")
+                    break
                     
                 # Ejecutar orden
-                success = await self._execute_signal_order(signal_data)
+                success = await self._execute_signal_order(signal_data, user, prices)
+                if success:
+                    user.record_trade()
                 
                 # Marcar como ejecutada
-                self.signal_queue.mark_executed(symbol, success)
+                user.signal_queue.mark_executed(symbol, success)
                 
                 # Pequeña pausa entre ejecuciones
                 await asyncio.sleep(1)
@@ -420,10 +329,20 @@ class AutoExecutionService:
             except Exception as e:
                 logger.error(f"❌ Error ejecutando señal: {e}")
                 
-    async def _execute_signal_order(self, signal_data: Dict) -> bool:
+    async def _market_price(self, symbol: str, prices: Dict[str, asyncio.Future]) -> Optional[float]:
+        """Precio real de Binance compartido por todas las ejecuciones de la ronda"""
+        if symbol not in prices:
+            from app.infrastructure.binance.client import get_binance_client
+            client = get_binance_client()
+            prices[symbol] = asyncio.ensure_future(asyncio.to_thread(client.get_price, symbol))
+        return await prices[symbol]
+                
+    async def _execute_signal_order(self, signal_data: Dict, user: UserAutomation,
+                                    prices: Optional[Dict[str, asyncio.Future]] = None) -> bool:
         """Ejecuta orden basada en señal con datos reales y aprendizaje."""
         signal = signal_data['signal']
         symbol = signal['symbol']
+        prices = {} if prices is None else prices
         
         # Determinar lado de la orden
         # El generador emite type='LONG'/'SHORT', el LLM puede emitir 'BUY'/'SELL'
@@ -435,8 +354,8 @@ class AutoExecutionService:
         is_spot_trade = original_action in ('BUY', 'SELL') or action in ('BUY', 'SELL')
         is_futures_trade = original_action in ('LONG', 'SHORT') or action in ('LONG', 'SHORT')
         
-        spot_enabled = self.settings.get('spot_enabled', True)
-        futures_enabled = self.settings.get('futures_enabled', True)
+        spot_enabled = user.settings.get('spot_enabled', True)
+        futures_enabled = user.settings.get('futures_enabled', True)
         
         if is_spot_trade and not spot_enabled:
             logger.warning(f"⏸️ [IA Spot] Abortando ejecución automática para {symbol} porque la IA Spot está pausada en caliente.")
@@ -447,16 +366,14 @@ class AutoExecutionService:
             return False
         
         # Calcular tamaño de posición
-        quantity = await self._calculate_position_size(symbol, signal)
+        quantity = await self._calculate_position_size(symbol, signal, user)
         
         if quantity <= 0:
             return False
             
         try:
             # Obtener precio real del mercado
-            from app.infrastructure.binance.client import get_binance_client
-            client = get_binance_client()
-            real_price = await asyncio.to_thread(client.get_price, symbol)
+            real_price = await self._market_price(symbol, prices)
             
             if not real_price:
                 logger.error(f"❌ No se pudo obtener precio real para {symbol}")
@@ -467,9 +384,10 @@ class AutoExecutionService:
             
             # Si estamos en modo práctica, realizar deducciones/depósitos en caliente en la wallet virtual del usuario
             is_practice = signal_data['params'].get('practice_mode_only', True)
+            excursion = None
             if is_practice:
-                user_id = self.user_id if hasattr(self, 'user_id') else 1
-                wallet_success = await self._update_practice_wallet_balance(
+                user_id = user.user_id
+                wallet_success, excursion = await self._update_practice_wallet_balance(
                     user_id=user_id,
                     symbol=symbol,
                     side=side,
@@ -489,7 +407,8 @@ class AutoExecutionService:
                 side=side,
                 quantity=quantity,
                 entry_price=real_price,
-                signal_data=signal_data
+                signal_data=signal_data,
+                excursion=excursion
             )
             
             return True
@@ -498,10 +417,13 @@ class AutoExecutionService:
             logger.error(f"❌ Error ejecutando orden para {symbol}: {e}")
             return False
 
-    async def _update_practice_wallet_balance(self, user_id: int, symbol: str, side: str, quantity: float, price: float) -> bool:
+    async def _update_practice_wallet_balance(self, user_id: int, symbol: str, side: str, quantity: float, price: float) -> Tuple[bool, Any]:
         """
         Actualiza el saldo de la wallet de práctica ante cada compra/venta del bot IA
         y registra persistentemente la operación en el historial (virtual_trades) con strategy='AI_AUTO'.
+        
+        Returns:
+            (éxito, resumen MAE/MFE de la venta o None)
         """
         db = SessionLocal()
         try:
@@ -525,7 +447,7 @@ class AutoExecutionService:
                     logger.info(f"💰 [IA AUTO] Compra: Descontados {total_amount + fee:.2f} USDT. Sumados {quantity} {base_asset}")
                 else:
                     logger.warning(f"⚠️ [IA AUTO] Saldo insuficiente en práctica para comprar {symbol}")
-                    return False
+                    return False, None
             elif side.upper() == "SELL":
                 asset_balance = float(balances.get(base_asset, 0))
                 if asset_balance >= quantity:
@@ -538,7 +460,7 @@ class AutoExecutionService:
                     logger.info(f"💰 [IA AUTO] Venta: Descontados {quantity} {base_asset}. Sumados {total_amount - fee:.2f} USDT")
                 else:
                     logger.warning(f"⚠️ [IA AUTO] Saldo insuficiente en práctica para vender {symbol}")
-                    return False
+                    return False, None
             
             # Guardar balances actualizados
             wallet.balances = json_lib.dumps(balances)
@@ -570,17 +492,33 @@ class AutoExecutionService:
             )
             db.add(new_trade)
             db.commit()
+            from app.ml.trade_metrics import closes_position, get_trade_metrics
+            if closes_position(new_trade.side, new_trade.market_type, new_trade.reason):
+                get_trade_metrics().record(user_id, "practice", pnl_amount, "AI_AUTO", symbol)
+            # MAE/MFE por tick de la posición spot: la venta solo cierra la excursión
+            # si vacía el activo; una venta parcial la consulta y la sigue
+            from app.services.excursion_tracker import get_excursion_tracker, spot_key
+            tracker = get_excursion_tracker()
+            excursion = None
+            if side.upper() == "BUY":
+                tracker.scale_in(
+                    spot_key(user_id, symbol), symbol, "LONG", price, quantity, current_asset_balance
+                )
+            elif base_asset in balances:
+                excursion = tracker.peek(spot_key(user_id, symbol), price)
+            else:
+                excursion = tracker.close(spot_key(user_id, symbol), price)
             logger.success(f"📈 [IA AUTO] Guardado trade en historial de práctica: {side} {quantity} {symbol} @ ${price}")
-            return True
+            return True, excursion
         except Exception as e:
             logger.error(f"❌ Error actualizando wallet de práctica en auto-trading: {e}")
             db.rollback()
-            return False
+            return False, None
         finally:
             db.close()
             
     async def _record_trade_for_learning(self, symbol: str, side: str, quantity: float, 
-                                        entry_price: float, signal_data: Dict):
+                                        entry_price: float, signal_data: Dict, excursion=None):
         """Registra trade para aprendizaje de IA con datos reales."""
         try:
             # Importar trading agent para aprendizaje
@@ -610,7 +548,8 @@ class AutoExecutionService:
                 exit_price=entry_price,  # Se actualizará cuando se cierre
                 pnl=0.0,  # Se calculará cuando se cierre
                 signals_used=signals_used,
-                patterns_detected=patterns_detected
+                patterns_detected=patterns_detected,
+                excursion=excursion
             )
             
             # Añadir marcador al gráfico
@@ -652,47 +591,29 @@ class AutoExecutionService:
             
         return True
         
-    async def _load_user_settings(self, user_id: int):
-        """Carga configuración de usuario desde BD."""
+    def _fetch_user_settings(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """Carga en una sola consulta la configuración de BD de varios usuarios."""
         db = SessionLocal()
         try:
             from app.infrastructure.database.models import AutomationConfig
-            config = db.query(AutomationConfig).filter(AutomationConfig.user_id == user_id).first()
-            if config:
-                self.settings = {
-                    'max_daily_trades': config.max_daily_trades,
-                    'max_position_size': config.max_position_size,
-                    'min_signal_confidence': config.min_signal_confidence,
-                    'allowed_tiers': config.allowed_tiers or ['S', 'A'],
-                    'risk_level': config.risk_level,
-                    'pause_on_high_volatility': config.pause_on_high_volatility,
-                    'check_interval_seconds': config.check_interval_seconds,
-                    'practice_mode_only': config.practice_mode_only,
-                    'spot_enabled': config.spot_enabled if hasattr(config, 'spot_enabled') else True,
-                    'futures_enabled': config.futures_enabled if hasattr(config, 'futures_enabled') else True
-                }
-                self.check_interval = config.check_interval_seconds or 30
-                self.max_daily_trades = config.max_daily_trades or 10
-                logger.info(f"⚙️ Configuración recargada de BD para usuario {user_id}: Confianza Mínima={self.settings['min_signal_confidence']}%, Posición Máxima=${self.settings['max_position_size']} USD, Modo Práctica={self.settings['practice_mode_only']}, Spot={self.settings['spot_enabled']}, Futuros={self.settings['futures_enabled']}")
-            else:
-                self.settings = {
-                    'max_daily_trades': 10,
-                    'max_position_size': 50.0,
-                    'min_signal_confidence': 70,
-                    'allowed_tiers': ['S', 'A'],
-                    'risk_level': 'moderate',
-                    'pause_on_high_volatility': True,
-                    'check_interval_seconds': 30,
-                    'practice_mode_only': True,
-                    'spot_enabled': True,
-                    'futures_enabled': True
-                }
-                self.check_interval = 30
-                self.max_daily_trades = 10
-                logger.warning(f"⚠️ No se encontró AutomationConfig para usuario {user_id}. Usando valores por defecto.")
+            configs = db.query(AutomationConfig).filter(AutomationConfig.user_id.in_(user_ids)).all()
+            return {int(config.user_id): settings_from_config(config) for config in configs}
+        except Exception as e:
+            logger.error(f"❌ Error cargando configuración de automatización: {e}")
+            return {}
         finally:
             db.close()
         
+    async def get_user_state(self, user_id: int) -> UserAutomation:
+        """Estado del usuario suscrito o, si no lo está, uno temporal con su configuración de BD."""
+        user = self.users.get(user_id)
+        if user is None:
+            user = UserAutomation(user_id)
+            loaded = self._fetch_user_settings([user_id])
+            if user_id in loaded:
+                user.settings.update(loaded[user_id])
+        return user
+        
     async def _update_enabled_status(self, user_id: int, enabled: bool):
         """Actualiza el estado 'enabled' en la base de datos de manera persistente."""
         db = SessionLocal()
@@ -731,34 +652,16 @@ class AutoExecutionService:
             'DEXEUSDT'
         ]
         
-    async def _get_symbol_settings(self, symbol: str) -> Dict:
+    async def _get_symbol_settings(self, symbol: str, user_id: Optional[int] = None) -> Dict:
         """Retorna configuración para símbolo específico basada en configuración de usuario."""
-        if hasattr(self, 'settings') and self.settings:
-            return {
-                'min_confidence': self.settings.get('min_signal_confidence', 70),
-                'allowed_tiers': self.settings.get('allowed_tiers', ['S', 'A']),
-                'max_position_size': self.settings.get('max_position_size', 50.0),
-                'practice_mode_only': self.settings.get('practice_mode_only', True)
-            }
-        return {
-            'min_confidence': 70,
-            'allowed_tiers': ['S', 'A'],
-            'max_position_size': 50.0,
-            'practice_mode_only': True
-        }
-        
-    def _signal_meets_criteria(self, signal: Dict, settings: Dict) -> bool:
-        """Verifica si señal cumple criterios de configuración."""
-        confidence = signal.get('confidence', 0)
-        tier = signal.get('tier', 'C')
+        if user_id is not None:
+            return (await self.get_user_state(user_id)).symbol_params()
+        return UserAutomation(0).symbol_params()
         
-        return (confidence >= settings['min_confidence'] and 
-                tier in settings['allowed_tiers'])
-                
-    def _should_stop_automation(self) -> bool:
-        """Verifica si se debe detener automatización."""
+    def _should_stop_automation(self, user: UserAutomation) -> bool:
+        """Verifica si se debe detener la automatización de un usuario."""
         # Verificar parada de emergencia
-        if self.emergency_stop:
+        if self.emergency_stop or user.emergency_stop:
             return True
             
         # Verificar pérdidas diarias
@@ -785,12 +688,28 @@ class AutoExecutionService:
         # Por ahora: máximo 5 pérdidas consecutivas
         return False
         
-    def _check_daily_limits(self, symbol: str) -> bool:
-        """Verifica límites diarios de trading."""
-        # TODO: Implementar verificación de límites
-        return True
-        
-    async def _calculate_position_size(self, symbol: str, signal: Dict) -> float:
+    async def _open_exposure(self, user_id: int) -> Dict[str, float]:
+        """Exposición abierta en USD por símbolo según la wallet de práctica del usuario."""
+        from app.services.correlation_matrix import get_correlation_service
+        matrix = get_correlation_service().matrix
+        db = SessionLocal()
+        try:
+            from app.api.v1.practice import get_or_create_wallet
+            wallet = get_or_create_wallet(db, user_id)
+            balances = json.loads(wallet.balances) if wallet.balances else {}
+            exposure = {}
+            for asset, qty in balances.items():
+                price = matrix.last_price(f"{asset.upper()}USDT")
+                if price and float(qty) > 0:
+                    exposure[f"{asset.upper()}USDT"] = float(qty) * price
+            self.exposure_by_user[user_id] = exposure
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer la exposición abierta: {e}")
+        finally:
+            db.close()
+        return self.exposure_by_user.get(user_id, {})
+
+    async def _calculate_position_size(self, symbol: str, signal: Dict, user: UserAutomation) -> float:
         """Calcula tamaño de posición (quantity) basado en señal, precio actual y configuración de la DB."""
         try:
             price = signal.get('current_price') or signal.get('entry_price')
@@ -808,9 +727,30 @@ class AutoExecutionService:
                 return 0.0
                 
             # Obtener tamaño de posición máximo en USD de la configuración
-            max_position_size_usd = 50.0
-            if hasattr(self, 'settings') and self.settings:
-                max_position_size_usd = self.settings.get('max_position_size', 50.0)
+            max_position_size_usd = user.settings.get('max_position_size', 50.0)
+            
+            # Las compras de activos correlacionados comparten el presupuesto del cluster
+            action = signal.get('action', signal.get('type', 'HOLD')).upper()
+            if action in ('BUY', 'LONG'):
+                from app.services.correlation_matrix import get_correlation_service
+                budget = get_correlation_service().available_budget(
+                    symbol, await self._open_exposure(user.user_id), max_position_size_usd
+                )
+                if budget < max_position_size_usd:
+                    logger.info(f"🧮 Presupuesto de cluster para {symbol}: ${budget:.2f} de ${max_position_size_usd}")
+                if budget <= 0:
+                    return 0.0
+                max_position_size_usd = budget
+                
+                # Kelly del agente (con Monte Carlo): el presupuesto es el techo
+                from app.ml.trading_agent import get_trading_agent
+                sizing = get_trading_agent().size_position(max_position_size_usd, signal.get('confidence', 50))
+                if sizing.position_size_usd <= 0:
+                    logger.warning(f"⚠️ Kelly descarta la entrada en {symbol}: {sizing.reasoning}")
+                    return 0.0
+                if sizing.position_size_usd < max_position_size_usd:
+                    logger.info(f"🎲 Kelly/Monte Carlo reduce {symbol} a ${sizing.position_size_usd:.2f}: {sizing.reasoning}")
+                max_position_size_usd = min(max_position_size_usd, sizing.position_size_usd)
                 
             # Calcular cantidad
             quantity = max_position_size_usd / price
@@ -838,18 +778,25 @@ class AutoExecutionService:
             logger.error(f"❌ Error al calcular tamaño de posición para {symbol}: {e}")
             return 0.0
         
-    def get_automation_status(self) -> Dict:
-        """Retorna estado completo del servicio de automatización."""
+    def get_automation_status(self, user_id: Optional[int] = None) -> Dict:
+        """Retorna estado del servicio de automatización (del usuario si se indica)."""
+        user = self.users.get(user_id) if user_id is not None else None
+        running = self.is_running(user_id) if user_id is not None else self.running
+        emergency_stop = self.emergency_stop or (user_id in self.emergency_stopped)
+        queue = user.signal_queue if user else (self.signal_queue if user_id is None else SignalQueue())
         return {
-            'running': self.running,
-            'emergency_stop': self.emergency_stop,
-            'queue_status': self.signal_queue.get_queue_status(),
-            'check_interval': self.check_interval,
-            'uptime': datetime.utcnow().isoformat() if self.running else None,
+            'running': running,
+            'emergency_stop': emergency_stop,
+            'queue_status': queue.get_queue_status(),
+            'check_interval': user.check_interval if user else 30,
+            'active_users': len(self.users),
+            'trades_today': user.trades_today if user else 0,
+            'llm_verdict_cache': get_llm_verdict_cache().get_stats(),
+            'uptime': datetime.utcnow().isoformat() if running else None,
             'emergency_conditions': {
                 'daily_loss_limit': self._check_daily_loss_limit(),
                 'consecutive_losses': self._check_consecutive_losses(),
-                'manual_stop': self.emergency_stop
+                'manual_stop': emergency_stop
             }
         }
 
@@ -0,0 +1,225 @@
+"""
+SIC Ultra - Usuarios de la Automatización
+Estado por usuario del bot IA 24/7 sobre un único análisis de mercado compartido:
+- El veredicto de cada símbolo (generador técnico + SmartPool) se calcula una vez por ciclo
+- Se evalúa en memoria contra los filtros, tiers y límites de cada usuario suscrito
+- La configuración se cachea y solo se recarga de BD al invalidarse (o por TTL de respaldo)
+"""
+
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from app.services.signal_queue import SignalQueue
+
+
+DEFAULT_SETTINGS = {
+    'max_daily_trades': 10,
+    'max_position_size': 50.0,
+    'min_signal_confidence': 70,
+    'allowed_tiers': ['S', 'A'],
+    'risk_level': 'moderate',
+    'pause_on_high_volatility': True,
+    'check_interval_seconds': 30,
+    'practice_mode_only': True,
+    'spot_enabled': True,
+    'futures_enabled': True
+}
+
+SPOT_ACTIONS = ('BUY', 'SELL')
+FUTURES_ACTIONS = ('LONG', 'SHORT')
+
+
+def settings_from_config(config) -> Dict:
+    """AutomationConfig de BD -> dict de configuración (con valores por defecto)"""
+    return {
+        'max_daily_trades': config.max_daily_trades or DEFAULT_SETTINGS['max_daily_trades'],
+        'max_position_size': config.max_position_size or DEFAULT_SETTINGS['max_position_size'],
+        'min_signal_confidence': config.min_signal_confidence or DEFAULT_SETTINGS['min_signal_confidence'],
+        'allowed_tiers': config.allowed_tiers or ['S', 'A'],
+        'risk_level': config.risk_level or DEFAULT_SETTINGS['risk_level'],
+        'pause_on_high_volatility': config.pause_on_high_volatility,
+        'check_interval_seconds': config.check_interval_seconds or DEFAULT_SETTINGS['check_interval_seconds'],
+        'practice_mode_only': config.practice_mode_only,
+        'spot_enabled': getattr(config, 'spot_enabled', True),
+        'futures_enabled': getattr(config, 'futures_enabled', True)
+    }
+
+
+@dataclass
+class MarketVerdict:
+    """Veredicto compartido de un símbolo en un ciclo (independiente del usuario)"""
+    symbol: str
+    signal: Dict      # Señal final con 'action' normalizada a BUY/SELL/HOLD
+    raw_action: str   # Acción antes de normalizar: BUY/SELL (spot) o LONG/SHORT (futuros)
+
+    @property
+    def action(self) -> str:
+        return self.signal.get('action', 'HOLD')
+
+
+@dataclass
+class UserAutomation:
+    """Configuración, cola y límites diarios de un usuario suscrito"""
+    user_id: int
+    settings: Dict = field(default_factory=lambda: dict(DEFAULT_SETTINGS))
+    signal_queue: SignalQueue = field(default_factory=SignalQueue)
+    loaded_at: float = 0.0        # 0 = pendiente de (re)cargar desde BD
+    next_run: float = 0.0         # time.monotonic() del próximo ciclo del usuario
+    emergency_stop: bool = False
+    trades_today: int = 0
+    trades_day: Optional[date] = None
+
+    @property
+    def check_interval(self) -> int:
+        return int(self.settings.get('check_interval_seconds') or 30)
+
+    @property
+    def max_daily_trades(self) -> int:
+        return int(self.settings.get('max_daily_trades') or 10)
+
+    def market_enabled(self, action: str) -> bool:
+        """¿Acepta el usuario operaciones de este mercado (spot / futuros)?"""
+        action = action.upper()
+        if action in SPOT_ACTIONS:
+            return bool(self.settings.get('spot_enabled', True))
+        if action in FUTURES_ACTIONS:
+            return bool(self.settings.get('futures_enabled', True))
+        return True
+
+    def symbol_params(self) -> Dict:
+        """Parámetros de ejecución que acompañan a la señal en la cola"""
+        return {
+            'min_confidence': self.settings.get('min_signal_confidence', 70),
+            'allowed_tiers': self.settings.get('allowed_tiers', ['S', 'A']),
+            'max_position_size': self.settings.get('max_position_size', 50.0),
+            'practice_mode_only': self.settings.get('practice_mode_only', True)
+        }
+
+    def evaluate(self, verdict: MarketVerdict) -> Optional[str]:
+        """Motivo de descarte del veredicto para este usuario (None = aprobada)"""
+        if self.emergency_stop:
+            return 'emergency_stop'
+        if not self.market_enabled(verdict.raw_action):
+            return 'market_disabled'
+        if verdict.action == 'HOLD':
+            return 'hold'
+        if not self.signal_queue.would_accept(verdict.signal):
+            return 'queued'  # Ya hay una igual o más fuerte (o se ejecutó y no ha expirado)
+        if (verdict.signal.get('confidence', 0) < self.settings.get('min_signal_confidence', 70)
+                or verdict.signal.get('tier', 'C') not in self.settings.get('allowed_tiers', ['S', 'A'])):
+            return 'filters'
+        return None
+
+    def _roll_day(self, today: date):
+        if self.trades_day != today:
+            self.trades_day, self.trades_today = today, 0
+
+    def can_trade(self, today: Optional[date] = None) -> bool:
+        """Límite diario de trades del usuario (contador en memoria, se reinicia cada día UTC)"""
+        self._roll_day(today or datetime.utcnow().date())
+        return self.trades_today < self.max_daily_trades
+
+    def record_trade(self, today: Optional[date] = None):
+        self._roll_day(today or datetime.utcnow().date())
+        self.trades_today += 1
+
+
+def fan_out(verdict: MarketVerdict, users: Iterable[UserAutomation]) -> Dict[str, List[int]]:
+    """
+    Evaluar un veredicto compartido contra cada usuario y encolarlo en los que lo aprueban.
+
+    Devuelve los user_id agrupados por resultado ('approved' o el motivo de descarte).
+    """
+    outcome: Dict[str, List[int]] = {}
+    for user in users:
+        reason = user.evaluate(verdict)
+        if reason is None:
+            user.signal_queue.add_approved_signal(dict(verdict.signal), user.symbol_params())
+            reason = 'approved'
+        outcome.setdefault(reason, []).append(user.user_id)
+    return outcome
+
+
+class AutomationUsers:
+    """
+    Usuarios suscritos a la automatización con su configuración cacheada.
+
+    `loader(user_ids)` devuelve {user_id: settings} en una sola consulta; solo se llama
+    para los usuarios invalidados o con la caché más vieja que `ttl` segundos.
+    """
+
+    def __init__(self, loader: Callable[[List[int]], Dict[int, Dict]], ttl: float = 300.0):
+        self.loader = loader
+        self.ttl = ttl
+        self.users: Dict[int, UserAutomation] = {}
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.users
+
+    def values(self) -> List[UserAutomation]:
+        return list(self.users.values())
+
+    def get(self, user_id: int) -> Optional[UserAutomation]:
+        return self.users.get(user_id)
+
+    def add(self, user_id: int, settings: Optional[Dict] = None) -> UserAutomation:
+        """Suscribir (o re-suscribir) un usuario; su configuración se confirma en la próxima recarga"""
+        user = self.users.get(user_id) or UserAutomation(user_id)
+        if settings:
+            user.settings = {**DEFAULT_SETTINGS, **settings}
+        user.loaded_at = 0.0
+        user.next_run = 0.0
+        user.emergency_stop = False
+        self.users[user_id] = user
+        return user
+
+    def remove(self, user_id: int) -> Optional[UserAutomation]:
+        return self.users.pop(user_id, None)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Marcar la configuración como obsoleta (un usuario o todos)"""
+        targets = self.users.values() if user_id is None else filter(None, [self.users.get(user_id)])
+        for user in targets:
+            user.loaded_at = 0.0
+
+    def refresh(self, now: Optional[float] = None) -> List[int]:
+        """Recargar en lote la configuración obsoleta. Devuelve los user_id recargados"""
+        now = now if now is not None else time.monotonic()
+        stale = [u.user_id for u in self.users.values() if not u.loaded_at or now - u.loaded_at >= self.ttl]
+        if not stale:
+            return []
+        loaded = self.loader(stale)
+        for user_id in stale:
+            user = self.users.get(user_id)
+            if user is None:
+                continue
+            if user_id in loaded:
+                user.settings = {**DEFAULT_SETTINGS, **loaded[user_id]}
+            else:
+                logger.warning(f"⚠️ No se encontró AutomationConfig para usuario {user_id}. Usando configuración actual.")
+            user.loaded_at = now
+        return stale
+
+    def due(self, now: Optional[float] = None) -> List[UserAutomation]:
+        """Usuarios cuyo intervalo de revisión ya venció"""
+        now = now if now is not None else time.monotonic()
+        return [u for u in self.users.values() if not u.emergency_stop and u.next_run <= now]
+
+    def schedule(self, users: Iterable[UserAutomation], now: Optional[float] = None):
+        now = now if now is not None else time.monotonic()
+        for user in users:
+            user.next_run = now + user.check_interval
+
+    def next_wakeup(self, now: Optional[float] = None, minimum: float = 1.0) -> float:
+        """Segundos hasta el próximo usuario pendiente"""
+        now = now if now is not None else time.monotonic()
+        if not self.users:
+            return minimum
+        return max(minimum, min(u.next_run for u in self.users.values()) - now)
@@ -0,0 +1,363 @@
+"""
+SIC Ultra - Matriz de Correlación Rolling entre Activos
+
+Mantiene los retornos logarítmicos de las últimas `window` velas de todos
+los símbolos operados en una matriz ring buffer [vela, símbolo]:
+- Al cerrar cada vela (stream de klines) se añade una fila y sale la más
+  antigua; sumas y productos cruzados se actualizan en O(n²), sin recorrer
+  la ventana (re-sincronización exacta cada `window` filas contra la deriva)
+- Correlación, clusters (ρ >= umbral, enlace simple) y exposición por cluster
+
+El sizing usa available_budget: las posiciones de un mismo cluster
+(p.ej. ETH/SOL/BNB) comparten un único presupuesto de riesgo.
+"""
+
+import asyncio
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+from app.infrastructure.binance.streams import BinanceStream
+
+
+class RollingCorrelation:
+    """
+    Covarianza/correlación incremental sobre una ventana de velas alineadas.
+
+    Una fila se confirma cuando todos los símbolos cerraron esa vela; si llega
+    una vela posterior antes, la fila incompleta se confirma con retorno 0
+    para los símbolos que faltan (la ventana sigue alineada en el tiempo).
+    """
+
+    def __init__(self, symbols: Iterable[str], window: int = 168):
+        self.symbols: List[str] = [s.upper() for s in symbols]
+        self.window = window
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self._returns = np.zeros((window, n))
+        self._times = np.zeros(window)
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._count = 0
+        self._pos = 0
+        self._commits = 0
+        self._last_close: Dict[str, tuple] = {}
+        self._pending: Dict[float, Dict[str, float]] = {}
+        self.updated_at: Optional[float] = None
+
+    @property
+    def samples(self) -> int:
+        return self._count
+
+    def last_price(self, symbol: str) -> Optional[float]:
+        last = self._last_close.get(symbol.upper())
+        return last[1] if last else None
+
+    # === Actualización ===
+
+    def on_close(self, symbol: str, open_time: float, close: float) -> bool:
+        """
+        Registrar el cierre de una vela. Devuelve True si se confirmó alguna fila.
+        """
+        symbol = symbol.upper()
+        if symbol not in self._index or close <= 0:
+            return False
+        prev = self._last_close.get(symbol)
+        if prev is not None and open_time <= prev[0]:
+            return False  # Duplicado o fuera de orden
+        self._last_close[symbol] = (open_time, close)
+        if prev is None or (self.updated_at is not None and open_time <= self.updated_at):
+            return False  # Sin referencia, o la fila de esa vela ya se confirmó
+
+        self._pending.setdefault(open_time, {})[symbol] = math.log(close / prev[1])
+
+        committed = False
+        for t in sorted(self._pending):
+            row = self._pending[t]
+            if len(row) < len(self.symbols) and t >= open_time:
+                break
+            self._commit(t, np.array([row.get(s, 0.0) for s in self.symbols]))
+            del self._pending[t]
+            committed = True
+        return committed
+
+    def _commit(self, t: float, x: np.ndarray):
+        if self._count == self.window:
+            old = self._returns[self._pos]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        else:
+            self._count += 1
+        self._returns[self._pos] = x
+        self._times[self._pos] = t
+        self._pos = (self._pos + 1) % self.window
+        self._sum += x
+        self._cross += np.outer(x, x)
+        self.updated_at = t
+
+        self._commits += 1
+        if self._commits % self.window == 0:
+            self._resync()
+
+    def _resync(self):
+        """Recalcular las sumas exactas desde el buffer (deriva numérica)"""
+        rows = self._returns if self._count == self.window else self._returns[:self._count]
+        self._sum = rows.sum(axis=0)
+        self._cross = rows.T @ rows
+
+    def load_history(self, closes: Dict[str, Dict[float, float]]):
+        """
+        Reconstruir la ventana desde velas históricas {symbol: {open_time: close}}.
+
+        Solo se usan los tiempos presentes en todos los símbolos.
+        """
+        common = sorted(set.intersection(*(set(c) for c in closes.values()))) if closes else []
+        n = len(self.symbols)
+        self._returns = np.zeros((self.window, n))
+        self._times = np.zeros(self.window)
+        self._count = self._pos = 0
+        self._pending.clear()
+        self._last_close.clear()
+        if len(common) < 2 or set(closes) != set(self.symbols):
+            self._sum, self._cross = np.zeros(n), np.zeros((n, n))
+            return
+
+        prices = np.array([[closes[s][t] for s in self.symbols] for t in common[-(self.window + 1):]])
+        rows = np.diff(np.log(prices), axis=0)
+        times = common[-len(rows):]
+        self._count = len(rows)
+        self._returns[:self._count] = rows
+        self._times[:self._count] = times
+        self._pos = self._count % self.window
+        self._resync()
+        self._last_close = {s: (common[-1], closes[s][common[-1]]) for s in self.symbols}
+        self.updated_at = common[-1]
+
+    # === Consultas ===
+
+    def covariance(self) -> Optional[np.ndarray]:
+        k = self._count
+        if k < 3:
+            return None
+        mean = self._sum / k
+        return (self._cross - k * np.outer(mean, mean)) / (k - 1)
+
+    def correlation(self) -> Optional[np.ndarray]:
+        cov = self.covariance()
+        if cov is None:
+            return None
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        denom = np.outer(std, std)
+        corr = np.divide(cov, denom, out=np.zeros_like(cov), where=denom > 0)
+        np.fill_diagonal(corr, 1.0)
+        return np.clip(corr, -1.0, 1.0)
+
+    def clusters(self, threshold: float = 0.7) -> List[List[str]]:
+        """Componentes conexas con ρ >= threshold (los clusters más grandes primero)"""
+        corr = self.correlation()
+        if corr is None:
+            return [[s] for s in self.symbols]
+        linked = corr >= threshold
+        seen, groups = set(), []
+        for start in range(len(self.symbols)):
+            if start in seen:
+                continue
+            stack, group = [start], []
+            seen.add(start)
+            while stack:
+                i = stack.pop()
+                group.append(i)
+                for j in np.flatnonzero(linked[i]):
+                    if j not in seen:
+                        seen.add(j)
+                        stack.append(j)
+            groups.append(sorted(group))
+        groups.sort(key=lambda g: (-len(g), g[0]))
+        return [[self.symbols[i] for i in group] for group in groups]
+
+    def cluster_of(self, symbol: str, threshold: float = 0.7) -> List[str]:
+        symbol = symbol.upper()
+        for group in self.clusters(threshold):
+            if symbol in group:
+                return group
+        return [symbol]
+
+    def correlated_exposure(self, symbol: str, exposures: Dict[str, float], threshold: float = 0.7) -> float:
+        """
+        Exposición ya comprometida en el cluster de `symbol`, ponderada por
+        max(ρ, 0) contra ese símbolo (la propia posición cuenta entera).
+        """
+        symbol = symbol.upper()
+        exposures = {s.upper(): v for s, v in exposures.items()}
+        corr = self.correlation()
+        if corr is None or symbol not in self._index:
+            return float(exposures.get(symbol, 0.0))
+        i = self._index[symbol]
+        total = 0.0
+        for member in self.cluster_of(symbol, threshold):
+            weight = max(corr[i, self._index[member]], 0.0)
+            total += weight * exposures.get(member, 0.0)
+        return total
+
+
+class CorrelationService:
+    """Matriz rolling alimentada por el stream combinado de klines de todos los símbolos"""
+
+    def __init__(
+        self,
+        interval: str = "1h",
+        window: int = 168,
+        cluster_threshold: float = 0.7,
+        cluster_budget: float = 1.5
+    ):
+        self.interval = interval
+        self.window = window
+        self.cluster_threshold = cluster_threshold
+        self.cluster_budget = cluster_budget
+        self.matrix = RollingCorrelation([], window)
+        self.running = False
+        self._stream: Optional[BinanceStream] = None
+        self._task = None
+
+    @property
+    def symbols(self) -> List[str]:
+        return self.matrix.symbols
+
+    @property
+    def ready(self) -> bool:
+        return self.matrix.samples >= 3
+
+    async def start(self, symbols: Iterable[str] = ()):
+        """Backfill REST de la ventana y stream de klines en segundo plano"""
+        new = [s.upper() for s in symbols if s.upper() not in self.symbols]
+        if new:
+            self.matrix = RollingCorrelation(self.symbols + new, self.window)
+            await asyncio.to_thread(self._backfill)
+        if self.running:
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"🧮 Matriz de correlación iniciada ({self.interval}, {self.window} velas): {', '.join(self.symbols) or '-'}")
+
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def track(self, symbol: str):
+        """Añadir un símbolo en caliente (re-backfill de toda la ventana)"""
+        if symbol.upper() in self.symbols:
+            return
+        await self.start([symbol])
+        if self._stream is not None:
+            await self._stream.subscribe([self._stream_name(symbol.upper())])
+
+    def _backfill(self):
+        from app.infrastructure.binance.client import get_binance_client
+        client = get_binance_client()
+        closes = {}
+        for symbol in self.symbols:
+            candles = client.get_klines(symbol, self.interval, self.window + 2) or []
+            # La última vela sigue en formación: la cerrará el stream
+            closes[symbol] = {c["timestamp"].timestamp(): float(c["close"]) for c in candles[:-1]}
+        self.matrix.load_history(closes)
+        logger.debug(f"🧮 Backfill de correlación: {self.matrix.samples} velas alineadas")
+
+    def _stream_name(self, symbol: str) -> str:
+        return f"{symbol.lower()}@kline_{self.interval}"
+
+    def handle_event(self, data: Dict) -> bool:
+        kline = data.get("k", {})
+        if not kline.get("x"):
+            return False  # Vela aún abierta
+        return self.matrix.on_close(kline["s"], kline["t"] / 1000, float(kline["c"]))
+
+    async def _run_loop(self):
+        while self.running:
+            self._stream = BinanceStream(self._stream_name(s) for s in self.symbols)
+            try:
+                async for _, data in self._stream.messages():
+                    self.handle_event(data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Stream de klines (correlación) caído: {e}")
+            if self.running:
+                await asyncio.sleep(2)
+
+    # === Riesgo de cartera ===
+
+    def available_budget(self, symbol: str, exposures: Dict[str, float], max_position_usd: float) -> float:
+        """
+        USD disponibles para una nueva posición en `symbol`.
+
+        Un cluster entero dispone de cluster_budget × max_position_usd; la
+        exposición ya abierta en él (ponderada por correlación) lo consume.
+        """
+        if not self.ready:
+            return max_position_usd
+        used = self.matrix.correlated_exposure(symbol, exposures, self.cluster_threshold)
+        return max(0.0, min(max_position_usd, self.cluster_budget * max_position_usd - used))
+
+    def cluster_exposure(self, exposures: Dict[str, float]) -> List[Dict]:
+        exposures = {s.upper(): v for s, v in exposures.items()}
+        return [
+            {
+                "symbols": group,
+                "exposure_usd": round(sum(exposures.get(s, 0.0) for s in group), 2),
+            }
+            for group in self.matrix.clusters(self.cluster_threshold)
+        ]
+
+    def snapshot(self) -> Optional[Dict]:
+        corr = self.matrix.correlation()
+        if corr is None:
+            return None
+        symbols = self.symbols
+        return {
+            "interval": self.interval,
+            "window": self.window,
+            "samples": self.matrix.samples,
+            "symbols": symbols,
+            "matrix": np.round(corr, 4).tolist(),
+            "pairs": {
+                f"{symbols[i]}-{symbols[j]}": round(float(corr[i, j]), 4)
+                for i in range(len(symbols)) for j in range(i + 1, len(symbols))
+            },
+            "clusters": self.matrix.clusters(self.cluster_threshold),
+            "cluster_threshold": self.cluster_threshold,
+            "updated_at": datetime.utcfromtimestamp(self.matrix.updated_at).isoformat() if self.matrix.updated_at else None,
+        }
+
+    def get_status(self) -> Dict:
+        return {
+            "running": self.running,
+            "stream_connected": bool(self._stream and self._stream.connected),
+            "symbols": self.symbols,
+            "samples": self.matrix.samples,
+        }
+
+
+# === Singleton ===
+
+_correlation_service: Optional[CorrelationService] = None
+
+
+def get_correlation_service() -> CorrelationService:
+    global _correlation_service
+    if _correlation_service is None:
+        _correlation_service = CorrelationService(
+            interval=settings.correlation_interval,
+            window=settings.correlation_window,
+            cluster_threshold=settings.correlation_cluster_threshold,
+            cluster_budget=settings.correlation_cluster_budget
+        )
+    return _correlation_service
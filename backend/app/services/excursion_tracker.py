@@ -0,0 +1,317 @@
+"""
+SIC Ultra - Excursiones de Trades Abiertos (MAE/MFE en vivo)
+
+Sigue cada posición abierta (práctica spot/futuros, auto-ejecución) con el
+stream `<symbol>@aggTrade` y mantiene en O(1) por tick el máximo y mínimo
+alcanzados desde la entrada:
+- Al cerrar, entrega un ExcursionSummary precalculado a PostTradeAnalyzer
+  (sin descargar klines del periodo y con precisión de trade, no de vela)
+- Solo se suscribe a los símbolos con posiciones abiertas
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from app.config import settings
+from app.infrastructure.binance.streams import BinanceStream
+
+
+@dataclass
+class ExcursionSummary:
+    """Resumen de excursiones de un trade cerrado (lo consume PostTradeAnalyzer)"""
+    symbol: str
+    direction: str
+    entry_price: float
+    exit_price: float
+    high: float
+    low: float
+    mae_pct: float
+    mfe_pct: float
+    ticks: int
+    opened_at: float
+    closed_at: float
+    mae_at: Optional[float] = None   # Epoch del peor precio
+    mfe_at: Optional[float] = None   # Epoch del mejor precio
+
+    @property
+    def duration_minutes(self) -> float:
+        return (self.closed_at - self.opened_at) / 60
+
+    def to_dict(self) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "direction": self.direction,
+            "entry_price": self.entry_price,
+            "exit_price": self.exit_price,
+            "high": self.high,
+            "low": self.low,
+            "mae_pct": round(self.mae_pct, 6),
+            "mfe_pct": round(self.mfe_pct, 6),
+            "ticks": self.ticks,
+            "duration_minutes": round(self.duration_minutes, 1),
+            "mae_at": self.mae_at,
+            "mfe_at": self.mfe_at,
+        }
+
+
+def is_long(direction: str) -> bool:
+    return direction.upper() in ("LONG", "BUY")
+
+
+class OpenExcursion:
+    """Máximo/mínimo desde la entrada de una posición"""
+
+    __slots__ = ("symbol", "direction", "entry_price", "opened_at", "high", "low",
+                 "high_at", "low_at", "last_price", "ticks")
+
+    def __init__(self, symbol: str, direction: str, entry_price: float, opened_at: Optional[float] = None):
+        self.symbol = symbol
+        self.direction = direction.upper()
+        self.entry_price = entry_price
+        self.opened_at = opened_at if opened_at is not None else time.time()
+        self.high = self.low = self.last_price = entry_price
+        self.high_at = self.low_at = self.opened_at
+        self.ticks = 0
+
+    def update(self, price: float, ts: float):
+        if ts < self.opened_at:
+            return  # Trade anterior a la apertura (llegó tarde por el stream)
+        if price > self.high:
+            self.high, self.high_at = price, ts
+        elif price < self.low:
+            self.low, self.low_at = price, ts
+        self.last_price = price
+        self.ticks += 1
+
+    def excursions(self) -> tuple:
+        """(MAE, MFE) como fracción del precio de entrada (mismas reglas que PostTradeAnalyzer)"""
+        if self.entry_price <= 0:
+            return 0.0, 0.0
+        if is_long(self.direction):
+            mae = (self.entry_price - self.low) / self.entry_price
+            mfe = (self.high - self.entry_price) / self.entry_price
+        else:
+            mae = (self.high - self.entry_price) / self.entry_price
+            mfe = (self.entry_price - self.low) / self.entry_price
+        return max(0.0, mae), max(0.0, mfe)
+
+    def summary(self, exit_price: float, closed_at: float) -> ExcursionSummary:
+        mae, mfe = self.excursions()
+        long = is_long(self.direction)
+        return ExcursionSummary(
+            symbol=self.symbol,
+            direction=self.direction,
+            entry_price=self.entry_price,
+            exit_price=exit_price,
+            high=self.high,
+            low=self.low,
+            mae_pct=mae,
+            mfe_pct=mfe,
+            ticks=self.ticks,
+            opened_at=self.opened_at,
+            closed_at=closed_at,
+            mae_at=self.low_at if long else self.high_at,
+            mfe_at=self.high_at if long else self.low_at,
+        )
+
+
+class ExcursionTracker:
+    """Posiciones abiertas por clave sobre un stream combinado de aggTrade"""
+
+    STREAM_SUFFIX = "@aggTrade"
+
+    def __init__(self, stream_enabled: bool = True):
+        self.stream_enabled = stream_enabled
+        self.positions: Dict[str, OpenExcursion] = {}
+        self._by_symbol: Dict[str, Set[str]] = {}
+        self.running = False
+        self._stream: Optional[BinanceStream] = None
+        self._task = None
+
+    # === Ciclo de vida de posiciones ===
+
+    def open(
+        self,
+        key: str,
+        symbol: str,
+        direction: str,
+        entry_price: float,
+        opened_at: Optional[float] = None
+    ) -> OpenExcursion:
+        """Empezar a seguir una posición (reemplaza la anterior con la misma clave)"""
+        symbol = symbol.upper()
+        self.close(key)
+        position = OpenExcursion(symbol, direction, entry_price, opened_at)
+        self.positions[key] = position
+        self._by_symbol.setdefault(symbol, set()).add(key)
+        self._ensure_stream(symbol)
+        return position
+
+    def scale_in(
+        self,
+        key: str,
+        symbol: str,
+        direction: str,
+        price: float,
+        quantity: float,
+        held_quantity: float
+    ) -> OpenExcursion:
+        """
+        Compra sobre una posición: si ya se sigue, promedia la entrada por cantidad
+        (`held_quantity` es lo que había antes) y conserva apertura y extremos;
+        si no, la abre.
+        """
+        position = self.positions.get(key)
+        if position is None or held_quantity <= 0:
+            return self.open(key, symbol, direction, price)
+        position.entry_price = (position.entry_price * held_quantity + price * quantity) / (held_quantity + quantity)
+        position.update(price, max(time.time(), position.opened_at))
+        return position
+
+    def close(
+        self,
+        key: str,
+        exit_price: Optional[float] = None,
+        closed_at: Optional[float] = None
+    ) -> Optional[ExcursionSummary]:
+        """Dejar de seguir una posición y devolver su resumen (None si no se seguía)"""
+        position = self.positions.pop(key, None)
+        if position is None:
+            return None
+        keys = self._by_symbol.get(position.symbol)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_symbol[position.symbol]
+        closed_at = closed_at if closed_at is not None else time.time()
+        if exit_price is not None:
+            position.update(exit_price, max(closed_at, position.opened_at))
+        return position.summary(exit_price if exit_price is not None else position.last_price, closed_at)
+
+    def peek(self, key: str, price: Optional[float] = None) -> Optional[ExcursionSummary]:
+        """Resumen a `price` sin dejar de seguir la posición (cierres parciales)"""
+        position = self.positions.get(key)
+        if position is None:
+            return None
+        now = time.time()
+        if price is not None:
+            position.update(price, max(now, position.opened_at))
+        return position.summary(price if price is not None else position.last_price, now)
+
+    def on_price(self, symbol: str, price: float, ts: Optional[float] = None) -> int:
+        """Propagar un precio a las posiciones del símbolo. Devuelve cuántas se actualizaron"""
+        keys = self._by_symbol.get(symbol.upper())
+        if not keys:
+            return 0
+        ts = ts if ts is not None else time.time()
+        for key in keys:
+            self.positions[key].update(price, ts)
+        return len(keys)
+
+    def handle_event(self, data: Dict) -> int:
+        """Evento aggTrade ({s, p, T})"""
+        return self.on_price(data["s"], float(data["p"]), data["T"] / 1000)
+
+    def get(self, key: str) -> Optional[Dict]:
+        summary = self.peek(key)
+        return summary.to_dict() if summary else None
+
+    # === Stream ===
+
+    def _ensure_stream(self, symbol: str):
+        if not self.stream_enabled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sin event loop (p.ej. llamada síncrona): se suscribirá al reconectar
+        if not self.running:
+            self.running = True
+            self._task = loop.create_task(self._run_loop())
+            logger.info(f"📏 Seguimiento de excursiones iniciado: {symbol}")
+        elif self._stream is not None and self._stream_name(symbol) not in self._stream.streams:
+            loop.create_task(self._stream.subscribe([self._stream_name(symbol)]))
+
+    def _stream_name(self, symbol: str) -> str:
+        return f"{symbol.lower()}{self.STREAM_SUFFIX}"
+
+    async def start(self):
+        """Arrancar el bucle del stream (escucha en cuanto haya posiciones abiertas)"""
+        if self.running or not self.stream_enabled:
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run_loop(self):
+        while self.running:
+            if not self._by_symbol:
+                await asyncio.sleep(5)  # Sin posiciones abiertas: no hay nada que escuchar
+                continue
+            self._stream = BinanceStream(self._stream_name(s) for s in self._by_symbol)
+            try:
+                async for _, data in self._stream.messages():
+                    self.handle_event(data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Stream de excursiones caído: {e}")
+            if self.running:
+                await asyncio.sleep(2)
+
+    def get_status(self) -> Dict:
+        return {
+            "running": self.running,
+            "stream_connected": bool(self._stream and self._stream.connected),
+            "open_positions": len(self.positions),
+            "symbols": sorted(self._by_symbol),
+        }
+
+
+def restore_open_positions(tracker: "ExcursionTracker", positions: Iterable) -> List[str]:
+    """
+    Retomar el seguimiento de posiciones de futuros abiertas (tras un reinicio).
+
+    Las excursiones previas al reinicio no se conocen: se parte del precio de entrada.
+    """
+    keys = []
+    for pos in positions:
+        created_at = getattr(pos, "created_at", None)
+        opened_at = created_at.replace(tzinfo=timezone.utc).timestamp() if created_at else None  # BD en UTC naive
+        key = futures_key(pos.id)
+        tracker.open(key, pos.symbol, pos.side, pos.entry_price, opened_at)
+        keys.append(key)
+    return keys
+
+
+def spot_key(user_id: int, symbol: str) -> str:
+    return f"spot:{user_id}:{symbol.upper()}"
+
+
+def futures_key(position_id: int) -> str:
+    return f"futures:{position_id}"
+
+
+# === Singleton ===
+
+_excursion_tracker: Optional[ExcursionTracker] = None
+
+
+def get_excursion_tracker() -> ExcursionTracker:
+    global _excursion_tracker
+    if _excursion_tracker is None:
+        _excursion_tracker = ExcursionTracker(stream_enabled=settings.excursion_stream_enabled)
+    return _excursion_tracker
@@ -120,8 +120,7 @@ class JournalAnalyst:
                 logger.warning("⚠️ LLM no disponible, retornando respuesta simulada.")
                 return self._get_mock_response()
                  
-            # Acceder al proveedor activo de forma segura
-            response = await self.llm._active_provider.analyze(prompt)
+            response = await self.llm.analyze(prompt)
             
             if not response:
                 logger.warning("⚠️ LLM retornó vacío, retornando respuesta simulada.")
@@ -9,7 +9,8 @@ from sqlalchemy import func
 import numpy as np
 from datetime import datetime
 
-from app.infrastructure.database.models import JournalEntry, VirtualTrade
+from app.infrastructure.database.models import JournalEntry, VirtualTrade, VirtualWallet
+from app.ml.trade_metrics import closing_trades, get_trade_metrics
 
 class JournalService:
     @staticmethod
@@ -34,20 +35,31 @@ class JournalService:
         db.add(entry)
         db.commit()
         db.refresh(entry)
+        get_trade_metrics().record(user_id, "journal", entry.pnl or 0.0, entry.strategy, entry.symbol)
         return entry
 
     @staticmethod
     def get_performance_metrics(db: Session, user_id: int) -> Dict[str, Any]:
         """
         Calcula KPIs profesionales: Profit Factor, Expectancy, Win Rate, etc.
-        """
-        # Combinamos trades del diario y trades virtuales para una visión completa
-        journal_trades = db.query(JournalEntry.pnl).filter(JournalEntry.user_id == user_id).all()
-        virtual_trades = db.query(VirtualTrade.pnl).join(VirtualTrade.wallet).filter(VirtualTrade.wallet_id != None).all() # Simplificado
         
-        all_pnls = [t[0] for t in journal_trades] + [t[0] for t in virtual_trades if t[0] is not None]
+        Lectura O(1) de los acumuladores incrementales; el historial completo
+        solo se recorre la primera vez que se consulta cada fuente.
+        """
+        metrics = get_trade_metrics()
+        # Combinamos trades del diario y trades virtuales cerrados para una visión completa
+        metrics.ensure(user_id, "journal", lambda: db.query(
+            JournalEntry.pnl, JournalEntry.strategy, JournalEntry.symbol
+        ).filter(JournalEntry.user_id == user_id).order_by(JournalEntry.created_at).all())
+        metrics.ensure(user_id, "practice", lambda: db.query(
+            VirtualTrade.pnl, VirtualTrade.strategy, VirtualTrade.symbol
+        ).join(VirtualWallet, VirtualTrade.wallet_id == VirtualWallet.id).filter(
+            VirtualWallet.user_id == user_id,
+            closing_trades(VirtualTrade)
+        ).order_by(VirtualTrade.created_at).all())
         
-        if not all_pnls:
+        combined = metrics.combined(user_id, ("journal", "practice"))
+        if combined.count == 0:
             return {
                 "total_trades": 0,
                 "win_rate": 0,
@@ -58,31 +70,18 @@ class JournalService:
                 "total_pnl": 0
             }
         
-        wins = [p for p in all_pnls if p > 0]
-        losses = [p for p in all_pnls if p < 0]
-        
-        total_trades = len(all_pnls)
-        win_rate = (len(wins) / total_trades) * 100
-        
-        gross_profit = sum(wins)
-        gross_loss = abs(sum(losses))
-        
-        profit_factor = gross_profit / gross_loss if gross_loss > 0 else (gross_profit if gross_profit > 0 else 0)
-        
-        avg_win = sum(wins) / len(wins) if wins else 0
-        avg_loss = sum(losses) / len(losses) if losses else 0
-        
-        # Expectancy = (Probability of Win * Avg Win) - (Probability of Loss * Avg Loss)
-        p_win = len(wins) / total_trades
-        p_loss = len(losses) / total_trades
-        expectancy = (p_win * avg_win) - (p_loss * abs(avg_loss))
+        profit_factor = combined.profit_factor
+        if combined.gross_loss == 0:
+            profit_factor = combined.gross_profit
         
         return {
-            "total_trades": total_trades,
-            "win_rate": round(win_rate, 2),
+            "total_trades": combined.count,
+            "win_rate": round(combined.win_rate, 2),
             "profit_factor": round(profit_factor, 2),
-            "expectancy": round(expectancy, 2),
-            "avg_win": round(avg_win, 2),
-            "avg_loss": round(avg_loss, 2),
-            "total_pnl": round(sum(all_pnls), 2)
+            "expectancy": round(combined.expectancy, 2),
+            "avg_win": round(combined.avg_win, 2),
+            "avg_loss": round(combined.avg_loss, 2),
+            "total_pnl": round(combined.total_pnl, 2),
+            "sharpe_ratio": combined.sharpe_ratio(),
+            "max_drawdown": round(combined.max_drawdown, 2)
         }
@@ -1,4 +1,5 @@
 import asyncio
+import json
 from datetime import datetime
 import random
 from loguru import logger
@@ -6,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from app.infrastructure.database.session import SessionLocal
 from app.infrastructure.binance.client import get_binance_client
+from app.services.order_book import get_order_book_manager
 from app.infrastructure.database.institutional_models import FundingRateHistory, OrderBookSnapshot, WhaleAlert
 
 class MarketScanner:
@@ -77,7 +79,12 @@ class MarketScanner:
 
                 # 2. Recolectar Snapshot de Order Book (Microestructura)
                 try:
-                    depth = client.get_order_book(symbol, limit=20)
+                    # Preferir el libro local (diff-depth); REST solo si no está sincronizado
+                    book = get_order_book_manager().get_book(symbol)
+                    if book is not None and book.synced:
+                        depth = book.levels(20)
+                    else:
+                        depth = client.get_order_book(symbol, limit=20)
                     if depth:
                         best_bid = float(depth['bids'][0][0]) if depth['bids'] else 0
                         best_ask = float(depth['asks'][0][0]) if depth['asks'] else 0
@@ -87,8 +94,8 @@ class MarketScanner:
                             best_bid=best_bid,
                             best_ask=best_ask,
                             spread=best_ask - best_bid,
-                            bids_json=str(depth['bids']),
-                            asks_json=str(depth['asks']),
+                            bids_json=json.dumps(depth['bids']),
+                            asks_json=json.dumps(depth['asks']),
                             timestamp=datetime.utcnow()
                         )
                         db.add(snapshot)
@@ -0,0 +1,116 @@
+"""
+SIC Ultra - Símbolos de los Streams de Mercado
+
+Los managers de streams (order book, flujo de trades) aceptan símbolos en
+caliente desde la API. Para que un símbolo arbitrario no abra un libro,
+un buffer, un SUBSCRIBE y reintentos de snapshot para siempre:
+- SymbolRegistry: pares spot en TRADING según exchangeInfo (cacheado)
+- SymbolSlots: tope de símbolos dinámicos con expulsión por inactividad
+  (los símbolos fijos de arranque nunca se expulsan)
+"""
+
+import asyncio
+import re
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9]{5,20}$")
+
+
+class SymbolRegistry:
+    """
+    Pares spot en TRADING, recargados cada `ttl_seconds`.
+
+    Si exchangeInfo no responde se reintenta cada `retry_seconds`; mientras
+    tanto solo se aceptan los símbolos ya cargados (o ninguno).
+    """
+
+    def __init__(
+        self,
+        fetcher: Optional[Callable[[], Iterable[str]]] = None,
+        ttl_seconds: float = 6 * 3600,
+        retry_seconds: float = 60.0
+    ):
+        self.fetcher = fetcher or self._fetch_symbols
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self.symbols: set = set()
+        self._loaded_at: Optional[float] = None  # time.monotonic() del último intento de carga
+
+    @staticmethod
+    def _fetch_symbols() -> List[str]:
+        from app.infrastructure.binance.client import get_binance_client
+        info = get_binance_client().client.get_exchange_info()
+        return [s['symbol'] for s in info.get('symbols', []) if s.get('status') == 'TRADING']
+
+    async def _refresh(self):
+        now = time.monotonic()
+        wait = self.ttl_seconds if self.symbols else self.retry_seconds
+        if self._loaded_at is not None and now - self._loaded_at < wait:
+            return
+        self._loaded_at = now
+        try:
+            symbols = await asyncio.to_thread(self.fetcher)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo cargar la lista de símbolos (exchangeInfo): {e}")
+            return
+        self.symbols = {s.upper() for s in symbols}
+        logger.debug(f"📋 {len(self.symbols)} símbolos spot en TRADING")
+
+    async def is_known(self, symbol: str) -> bool:
+        symbol = symbol.upper()
+        if not SYMBOL_PATTERN.match(symbol):
+            return False
+        await self._refresh()
+        return symbol in self.symbols
+
+
+class SymbolSlots:
+    """
+    Uso de los símbolos seguidos por un manager.
+
+    Los fijos (`pin`) no cuentan para el tope; de los dinámicos se expulsan
+    los inactivos más de `idle_seconds` y, si aun así no cabe uno nuevo,
+    el usado hace más tiempo.
+    """
+
+    def __init__(self, max_symbols: int = 20, idle_seconds: float = 900.0):
+        self.max_symbols = max_symbols
+        self.idle_seconds = idle_seconds
+        self.pinned: set = set()
+        self.last_used: Dict[str, float] = {}
+
+    def pin(self, symbol: str):
+        self.pinned.add(symbol)
+        self.last_used.pop(symbol, None)
+
+    def touch(self, symbol: str, now: Optional[float] = None):
+        if symbol not in self.pinned:
+            self.last_used[symbol] = now if now is not None else time.monotonic()
+
+    def release(self, symbol: str):
+        self.last_used.pop(symbol, None)
+
+    def to_evict(self, now: Optional[float] = None) -> List[str]:
+        """Símbolos dinámicos a soltar antes de admitir uno nuevo"""
+        now = now if now is not None else time.monotonic()
+        by_age = sorted(self.last_used, key=self.last_used.get)
+        idle = [s for s in by_age if now - self.last_used[s] >= self.idle_seconds]
+        active = [s for s in by_age if s not in idle]
+        overflow = max(0, len(active) - (self.max_symbols - 1))
+        return idle + active[:overflow]
+
+
+# === Singleton ===
+
+_symbol_registry: Optional[SymbolRegistry] = None
+
+
+def get_symbol_registry() -> SymbolRegistry:
+    global _symbol_registry
+    if _symbol_registry is None:
+        _symbol_registry = SymbolRegistry()
+    return _symbol_registry
@@ -0,0 +1,481 @@
+"""
+SIC Ultra - Order Book Local (L2)
+
+Libro de órdenes mantenido en memoria a partir del stream diff-depth de Binance:
+1. Se abre el stream `<symbol>@depth@100ms` y se bufferizan los eventos
+2. Se descarga un snapshot REST (`lastUpdateId`)
+3. Se descartan los eventos con `u <= lastUpdateId`; el primero aplicado debe
+   cubrir `lastUpdateId + 1` y cada evento siguiente debe empezar en `u + 1`
+   del anterior. Cualquier hueco marca el libro como desincronizado y se
+   vuelve a pedir snapshot.
+
+Cada lado guarda sus niveles ordenados por precio (bisect). Los acumulados
+de cantidad y nocional se recalculan una vez por lote de diffs, así que muros,
+imbalance y profundidad dentro de X% se consultan en O(log n) sin tocar el
+exchange.
+
+Modo replay: `replay_recording()` reconstruye el libro desde un JSONL grabado
+(snapshots + diffs), para tests y análisis offline.
+"""
+
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+from app.infrastructure.binance.streams import BinanceStream
+from app.services.market_symbols import SymbolSlots, get_symbol_registry
+
+
+class _BookSide:
+    """
+    Niveles de un lado del libro, ordenados del mejor precio al peor.
+
+    Internamente la clave es el precio (asks) o -precio (bids), así ambos
+    lados quedan ascendentes desde el mejor nivel.
+    """
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self._keys: List[float] = []
+        self._qty: List[float] = []
+        self._view: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    def clear(self):
+        self._keys.clear()
+        self._qty.clear()
+        self._view = None
+
+    def set(self, price: float, qty: float):
+        """Fijar la cantidad de un nivel (0 = eliminarlo)"""
+        key = self._key(price)
+        i = bisect_left(self._keys, key)
+        exists = i < len(self._keys) and self._keys[i] == key
+        if qty <= 0:
+            if exists:
+                del self._keys[i]
+                del self._qty[i]
+        elif exists:
+            self._qty[i] = qty
+        else:
+            self._keys.insert(i, key)
+            self._qty.insert(i, qty)
+        self._view = None
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(precios, cantidades, cantidad acumulada, nocional acumulado) desde el mejor nivel"""
+        if self._view is None:
+            keys = np.asarray(self._keys, dtype=np.float64)
+            qty = np.asarray(self._qty, dtype=np.float64)
+            prices = -keys if self.is_bid else keys
+            self._view = (prices, qty, np.cumsum(qty), np.cumsum(prices * qty))
+        return self._view
+
+    @property
+    def best(self) -> Optional[float]:
+        if not self._keys:
+            return None
+        return -self._keys[0] if self.is_bid else self._keys[0]
+
+    def count_to(self, price_limit: float) -> int:
+        """Número de niveles entre el mejor precio y `price_limit` (inclusive)"""
+        return bisect_right(self._keys, self._key(price_limit))
+
+    def depth_to(self, price_limit: float) -> Tuple[float, float]:
+        """(cantidad, nocional) acumulados hasta `price_limit`"""
+        n = self.count_to(price_limit)
+        if n == 0:
+            return 0.0, 0.0
+        _, _, cum_qty, cum_notional = self.arrays()
+        return float(cum_qty[n - 1]), float(cum_notional[n - 1])
+
+    def top(self, limit: int) -> List[List[float]]:
+        prices, qty, _, _ = self.arrays()
+        return [[float(p), float(q)] for p, q in zip(prices[:limit], qty[:limit])]
+
+
+class LocalOrderBook:
+    """Libro L2 de un símbolo, sincronizado por lastUpdateId"""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol.upper()
+        self.bids = _BookSide(is_bid=True)
+        self.asks = _BookSide(is_bid=False)
+        self.last_update_id = 0
+        self.synced = False
+        self.updated_at: Optional[float] = None
+        self.gaps = 0
+        self.events_applied = 0
+        self._awaiting_first = False
+
+    # --- Sincronización ---
+
+    def load_snapshot(self, snapshot: Dict):
+        """Cargar un snapshot REST ({lastUpdateId, bids, asks})"""
+        self.bids.clear()
+        self.asks.clear()
+        for price, qty in snapshot.get("bids", []):
+            self.bids.set(float(price), float(qty))
+        for price, qty in snapshot.get("asks", []):
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = int(snapshot["lastUpdateId"])
+        self.synced = True
+        self._awaiting_first = True
+        self.updated_at = time.time()
+
+    def apply_diff(self, event: Dict) -> bool:
+        """
+        Aplicar un evento depthUpdate ({U, u, b, a}).
+
+        Returns:
+            False si hay un hueco de secuencia (el libro queda desincronizado
+            y hay que recargar snapshot). Los eventos ya cubiertos por el
+            snapshot se ignoran y devuelven True.
+        """
+        if not self.synced:
+            return False
+
+        first, last = int(event["U"]), int(event["u"])
+        if last <= self.last_update_id:
+            return True  # Ya incluido en el estado actual
+
+        expected = self.last_update_id + 1
+        in_sequence = first <= expected if self._awaiting_first else first == expected
+        if not in_sequence:
+            self.synced = False
+            self.gaps += 1
+            logger.warning(f"⚠️ Hueco en order book {self.symbol}: esperado {expected}, llegó {first}-{last}")
+            return False
+
+        for price, qty in event.get("b", []):
+            self.bids.set(float(price), float(qty))
+        for price, qty in event.get("a", []):
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = last
+        self._awaiting_first = False
+        self.events_applied += 1
+        self.updated_at = time.time()
+        return True
+
+    # --- Consultas ---
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bids.best
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.asks.best
+
+    @property
+    def mid_price(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_bid + self.best_ask) / 2
+
+    def depth_within(self, percent: float) -> Dict[str, float]:
+        """Cantidad y nocional por lado dentro de ±percent% del mid"""
+        mid = self.mid_price
+        if mid is None:
+            return {"bid_qty": 0.0, "ask_qty": 0.0, "bid_notional": 0.0, "ask_notional": 0.0}
+        bid_qty, bid_notional = self.bids.depth_to(mid * (1 - percent / 100))
+        ask_qty, ask_notional = self.asks.depth_to(mid * (1 + percent / 100))
+        return {"bid_qty": bid_qty, "ask_qty": ask_qty, "bid_notional": bid_notional, "ask_notional": ask_notional}
+
+    def imbalance(self, percent: float = 1.0) -> float:
+        """(bids - asks) / (bids + asks) en nocional dentro de ±percent%: +1 = solo compradores"""
+        depth = self.depth_within(percent)
+        total = depth["bid_notional"] + depth["ask_notional"]
+        return (depth["bid_notional"] - depth["ask_notional"]) / total if total > 0 else 0.0
+
+    def walls(self, percent: float = 2.0, factor: float = 5.0, top: int = 5) -> Dict[str, List[Dict]]:
+        """
+        Muros: niveles dentro de ±percent% con cantidad >= factor × media de su lado en ese rango.
+        """
+        mid = self.mid_price
+        result = {"bids": [], "asks": []}
+        if mid is None:
+            return result
+        for name, side, limit in (("bids", self.bids, mid * (1 - percent / 100)),
+                                  ("asks", self.asks, mid * (1 + percent / 100))):
+            n = side.count_to(limit)
+            if n == 0:
+                continue
+            prices, qty, cum_qty, _ = side.arrays()
+            mean = cum_qty[n - 1] / n
+            candidates = np.flatnonzero(qty[:n] >= factor * mean)
+            largest = candidates[np.argsort(qty[candidates])[::-1][:top]]
+            result[name] = [
+                {"price": float(prices[i]), "qty": float(qty[i]), "ratio": round(float(qty[i] / mean), 1)}
+                for i in largest
+            ]
+        return result
+
+    def levels(self, limit: int = 20) -> Dict[str, List[List[float]]]:
+        return {"bids": self.bids.top(limit), "asks": self.asks.top(limit)}
+
+    def summary(self, percent: float = 1.0) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "synced": self.synced,
+            "last_update_id": self.last_update_id,
+            "best_bid": self.best_bid,
+            "best_ask": self.best_ask,
+            "mid_price": self.mid_price,
+            "levels": {"bids": len(self.bids), "asks": len(self.asks)},
+            "imbalance": round(self.imbalance(percent), 4),
+            "depth": self.depth_within(percent),
+            "events_applied": self.events_applied,
+            "gaps": self.gaps,
+            "age_seconds": round(time.time() - self.updated_at, 3) if self.updated_at else None,
+        }
+
+
+# === Replay ===
+
+def replay(symbol: str, records: Iterable[Dict]) -> LocalOrderBook:
+    """
+    Reconstruir un libro desde registros grabados:
+    {"snapshot": {...}} carga estado y {"event": {...}} aplica un diff.
+    """
+    book = LocalOrderBook(symbol)
+    for record in records:
+        if "snapshot" in record:
+            book.load_snapshot(record["snapshot"])
+        elif "event" in record:
+            book.apply_diff(record["event"])
+    return book
+
+
+def replay_recording(path: str, symbol: Optional[str] = None) -> LocalOrderBook:
+    """Reconstruir un libro desde un JSONL grabado por OrderBookManager"""
+    symbol = symbol or os.path.basename(path).split("-")[0]
+    with open(path, "r", encoding="utf-8") as f:
+        return replay(symbol, (json.loads(line) for line in f if line.strip()))
+
+
+# === Manager ===
+
+class OrderBookManager:
+    """
+    Mantiene un LocalOrderBook por símbolo sobre un único stream combinado.
+
+    Args:
+        snapshot_fetcher: fn(symbol, limit) -> snapshot REST (por defecto, el cliente de Binance)
+        record_dir: Si se indica, graba snapshots y diffs en JSONL para replay
+        symbol_validator: async fn(symbol) -> bool para los símbolos añadidos en caliente
+            (por defecto, pares en TRADING de exchangeInfo)
+        max_symbols / idle_seconds: tope de libros en caliente y expulsión por inactividad
+    """
+
+    STREAM_SUFFIX = "@depth@100ms"
+    BUFFER_LIMIT = 1000  # Eventos retenidos por símbolo mientras llega el snapshot
+
+    def __init__(
+        self,
+        snapshot_fetcher: Optional[Callable[[str, int], Dict]] = None,
+        snapshot_limit: int = 1000,
+        record_dir: Optional[str] = None,
+        symbol_validator: Optional[Callable[[str], Awaitable[bool]]] = None,
+        max_symbols: int = 20,
+        idle_seconds: float = 900.0
+    ):
+        self.snapshot_fetcher = snapshot_fetcher or self._fetch_snapshot
+        self.snapshot_limit = snapshot_limit
+        self.record_dir = record_dir
+        self.symbol_validator = symbol_validator or (lambda symbol: get_symbol_registry().is_known(symbol))
+        self.slots = SymbolSlots(max_symbols, idle_seconds)
+        self.books: Dict[str, LocalOrderBook] = {}
+        self.running = False
+        self._stream: Optional[BinanceStream] = None
+        self._task = None
+        self._buffers: Dict[str, deque] = {}
+        self._resyncing: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _fetch_snapshot(symbol: str, limit: int) -> Dict:
+        from app.infrastructure.binance.client import get_binance_client
+        return get_binance_client().client.get_order_book(symbol=symbol, limit=limit)
+
+    def get_book(self, symbol: str) -> Optional[LocalOrderBook]:
+        book = self.books.get(symbol.upper())
+        if book is not None:
+            self.slots.touch(book.symbol)
+        return book
+
+    async def start(self, symbols: Iterable[str] = ()):
+        """Iniciar el stream en segundo plano con los símbolos indicados"""
+        for symbol in symbols:
+            self.slots.pin(self._add(symbol).symbol)
+        if self.running:
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"📚 Order books locales iniciados: {', '.join(self.books) or '-'}")
+
+    async def stop(self):
+        """Detener el stream y los resyncs en curso"""
+        self.running = False
+        tasks = [t for t in [self._task, *self._resyncing.values()] if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._resyncing.clear()
+
+    async def track(self, symbol: str, timeout: float = 5.0) -> LocalOrderBook:
+        """
+        Añadir un símbolo en caliente y esperar (hasta `timeout`) a que sincronice.
+
+        Raises:
+            ValueError: si el símbolo no es un par spot conocido
+        """
+        symbol = symbol.upper()
+        if symbol not in self.books:
+            if not await self.symbol_validator(symbol):
+                raise ValueError(f"Símbolo desconocido: {symbol}")
+            for stale in self.slots.to_evict():
+                await self.untrack(stale)
+        book = self._add(symbol)
+        self.slots.touch(symbol)
+        if not self.running:
+            await self.start()
+        elif self._stream is not None:
+            await self._stream.subscribe([self._stream_name(book.symbol)])
+        deadline = time.monotonic() + timeout
+        while not book.synced and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return book
+
+    async def untrack(self, symbol: str):
+        """Dejar de seguir un símbolo: libro, buffer, resync y suscripción"""
+        symbol = symbol.upper()
+        self.books.pop(symbol, None)
+        self._buffers.pop(symbol, None)
+        self.slots.release(symbol)
+        task = self._resyncing.pop(symbol, None)
+        if task is not None:
+            task.cancel()
+        if self._stream is not None:
+            await self._stream.unsubscribe([self._stream_name(symbol)])
+        logger.debug(f"📚 Order book {symbol} liberado")
+
+    def _add(self, symbol: str) -> LocalOrderBook:
+        symbol = symbol.upper()
+        if symbol not in self.books:
+            self.books[symbol] = LocalOrderBook(symbol)
+            self._buffers[symbol] = deque(maxlen=self.BUFFER_LIMIT)
+        return self.books[symbol]
+
+    def _stream_name(self, symbol: str) -> str:
+        return f"{symbol.lower()}{self.STREAM_SUFFIX}"
+
+    async def _run_loop(self):
+        while self.running:
+            self._stream = BinanceStream(self._stream_name(s) for s in self.books)
+            try:
+                # Tras (re)conectar, todos los libros vuelven a pasar por snapshot
+                for book in self.books.values():
+                    book.synced = False
+                    self._schedule_resync(book.symbol)
+                async for stream, data in self._stream.messages():
+                    self.handle_event(stream.split("@")[0].upper(), data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Stream de order book caído: {e}")
+            if self.running:
+                await asyncio.sleep(2)
+
+    def handle_event(self, symbol: str, event: Dict):
+        """Procesar un evento depthUpdate (también usable sin stream)"""
+        book = self.books.get(symbol)
+        if book is None:
+            return
+        self._record(symbol, {"event": event})
+        if not book.synced:
+            self._buffers[symbol].append(event)
+            self._schedule_resync(symbol)
+            return
+        if not book.apply_diff(event):
+            self._buffers[symbol].append(event)
+            self._schedule_resync(symbol)
+
+    def _schedule_resync(self, symbol: str):
+        task = self._resyncing.get(symbol)
+        if task is None or task.done():
+            self._resyncing[symbol] = asyncio.create_task(self.resync(symbol))
+
+    async def resync(self, symbol: str, max_attempts: int = 5):
+        """Recargar snapshot y aplicar los eventos bufferizados posteriores"""
+        book, buffer = self.books[symbol], self._buffers[symbol]
+        for attempt in range(max_attempts):
+            try:
+                snapshot = await asyncio.to_thread(self.snapshot_fetcher, symbol, self.snapshot_limit)
+            except Exception as e:
+                logger.warning(f"⚠️ Snapshot de {symbol} falló: {e}")
+                await asyncio.sleep(1 + attempt)
+                continue
+
+            last_id = int(snapshot["lastUpdateId"])
+            pending = [e for e in buffer if int(e["u"]) > last_id]
+            if pending and int(pending[0]["U"]) > last_id + 1:
+                # El snapshot es anterior al primer evento retenido: pedir otro
+                await asyncio.sleep(0.2 * (attempt + 1))
+                continue
+
+            book.load_snapshot(snapshot)
+            self._record(symbol, {"snapshot": snapshot})
+            buffer.clear()
+            for event in pending:
+                if not book.apply_diff(event):
+                    break
+            if book.synced:
+                logger.info(f"📚 Order book {symbol} sincronizado (lastUpdateId {book.last_update_id})")
+                return
+        logger.error(f"❌ No se pudo sincronizar el order book de {symbol}")
+
+    def _record(self, symbol: str, record: Dict):
+        if not self.record_dir:
+            return
+        os.makedirs(self.record_dir, exist_ok=True)
+        path = os.path.join(self.record_dir, f"{symbol}-{datetime.utcnow():%Y%m%d}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def get_status(self) -> Dict:
+        return {
+            "running": self.running,
+            "stream_connected": bool(self._stream and self._stream.connected),
+            "books": {symbol: book.summary() for symbol, book in self.books.items()},
+        }
+
+
+# === Singleton ===
+
+_order_book_manager: Optional[OrderBookManager] = None
+
+
+def get_order_book_manager() -> OrderBookManager:
+    global _order_book_manager
+    if _order_book_manager is None:
+        _order_book_manager = OrderBookManager(
+            snapshot_limit=settings.order_book_snapshot_limit,
+            record_dir=settings.order_book_record_dir or None,
+            max_symbols=settings.order_book_max_symbols,
+            idle_seconds=settings.order_book_idle_seconds
+        )
+    return _order_book_manager
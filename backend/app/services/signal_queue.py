@@ -0,0 +1,258 @@
+"""
+SIC Ultra - Cola de Señales Aprobadas
+Señales que superaron los filtros de un usuario, pendientes de ejecución automática:
+- Ordenadas por valor esperado (confianza × R:R × peso del tier)
+- Heap de expiración para purgar e insertar en O(log n)
+- Una señal por símbolo: una más fuerte reemplaza a la pendiente más débil
+"""
+
+import heapq
+from collections import deque
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from loguru import logger
+
+
+TIER_WEIGHTS = {'S': 1.0, 'A': 0.8, 'B': 0.6, 'C': 0.4}
+SIGNAL_TTL = timedelta(hours=2)
+
+
+def risk_reward(signal: Dict) -> float:
+    """R:R de la señal (explícito o a partir de entrada / SL / TP); 1.0 si no se conoce"""
+    rr = signal.get('risk_reward')
+    if rr:
+        return float(rr)
+    entry = signal.get('entry_price') or signal.get('current_price')
+    stop, target = signal.get('stop_loss'), signal.get('take_profit')
+    if entry and stop and target and entry != stop:
+        return abs(target - entry) / abs(entry - stop)
+    return 1.0
+
+
+def expected_value(signal: Dict) -> float:
+    """Prioridad de ejecución: confianza (0-1) × R:R × peso del tier"""
+    confidence = float(signal.get('confidence', 0) or 0) / 100
+    return confidence * risk_reward(signal) * TIER_WEIGHTS.get(signal.get('tier', 'C'), TIER_WEIGHTS['C'])
+
+
+class SignalQueue:
+    """Gestiona cola de señales aprobadas para ejecución automática."""
+    
+    def __init__(self, max_queue_size: int = 50, ttl: timedelta = SIGNAL_TTL):
+        self.approved_signals: Dict[str, Dict] = {}  # symbol -> signal_data
+        self.execution_history: deque = deque(maxlen=100)
+        self.max_queue_size = max_queue_size
+        self.ttl = ttl
+        self.expired_count = 0
+        self.replaced_count = 0
+        # Heaps con borrado perezoso: una entrada es válida si su seq coincide con la del símbolo
+        self._by_value: List[Tuple[float, int, str]] = []     # (-valor esperado, seq, símbolo) de las pendientes
+        self._by_expiry: List[Tuple[datetime, int, str]] = []  # (expires_at, seq, símbolo) de todas
+        self._seq = count()
+        
+    def _is_live(self, seq: int, symbol: str) -> bool:
+        data = self.approved_signals.get(symbol)
+        return data is not None and data['seq'] == seq
+        
+    def would_accept(self, signal: Dict, now: Optional[datetime] = None) -> bool:
+        """¿Entraría la señal? (símbolo libre o pendiente con menor valor esperado)"""
+        self.purge_expired(now)
+        current = self.approved_signals.get(signal.get('symbol'))
+        if current is None:
+            return True
+        return not current['executed'] and expected_value(signal) > current['expected_value']
+        
+    def add_approved_signal(self, signal: Dict, auto_execute_params: Dict, now: Optional[datetime] = None):
+        """Añade señal aprobada a la cola de ejecución."""
+        symbol = signal.get('symbol')
+        if not symbol:
+            return False
+        now = now or datetime.utcnow()
+        
+        # Una señal por símbolo: solo una más fuerte reemplaza a la pendiente
+        if not self.would_accept(signal, now):
+            return False
+        replaced = symbol in self.approved_signals
+        if replaced:
+            self.replaced_count += 1
+            
+        # Limitar tamaño de cola
+        if not replaced and len(self.approved_signals) >= self.max_queue_size:
+            self._remove_oldest_signal()
+            
+        seq = next(self._seq)
+        value = expected_value(signal)
+        self.approved_signals[symbol] = {
+            'signal': signal,
+            'params': auto_execute_params,
+            'added_at': now,
+            'expires_at': now + self.ttl,
+            'executed': False,
+            'expected_value': value,
+            'seq': seq
+        }
+        heapq.heappush(self._by_value, (-value, seq, symbol))
+        heapq.heappush(self._by_expiry, (now + self.ttl, seq, symbol))
+        self._compact()
+        
+        logger.info(f"📋 Señal {'reemplazada' if replaced else 'añadida'} en cola: {symbol} - {signal.get('confidence', 0)}% (EV {value:.2f})")
+        return True
+        
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        """Elimina las señales caducadas (pendientes o ya ejecutadas) en O(k log n)"""
+        now = now or datetime.utcnow()
+        purged = 0
+        while self._by_expiry and self._by_expiry[0][0] <= now:
+            _, seq, symbol = heapq.heappop(self._by_expiry)
+            if self._is_live(seq, symbol):
+                del self.approved_signals[symbol]
+                purged += 1
+        self.expired_count += purged
+        return purged
+        
+    def get_executable_signals(self, now: Optional[datetime] = None) -> List[Dict]:
+        """Retorna señales listas para ejecución, de mayor a menor valor esperado."""
+        self.purge_expired(now)
+        executable = []
+        for _, seq, symbol in sorted(self._by_value):
+            if not self._is_live(seq, symbol):
+                continue
+            data = self.approved_signals[symbol]
+            if not data['executed'] and self._should_execute_signal(data):
+                executable.append(data)
+        return executable
+        
+    def mark_executed(self, symbol: str, success: bool, order_id: Optional[str] = None):
+        """Marca señal como ejecutada (sigue ocupando el símbolo hasta expirar)."""
+        if symbol in self.approved_signals:
+            signal_data = self.approved_signals[symbol]
+            signal_data['executed'] = True
+            signal_data['executed_at'] = datetime.utcnow()
+            signal_data['execution_success'] = success
+            signal_data['order_id'] = order_id
+            
+            # Añadir al historial (deque acotado)
+            self.execution_history.append({
+                'symbol': symbol,
+                'signal': signal_data['signal'],
+                'executed_at': signal_data['executed_at'],
+                'success': success,
+                'order_id': order_id
+            })
+            self._compact()
+                
+            logger.info(f"✅ Señal ejecutada: {symbol} - {'Éxito' if success else 'Fallo'}")
+            
+    def _remove_oldest_signal(self):
+        """Elimina señal más antigua de la cola (la primera en expirar)."""
+        while self._by_expiry:
+            _, seq, symbol = heapq.heappop(self._by_expiry)
+            if self._is_live(seq, symbol):
+                del self.approved_signals[symbol]
+                return
+                
+    def _compact(self):
+        """Reconstruir los heaps cuando las entradas obsoletas superan a las vivas"""
+        live = len(self.approved_signals)
+        if len(self._by_expiry) > 2 * live + 16:
+            self._by_expiry = [e for e in self._by_expiry if self._is_live(e[1], e[2])]
+            heapq.heapify(self._by_expiry)
+        if len(self._by_value) > 2 * live + 16:
+            self._by_value = [e for e in self._by_value
+                              if self._is_live(e[1], e[2]) and not self.approved_signals[e[2]]['executed']]
+            heapq.heapify(self._by_value)
+            
+    def queue_metrics(self, now: Optional[datetime] = None) -> Dict:
+        """Profundidad y antigüedad de la cola (sin BD)"""
+        now = now or datetime.utcnow()
+        self.purge_expired(now)
+        pending = [s for s in self.approved_signals.values() if not s['executed']]
+        ages = [(now - s['added_at']).total_seconds() for s in pending]
+        top = next((-v for v, seq, symbol in sorted(self._by_value)
+                    if self._is_live(seq, symbol) and not self.approved_signals[symbol]['executed']), None)
+        return {
+            'queue_size': len(self.approved_signals),
+            'pending_signals': len(pending),
+            'queue_depth': len(pending),
+            'oldest_pending_age_seconds': round(max(ages), 1) if ages else 0.0,
+            'avg_pending_age_seconds': round(sum(ages) / len(ages), 1) if ages else 0.0,
+            'top_expected_value': round(top, 4) if top is not None else None,
+            'expired_total': self.expired_count,
+            'replaced_total': self.replaced_count
+        }
+            
+    def _should_execute_signal(self, signal_data: Dict) -> bool:
+        """Valida si la señal debe ser ejecutada ahora."""
+        # Validar confianza mínima
+        min_confidence = signal_data['params'].get('min_confidence', 70)
+        if signal_data['signal'].get('confidence', 0) < min_confidence:
+            return False
+            
+        # Validar tier permitido
+        allowed_tiers = signal_data['params'].get('allowed_tiers', ['S', 'A'])
+        signal_tier = signal_data['signal'].get('tier', 'C')
+        if signal_tier not in allowed_tiers:
+            return False
+            
+        return True
+        
+    def get_queue_status(self) -> Dict:
+        """Retorna estado actual de la cola consultando la base de datos para estadísticas diarias."""
+        db = None
+        try:
+            from app.infrastructure.database.session import SessionLocal
+            from app.infrastructure.database.models import VirtualTrade, AgentTrade
+            db = SessionLocal()
+            from datetime import date
+            
+            today = date.today()
+            
+            # Contar trades realizados hoy (VirtualTrade con strategy AI_AUTO + AgentTrade)
+            today_v_trades = db.query(VirtualTrade).filter(
+                VirtualTrade.strategy == "AI_AUTO",
+                VirtualTrade.created_at >= today
+            ).all()
+            
+            today_a_trades = db.query(AgentTrade).filter(
+                AgentTrade.created_at >= today
+            ).all()
+            
+            executed_today = len(today_v_trades) + len(today_a_trades)
+            
+            # Calcular tasa de éxito de las últimas 24 horas (usando AgentTrade como referencia real)
+            yesterday = datetime.utcnow() - timedelta(days=1)
+            recent_trades = db.query(AgentTrade).filter(AgentTrade.created_at >= yesterday).all()
+            
+            if not recent_trades:
+                success_rate_24h = 0.0
+            else:
+                successful = len([t for t in recent_trades if t.pnl > 0])
+                success_rate_24h = (successful / len(recent_trades)) * 100
+                
+        except Exception as e:
+            logger.error(f"❌ Error calculando estadísticas de cola en DB: {e}")
+            executed_today = len([s for s in self.execution_history 
+                                 if s['executed_at'].date() == datetime.utcnow().date()])
+            success_rate_24h = self._calculate_success_rate_24h()
+        finally:
+            if db is not None:
+                db.close()
+            
+        return {
+            **self.queue_metrics(),
+            'executed_today': executed_today,
+            'success_rate_24h': success_rate_24h
+        }
+        
+    def _calculate_success_rate_24h(self) -> float:
+        """Calcula tasa de éxito últimas 24 horas."""
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        recent_executions = [s for s in self.execution_history 
+                            if s['executed_at'] > yesterday]
+        
+        if not recent_executions:
+            return 0.0
+            
+        successful = len([s for s in recent_executions if s['success']])
+        return (successful / len(recent_executions)) * 100
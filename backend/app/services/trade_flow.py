@@ -0,0 +1,432 @@
+"""
+SIC Ultra - Order Flow desde Trades Reales (aggTrade)
+
+Agregador en memoria del stream `<symbol>@aggTrade` de Binance:
+- Barras de tiempo en un ring buffer NumPy (volumen comprador/vendedor y nº de trades)
+- CVD (Cumulative Volume Delta) real: compras agresivas - ventas agresivas
+- Footprint por barra: volumen comprador/vendedor por bucket de precio
+- Detección de prints grandes frente al tamaño medio (EWMA) de los trades
+
+Cada trade actualiza su barra y su bucket en O(1). El lado agresor sale del
+flag `m` (buyer is maker → la agresión fue de venta).
+"""
+
+import asyncio
+import math
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+from app.infrastructure.binance.streams import BinanceStream
+from app.services.market_symbols import SymbolSlots, get_symbol_registry
+
+
+def default_bucket_size(price: float) -> float:
+    """Bucket de footprint ≈ 0.01%-0.1% del precio (BTC 60k → 10, ETH 3k → 1)"""
+    if price <= 0:
+        return 1.0
+    return 10 ** math.floor(math.log10(price)) / 1000
+
+
+class TradeFlow:
+    """
+    Flujo de trades de un símbolo.
+
+    Args:
+        bar_seconds: Duración de cada barra
+        max_bars: Barras retenidas (ventana rolling = bar_seconds × max_bars)
+        bucket_size: Tamaño del bucket de precio del footprint (None = automático)
+        large_factor: Un print es grande si su nocional >= factor × nocional medio
+    """
+
+    WARMUP_TRADES = 50  # Trades antes de marcar prints grandes
+    AVG_ALPHA = 0.01
+
+    def __init__(
+        self,
+        symbol: str,
+        bar_seconds: int = 60,
+        max_bars: int = 240,
+        bucket_size: Optional[float] = None,
+        large_factor: float = 10.0
+    ):
+        self.symbol = symbol.upper()
+        self.bar_seconds = bar_seconds
+        self.max_bars = max_bars
+        self.bucket_size = bucket_size
+        self.large_factor = large_factor
+
+        self._bar_id = np.full(max_bars, -1, dtype=np.int64)
+        self._buy = np.zeros(max_bars, dtype=np.float64)
+        self._sell = np.zeros(max_bars, dtype=np.float64)
+        self._trades = np.zeros(max_bars, dtype=np.int64)
+        self._footprints: List[Dict[int, List[float]]] = [{} for _ in range(max_bars)]
+
+        self.cvd_total = 0.0
+        self.trades_total = 0
+        self.last_price: Optional[float] = None
+        self.last_trade_id: Optional[int] = None
+        self.first_bar: Optional[int] = None
+        self.current_bar: Optional[int] = None
+        self.avg_notional: Optional[float] = None
+        self.large_prints: deque = deque(maxlen=100)
+
+    # --- Ingesta ---
+
+    def add_trade(self, price: float, qty: float, is_buyer_maker: bool, timestamp_ms: int) -> bool:
+        """
+        Registrar un trade. Devuelve True si fue un print grande.
+        Trades más antiguos que la ventana retenida se descartan.
+        """
+        bar = timestamp_ms // (self.bar_seconds * 1000)
+        slot = bar % self.max_bars
+        if self._bar_id[slot] != bar:
+            if self._bar_id[slot] > bar:
+                return False  # Fuera de la ventana
+            self._bar_id[slot] = bar
+            self._buy[slot] = self._sell[slot] = 0.0
+            self._trades[slot] = 0
+            self._footprints[slot] = {}
+        if self.first_bar is None:
+            self.first_bar = bar
+        if self.current_bar is None or bar > self.current_bar:
+            self.current_bar = bar
+
+        if self.bucket_size is None:
+            self.bucket_size = default_bucket_size(price)
+        cell = self._footprints[slot].setdefault(int(price // self.bucket_size), [0.0, 0.0, 0])
+
+        if is_buyer_maker:  # Agresor vendedor
+            self._sell[slot] += qty
+            cell[1] += qty
+            self.cvd_total -= qty
+        else:
+            self._buy[slot] += qty
+            cell[0] += qty
+            self.cvd_total += qty
+        cell[2] += 1
+        self._trades[slot] += 1
+        self.trades_total += 1
+        self.last_price = price
+
+        notional = price * qty
+        is_large = (
+            self.trades_total > self.WARMUP_TRADES
+            and self.avg_notional is not None
+            and notional >= self.large_factor * self.avg_notional
+        )
+        if is_large:
+            self.large_prints.append({
+                "price": price,
+                "qty": qty,
+                "notional": round(notional, 2),
+                "side": "SELL" if is_buyer_maker else "BUY",
+                "ratio": round(notional / self.avg_notional, 1),
+                "timestamp": timestamp_ms,
+            })
+        self.avg_notional = notional if self.avg_notional is None else \
+            (1 - self.AVG_ALPHA) * self.avg_notional + self.AVG_ALPHA * notional
+        return is_large
+
+    def handle_event(self, event: Dict) -> bool:
+        """Procesar un evento aggTrade ({a, p, q, T, m}); ignora duplicados por id"""
+        trade_id = int(event["a"])
+        if self.last_trade_id is not None and trade_id <= self.last_trade_id:
+            return False
+        self.last_trade_id = trade_id
+        return self.add_trade(float(event["p"]), float(event["q"]), bool(event["m"]), int(event["T"]))
+
+    # --- Consultas ---
+
+    def _window(self, bars: int) -> np.ndarray:
+        """Slots válidos de las últimas `bars` barras (de la más antigua a la actual)"""
+        if self.current_bar is None:
+            return np.empty(0, dtype=np.int64)
+        bars = min(bars, self.max_bars)
+        ids = np.arange(self.current_bar - bars + 1, self.current_bar + 1)
+        slots = ids % self.max_bars
+        return slots[self._bar_id[slots] == ids]
+
+    @property
+    def bars_available(self) -> int:
+        if self.current_bar is None:
+            return 0
+        return min(self.current_bar - self.first_bar + 1, self.max_bars)
+
+    def cvd(self, bars: Optional[int] = None) -> float:
+        """CVD desde el arranque (None) o de las últimas `bars` barras"""
+        if bars is None:
+            return self.cvd_total
+        slots = self._window(bars)
+        return float(self._buy[slots].sum() - self._sell[slots].sum())
+
+    def bars(self, count: int = 30) -> List[Dict]:
+        slots = self._window(count)
+        cvd = np.cumsum(self._buy[slots] - self._sell[slots])
+        return [
+            {
+                "start": int(self._bar_id[s]) * self.bar_seconds,
+                "buy_volume": float(self._buy[s]),
+                "sell_volume": float(self._sell[s]),
+                "delta": float(self._buy[s] - self._sell[s]),
+                "cvd": float(c),
+                "trades": int(self._trades[s]),
+            }
+            for s, c in zip(slots, cvd)
+        ]
+
+    def footprint(self, bars: int = 1) -> List[Dict]:
+        """Volumen por bucket de precio en las últimas `bars` barras (precio descendente)"""
+        merged: Dict[int, List[float]] = {}
+        for s in self._window(bars):
+            for bucket, (buy, sell, count) in self._footprints[s].items():
+                cell = merged.setdefault(bucket, [0.0, 0.0, 0])
+                cell[0] += buy
+                cell[1] += sell
+                cell[2] += count
+        return [
+            {"price": bucket * self.bucket_size, "buy_volume": buy, "sell_volume": sell,
+             "delta": buy - sell, "trades": count}
+            for bucket, (buy, sell, count) in sorted(merged.items(), reverse=True)
+        ]
+
+    def traded_at(self, price: float, bars: Optional[int] = None) -> Dict[str, float]:
+        """Volumen y nº de trades en el bucket que contiene `price`"""
+        result = {"volume": 0.0, "trades": 0}
+        if self.bucket_size is None:
+            return result
+        bucket = int(price // self.bucket_size)
+        for s in self._window(bars or self.max_bars):
+            cell = self._footprints[s].get(bucket)
+            if cell:
+                result["volume"] += cell[0] + cell[1]
+                result["trades"] += cell[2]
+        return result
+
+    def depth_profile(self, bids: List[List[float]], asks: List[List[float]], bars: Optional[int] = None) -> List[Dict]:
+        """
+        Niveles del libro agregados en los buckets del footprint, junto al volumen
+        ejecutado en cada bucket (precio descendente).
+
+        Libro y trades se comparan a la misma resolución: cada bucket cuenta sus
+        trades una sola vez aunque contenga niveles bid y ask.
+        """
+        levels = list(bids) + list(asks)
+        if not levels:
+            return []
+        size = self.bucket_size or default_bucket_size(levels[0][0])
+        resting: Dict[int, List[float]] = {}  # bucket -> [bid, ask]
+        for side, book_levels in ((0, bids), (1, asks)):
+            for price, qty in book_levels:
+                resting.setdefault(int(price // size), [0.0, 0.0])[side] += qty
+
+        traded: Dict[int, List[float]] = {}  # bucket -> [volumen, trades]
+        if self.bucket_size is not None:
+            for s in self._window(bars or self.max_bars):
+                for bucket, (buy, sell, count) in self._footprints[s].items():
+                    if bucket in resting:
+                        cell = traded.setdefault(bucket, [0.0, 0])
+                        cell[0] += buy + sell
+                        cell[1] += count
+
+        return [
+            {
+                "price": bucket * size,
+                "bid_volume": bid,
+                "ask_volume": ask,
+                "traded_volume": traded.get(bucket, (0.0, 0))[0],
+                "trades": int(traded.get(bucket, (0.0, 0))[1]),
+            }
+            for bucket, (bid, ask) in sorted(resting.items(), reverse=True)
+        ]
+
+    def volume_check(self, window_bars: int) -> Optional[Dict]:
+        """
+        Confirmación de volumen equivalente a calculate_volume_profile, desde trades.
+
+        Compara el volumen de las últimas `window_bars` barras con la media de las
+        ventanas anteriores retenidas. None si aún no hay al menos 2 ventanas.
+        """
+        available = self.bars_available
+        if window_bars <= 0 or available < 2 * window_bars:
+            return None
+        slots = self._window(available)
+        volume = self._buy[slots] + self._sell[slots]
+        # Barras vacías dentro de la ventana cuentan como volumen 0
+        ids = self._bar_id[slots]
+        recent_mask = ids > self.current_bar - window_bars
+        recent = float(volume[recent_mask].sum())
+        baseline = float(volume[~recent_mask].sum()) / ((available - window_bars) / window_bars)
+        ratio = recent / baseline if baseline > 0 else 1.0
+
+        half = self.current_bar - window_bars // 2
+        first_half = float(volume[recent_mask & (ids <= half)].sum())
+        second_half = float(volume[ids > half].sum())
+        if second_half > first_half * 1.2:
+            trend = "INCREASING"
+        elif second_half < first_half * 0.8:
+            trend = "DECREASING"
+        else:
+            trend = "STABLE"
+
+        buy = float(self._buy[slots][recent_mask].sum())
+        sell = float(self._sell[slots][recent_mask].sum())
+        return {
+            "trend": trend,
+            "ratio": round(ratio, 2),
+            "is_high": ratio > 1.5,
+            "is_extreme": ratio > 2.5,
+            "delta": buy - sell,
+            "delta_ratio": round((buy - sell) / (buy + sell), 4) if buy + sell > 0 else 0.0,
+        }
+
+    def summary(self, bars: int = 60) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "last_price": self.last_price,
+            "trades": self.trades_total,
+            "cvd": self.cvd_total,
+            "cvd_window": self.cvd(bars),
+            "bars_available": self.bars_available,
+            "bucket_size": self.bucket_size,
+            "large_prints": list(self.large_prints)[-10:],
+        }
+
+
+class TradeFlowManager:
+    """
+    Un TradeFlow por símbolo sobre un único stream combinado de aggTrade.
+
+    Los símbolos añadidos en caliente se validan con `symbol_validator`
+    (por defecto, pares en TRADING de exchangeInfo) y se limitan a
+    `max_symbols`, soltando los inactivos más de `idle_seconds`.
+    """
+
+    STREAM_SUFFIX = "@aggTrade"
+
+    def __init__(
+        self,
+        bar_seconds: int = 60,
+        max_bars: int = 240,
+        large_factor: float = 10.0,
+        symbol_validator: Optional[Callable[[str], Awaitable[bool]]] = None,
+        max_symbols: int = 20,
+        idle_seconds: float = 900.0
+    ):
+        self.bar_seconds = bar_seconds
+        self.max_bars = max_bars
+        self.large_factor = large_factor
+        self.symbol_validator = symbol_validator or (lambda symbol: get_symbol_registry().is_known(symbol))
+        self.slots = SymbolSlots(max_symbols, idle_seconds)
+        self.flows: Dict[str, TradeFlow] = {}
+        self.running = False
+        self._stream: Optional[BinanceStream] = None
+        self._task = None
+
+    def get(self, symbol: str) -> Optional[TradeFlow]:
+        flow = self.flows.get(symbol.upper())
+        if flow is not None:
+            self.slots.touch(flow.symbol)
+        return flow
+
+    async def start(self, symbols: Iterable[str] = ()):
+        """Iniciar el stream en segundo plano con los símbolos indicados"""
+        for symbol in symbols:
+            self.slots.pin(self._add(symbol).symbol)
+        if self.running:
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"🌊 Flujo de trades iniciado: {', '.join(self.flows) or '-'}")
+
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def track(self, symbol: str) -> TradeFlow:
+        """
+        Añadir un símbolo en caliente (el flujo empieza vacío).
+
+        Raises:
+            ValueError: si el símbolo no es un par spot conocido
+        """
+        symbol = symbol.upper()
+        if symbol not in self.flows:
+            if not await self.symbol_validator(symbol):
+                raise ValueError(f"Símbolo desconocido: {symbol}")
+            for stale in self.slots.to_evict():
+                await self.untrack(stale)
+        flow = self._add(symbol)
+        self.slots.touch(symbol)
+        if not self.running:
+            await self.start()
+        elif self._stream is not None:
+            await self._stream.subscribe([self._stream_name(flow.symbol)])
+        return flow
+
+    async def untrack(self, symbol: str):
+        """Dejar de seguir un símbolo (descarta su flujo y su suscripción)"""
+        symbol = symbol.upper()
+        self.flows.pop(symbol, None)
+        self.slots.release(symbol)
+        if self._stream is not None:
+            await self._stream.unsubscribe([self._stream_name(symbol)])
+        logger.debug(f"🌊 Flujo de trades {symbol} liberado")
+
+    def _add(self, symbol: str) -> TradeFlow:
+        symbol = symbol.upper()
+        if symbol not in self.flows:
+            self.flows[symbol] = TradeFlow(symbol, self.bar_seconds, self.max_bars, large_factor=self.large_factor)
+        return self.flows[symbol]
+
+    def _stream_name(self, symbol: str) -> str:
+        return f"{symbol.lower()}{self.STREAM_SUFFIX}"
+
+    async def _run_loop(self):
+        while self.running:
+            self._stream = BinanceStream(self._stream_name(s) for s in self.flows)
+            try:
+                async for stream, data in self._stream.messages():
+                    flow = self.flows.get(stream.split("@")[0].upper())
+                    if flow is not None and flow.handle_event(data):
+                        large = flow.large_prints[-1]
+                        logger.debug(f"🐳 Print grande {flow.symbol}: {large['side']} {large['qty']} @ {large['price']}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Stream de trades caído: {e}")
+            if self.running:
+                await asyncio.sleep(2)
+
+    def get_status(self) -> Dict:
+        return {
+            "running": self.running,
+            "stream_connected": bool(self._stream and self._stream.connected),
+            "flows": {symbol: flow.summary() for symbol, flow in self.flows.items()},
+        }
+
+
+# === Singleton ===
+
+_trade_flow_manager: Optional[TradeFlowManager] = None
+
+
+def get_trade_flow_manager() -> TradeFlowManager:
+    global _trade_flow_manager
+    if _trade_flow_manager is None:
+        _trade_flow_manager = TradeFlowManager(
+            bar_seconds=settings.trade_flow_bar_seconds,
+            max_bars=settings.trade_flow_max_bars,
+            large_factor=settings.trade_flow_large_factor,
+            max_symbols=settings.trade_flow_max_symbols,
+            idle_seconds=settings.trade_flow_idle_seconds
+        )
+    return _trade_flow_manager
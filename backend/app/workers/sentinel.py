@@ -12,6 +12,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.infrastructure.binance.client import get_binance_client
 from app.ml.indicators import calculate_rsi, calculate_atr
 from app.ml.trading_agent import get_trading_agent
+from app.ml.trade_metrics import closes_position, get_trade_metrics
 from app.infrastructure.database.session import SessionLocal
 from app.infrastructure.database.models import VirtualWallet, VirtualTrade, User, Transaction, AutomationConfig
 
@@ -164,6 +165,8 @@ async def run_sentinel_cio():
                             )
                             db.add(new_trade)
                             db.commit()
+                            if closes_position(new_trade.side, new_trade.market_type, new_trade.reason):
+                                get_trade_metrics().record(wallet.user_id, "practice", new_trade.pnl or 0.0, new_trade.strategy, new_trade.symbol)
                             logger.success(f"🎯 Acción Ejecutada en DB (Práctica) para Wallet ID {wallet.id}: {action}")
                             
                             # MODO FUEGO REAL (DUAL)
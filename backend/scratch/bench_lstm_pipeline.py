@@ -0,0 +1,89 @@
+"""
+Benchmark: construcción de secuencias LSTM y predicción batch.
+
+Compara:
+1. Bucle con copias por ventana (implementación anterior) vs vistas con strides
+   (memoria pico vía tracemalloc y tiempo).
+2. `predict` símbolo a símbolo vs `predict_batch` en un solo forward pass.
+
+Uso: python scratch/bench_lstm_pipeline.py [n_rows] [n_symbols]
+"""
+
+import sys
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.models import LSTMPricePredictor, TENSORFLOW_AVAILABLE
+from tests.test_ml_models import make_feature_frame
+
+
+def copy_loop_sequences(data_scaled: np.ndarray, sequence_length: int):
+    """Implementación anterior de prepare_data (una copia por ventana)."""
+    X, y = [], []
+    for i in range(sequence_length, len(data_scaled)):
+        X.append(data_scaled[i - sequence_length:i])
+        y.append(data_scaled[i, 0])
+    return np.array(X), np.array(y)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_sequences(lstm: LSTMPricePredictor, n_rows: int):
+    data = np.random.rand(n_rows, 7).astype(np.float32)
+
+    _, t_loop, mem_loop = measure(copy_loop_sequences, data, lstm.sequence_length)
+    _, t_view, mem_view = measure(lstm.build_sequences, data)
+
+    print(f"\n📐 Secuencias ({n_rows:,} filas, ventana {lstm.sequence_length})")
+    print(f"   Bucle con copias : {t_loop * 1000:9.1f} ms | pico {mem_loop / 1e6:9.1f} MB")
+    print(f"   Vistas (strides) : {t_view * 1000:9.1f} ms | pico {mem_view / 1e6:9.1f} MB")
+
+
+def bench_predict(lstm: LSTMPricePredictor, n_symbols: int):
+    if not TENSORFLOW_AVAILABLE:
+        print("\n⚠️ TensorFlow no disponible: se omite benchmark de predicción")
+        return
+
+    lstm._create_model()
+    lstm._scale(make_feature_frame(200), fit_scaler=True)
+    frames = {f"SYM{i}USDT": make_feature_frame(100, seed=i) for i in range(n_symbols)}
+
+    # Warm-up (trazado del grafo)
+    lstm.predict(next(iter(frames.values())))
+    lstm.predict_batch(frames)
+
+    start = time.perf_counter()
+    for df in frames.values():
+        lstm.predict(df)
+    t_single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lstm.predict_batch(frames)
+    t_batch = time.perf_counter() - start
+
+    print(f"\n⚡ Predicción ({n_symbols} símbolos)")
+    print(f"   predict x{n_symbols}    : {t_single * 1000:9.1f} ms")
+    print(f"   predict_batch     : {t_batch * 1000:9.1f} ms ({t_single / t_batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_symbols = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    lstm = LSTMPricePredictor()
+
+    bench_sequences(lstm, n_rows)
+    bench_predict(lstm, n_symbols)
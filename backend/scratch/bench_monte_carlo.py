@@ -0,0 +1,46 @@
+"""
+Benchmark: motor Monte Carlo de riesgo (app.ml.risk_engine).
+
+Mide el tiempo de un reporte completo (trayectorias + Kelly bootstrap)
+sin caché y el coste de una consulta cacheada.
+
+Uso: python scratch/bench_monte_carlo.py [n_trades] [n_trayectorias]
+"""
+
+import sys
+import os
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.risk_engine import MonteCarloRiskEngine
+
+
+def main():
+    n_trades = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    paths = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    pnls = np.random.default_rng(0).normal(8, 100, n_trades).tolist()
+    engine = MonteCarloRiskEngine(paths=paths, horizon=100, seed=0)
+
+    timings = []
+    for _ in range(10):
+        engine.invalidate()
+        start = time.perf_counter()
+        report = engine.evaluate("bench", pnls, 10_000)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    engine.evaluate("bench", pnls, 10_000)
+    cached = (time.perf_counter() - start) * 1000
+
+    print(f"{n_trades} trades, {paths} trayectorias × 100 trades")
+    print(f"  reporte:  p50 {np.median(timings):.1f} ms, max {max(timings):.1f} ms")
+    print(f"  caché:    {cached * 1000:.0f} µs")
+    print(f"  ruina={report.risk_of_ruin:.2%} dd95={report.drawdown_p95:.2%} "
+          f"VaR95=${report.var_95} CVaR95=${report.cvar_95} kelly={report.kelly_fraction}")
+
+
+if __name__ == "__main__":
+    main()
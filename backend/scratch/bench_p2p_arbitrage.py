@@ -0,0 +1,80 @@
+"""
+Benchmark: solver de arbitraje P2P por profundidad.
+
+Mide el tiempo de `solve_arbitrage` sobre libros sintéticos del tamaño que
+devuelve `get_order_book` (páginas × 20 anuncios por lado, varios métodos de
+pago) y el coste de `SpreadHistory.append` + `stats` frente al filtrado de
+lista anterior.
+
+Uso: python scratch/bench_p2p_arbitrage.py [offers_por_lado] [iteraciones]
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.p2p_arbitrage import SpreadHistory, solve_arbitrage
+
+METHODS = ["Banesco", "Mercantil", "PagoMovil", "BancoDeVenezuela", "Provincial"]
+
+
+def make_book(n: int, start: float, step: float, rng: np.random.Generator):
+    offers = []
+    for i in range(n):
+        price = start + step * i + rng.normal(0, 0.01)
+        offers.append({
+            "advertiser": f"trader{i}",
+            "price": round(price, 2),
+            "available": float(rng.uniform(20, 2000)),
+            "min_amount": float(rng.choice([500, 1000, 5000, 20000])),
+            "max_amount": float(rng.choice([50000, 200000, 1000000])),
+            "payment_methods": list(rng.choice(METHODS, size=rng.integers(1, 4), replace=False)),
+        })
+    return offers
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = np.random.default_rng(7)
+    buys = make_book(n, 40.0, 0.02, rng)
+    sells = make_book(n, 40.9, -0.02, rng)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        solution = solve_arbitrage(buys, sells, target_amount=1000)
+    elapsed = (time.perf_counter() - start) / iterations
+    print(f"solve_arbitrage ({n} anuncios/lado, {len(METHODS)} métodos): {elapsed * 1000:.2f} ms")
+    print(f"  → {solution.payment_method}: {solution.fillable_amount:.0f} USDT, "
+          f"spread VWAP {solution.spread_percent:.2f}%, máx. rentable {solution.max_profitable_volume:.0f} USDT")
+
+    # Histórico: 24h de refrescos cada 10s
+    refreshes = 8640
+    history = SpreadHistory(capacity=refreshes)
+    legacy = []
+    base = datetime.utcnow()
+
+    start = time.perf_counter()
+    for i in range(refreshes):
+        now = base + timedelta(seconds=10 * i)
+        legacy.append({"timestamp": now, "spread": 1.0})
+        cutoff = now - timedelta(hours=24)
+        legacy = [s for s in legacy if s["timestamp"] > cutoff]
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(refreshes):
+        history.append(1.0)
+    history.stats()
+    ring_elapsed = time.perf_counter() - start
+
+    print(f"Histórico {refreshes} refrescos: lista filtrada {legacy_elapsed:.2f}s vs ring buffer {ring_elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmark: detección de patrones de velas sobre historiales largos.
+
+Compara el recorrido escalar vela a vela (app.ml.candle_patterns, un
+analyze_candle por predicado) con las máscaras vectorizadas de
+app.ml.pattern_engine sobre la misma serie.
+
+Uso: python scratch/bench_pattern_engine.py [n_velas]
+"""
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.pattern_engine import pattern_hits
+from tests.test_pattern_engine import CLASSIC_SCALAR, random_candles
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000  # ~5.7 años de velas 1h
+    candles = random_candles(n)
+
+    start = time.perf_counter()
+    scalar = {
+        name: [i for i in range(n) if fn(candles[max(0, i - 2):i + 1])]
+        for name, fn in CLASSIC_SCALAR.items()
+    }
+    scalar_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = pattern_hits(candles, rules="classic")
+    vector_elapsed = time.perf_counter() - start
+
+    assert all(vectorized[k].tolist() == scalar[k] for k in scalar)
+    total = sum(len(v) for v in vectorized.values())
+    print(f"{n} velas, {len(scalar)} patrones, {total} hits")
+    print(f"  escalar:      {scalar_elapsed:.2f}s")
+    print(f"  vectorizado:  {vector_elapsed * 1000:.1f} ms ({scalar_elapsed / vector_elapsed:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: recall y latencia de la búsqueda densa, léxica (BM25) e híbrida.
+
+Usa los libros ya almacenados en la base de conocimientos (ChromaDB). Para cada
+chunk muestreado se arma una query con sus términos más raros (nombres propios,
+jerga: "wyckoff", "funding"...) y se mide si ese chunk aparece en el top-k.
+
+Uso: python scratch/bench_rag_retrieval.py [n_queries] [k]
+"""
+
+import sys
+import os
+import random
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.knowledge_base import get_knowledge_base
+from app.ml.lexical_index import tokenize
+from app.ml.rag_cache import get_retrieval_cache
+
+
+def build_queries(kb, n_queries: int, terms_per_query: int = 3):
+    """(chunk_id, query) con los términos de menor frecuencia documental de cada chunk."""
+    data = kb.collection.get(include=["documents"])
+    sample = random.sample(range(len(data["ids"])), min(n_queries, len(data["ids"])))
+    postings = kb.lexical_index._postings
+
+    queries = []
+    for i in sample:
+        terms = sorted(set(tokenize(data["documents"][i])), key=lambda t: len(postings.get(t, ())))
+        if terms:
+            queries.append((data["ids"][i], " ".join(terms[:terms_per_query])))
+    return queries
+
+
+def run(kb, queries, mode: str, k: int):
+    cache = get_retrieval_cache()
+    hits, latencies = 0, []
+    for chunk_id, query in queries:
+        cache.invalidate_results()  # Medir búsqueda real, no el cache de resultados
+        start = time.perf_counter()
+        results = kb.search(query, n_results=k, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        data = kb.collection.get(ids=[chunk_id], include=["documents"])
+        hits += any(r["content"] == data["documents"][0] for r in results)
+
+    latencies = np.array(latencies)
+    print(
+        f"   {mode:8s} recall@{k}: {hits / len(queries):6.1%} | "
+        f"p50 {np.percentile(latencies, 50):7.2f} ms | p99 {np.percentile(latencies, 99):7.2f} ms"
+    )
+
+
+def main():
+    n_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    random.seed(42)
+
+    kb = get_knowledge_base()
+    if not kb.is_ready or not kb.collection.count():
+        print("⚠️ Base de conocimientos vacía o ChromaDB no disponible")
+        return
+
+    kb._ensure_lexical_index()
+    queries = build_queries(kb, n_queries)
+    print(f"\n🔎 {len(queries)} queries sobre {kb.collection.count():,} chunks (k={k})")
+
+    run(kb, queries, "lexical", k)
+    kb._load_embedding_model()
+    run(kb, queries, "dense", k)
+    run(kb, queries, "hybrid", k)
+
+
+if __name__ == "__main__":
+    main()
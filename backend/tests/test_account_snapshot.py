@@ -0,0 +1,207 @@
+"""
+SIC Ultra — Account Snapshot Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests the in-memory account snapshot fed by the user-data stream:
+REST reconciliation vs newer stream events, order lifecycle, ticker
+pricing and the /wallet view.
+"""
+
+import asyncio
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.account_snapshot import TICKER_STREAM, AccountSnapshot, AccountStreamService
+
+
+def account(update_ms, **balances):
+    return {
+        "updateTime": update_ms,
+        "balances": [{"asset": a, "free": str(f), "locked": str(l)} for a, (f, l) in balances.items()]
+    }
+
+
+def position(ts, **balances):
+    return {"e": "outboundAccountPosition", "E": ts, "u": ts,
+            "B": [{"a": a, "f": str(f), "l": str(l)} for a, (f, l) in balances.items()]}
+
+
+def execution(order_id, status, filled="0", ts=1):
+    return {"e": "executionReport", "E": ts, "T": ts, "s": "BTCUSDT", "S": "BUY", "o": "LIMIT",
+            "i": order_id, "X": status, "p": "50000", "q": "0.01", "z": filled, "L": "0"}
+
+
+def rest_order(order_id, update_ms, filled="0"):
+    return {"orderId": order_id, "symbol": "BTCUSDT", "side": "BUY", "type": "LIMIT", "status": "NEW",
+            "price": "50000", "origQty": "0.01", "executedQty": filled, "updateTime": update_ms}
+
+
+class TestAccountSnapshot:
+
+    def setup_method(self):
+        self.snapshot = AccountSnapshot()
+        self.snapshot.reconcile(
+            account(1000, USDT=(500, 0), BTC=(0.01, 0), ETH=(0, 0)),
+            prices={"BTCUSDT": 60000.0, "ETHUSDT": 3000.0}
+        )
+
+    def test_wallet_view_matches_rest_computation(self):
+        # Act
+        wallet = self.snapshot.wallet()
+
+        # Assert
+        assert wallet["total_usd"] == pytest.approx(500 + 600)
+        assert [b["asset"] for b in wallet["balances"]] == ["BTC", "USDT"]  # Ordenado por USD; ETH en 0 oculto
+        assert wallet["balances"][0]["usd_value"] == pytest.approx(600.0)
+
+    def test_stream_updates_balances_and_tickers(self):
+        self.snapshot.apply_event(position(2000, USDT=(200, 100), ETH=(0.5, 0)))
+        self.snapshot.apply_tickers([{"s": "ETHUSDT", "c": "3200"}, {"s": "BTCUSDT", "c": "61000"}])
+
+        wallet = self.snapshot.wallet()
+
+        assert self.snapshot.balance("usdt") == {"asset": "USDT", "free": 200.0, "locked": 100.0, "total": 300.0}
+        assert wallet["total_usd"] == pytest.approx(300 + 610 + 1600)
+
+    def test_older_rest_snapshot_does_not_overwrite_newer_event(self):
+        # Arrange
+        self.snapshot.apply_event(position(3000, USDT=(100, 0)))
+
+        # Act
+        self.snapshot.reconcile(account(2500, USDT=(500, 0), BTC=(0.02, 0)))
+
+        # Assert
+        assert self.snapshot.balances["USDT"]["free"] == 100.0
+        assert self.snapshot.balances["BTC"]["free"] == 0.02
+
+    def test_late_event_is_ignored_and_empty_balance_removed(self):
+        self.snapshot.apply_event(position(3000, BTC=(0, 0)))
+        self.snapshot.apply_event(position(2000, BTC=(5, 0)))
+
+        assert "BTC" not in self.snapshot.balances
+
+    def test_order_lifecycle(self):
+        self.snapshot.apply_event(execution(1, "NEW"))
+        self.snapshot.apply_event(execution(2, "NEW"))
+        self.snapshot.apply_event(execution(1, "PARTIALLY_FILLED", filled="0.005", ts=2))
+        self.snapshot.apply_event(execution(2, "CANCELED", ts=3))
+
+        assert list(self.snapshot.open_orders) == [1]
+        assert self.snapshot.open_orders[1]["filled"] == 0.005
+        assert len(self.snapshot.order_updates) == 4
+
+    def test_rest_orders_merge_by_update_time(self):
+        # Arrange
+        self.snapshot.apply_event(execution(1, "NEW", ts=1000))
+        self.snapshot.apply_event(execution(2, "CANCELED", ts=4000))               # Cerrada por el stream
+        self.snapshot.apply_event(execution(3, "PARTIALLY_FILLED", "0.004", ts=5000))
+        self.snapshot.apply_event(execution(4, "NEW", ts=6000))                    # Posterior al snapshot REST
+
+        # Act
+        self.snapshot.reconcile(account(1000, USDT=(500, 0)), open_orders=[
+            rest_order(2, 3000),                 # Más viejo que la cancelación: no resucita
+            rest_order(3, 4500, filled="0.001"), # Más viejo que el fill parcial: no lo pisa
+            rest_order(5, 4000),                 # Solo en REST: se añade
+        ], fetched_ms=5500)                      # La orden 1 no viene en REST y es anterior: cerrada
+
+        # Assert
+        assert sorted(self.snapshot.open_orders) == [3, 4, 5]
+        assert self.snapshot.open_orders[3]["filled"] == 0.004
+
+    def test_late_order_event_is_ignored(self):
+        self.snapshot.apply_event(execution(1, "FILLED", "0.01", ts=3000))
+        self.snapshot.apply_event(execution(1, "NEW", ts=2000))
+
+        assert 1 not in self.snapshot.open_orders
+
+    def test_listen_key_expiry_is_flagged(self):
+        event = self.snapshot.apply_event({"e": "listenKeyExpired", "E": 5000})
+
+        assert event == "listenKeyExpired" and self.snapshot.listen_key_expired
+
+
+class TestAccountStreamService:
+
+    def test_freshness_requires_recent_reconcile_without_stream(self):
+        # Arrange
+        service = AccountStreamService(stale_seconds=60)
+        assert not service.is_fresh()
+
+        # Act
+        service.snapshot.reconcile(account(1, USDT=(10, 0)))
+        fresh = service.is_fresh()
+        service.snapshot.reconciled_at = time.time() - 120
+
+        # Assert
+        assert fresh and not service.is_fresh()
+
+    def test_gap_requires_reconcile_after_it_even_when_reconnected(self):
+        # Arrange
+        service = AccountStreamService(stale_seconds=60)
+        service._fetch_account = lambda: (account(1, USDT=(10, 0)), {}, [])
+        asyncio.run(service.reconcile())
+        service._stream = SimpleNamespace(connected=True)
+        assert service.is_fresh()
+
+        def fail():
+            raise ConnectionError("REST caído")
+
+        # Act: corte → reconexión → reconciliación fallida
+        service._record_gap()
+        service._stream = SimpleNamespace(connected=True)
+        service._fetch_account = fail
+        asyncio.run(service.reconcile())
+        stale_after_failure = service.is_fresh()
+        service._fetch_account = lambda: (account(2, USDT=(12, 0)), {}, [])
+        asyncio.run(service.reconcile())
+
+        # Assert
+        assert stale_after_failure is False
+        assert service.is_fresh() is True
+
+    def test_failed_reconcile_backs_off_from_last_attempt(self):
+        # Arrange
+        service = AccountStreamService(reconcile_seconds=900)
+
+        def fail():
+            raise ConnectionError("REST caído")
+
+        service._fetch_account = fail
+
+        # Act
+        ok = asyncio.run(service.reconcile())
+        attempt = service._reconcile_attempt_at
+        first_retry = (service.reconcile_due(attempt + 10), service.reconcile_due(attempt + 15))
+        asyncio.run(service.reconcile())
+        attempt = service._reconcile_attempt_at
+
+        # Assert
+        assert not ok and service.reconcile_failures == 2
+        assert first_retry == (False, True)
+        assert not service.reconcile_due(attempt + 15) and service.reconcile_due(attempt + 30)
+
+    def test_successful_reconcile_waits_full_period(self):
+        service = AccountStreamService(reconcile_seconds=900)
+        service._fetch_account = lambda: (account(1, USDT=(10, 0)), {}, [])
+        assert service.reconcile_due()
+
+        asyncio.run(service.reconcile())
+        attempt = service._reconcile_attempt_at
+
+        assert service.reconcile_failures == 0
+        assert not service.reconcile_due(attempt + 899) and service.reconcile_due(attempt + 900)
+
+    def test_messages_are_routed_by_stream(self):
+        service = AccountStreamService()
+
+        service.handle_message(TICKER_STREAM, [{"s": "SOLUSDT", "c": "150"}])
+        event = service.handle_message("listenkey123", position(1, SOL=(2, 0)))
+
+        assert event == "outboundAccountPosition"
+        assert service.snapshot.usd_value("SOL", 2) == pytest.approx(300.0)
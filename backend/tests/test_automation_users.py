@@ -0,0 +1,136 @@
+"""
+SIC Ultra — Multi-User Automation Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests the fan-out of a single shared market verdict to every subscribed
+user's filters, tiers, market toggles and daily limits, and the batched,
+invalidation-driven settings cache.
+"""
+
+import sys
+import os
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.automation_users import (
+    AutomationUsers, MarketVerdict, UserAutomation, fan_out
+)
+
+
+def verdict(symbol="BTCUSDT", action="BUY", raw_action="LONG", confidence=80, tier="A"):
+    return MarketVerdict(
+        symbol=symbol,
+        signal={"symbol": symbol, "action": action, "confidence": confidence, "tier": tier, "reasoning": []},
+        raw_action=raw_action
+    )
+
+
+class FakeLoader:
+    """Simula la consulta en lote de AutomationConfig"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, user_ids):
+        self.calls.append(sorted(user_ids))
+        return {uid: self.rows[uid] for uid in user_ids if uid in self.rows}
+
+
+class TestFanOut:
+
+    def test_one_verdict_is_evaluated_per_user(self):
+        # Arrange
+        users = [
+            UserAutomation(1),
+            UserAutomation(2, settings={"min_signal_confidence": 90, "allowed_tiers": ["S", "A"]}),
+            UserAutomation(3, settings={"min_signal_confidence": 70, "allowed_tiers": ["S"]}),
+            UserAutomation(4, settings={"futures_enabled": False}),
+        ]
+
+        # Act
+        outcome = fan_out(verdict(), users)
+
+        # Assert
+        assert outcome == {"approved": [1], "filters": [2, 3], "market_disabled": [4]}
+        assert "BTCUSDT" in users[0].signal_queue.approved_signals
+        assert not users[1].signal_queue.approved_signals
+
+    def test_each_user_gets_its_own_copy_and_params(self):
+        users = [UserAutomation(1), UserAutomation(2, settings={"max_position_size": 200.0, "allowed_tiers": ["A"]})]
+
+        fan_out(verdict(), users)
+
+        first = users[0].signal_queue.approved_signals["BTCUSDT"]
+        second = users[1].signal_queue.approved_signals["BTCUSDT"]
+        assert first["signal"] is not second["signal"]
+        assert (first["params"]["max_position_size"], second["params"]["max_position_size"]) == (50.0, 200.0)
+
+    def test_already_queued_and_hold_are_skipped(self):
+        user = UserAutomation(1)
+        fan_out(verdict(), [user])
+
+        again = fan_out(verdict(), [user])
+        stronger = fan_out(verdict(confidence=95), [user])
+        hold = fan_out(verdict(symbol="ETHUSDT", action="HOLD", raw_action="HOLD"), [user])
+
+        assert again == {"queued": [1]}
+        assert stronger == {"approved": [1]}
+        assert hold == {"hold": [1]}
+
+    def test_daily_limit_resets_next_day(self):
+        user = UserAutomation(1, settings={"max_daily_trades": 2})
+        today, tomorrow = date(2024, 1, 1), date(2024, 1, 2)
+
+        user.record_trade(today)
+        user.record_trade(today)
+
+        assert not user.can_trade(today)
+        assert user.can_trade(tomorrow)
+
+
+class TestSettingsCache:
+
+    def test_refresh_loads_stale_users_in_one_batch(self):
+        # Arrange
+        loader = FakeLoader({1: {"min_signal_confidence": 85}, 2: {"check_interval_seconds": 60}})
+        users = AutomationUsers(loader, ttl=300)
+        users.add(1, {"min_signal_confidence": 70})
+        users.add(2, {})
+        users.add(3, {})
+
+        # Act
+        first = users.refresh(now=100.0)
+        second = users.refresh(now=150.0)
+
+        # Assert
+        assert loader.calls == [[1, 2, 3]]
+        assert sorted(first) == [1, 2, 3] and second == []
+        assert users.get(1).settings["min_signal_confidence"] == 85
+        assert users.get(2).check_interval == 60
+        assert users.get(3).settings["spot_enabled"] is True  # Sin fila en BD: se mantiene la actual
+
+    def test_invalidate_reloads_only_that_user(self):
+        loader = FakeLoader({1: {}, 2: {}})
+        users = AutomationUsers(loader, ttl=300)
+        users.add(1), users.add(2)
+        users.refresh(now=100.0)
+
+        users.invalidate(2)
+        users.invalidate(99)  # Usuario no suscrito: sin efecto
+        users.refresh(now=110.0)
+        users.refresh(now=400.0)  # TTL de respaldo vencido para ambos
+
+        assert loader.calls == [[1, 2], [2], [1]]
+
+    def test_due_users_follow_their_own_interval(self):
+        users = AutomationUsers(FakeLoader({}), ttl=300)
+        users.add(1, {"check_interval_seconds": 10})
+        users.add(2, {"check_interval_seconds": 60})
+
+        users.schedule(users.due(now=0.0), now=0.0)
+
+        assert [u.user_id for u in users.due(now=30.0)] == [1]
+        assert users.next_wakeup(now=5.0) == 5.0
+        assert users.due(now=60.0) and len(users.due(now=60.0)) == 2
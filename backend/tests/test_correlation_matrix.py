@@ -0,0 +1,156 @@
+"""
+SIC Ultra — Rolling Correlation Matrix Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests the incremental ring-buffer covariance against a full recomputation,
+clustering of correlated assets, the shared cluster risk budget and the
+handling of late / duplicate kline events.
+"""
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.correlation_matrix import CorrelationService, RollingCorrelation
+
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XAUTUSDT"]
+
+
+def correlated_closes(n, seed=0):
+    """ETH/SOL/BNB siguen un factor común; BTC y XAUT son independientes"""
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, n)
+    returns = {
+        "BTCUSDT": rng.normal(0, 0.01, n),
+        "ETHUSDT": factor + rng.normal(0, 0.002, n),
+        "SOLUSDT": factor + rng.normal(0, 0.003, n),
+        "BNBUSDT": factor + rng.normal(0, 0.002, n),
+        "XAUTUSDT": rng.normal(0, 0.005, n),
+    }
+    return {s: 100 * np.exp(np.concatenate([[0], np.cumsum(r)])) for s, r in returns.items()}
+
+
+def feed(matrix, closes, start=0):
+    n = len(next(iter(closes.values())))
+    for t in range(start, n):
+        for symbol in matrix.symbols:
+            matrix.on_close(symbol, t * 3600.0, closes[symbol][t])
+
+
+class TestRollingCorrelation:
+
+    def test_incremental_matches_full_recompute_after_rollover(self):
+        # Arrange
+        window = 50
+        closes = correlated_closes(3 * window + 17)
+        matrix = RollingCorrelation(SYMBOLS, window)
+
+        # Act
+        feed(matrix, closes)
+
+        # Assert
+        returns = np.diff(np.log(np.array([closes[s] for s in SYMBOLS])), axis=1)[:, -window:]
+        assert matrix.samples == window
+        assert matrix.correlation() == pytest.approx(np.corrcoef(returns), abs=1e-9)
+        assert matrix.covariance() == pytest.approx(np.cov(returns), abs=1e-12)
+
+    def test_clusters_group_correlated_assets(self):
+        matrix = RollingCorrelation(SYMBOLS, 100)
+        feed(matrix, correlated_closes(150))
+
+        clusters = matrix.clusters(0.7)
+
+        assert clusters[0] == ["ETHUSDT", "SOLUSDT", "BNBUSDT"]
+        assert ["BTCUSDT"] in clusters and ["XAUTUSDT"] in clusters
+
+    def test_late_and_duplicate_events_are_ignored(self):
+        # Arrange
+        matrix = RollingCorrelation(["BTCUSDT", "ETHUSDT"], 10)
+        for t, (btc, eth) in enumerate([(100, 10), (101, 10.1), (102, 10.3)]):
+            matrix.on_close("BTCUSDT", t, btc)
+            matrix.on_close("ETHUSDT", t, eth)
+        before = matrix.covariance() if matrix.samples >= 3 else None
+
+        # Act
+        duplicate = matrix.on_close("BTCUSDT", 2, 500)
+        late = matrix.on_close("ETHUSDT", 1, 500)
+
+        # Assert
+        assert not duplicate and not late
+        assert matrix.samples == 2 and before is None
+        assert matrix.last_price("BTCUSDT") == 102
+
+    def test_missing_symbol_is_committed_as_flat_when_next_candle_arrives(self):
+        matrix = RollingCorrelation(["BTCUSDT", "ETHUSDT"], 10)
+        matrix.on_close("BTCUSDT", 0, 100)
+        matrix.on_close("ETHUSDT", 0, 10)
+
+        matrix.on_close("BTCUSDT", 1, 101)
+        assert matrix.samples == 0
+        matrix.on_close("BTCUSDT", 2, 102)
+
+        assert matrix.samples == 1
+        assert matrix._returns[0] == pytest.approx([np.log(1.01), 0.0])
+
+    def test_load_history_uses_common_timestamps(self):
+        # Arrange
+        closes = correlated_closes(80, seed=2)
+        history = {s: {t * 3600.0: float(closes[s][t]) for t in range(80)} for s in SYMBOLS}
+        del history["SOLUSDT"][40 * 3600.0]
+        matrix = RollingCorrelation(SYMBOLS, 100)
+
+        # Act
+        matrix.load_history(history)
+        feed(matrix, {s: [*closes[s], closes[s][-1] * 1.01] for s in SYMBOLS}, start=80)
+
+        # Assert
+        assert matrix.samples == 78 + 2  # 79 tiempos comunes + 2 velas del stream
+        assert matrix.updated_at == 81 * 3600.0
+
+
+class TestClusterBudget:
+
+    @pytest.fixture
+    def service(self):
+        service = CorrelationService(window=100, cluster_threshold=0.7, cluster_budget=1.5)
+        service.matrix = RollingCorrelation(SYMBOLS, 100)
+        feed(service.matrix, correlated_closes(150))
+        return service
+
+    def test_correlated_positions_share_budget(self, service):
+        exposures = {"ETHUSDT": 50.0, "SOLUSDT": 20.0}
+
+        sol = service.available_budget("BNBUSDT", exposures, 50.0)
+        btc = service.available_budget("BTCUSDT", exposures, 50.0)
+
+        assert 0 < sol < 50.0
+        assert btc == 50.0
+
+    def test_full_cluster_blocks_new_positions(self, service):
+        budget = service.available_budget("SOLUSDT", {"ETHUSDT": 60.0, "BNBUSDT": 60.0}, 50.0)
+
+        assert budget == 0.0
+
+    def test_not_ready_returns_full_budget(self):
+        service = CorrelationService()
+
+        assert service.available_budget("ETHUSDT", {"SOLUSDT": 1e6}, 50.0) == 50.0
+        assert service.snapshot() is None
+
+    def test_closed_kline_event_updates_matrix(self, service):
+        samples = service.matrix.samples
+        last = service.matrix.last_price("BTCUSDT")
+        event = {"k": {"s": "BTCUSDT", "t": 151 * 3600 * 1000, "c": str(last * 1.01), "x": False}}
+
+        assert not service.handle_event(event)
+        event["k"]["x"] = True
+        service.handle_event(event)
+
+        assert service.matrix.last_price("BTCUSDT") == pytest.approx(last * 1.01)
+        assert service.matrix.samples == samples
+        assert service.cluster_exposure({"ETHUSDT": 10.0, "SOLUSDT": 5.0})[0]["exposure_usd"] == 15.0
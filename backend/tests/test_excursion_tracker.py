@@ -0,0 +1,148 @@
+"""
+SIC Ultra — Live Excursion Tracker Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests O(1)-per-tick MAE/MFE tracking of open positions against the
+PostTradeAnalyzer batch computation, and the hand-off of the precomputed
+summary to the analyzer at close.
+"""
+
+import sys
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.ml.post_trade_analyzer import PostTradeAnalyzer
+from app.services.excursion_tracker import (
+    ExcursionTracker, futures_key, restore_open_positions, spot_key
+)
+
+
+def price_path(n, entry=100.0, seed=0):
+    rng = np.random.default_rng(seed)
+    return (entry * np.exp(np.cumsum(rng.normal(0, 0.002, n)))).tolist()
+
+
+class TestExcursionTracker:
+
+    def setup_method(self):
+        self.tracker = ExcursionTracker(stream_enabled=False)
+
+    @pytest.mark.parametrize("direction", ["LONG", "SHORT"])
+    def test_matches_batch_excursions(self, direction):
+        # Arrange
+        prices = price_path(500, seed=1)
+        self.tracker.open("t1", "BTCUSDT", direction, 100.0, opened_at=1000.0)
+
+        # Act
+        for i, price in enumerate(prices):
+            self.tracker.on_price("BTCUSDT", price, 1000.0 + i)
+        summary = self.tracker.close("t1", exit_price=prices[-1], closed_at=1600.0)
+
+        # Assert
+        mae, mfe = PostTradeAnalyzer()._calculate_excursions(100.0, [100.0] + prices, direction)
+        assert summary.mae_pct == pytest.approx(mae)
+        assert summary.mfe_pct == pytest.approx(mfe)
+        assert summary.ticks == len(prices) + 1
+        assert summary.duration_minutes == pytest.approx(10.0)
+
+    def test_records_when_extremes_happened(self):
+        self.tracker.open("t1", "ETHUSDT", "LONG", 100.0, opened_at=0.0)
+
+        for ts, price in [(1, 101), (2, 97), (3, 104), (4, 99)]:
+            self.tracker.on_price("ETHUSDT", price, ts)
+        summary = self.tracker.close("t1", closed_at=5.0)
+
+        assert (summary.mae_at, summary.mfe_at) == (2, 3)
+        assert summary.exit_price == 99
+
+    def test_only_updates_positions_of_the_symbol(self):
+        self.tracker.open("btc", "BTCUSDT", "LONG", 100.0, opened_at=0.0)
+        self.tracker.open("eth", "ETHUSDT", "SHORT", 10.0, opened_at=0.0)
+
+        updated = self.tracker.handle_event({"s": "BTCUSDT", "p": "90.5", "T": 1000})
+        self.tracker.close("btc")
+
+        assert updated == 1
+        assert self.tracker.on_price("BTCUSDT", 50.0, 2.0) == 0
+        assert self.tracker.get("eth")["mae_pct"] == 0.0
+        assert self.tracker.get_status()["symbols"] == ["ETHUSDT"]
+
+    def test_ignores_ticks_before_opening(self):
+        self.tracker.open("t1", "BTCUSDT", "LONG", 100.0, opened_at=50.0)
+
+        self.tracker.on_price("BTCUSDT", 80.0, 49.0)
+
+        assert self.tracker.close("t1", closed_at=60.0).mae_pct == 0.0
+
+    def test_peek_keeps_tracking_for_partial_close(self):
+        key = spot_key(1, "solusdt")
+        self.tracker.open(key, "SOLUSDT", "LONG", 20.0, opened_at=0.0)
+
+        partial = self.tracker.peek(key, 22.0)
+        self.tracker.on_price("SOLUSDT", 18.0, 10.0)
+        final = self.tracker.close(key, 21.0, closed_at=20.0)
+
+        assert partial.mfe_pct == pytest.approx(0.1) and partial.mae_pct == 0.0
+        assert final.mfe_pct == pytest.approx(0.1) and final.mae_pct == pytest.approx(0.1)
+
+    def test_reopening_replaces_previous_position(self):
+        self.tracker.open("k", "BTCUSDT", "LONG", 100.0, opened_at=0.0)
+        self.tracker.on_price("BTCUSDT", 80.0, 1.0)
+
+        self.tracker.open("k", "BTCUSDT", "LONG", 90.0, opened_at=2.0)
+
+        assert self.tracker.close("k", 90.0, closed_at=3.0).mae_pct == 0.0
+        assert self.tracker.close("k") is None
+
+    def test_scaling_in_averages_entry_and_keeps_excursion(self):
+        # Arrange
+        self.tracker.scale_in("k", "BTCUSDT", "LONG", 100.0, 1.0, held_quantity=0.0)
+        opened_at = self.tracker.positions["k"].opened_at
+        self.tracker.on_price("BTCUSDT", 80.0, opened_at + 1)
+
+        # Act: compra 3 más a 80 → entrada media 85
+        position = self.tracker.scale_in("k", "BTCUSDT", "LONG", 80.0, 3.0, held_quantity=1.0)
+        summary = self.tracker.close("k", 85.0)
+
+        # Assert
+        assert position.opened_at == opened_at
+        assert summary.entry_price == pytest.approx(85.0)
+        assert summary.low == 80.0 and summary.mae_pct == pytest.approx(5 / 85)
+
+    def test_restore_open_futures_positions(self):
+        positions = [SimpleNamespace(id=7, symbol="BTCUSDT", side="SHORT", entry_price=100.0,
+                                     created_at=datetime(2024, 1, 1))]
+
+        keys = restore_open_positions(self.tracker, positions)
+
+        assert keys == [futures_key(7)]
+        assert self.tracker.positions[futures_key(7)].opened_at == 1704067200.0
+
+
+class TestAnalyzerHandOff:
+
+    def test_analyzer_uses_precomputed_summary(self):
+        # Arrange
+        tracker = ExcursionTracker(stream_enabled=False)
+        tracker.open("t", "BTCUSDT", "LONG", 100.0, opened_at=0.0)
+        for ts, price in enumerate([99.0, 95.0, 108.0, 103.0], start=1):
+            tracker.on_price("BTCUSDT", price, float(ts))
+        summary = tracker.close("t", 103.0, closed_at=1800.0)
+
+        # Act
+        report = PostTradeAnalyzer().analyze(
+            trade_id="t", symbol="BTCUSDT", direction="LONG", signal_price=100.0,
+            fill_price=100.0, exit_price=103.0, pnl=3.0, price_history_during_trade=None,
+            signals_used=["rsi"], patterns_detected=[], excursion=summary
+        )
+
+        # Assert
+        assert report.mae_pct == pytest.approx(0.05)
+        assert report.mfe_pct == pytest.approx(0.08)
+        assert report.hold_duration_minutes == 30.0
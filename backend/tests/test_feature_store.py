@@ -0,0 +1,188 @@
+"""
+SIC Ultra — Feature Store Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests parity with app.ml.indicators, incremental sync and point-in-time reads.
+"""
+
+import numpy as np
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.feature_store as feature_store
+from app.ml.feature_store import FeatureStore
+from app.ml.indicators import calculate_rsi, calculate_macd, calculate_atr
+from tests.conftest import generate_candles
+
+
+START = datetime(2024, 1, 1)
+NOW = (START + timedelta(days=30)).timestamp()
+
+
+def hourly_candles(n: int = 300):
+    np.random.seed(7)
+    candles = generate_candles(n, 50000, "mean_reverting", 0.01)
+    for i, candle in enumerate(candles):
+        candle["timestamp"] = START + timedelta(hours=i)
+    return candles
+
+
+def padded(values, n):
+    return [np.nan] * (n - len(values)) + list(values)
+
+
+class FakeKlines:
+    """Binance klines: últimas `limit` velas abiertas hasta `end_time`."""
+
+    def __init__(self, candles):
+        self.candles = candles
+        self.calls = 0
+
+    def get_klines(self, symbol, interval, limit, end_time=None):
+        self.calls += 1
+        candles = [c for c in self.candles if end_time is None or c["timestamp"] <= end_time]
+        return candles[-limit:]
+
+
+class TestFeatureStore:
+
+    def setup_method(self):
+        self.candles = hourly_candles()
+
+    def test_parity_with_indicator_functions(self, tmp_path):
+        # Arrange
+        store = FeatureStore(root=str(tmp_path))
+        closes = [c["close"] for c in self.candles]
+        highs = [c["high"] for c in self.candles]
+        lows = [c["low"] for c in self.candles]
+        n = len(closes)
+
+        # Act
+        store.sync("BTCUSDT", "1h", self.candles, now=NOW)
+        df = store.read("BTCUSDT", "1h", dropna=False)
+
+        # Assert
+        np.testing.assert_allclose(df["rsi"], padded(calculate_rsi(closes, 14), n), rtol=1e-12)
+        np.testing.assert_allclose(
+            df["macd"], padded(calculate_macd(closes)["histogram"], n), rtol=1e-9
+        )
+        np.testing.assert_allclose(
+            df["atr"], padded(calculate_atr(highs, lows, closes, 14), n), rtol=1e-12
+        )
+
+    def test_incremental_sync_matches_full_build(self, tmp_path):
+        full = FeatureStore(root=str(tmp_path / "full"))
+        incremental = FeatureStore(root=str(tmp_path / "inc"))
+
+        full.sync("BTCUSDT", "1h", self.candles, now=NOW)
+        added = 0
+        for start in range(0, len(self.candles), 37):
+            # Solapamiento intencional: velas ya guardadas se ignoran
+            added += incremental.sync("BTCUSDT", "1h", self.candles[max(0, start - 5):start + 37], now=NOW)
+
+        assert added == len(self.candles)
+        a = full.read("BTCUSDT", "1h", dropna=False)
+        b = incremental.read("BTCUSDT", "1h", dropna=False)
+        np.testing.assert_allclose(
+            a.drop(columns="timestamp").values, b.drop(columns="timestamp").values, rtol=1e-12
+        )
+
+    def test_forming_candle_not_persisted(self, tmp_path):
+        store = FeatureStore(root=str(tmp_path))
+        now = (START + timedelta(hours=len(self.candles) - 1, minutes=30)).timestamp()
+
+        added = store.sync("BTCUSDT", "1h", self.candles, now=now)
+
+        assert added == len(self.candles) - 1
+        live = store.preview("BTCUSDT", "1h", self.candles[-1])
+        assert live["close"] == self.candles[-1]["close"]
+        assert store.info("BTCUSDT", "1h")["rows"] == len(self.candles) - 1
+
+    def test_point_in_time_read_has_no_future_rows(self, tmp_path):
+        store = FeatureStore(root=str(tmp_path))
+        store.sync("BTCUSDT", "1h", self.candles, now=NOW)
+        as_of = START + timedelta(hours=100)
+
+        df = store.read("BTCUSDT", "1h", as_of=as_of, dropna=False)
+
+        # Velas cerradas a las 100h: las que abrieron hasta las 99h
+        assert len(df) == 100
+        assert df["close"].iloc[-1] == self.candles[99]["close"]
+
+    def test_limit_returns_complete_rows(self, tmp_path):
+        store = FeatureStore(root=str(tmp_path))
+        store.sync("BTCUSDT", "1h", self.candles, now=NOW)
+
+        df = store.read("BTCUSDT", "1h", limit=120)
+
+        assert len(df) == 120
+        assert not df.isna().any().any()
+
+    def test_xgboost_uses_precomputed_columns(self, tmp_path):
+        from app.ml.models import XGBoostSignalClassifier
+        store = FeatureStore(root=str(tmp_path))
+        store.sync("BTCUSDT", "1h", self.candles, now=NOW)
+        df = store.read("BTCUSDT", "1h")
+
+        X = XGBoostSignalClassifier().prepare_features(df)
+
+        assert X.shape == (len(df), 7)
+        np.testing.assert_allclose(X[:, 0], df["close_ret"])
+
+
+class TestFeatureStoreGaps:
+
+    def setup_method(self):
+        self.candles = hourly_candles(1800)
+        self.now = (START + timedelta(hours=len(self.candles) - 1, minutes=30)).timestamp()
+
+    def stale_store(self, tmp_path, monkeypatch):
+        store = FeatureStore(root=str(tmp_path / "stale"))
+        store.sync("BTCUSDT", "1h", self.candles[:300], now=self.now)
+        client = FakeKlines(self.candles)
+        monkeypatch.setattr("app.infrastructure.binance.client.get_binance_client", lambda: client)
+        return store, client
+
+    def test_refresh_pages_back_over_gap_larger_than_one_request(self, tmp_path, monkeypatch):
+        # Arrange
+        store, client = self.stale_store(tmp_path, monkeypatch)
+        full = FeatureStore(root=str(tmp_path / "full"))
+        full.sync("BTCUSDT", "1h", self.candles, now=self.now)
+        assert store.bars_behind("BTCUSDT", "1h", now=self.now) > feature_store.MAX_KLINES
+
+        # Act
+        store.refresh("BTCUSDT", "1h", now=self.now)
+
+        # Assert
+        assert client.calls == 2
+        a = full.read("BTCUSDT", "1h", dropna=False)
+        b = store.read("BTCUSDT", "1h", dropna=False)
+        assert len(b) == len(self.candles) - 1
+        assert (np.diff(b["timestamp"].values) == np.timedelta64(1, "h")).all()
+        np.testing.assert_allclose(
+            a.drop(columns="timestamp").values, b.drop(columns="timestamp").values, rtol=1e-12
+        )
+
+    def test_refresh_rebuilds_when_gap_exceeds_page_limit(self, tmp_path, monkeypatch):
+        store, client = self.stale_store(tmp_path, monkeypatch)
+        monkeypatch.setattr(feature_store, "MAX_GAP_PAGES", 1)
+
+        store.refresh("BTCUSDT", "1h", now=self.now)
+
+        df = store.read("BTCUSDT", "1h", dropna=False)
+        assert len(df) == feature_store.MAX_KLINES - 1
+        assert df["close"].iloc[0] == self.candles[-feature_store.MAX_KLINES]["close"]
+        assert (np.diff(df["timestamp"].values) == np.timedelta64(1, "h")).all()
+
+    def test_sync_rejects_batch_that_leaves_a_hole(self, tmp_path):
+        store = FeatureStore(root=str(tmp_path))
+        store.sync("BTCUSDT", "1h", self.candles[:300], now=self.now)
+
+        added = store.sync("BTCUSDT", "1h", self.candles[400:500], now=self.now)
+
+        assert added == 0
+        assert store.info("BTCUSDT", "1h")["rows"] == 300
+        assert store.sync("BTCUSDT", "1h", self.candles[300:500], now=self.now) == 200
@@ -0,0 +1,93 @@
+"""
+SIC Ultra — Inference Service Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests micro-batching, futures, max batch and per-model metrics.
+"""
+
+import pytest
+import asyncio
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.ml.inference_service import InferenceService
+
+
+class RecordingRunner:
+    """Fake batch runner: echoes the last close and records batch sizes."""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def __call__(self, frames):
+        with self.lock:
+            self.batch_sizes.append(len(frames))
+        return {key: {"value": frame["close"][-1]} for key, frame in frames.items()}
+
+
+class TestInferenceService:
+
+    def setup_method(self):
+        self.runner = RecordingRunner()
+        self.service = InferenceService(
+            max_batch=8, max_wait_ms=50, runners={"fake": self.runner}
+        )
+
+    def teardown_method(self):
+        self.service.stop()
+
+    def test_concurrent_requests_are_batched(self):
+        # Arrange
+        async def run():
+            frames = [{"close": [i]} for i in range(8)]
+            return await asyncio.gather(
+                *(self.service.predict("fake", frame) for frame in frames)
+            )
+
+        # Act
+        results = asyncio.run(run())
+
+        # Assert
+        assert [r["value"] for r in results] == list(range(8))
+        assert max(self.runner.batch_sizes) > 1, "Concurrent requests should share a batch"
+        assert sum(self.runner.batch_sizes) == 8
+
+    def test_max_batch_is_respected(self):
+        futures = [self.service.submit("fake", {"close": [i]}) for i in range(20)]
+
+        results = [f.result(timeout=5) for f in futures]
+
+        assert len(results) == 20
+        assert max(self.runner.batch_sizes) <= 8
+
+    def test_metrics_report_latency_and_batch_size(self):
+        futures = [self.service.submit("fake", {"close": [i]}) for i in range(5)]
+        for f in futures:
+            f.result(timeout=5)
+
+        metrics = self.service.get_metrics()["models"]["fake"]
+
+        assert metrics["requests"] == 5
+        assert metrics["latency_p50_ms"] is not None
+        assert metrics["latency_p99_ms"] >= metrics["latency_p50_ms"]
+        assert metrics["avg_batch_size"] >= 1
+
+    def test_runner_error_propagates_to_futures(self):
+        def broken(frames):
+            raise RuntimeError("modelo caído")
+        service = InferenceService(max_wait_ms=1, runners={"broken": broken})
+
+        future = service.submit("broken", {"close": [1]})
+
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+        assert service.get_metrics()["models"]["broken"]["errors"] == 1
+        service.stop()
+
+    def test_unknown_model_rejected(self):
+        with pytest.raises(ValueError):
+            self.service.submit("nope", {"close": [1]})
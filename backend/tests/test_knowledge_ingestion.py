@@ -0,0 +1,241 @@
+"""
+SIC Ultra — Knowledge Base Ingestion Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests streaming chunking, batched incremental writes, content-hash re-ingestion
+and the background job queue.
+"""
+
+import pytest
+import numpy as np
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.knowledge_base as knowledge_base
+from app.ml.knowledge_base import DocumentProcessor, KnowledgeBase
+from app.ml.knowledge_ingestion import IngestionQueue
+from app.ml.lexical_index import BM25Index
+
+
+class MemoryCollection:
+    """Minimal in-memory stand-in for a ChromaDB collection."""
+
+    def __init__(self):
+        self.rows = {}
+        self.upsert_calls = 0
+
+    def get(self, where=None, include=None, ids=None):
+        rows = [
+            (chunk_id, row) for chunk_id, row in self.rows.items()
+            if (not where or all(row["metadata"].get(k) == v for k, v in where.items()))
+            and (ids is None or chunk_id in ids)
+        ]
+        return {
+            "ids": [r[0] for r in rows],
+            "documents": [r[1]["document"] for r in rows],
+            "metadatas": [r[1]["metadata"] for r in rows],
+        }
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.upsert_calls += 1
+        for chunk_id, embedding, document, metadata in zip(ids, embeddings, documents, metadatas):
+            self.rows[chunk_id] = {"embedding": embedding, "document": document, "metadata": metadata}
+
+    def update(self, ids, metadatas):
+        for chunk_id, metadata in zip(ids, metadatas):
+            self.rows[chunk_id]["metadata"] = metadata
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.rows.pop(chunk_id, None)
+
+    def count(self):
+        return len(self.rows)
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+
+def make_kb() -> KnowledgeBase:
+    return KnowledgeBase(
+        collection=MemoryCollection(),
+        embedding_model=CountingEncoder(),
+        lexical_index=BM25Index()
+    )
+
+
+def write_book(path, n_words: int, prefix: str = "palabra") -> str:
+    path.write_text(" ".join(f"{prefix}{i}" for i in range(n_words)), encoding="utf-8")
+    return str(path)
+
+
+class TestStreamingChunker:
+
+    @pytest.mark.parametrize("n_words", [0, 1, 100, 499, 500, 501, 900, 1000, 2345])
+    def test_matches_chunk_text(self, n_words):
+        # Arrange
+        words = [f"w{i}" for i in range(n_words)]
+        segments = [" ".join(words[i:i + 37]) + "\n" for i in range(0, n_words, 37)]
+
+        # Act
+        streamed = list(DocumentProcessor.iter_chunks(segments, chunk_size=500, overlap=100))
+
+        # Assert
+        assert streamed == DocumentProcessor.chunk_text(" ".join(words), chunk_size=500, overlap=100)
+
+    def test_text_blocks_do_not_split_words(self, tmp_path):
+        book = write_book(tmp_path / "libro.txt", 5000)
+
+        blocks = list(DocumentProcessor._iter_text(book, block_size=100))
+
+        assert "".join(blocks).split() == DocumentProcessor.extract_text(book).split()
+
+
+class TestIngestDocument:
+
+    def test_writes_in_batches_with_progress(self, tmp_path):
+        # Arrange
+        kb = make_kb()
+        book = write_book(tmp_path / "libro.txt", 8000)
+        updates = []
+
+        # Act
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            result = kb.ingest_document(book, category="trading", progress=updates.append,
+                                        batch_size=5, executor=pool, workers=2)
+
+        # Assert
+        assert result["chunks"] == 20
+        assert result["embedded"] == 20
+        assert kb.collection.upsert_calls == 4
+        assert [u["embedded"] for u in updates] == [5, 10, 15, 20]
+        indexes = sorted(row["metadata"]["chunk_index"] for row in kb.collection.rows.values())
+        assert indexes == list(range(20))
+
+    def test_reupload_only_embeds_changed_chunks(self, tmp_path):
+        # Arrange
+        kb = make_kb()
+        path = tmp_path / "libro.txt"
+        book = write_book(path, 8000)
+        kb.ingest_document(book, batch_size=8)
+        kb.embedding_model.encoded = 0
+        words = path.read_text(encoding="utf-8").split()
+        words[7250] = "editado"
+        path.write_text(" ".join(words), encoding="utf-8")
+
+        # Act
+        result = kb.ingest_document(book, batch_size=8)
+
+        # Assert
+        assert kb.embedding_model.encoded == 2  # Los dos chunks que solapan en la palabra 7250
+        assert result["reused"] == 18
+        assert result["removed"] == 2
+        assert kb.collection.count() == 20
+
+    def test_unchanged_reupload_does_not_load_model(self, tmp_path):
+        kb = make_kb()
+        book = write_book(tmp_path / "libro.txt", 3000)
+        kb.ingest_document(book)
+        kb.embedding_model = None  # Cualquier intento de encode fallaría
+
+        result = kb.ingest_document(book)
+
+        assert result["embedded"] == 0
+        assert result["reused"] == result["chunks"]
+
+
+    def test_failed_ingest_still_invalidates_cached_results(self, tmp_path, monkeypatch):
+        # Arrange
+        invalidated = []
+        monkeypatch.setattr(
+            knowledge_base, "get_retrieval_cache",
+            lambda: type("Cache", (), {"invalidate_results": lambda self: invalidated.append(1)})()
+        )
+        kb = make_kb()
+        calls = []
+
+        def flaky_encode(texts):
+            calls.append(1)
+            if len(calls) > 1:
+                raise RuntimeError("encoder caído")
+            return np.ones((len(texts), 2))
+
+        kb.embedding_model.encode = flaky_encode
+        book = write_book(tmp_path / "libro.txt", 3000)
+
+        # Act
+        with pytest.raises(RuntimeError):
+            kb.ingest_document(book, batch_size=2)
+
+        # Assert
+        assert kb.collection.count() == 2  # El primer lote ya se escribió
+        assert invalidated == [1]
+
+
+class TestEmbeddingModelLoading:
+
+    def test_failed_background_load_can_be_retried(self, monkeypatch):
+        # Arrange
+        monkeypatch.setattr(knowledge_base, "EMBEDDINGS_AVAILABLE", True)
+        kb = KnowledgeBase(collection=MemoryCollection(), lexical_index=BM25Index())
+        attempts = []
+
+        def fail():
+            attempts.append(1)
+            raise OSError("sin red para descargar el modelo")
+
+        kb._load_embedding_model = fail
+
+        def load_and_wait():
+            kb._load_embedding_model_async()
+            for thread in threading.enumerate():
+                if thread.name == "kb-embeddings":
+                    thread.join()
+
+        # Act
+        load_and_wait()
+        loading_after_failure = kb._model_loading
+        load_and_wait()
+
+        # Assert
+        assert loading_after_failure is False
+        assert len(attempts) == 2 and kb.embedding_model is None
+
+
+class TestIngestionQueue:
+
+    def test_job_completes_in_background(self, tmp_path):
+        # Arrange
+        kb = make_kb()
+        ingestion = IngestionQueue(knowledge_base_factory=lambda: kb, workers=2, batch_size=4)
+        book = write_book(tmp_path / "libro.txt", 4000)
+
+        # Act
+        job = ingestion.submit(book, title="Libro", category="trading")
+        ingestion.wait()
+
+        # Assert
+        stored = ingestion.get_job(job.job_id)
+        assert stored.status == "completed"
+        assert stored.chunks == stored.embedded == 10
+        assert stored.finished_at is not None
+
+    def test_failed_job_reports_error(self, tmp_path):
+        kb = make_kb()
+        ingestion = IngestionQueue(knowledge_base_factory=lambda: kb)
+
+        job = ingestion.submit(str(tmp_path / "no_existe.txt"))
+        ingestion.wait()
+
+        assert job.status == "failed"
+        assert "no encontrado" in job.error
@@ -0,0 +1,178 @@
+"""
+SIC Ultra — BM25 Lexical Index & Hybrid Retrieval Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests tokenization, BM25 ranking, persistence, RRF fusion and the
+lexical fast path of KnowledgeBase.search.
+"""
+
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.knowledge_base as knowledge_base
+from app.ml.knowledge_base import KnowledgeBase
+from app.ml.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from app.ml.rag_cache import RetrievalCache
+
+
+CHUNKS = {
+    "a": ("El método Wyckoff describe fases de acumulación y distribución", "trading"),
+    "b": ("La divergencia RSI anticipa agotamiento de tendencia", "analisis_tecnico"),
+    "c": ("El funding rate de perpetuos mide el sesgo de apalancamiento", "trading"),
+    "d": ("La gestión de riesgo limita la pérdida por operación", "gestion_riesgo"),
+}
+
+
+class VectorCollection:
+    """In-memory collection with cosine-distance `query`."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def count(self):
+        return len(self.rows)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for chunk_id, embedding, document, metadata in zip(ids, embeddings, documents, metadatas):
+            self.rows[chunk_id] = (np.asarray(embedding), document, metadata)
+
+    def get(self, ids=None, where=None, include=None):
+        selected = [
+            (chunk_id, row) for chunk_id, row in self.rows.items()
+            if (ids is None or chunk_id in ids)
+            and (not where or all(row[2].get(k) == v for k, v in where.items()))
+        ]
+        return {
+            "ids": [chunk_id for chunk_id, _ in selected],
+            "documents": [row[1] for _, row in selected],
+            "metadatas": [row[2] for _, row in selected],
+        }
+
+    def query(self, query_embeddings, n_results, where, include):
+        q = np.asarray(query_embeddings[0])
+        scored = sorted(
+            (1 - float(q @ row[0] / (np.linalg.norm(q) * np.linalg.norm(row[0]))), chunk_id)
+            for chunk_id, row in self.rows.items()
+            if not where or all(row[2].get(k) == v for k, v in where.items())
+        )[:n_results]
+        return {
+            "ids": [[chunk_id for _, chunk_id in scored]],
+            "documents": [[self.rows[chunk_id][1] for _, chunk_id in scored]],
+            "metadatas": [[self.rows[chunk_id][2] for _, chunk_id in scored]],
+            "distances": [[distance for distance, _ in scored]],
+        }
+
+
+class LengthEncoder:
+    """Dense stand-in that knows nothing about exact terms."""
+
+    def encode(self, texts):
+        return np.array([[len(t), 1.0] for t in texts], dtype=float)
+
+
+def build_kb(embedding_model=None) -> KnowledgeBase:
+    collection = VectorCollection()
+    index = BM25Index()
+    for chunk_id, (text, category) in CHUNKS.items():
+        metadata = {"source": "libro.txt", "title": "Libro", "category": category}
+        collection.upsert([chunk_id], [[len(text), 1.0]], [text], [metadata])
+        index.add(chunk_id, text, category)
+    return KnowledgeBase(collection=collection, embedding_model=embedding_model, lexical_index=index)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = RetrievalCache()
+    monkeypatch.setattr(knowledge_base, "get_retrieval_cache", lambda: cache)
+    return cache
+
+
+class TestBM25Index:
+
+    def test_tokenize_strips_accents_and_stopwords(self):
+        assert tokenize("La Gestión de RIESGO en el método") == ["gestion", "riesgo", "metodo"]
+
+    def test_exact_term_ranks_first(self):
+        index = BM25Index()
+        for chunk_id, (text, category) in CHUNKS.items():
+            index.add(chunk_id, text, category)
+
+        results = index.search("wyckoff acumulación", n_results=2)
+
+        assert results[0][0] == "a"
+
+    def test_category_filter_and_remove(self):
+        index = BM25Index()
+        for chunk_id, (text, category) in CHUNKS.items():
+            index.add(chunk_id, text, category)
+
+        assert index.search("divergencia", category="trading") == []
+        index.remove(["b"])
+        assert index.search("divergencia") == []
+        assert len(index) == 3
+
+    def test_persistence_roundtrip(self, tmp_path):
+        # Arrange
+        path = str(tmp_path / "bm25.json")
+        index = BM25Index(path)
+        for chunk_id, (text, category) in CHUNKS.items():
+            index.add(chunk_id, text, category)
+
+        # Act
+        index.save()
+        reloaded = BM25Index(path)
+
+        # Assert
+        assert reloaded.search("funding") == index.search("funding")
+
+
+class TestReciprocalRankFusion:
+
+    def test_first_in_all_rankings_scores_one(self):
+        fused = reciprocal_rank_fusion([["a", "b"], ["a", "c"]])
+
+        assert fused[0] == ("a", 1.0)
+        assert {chunk_id for chunk_id, _ in fused} == {"a", "b", "c"}
+
+
+class TestHybridSearch:
+
+    def test_hybrid_recovers_exact_term_missed_by_dense(self):
+        # Arrange
+        kb = build_kb(embedding_model=LengthEncoder())
+        dense_only = kb.search("Wyckoff", n_results=1, mode="dense")
+
+        # Act
+        hybrid = kb.search("Wyckoff", n_results=2, mode="hybrid")
+
+        # Assert
+        assert "Wyckoff" not in dense_only[0]["content"]
+        assert any("Wyckoff" in r["content"] for r in hybrid)
+        assert all(0 < r["relevance"] <= 1 for r in hybrid)
+        assert all("id" not in r for r in hybrid)
+
+    def test_lexical_fast_path_without_embedding_model(self, monkeypatch):
+        # Arrange
+        monkeypatch.setattr(knowledge_base, "EMBEDDINGS_AVAILABLE", False)
+        kb = build_kb(embedding_model=None)
+
+        # Act
+        results = kb.search("funding rate", n_results=2)
+
+        # Assert
+        assert results[0]["content"].startswith("El funding rate")
+        assert results[0]["relevance"] == 1.0
+        assert kb.embedding_model is None
+
+    def test_index_rebuilt_from_existing_collection(self):
+        kb = build_kb(embedding_model=None)
+        kb.lexical_index = BM25Index()
+
+        results = kb.search("divergencia", n_results=1, mode="lexical")
+
+        assert len(kb.lexical_index) == len(CHUNKS)
+        assert results[0]["category"] == "analisis_tecnico"
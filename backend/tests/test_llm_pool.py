@@ -0,0 +1,143 @@
+"""
+SIC Ultra — LLM Provider Pool Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests the token bucket, provider health / circuit breaker, background
+probing and health-based provider selection in LLMManager.
+"""
+
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.llm_pool as llm_pool
+from app.ml.llm_connector import LLMManager, LLMProvider
+from app.ml.llm_pool import ProviderHealth, TokenBucket
+
+
+class FakeProvider(LLMProvider):
+    """Scripted provider: fixed answer (None = failure), optional delay and probe result."""
+
+    def __init__(self, answer="SIGNAL: BUY, CONFIDENCE: 80%", delay=0.0, reachable=True, max_concurrency=4):
+        self.max_concurrency = max_concurrency
+        super().__init__()
+        self.answer = answer
+        self.delay = delay
+        self.reachable = reachable
+        self.calls = 0
+        self.peak_in_flight = 0
+
+    def is_configured(self) -> bool:
+        return True
+
+    async def probe(self) -> bool:
+        return self.reachable
+
+    async def analyze(self, prompt: str):
+        self.calls += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.health.in_flight)
+        await asyncio.sleep(self.delay)
+        return self.answer
+
+
+class Primary(FakeProvider):
+    pass
+
+
+class Secondary(FakeProvider):
+    pass
+
+
+class TestTokenBucket:
+
+    def test_burst_then_refill(self, monkeypatch):
+        # Arrange
+        clock = [100.0]
+        monkeypatch.setattr(llm_pool.time, "monotonic", lambda: clock[0])
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+
+        # Act / Assert
+        assert bucket.try_acquire() and bucket.try_acquire()
+        assert not bucket.try_acquire()
+        clock[0] += 1.0
+        assert bucket.try_acquire()
+
+
+class TestProviderHealth:
+
+    def test_consecutive_failures_open_circuit_until_cooldown(self, monkeypatch):
+        # Arrange
+        clock = [0.0]
+        monkeypatch.setattr(llm_pool.time, "monotonic", lambda: clock[0])
+        health = ProviderHealth(failure_threshold=3, cooldown_seconds=60)
+
+        # Act
+        for _ in range(3):
+            health.record_failure("timeout")
+
+        # Assert
+        assert health.state == "down"
+        clock[0] += 61
+        assert health.state == "degraded"
+        health.record_success(0.2)
+        assert health.state == "up"
+
+    def test_successful_call_marks_unreachable_provider_up(self):
+        health = ProviderHealth()
+        health.record_probe(False, 2.0, "PoolTimeout")
+
+        health.record_success(0.5)
+
+        assert health.reachable is True and health.state == "up"
+
+    def test_latency_ewma(self):
+        health = ProviderHealth(alpha=0.5)
+
+        health.record_success(1.0)
+        health.record_success(3.0)
+
+        assert health.latency_ewma == 2.0
+
+
+class TestProviderSelection:
+
+    def test_unreachable_provider_skipped_after_probe(self):
+        # Arrange
+        primary, secondary = Primary(reachable=False), Secondary()
+        manager = LLMManager([primary, secondary])
+
+        # Act
+        response = asyncio.run(manager.analyze("hola"))
+
+        # Assert
+        assert response.startswith("SIGNAL: BUY")
+        assert primary.calls == 0 and secondary.calls == 1
+        assert manager.provider_name == "Secondary"
+        assert manager.get_metrics()["providers"]["Primary"]["state"] == "down"
+
+    def test_fallback_on_empty_response_and_degraded_demoted(self):
+        # Arrange
+        primary, secondary = Primary(answer=None), Secondary()
+        manager = LLMManager([primary, secondary])
+
+        # Act
+        verdict = asyncio.run(manager.analyze_market("BTCUSDT", 60000, {"rsi": 55}, [], []))
+
+        # Assert
+        assert verdict["signal"] == "BUY" and verdict["source"] == "Secondary"
+        assert primary.health.state == "degraded"
+        assert manager.ranked_providers() == [secondary, primary]
+
+    def test_semaphore_caps_concurrency(self):
+        provider = Primary(delay=0.02, max_concurrency=2)
+        manager = LLMManager([provider])
+
+        async def run():
+            await asyncio.gather(*[manager.analyze(f"p{i}") for i in range(6)])
+
+        asyncio.run(run())
+
+        assert provider.calls == 6
+        assert provider.peak_in_flight == 2
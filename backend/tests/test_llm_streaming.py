@@ -0,0 +1,152 @@
+"""
+SIC Ultra — Streaming LLM Response Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests NDJSON / SSE token parsing, verdict detection on partial text,
+early termination and streaming fallback in LLMManager.
+"""
+
+import asyncio
+import json
+import sys
+import os
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.ml.llm_connector import (
+    LLMManager,
+    LLMProvider,
+    OllamaProvider,
+    OpenAIProvider,
+    verdict_ready,
+)
+
+
+TOKENS = ["SIGNAL: ", "SELL", "\nCONFIDENCE: ", "7", "8", "%\nREASON: ", "ruptura ", "de ", "soporte"]
+
+
+class TokenProvider(LLMProvider):
+    """Streams scripted tokens and records how many were produced before closing."""
+
+    def __init__(self, tokens):
+        super().__init__()
+        self.tokens = tokens
+        self.produced = 0
+        self.closed = False
+
+    def is_configured(self) -> bool:
+        return True
+
+    async def analyze(self, prompt: str):
+        return "".join(self.tokens) or None
+
+    async def stream(self, prompt: str):
+        try:
+            for token in self.tokens:
+                self.produced += 1
+                await asyncio.sleep(0)
+                yield token
+        finally:
+            self.closed = True
+
+
+def with_transport(provider: LLMProvider, handler):
+    """Bind the provider to the running loop and swap its pool for a mock transport."""
+    provider._bind_loop()
+    provider._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestVerdictDetection:
+
+    def test_waits_for_complete_confidence_number(self):
+        assert not verdict_ready("SIGNAL: SELL\nCONFIDENCE: 7")
+        assert verdict_ready("SIGNAL: SELL\nCONFIDENCE: 78%")
+        assert verdict_ready("**SEÑAL:** COMPRA, CONFIANZA: 65 ")
+
+
+class TestProviderStreams:
+
+    def test_ollama_ndjson_stream(self):
+        # Arrange
+        lines = [{"response": "SIGNAL: BUY", "done": False}, {"response": ", CONFIDENCE: 70", "done": False},
+                 {"response": "", "done": True}]
+        body = "\n".join(json.dumps(line) for line in lines).encode()
+        provider = OllamaProvider(model="test")
+
+        async def run():
+            with_transport(provider, lambda request: httpx.Response(200, content=body))
+            return [delta async for delta in provider.generate_stream("hola")]
+
+        # Act
+        deltas = asyncio.run(run())
+
+        # Assert
+        assert deltas == ["SIGNAL: BUY", ", CONFIDENCE: 70"]
+
+    def test_openai_sse_stream_sends_stream_flag(self):
+        # Arrange
+        events = [{"choices": [{"delta": {"content": "SIGNAL: "}}]}, {"choices": [{"delta": {"content": "HOLD"}}]}]
+        body = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+        provider = OpenAIProvider(api_key="sk-test")
+        sent = {}
+
+        def handler(request):
+            sent.update(json.loads(request.content))
+            return httpx.Response(200, content=body.encode())
+
+        async def run():
+            with_transport(provider, handler)
+            return [delta async for delta in provider.stream("hola")]
+
+        # Act
+        deltas = asyncio.run(run())
+
+        # Assert
+        assert deltas == ["SIGNAL: ", "HOLD"]
+        assert sent["stream"] is True
+
+
+class TestManagerStreaming:
+
+    def test_verdict_only_stops_early_and_forwards_tokens(self):
+        # Arrange
+        provider = TokenProvider(TOKENS)
+        manager = LLMManager([provider])
+        forwarded = []
+
+        async def on_token(delta):
+            forwarded.append(delta)
+
+        # Act
+        result = asyncio.run(manager.stream_market_analysis(
+            "BTCUSDT", 60000, {"rsi": 71}, [], [], on_token=on_token, verdict_only=True
+        ))
+
+        # Assert
+        assert result["signal"] == "SELL" and result["confidence"] == 78
+        assert result["early_stop"] is True
+        assert provider.produced == 6 and provider.closed
+        assert "".join(forwarded) == "".join(TOKENS[:6])
+        assert provider.health.in_flight == 0 and provider.health.failures == 0
+
+    def test_full_stream_matches_non_streaming_parse(self):
+        provider = TokenProvider(TOKENS)
+        manager = LLMManager([provider])
+
+        streamed = asyncio.run(manager.stream_market_analysis("BTCUSDT", 60000, {}, [], []))
+        complete = asyncio.run(manager.analyze_market("BTCUSDT", 60000, {}, [], []))
+
+        assert streamed["early_stop"] is False
+        assert (streamed["signal"], streamed["confidence"], streamed["reasoning"]) == \
+            (complete["signal"], complete["confidence"], complete["reasoning"])
+
+    def test_fallback_when_first_stream_is_empty(self):
+        silent, talker = TokenProvider([]), TokenProvider(TOKENS)
+        manager = LLMManager([silent, talker])
+
+        result = asyncio.run(manager.stream_market_analysis("BTCUSDT", 60000, {}, [], []))
+
+        assert result["signal"] == "SELL"
+        assert silent.health.failures == 1
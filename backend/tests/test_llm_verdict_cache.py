@@ -0,0 +1,142 @@
+"""
+SIC Ultra — LLM Verdict Cache Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests state quantization, candle-close expiry, in-flight deduplication
+and the cached path of LLMManager.analyze_market.
+"""
+
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.llm_verdict_cache as llm_verdict_cache
+from app.ml.llm_connector import LLMManager, LLMProvider
+from app.ml.llm_verdict_cache import LLMVerdictCache, next_candle_close, quantize_state
+
+
+INDICATORS = {"rsi": 31.2, "macd": -0.0041, "ema_alignment": "BEARISH"}
+
+
+class SlowProvider(LLMProvider):
+    """Provider that counts calls and answers after a delay."""
+
+    def __init__(self, delay: float = 0.05):
+        super().__init__()
+        self.delay = delay
+        self.calls = 0
+
+    def is_configured(self) -> bool:
+        return True
+
+    async def analyze(self, prompt: str):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return "SIGNAL: SELL, CONFIDENCE: 72%, REASON: presión vendedora"
+
+
+def build_manager(provider) -> LLMManager:
+    return LLMManager([provider])
+
+
+class TestQuantization:
+
+    def test_small_moves_share_key(self):
+        a = quantize_state("btcusdt", 60000, INDICATORS, ["📊 Hammer"])
+        b = quantize_state("BTCUSDT", 60150, {**INDICATORS, "rsi": 33.9, "macd": -0.0012}, ["📊 Hammer"])
+
+        assert a == b
+
+    def test_bucket_or_pattern_change_breaks_key(self):
+        base = quantize_state("BTCUSDT", 60000, INDICATORS, ["📊 Hammer"])
+
+        assert quantize_state("BTCUSDT", 60000, {**INDICATORS, "rsi": 36.0}, ["📊 Hammer"]) != base
+        assert quantize_state("BTCUSDT", 60000, {**INDICATORS, "macd": 0.001}, ["📊 Hammer"]) != base
+        assert quantize_state("BTCUSDT", 60000, INDICATORS, ["📊 Hammer", "📊 Doji"]) != base
+
+    def test_next_candle_close(self):
+        assert next_candle_close("1h", now=7200.0) == 10800
+        assert next_candle_close("1h", now=7199.5) == 7200
+
+
+class TestVerdictCache:
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        # Arrange
+        provider = SlowProvider()
+        manager = build_manager(provider)
+        cache = LLMVerdictCache()
+        key = quantize_state("BTCUSDT", 60000, INDICATORS, [])
+
+        async def run():
+            compute = lambda: manager._analyze_market("BTCUSDT", 60000, INDICATORS, [], [])
+            return await asyncio.gather(*[
+                cache.get_or_compute(key, next_candle_close("1h"), compute) for _ in range(5)
+            ])
+
+        # Act
+        results = asyncio.run(run())
+
+        # Assert
+        assert provider.calls == 1
+        assert cache.stats["deduplicated"] == 4
+        assert all(r == results[0] for r in results)
+
+    def test_expires_at_candle_close(self, monkeypatch):
+        cache = LLMVerdictCache()
+        clock = [1000.0]
+        monkeypatch.setattr(llm_verdict_cache.time, "time", lambda: clock[0])
+
+        async def compute():
+            return {"signal": "BUY"}
+
+        async def lookup():
+            return await cache.get_or_compute("k", 1100.0, compute)
+
+        asyncio.run(lookup())
+        assert asyncio.run(lookup())["cached"] is True
+        clock[0] = 1100.0
+        assert "cached" not in asyncio.run(lookup())
+        assert cache.stats["expired"] == 1
+
+    def test_timed_out_caller_still_fills_cache(self, monkeypatch):
+        # Arrange
+        provider = SlowProvider(delay=0.1)
+        manager = build_manager(provider)
+        monkeypatch.setattr(llm_verdict_cache, "_verdict_cache", LLMVerdictCache())
+
+        async def run():
+            try:
+                await asyncio.wait_for(
+                    manager.analyze_market("BTCUSDT", 60000, INDICATORS, [], [], candle_interval="1h"),
+                    timeout=0.01
+                )
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(0.15)
+            return await manager.analyze_market("BTCUSDT", 60100, INDICATORS, [], [], candle_interval="1h")
+
+        # Act
+        verdict = asyncio.run(run())
+
+        # Assert
+        assert provider.calls == 1
+        assert verdict["signal"] == "SELL" and verdict["cached"] is True
+
+    def test_empty_response_not_cached(self):
+        cache = LLMVerdictCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return None
+
+        async def run():
+            await cache.get_or_compute("k", float("inf"), compute)
+            await cache.get_or_compute("k", float("inf"), compute)
+
+        asyncio.run(run())
+
+        assert len(calls) == 2
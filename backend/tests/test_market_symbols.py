@@ -0,0 +1,80 @@
+"""
+SIC Ultra — Market Stream Symbols Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests the exchangeInfo-backed symbol registry (cache, retry after a
+failed load) and the hot-symbol slots (cap, idle eviction, pinned symbols).
+"""
+
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.services.market_symbols as market_symbols
+from app.services.market_symbols import SymbolRegistry, SymbolSlots
+
+
+class TestSymbolRegistry:
+
+    def test_known_symbols_loaded_once_and_cached(self):
+        # Arrange
+        calls = []
+
+        def fetcher():
+            calls.append(1)
+            return ["BTCUSDT", "ethusdt"]
+
+        registry = SymbolRegistry(fetcher)
+
+        async def run():
+            return [await registry.is_known(s) for s in ("btcusdt", "ETHUSDT", "FAKEUSDT", "../x")]
+
+        # Act
+        known = asyncio.run(run())
+
+        # Assert
+        assert known == [True, True, False, False]
+        assert len(calls) == 1
+
+    def test_failed_load_is_retried_after_retry_seconds(self, monkeypatch):
+        clock = [0.0]
+        monkeypatch.setattr(market_symbols.time, "monotonic", lambda: clock[0])
+        results = [ConnectionError("sin red"), ["BTCUSDT"]]
+
+        def fetcher():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        registry = SymbolRegistry(fetcher, retry_seconds=60)
+
+        first = asyncio.run(registry.is_known("BTCUSDT"))
+        clock[0] = 30.0
+        second = asyncio.run(registry.is_known("BTCUSDT"))
+        clock[0] = 61.0
+        third = asyncio.run(registry.is_known("BTCUSDT"))
+
+        assert (first, second, third) == (False, False, True)
+
+
+class TestSymbolSlots:
+
+    def test_idle_and_least_recent_symbols_evicted_pinned_kept(self):
+        # Arrange
+        slots = SymbolSlots(max_symbols=3, idle_seconds=100)
+        slots.pin("BTCUSDT")
+        slots.touch("BTCUSDT", now=0.0)
+        for i, symbol in enumerate(("AAAUSDT", "BBBUSDT", "CCCUSDT")):
+            slots.touch(symbol, now=50.0 + i)
+
+        # Act
+        full = slots.to_evict(now=60.0)
+        idle = slots.to_evict(now=151.5)
+
+        # Assert
+        assert full == ["AAAUSDT"]               # Lleno: hace sitio al nuevo
+        assert idle == ["AAAUSDT", "BBBUSDT"]    # Inactivos >= 100s
+        assert "BTCUSDT" not in slots.last_used
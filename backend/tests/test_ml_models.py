@@ -0,0 +1,113 @@
+"""
+SIC Ultra — ML Models Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests LSTM sequence building (strided views) and batched inference.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.ml.models import LSTMPricePredictor, LSTM_FEATURE_COLUMNS, TENSORFLOW_AVAILABLE
+from tests.conftest import generate_candles
+
+
+def make_feature_frame(n: int = 120, seed: int = 42) -> pd.DataFrame:
+    """DataFrame with every LSTM feature column filled."""
+    np.random.seed(seed)
+    df = pd.DataFrame(generate_candles(n, 50000, "trending_up", 0.01))
+    df["rsi"] = np.random.uniform(20, 80, n)
+    df["macd"] = np.random.normal(0, 50, n)
+    df["atr"] = np.random.uniform(100, 500, n)
+    return df[LSTM_FEATURE_COLUMNS]
+
+
+class TestLSTMSequences:
+    """Sliding-window construction must match the old copy loop exactly."""
+
+    def setup_method(self):
+        self.lstm = LSTMPricePredictor.__new__(LSTMPricePredictor)
+        self.lstm.sequence_length = 10
+
+    def test_windows_match_copy_loop(self):
+        # Arrange
+        data = np.random.rand(50, 7).astype(np.float32)
+
+        # Act
+        X, y = self.lstm.build_sequences(data)
+
+        # Assert
+        X_loop = np.array([data[i - 10:i] for i in range(10, 50)])
+        y_loop = np.array([data[i, 0] for i in range(10, 50)])
+        assert X.shape == (40, 10, 7)
+        np.testing.assert_array_equal(X, X_loop)
+        np.testing.assert_array_equal(y, y_loop)
+
+    def test_windows_are_views(self):
+        """No per-window copies: X shares memory with the scaled series."""
+        data = np.random.rand(50, 7).astype(np.float32)
+
+        X, y = self.lstm.build_sequences(data)
+
+        assert np.shares_memory(X, data)
+        assert np.shares_memory(y, data)
+
+    def test_short_series_returns_empty(self):
+        data = np.random.rand(10, 7).astype(np.float32)
+
+        X, y = self.lstm.build_sequences(data)
+
+        assert X.shape == (0, 10, 7)
+        assert y.shape == (0,)
+
+
+@pytest.mark.skipif(not TENSORFLOW_AVAILABLE, reason="TensorFlow no disponible")
+class TestLSTMBatchInference:
+    """predict_batch must agree with per-symbol predict."""
+
+    def setup_method(self):
+        self.lstm = LSTMPricePredictor(sequence_length=20)
+        self.lstm._create_model()  # Pesos frescos: ignora modelos guardados en disco
+        frame = make_feature_frame(120)
+        self.lstm._scale(frame, fit_scaler=True)
+
+    def test_batch_matches_single(self):
+        # Arrange
+        frames = {
+            "BTCUSDT": make_feature_frame(60, seed=1),
+            "ETHUSDT": make_feature_frame(60, seed=2),
+        }
+
+        # Act
+        batch = self.lstm.predict_batch(frames)
+        single = {symbol: self.lstm.predict(df) for symbol, df in frames.items()}
+
+        # Assert
+        for symbol in frames:
+            assert batch[symbol]["predicted_price"] == pytest.approx(
+                single[symbol]["predicted_price"], rel=1e-4
+            )
+
+    def test_insufficient_history_is_none(self):
+        frames = {"BTCUSDT": make_feature_frame(60), "NEWUSDT": make_feature_frame(5)}
+
+        batch = self.lstm.predict_batch(frames)
+
+        assert batch["BTCUSDT"] is not None
+        assert batch["NEWUSDT"] is None
+
+    def test_streaming_dataset_matches_sequences(self):
+        data = self.lstm._scale(make_feature_frame(80))
+        X, y = self.lstm.build_sequences(data)
+
+        batches = list(self.lstm.make_dataset(data, 20, 80, batch_size=16))
+        X_ds = np.concatenate([b[0].numpy() for b in batches])
+        y_ds = np.concatenate([b[1].numpy() for b in batches])
+
+        np.testing.assert_allclose(X_ds, X, rtol=1e-6)
+        np.testing.assert_allclose(y_ds, y, rtol=1e-6)
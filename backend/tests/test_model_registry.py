@@ -0,0 +1,137 @@
+"""
+SIC Ultra — Model Registry & Startup Report Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests versioned artifacts, checksum fallback, lazy model loading and import timing.
+"""
+
+import pytest
+import sys
+import os
+import importlib
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.models as ml_models
+from app.infrastructure.startup_report import ImportTimer
+from app.ml.feature_store import FeatureStore
+from app.ml.model_registry import ModelRegistry
+from tests.conftest import generate_candles
+
+
+def write(path, content: str) -> str:
+    with open(path, "w") as f:
+        f.write(content)
+    return str(path)
+
+
+class TestModelRegistry:
+
+    def make(self, tmp_path) -> ModelRegistry:
+        return ModelRegistry(root=str(tmp_path / "registry"))
+
+    def test_register_creates_incrementing_versions(self, tmp_path):
+        # Arrange
+        registry = self.make(tmp_path)
+        artifact = write(tmp_path / "model.json", "v1")
+
+        # Act
+        first = registry.register("xgboost", {"model": artifact}, {"accuracy": 0.5})
+        write(tmp_path / "model.json", "v2")
+        second = registry.register("xgboost", {"model": artifact}, {"accuracy": 0.6})
+
+        # Assert
+        assert (first["version"], second["version"]) == (1, 2)
+        resolved = registry.resolve("xgboost")
+        assert resolved["version"] == 2
+        assert resolved["metadata"]["accuracy"] == 0.6
+        with open(resolved["paths"]["model"]) as f:
+            assert f.read() == "v2"
+
+    def test_corrupted_current_falls_back_to_previous(self, tmp_path):
+        # Arrange
+        registry = self.make(tmp_path)
+        artifact = write(tmp_path / "model.json", "v1")
+        registry.register("lstm", {"model": artifact})
+        write(tmp_path / "model.json", "v2")
+        second = registry.register("lstm", {"model": artifact})
+        corrupted = os.path.join(registry.root, "lstm", "v2", "model.json")
+        write(corrupted, "tampered")
+
+        # Act
+        resolved = registry.resolve("lstm")
+
+        # Assert
+        assert second["version"] == 2
+        assert resolved["version"] == 1
+        assert registry.verify("lstm", 2) is False
+
+    def test_set_current_rolls_back(self, tmp_path):
+        registry = self.make(tmp_path)
+        artifact = write(tmp_path / "model.json", "x")
+        registry.register("lstm", {"model": artifact})
+        registry.register("lstm", {"model": artifact})
+
+        registry.set_current("lstm", 1)
+
+        versions = registry.list_versions("lstm")
+        assert [v["version"] for v in versions if v["current"]] == [1]
+        with pytest.raises(ValueError):
+            registry.set_current("lstm", 9)
+
+    def test_unknown_model_resolves_to_none(self, tmp_path):
+        assert self.make(tmp_path).resolve("lstm") is None
+
+
+@pytest.mark.skipif(not ml_models.XGBOOST_AVAILABLE, reason="XGBoost no disponible")
+class TestLazyLoading:
+
+    def test_classifier_loads_current_version_on_first_use(self, tmp_path, monkeypatch):
+        # Arrange
+        registry = ModelRegistry(root=str(tmp_path / "registry"))
+        monkeypatch.setattr(ml_models, "get_model_registry", lambda: registry)
+        store = FeatureStore(root=str(tmp_path / "store"))
+        candles = generate_candles(300, 50000, "mean_reverting", 0.01)
+        start = datetime(2024, 1, 1)
+        for i, candle in enumerate(candles):
+            candle["timestamp"] = start + timedelta(hours=i)
+        store.sync("BTCUSDT", "1h", candles, now=(start + timedelta(days=30)).timestamp())
+        df = store.read("BTCUSDT", "1h")
+
+        trained = ml_models.XGBoostSignalClassifier()
+        trained.model_path = str(tmp_path / "xgb.json")
+        trained.scaler_path = str(tmp_path / "scaler.pkl")
+        trained.encoder_path = str(tmp_path / "encoder.pkl")
+        trained.train(df)
+        registry.register("xgboost", trained.artifacts())
+
+        # Act
+        fresh = ml_models.XGBoostSignalClassifier()
+        loaded_before_use = fresh.model is not None
+        prediction = fresh.predict(df)
+
+        # Assert
+        assert loaded_before_use is False
+        assert fresh.version == 1
+        assert prediction == {**trained.predict(df), "timestamp": prediction["timestamp"]}
+
+
+class TestImportTimer:
+
+    def test_records_self_time_per_module(self):
+        # Arrange
+        timer = ImportTimer()
+        sys.modules.pop("json.tool", None)
+
+        # Act
+        timer.install()
+        try:
+            importlib.import_module("json.tool")
+        finally:
+            timer.uninstall()
+
+        # Assert
+        assert "json.tool" in timer.self_time
+        assert timer.self_time["json.tool"] <= timer.inclusive["json.tool"]
+        assert any(entry["module"] == "json" for entry in timer.by_package())
@@ -0,0 +1,188 @@
+"""
+SIC Ultra — Local L2 Order Book Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests snapshot + diff-depth sync rules (stale drop, first-event coverage,
+gap detection), depth/imbalance/wall queries, replay from a recording and
+manager resync with buffered events.
+"""
+
+import asyncio
+import json
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.order_book import LocalOrderBook, OrderBookManager, replay, replay_recording
+
+
+SNAPSHOT = {
+    "lastUpdateId": 100,
+    "bids": [["99.0", "2"], ["100.0", "1"], ["98.0", "3"]],
+    "asks": [["101.0", "1"], ["103.0", "3"], ["102.0", "2"]],
+}
+
+
+def diff(first, last, bids=(), asks=()):
+    return {"e": "depthUpdate", "U": first, "u": last, "b": [list(b) for b in bids], "a": [list(a) for a in asks]}
+
+
+class TestSync:
+
+    def test_snapshot_sorted_best_first(self):
+        # Arrange
+        book = LocalOrderBook("btcusdt")
+
+        # Act
+        book.load_snapshot(SNAPSHOT)
+
+        # Assert
+        assert book.levels(3) == {"bids": [[100, 1], [99, 2], [98, 3]], "asks": [[101, 1], [102, 2], [103, 3]]}
+        assert book.mid_price == 100.5
+
+    def test_stale_events_dropped_and_first_event_must_cover_snapshot(self):
+        book = LocalOrderBook("BTCUSDT")
+        book.load_snapshot(SNAPSHOT)
+
+        assert book.apply_diff(diff(90, 100, bids=[("100.0", "50")]))  # Ya en el snapshot
+        assert book.best_bid == 100 and book.levels(1)["bids"] == [[100, 1]]
+
+        assert book.apply_diff(diff(95, 102, bids=[("100.5", "4")], asks=[("101.0", "0")]))
+
+        assert book.best_bid == 100.5 and book.best_ask == 102
+        assert book.last_update_id == 102
+
+    def test_gap_marks_book_unsynced(self):
+        book = LocalOrderBook("BTCUSDT")
+        book.load_snapshot(SNAPSHOT)
+        book.apply_diff(diff(101, 105))
+
+        applied = book.apply_diff(diff(107, 110, bids=[("99.5", "1")]))
+
+        assert not applied and not book.synced and book.gaps == 1
+        assert book.last_update_id == 105
+
+    def test_first_event_after_snapshot_with_hole_is_gap(self):
+        book = LocalOrderBook("BTCUSDT")
+        book.load_snapshot(SNAPSHOT)
+
+        assert not book.apply_diff(diff(103, 104))
+
+
+class TestQueries:
+
+    def test_depth_imbalance_and_walls(self):
+        # Arrange: muro de compra en 99.8
+        book = LocalOrderBook("BTCUSDT")
+        book.load_snapshot({
+            "lastUpdateId": 1,
+            "bids": [[str(100 - i / 10), "60" if i == 2 else "1"] for i in range(1, 30)],
+            "asks": [[str(100 + i / 10), "1"] for i in range(1, 30)],
+        })
+
+        # Act
+        depth = book.depth_within(0.25)
+        walls = book.walls(percent=1.0, factor=5.0)
+
+        # Assert: ±0.25% de 100 → 2 niveles por lado
+        assert depth["bid_qty"] == 61 and depth["ask_qty"] == 2
+        assert depth["ask_notional"] == pytest.approx(100.1 + 100.2)
+        assert book.imbalance(0.25) > 0.9
+        assert [w["price"] for w in walls["bids"]] == [99.8] and walls["asks"] == []
+
+
+class TestReplay:
+
+    def test_replay_recording_matches_live_application(self, tmp_path):
+        # Arrange
+        events = [diff(99, 101, bids=[("100.0", "5")]), diff(102, 102, asks=[("101.5", "1")]),
+                  diff(103, 104, bids=[("99.0", "0")])]
+        live = LocalOrderBook("BTCUSDT")
+        live.load_snapshot(SNAPSHOT)
+        for event in events:
+            live.apply_diff(event)
+        path = tmp_path / "BTCUSDT-20260101.jsonl"
+        path.write_text("\n".join(json.dumps(r) for r in [{"snapshot": SNAPSHOT}] + [{"event": e} for e in events]))
+
+        # Act
+        replayed = replay_recording(str(path))
+
+        # Assert
+        assert replayed.symbol == "BTCUSDT"
+        assert replayed.levels(10) == live.levels(10)
+        assert replayed.last_update_id == 104
+
+    def test_replay_recovers_after_recorded_resync(self):
+        resnapshot = {"lastUpdateId": 200, "bids": [["90", "1"]], "asks": [["91", "1"]]}
+        records = [{"snapshot": SNAPSHOT}, {"event": diff(150, 160)}, {"snapshot": resnapshot},
+                   {"event": diff(199, 201, bids=[("90.5", "2")])}]
+
+        book = replay("BTCUSDT", records)
+
+        assert book.synced and book.best_bid == 90.5 and book.gaps == 1
+
+
+class TestManager:
+
+    def test_buffered_events_applied_after_snapshot_and_gap_resyncs(self):
+        # Arrange
+        snapshots = [SNAPSHOT, {"lastUpdateId": 300, "bids": [["95", "1"]], "asks": [["96", "1"]]}]
+        fetched = []
+
+        def fetcher(symbol, limit):
+            fetched.append(symbol)
+            return snapshots[len(fetched) - 1]
+
+        manager = OrderBookManager(snapshot_fetcher=fetcher)
+        manager._add("BTCUSDT")
+
+        async def run():
+            # Eventos antes del snapshot: quedan en buffer
+            manager.handle_event("BTCUSDT", diff(95, 100))
+            manager.handle_event("BTCUSDT", diff(101, 102, bids=[("100.2", "1")]))
+            await manager._resyncing["BTCUSDT"]
+            synced_bid = manager.get_book("BTCUSDT").best_bid
+
+            manager.handle_event("BTCUSDT", diff(250, 301))  # Hueco → nuevo snapshot
+            await manager._resyncing["BTCUSDT"]
+            return synced_bid
+
+        # Act
+        synced_bid = asyncio.run(run())
+
+        # Assert
+        book = manager.get_book("BTCUSDT")
+        assert synced_bid == 100.2
+        assert len(fetched) == 2
+        assert book.synced and book.last_update_id == 301 and book.best_bid == 95
+
+    def test_track_rejects_unknown_symbols_and_caps_hot_books(self):
+        # Arrange
+        async def validator(symbol):
+            return symbol in {"ETHUSDT", "SOLUSDT", "XRPUSDT"}
+
+        manager = OrderBookManager(snapshot_fetcher=lambda s, l: SNAPSHOT, symbol_validator=validator,
+                                   max_symbols=2, idle_seconds=900)
+        manager.running = True  # Sin stream real: track no arranca el bucle
+        manager.slots.pin(manager._add("BTCUSDT").symbol)
+
+        async def run():
+            with pytest.raises(ValueError):
+                await manager.track("NOPEUSDT", timeout=0)
+            for symbol in ("ETHUSDT", "SOLUSDT", "XRPUSDT"):  # Lleno: sale el usado hace más tiempo
+                await manager.track(symbol, timeout=0)
+            after_cap = sorted(manager.books)
+            manager.slots.last_used["SOLUSDT"] -= 1000      # Inactivo: se expulsa al entrar otro
+            await manager.track("ETHUSDT", timeout=0)
+            return after_cap
+
+        # Act
+        after_cap = asyncio.run(run())
+
+        # Assert
+        assert after_cap == ["BTCUSDT", "SOLUSDT", "XRPUSDT"]
+        assert sorted(manager.books) == sorted(manager._buffers) == ["BTCUSDT", "ETHUSDT", "XRPUSDT"]
+        assert "NOPEUSDT" not in manager.books
@@ -0,0 +1,141 @@
+"""
+SIC Ultra — Depth-Aware P2P Arbitrage Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests the book-walking solver (ticket limits, payment-method compatibility,
+insufficient depth, VWAP spread) and the NumPy spread ring buffer.
+"""
+
+import asyncio
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.ml.p2p_analyzer import P2POpportunityFinder
+from app.ml.p2p_arbitrage import SpreadHistory, solve_arbitrage
+
+
+def offer(price, available, methods=("Banesco",), min_amount=0.0, max_amount=1e9, name=None):
+    return {
+        "advertiser": name or f"t{price}-{available}",
+        "price": price,
+        "available": available,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "payment_methods": list(methods),
+        "completion_rate": 99.0,
+        "orders_count": 800,
+    }
+
+
+class TestSolver:
+
+    def test_vwap_walks_depth_beyond_best_price(self):
+        # Arrange
+        buys = [offer(100, 10), offer(101, 100)]
+        sells = [offer(104, 50), offer(103, 100)]
+
+        # Act
+        solution = solve_arbitrage(buys, sells, target_amount=60)
+
+        # Assert
+        assert solution.fillable_amount == pytest.approx(60)
+        assert solution.buy_vwap == pytest.approx((10 * 100 + 50 * 101) / 60)
+        assert solution.sell_vwap == pytest.approx((50 * 104 + 10 * 103) / 60)
+        assert solution.spread_percent < (104 - 100) / 100 * 100
+        assert solution.profit_fiat == pytest.approx(60 * (solution.sell_vwap - solution.buy_vwap), abs=0.01)
+
+    def test_ticket_limits_respected(self):
+        # Arrange: el mejor anuncio de compra permite máximo 500 fiat (5 USDT)
+        # y el segundo exige un ticket mínimo que el resto no alcanza
+        buys = [offer(100, 50, max_amount=500), offer(100.5, 50, min_amount=5000), offer(102, 50)]
+        sells = [offer(105, 100)]
+
+        # Act
+        solution = solve_arbitrage(buys, sells, target_amount=20)
+
+        # Assert
+        assert [leg["amount"] for leg in solution.buy_legs] == [5, 15]
+        assert [leg["price"] for leg in solution.buy_legs] == [100, 102]
+
+    def test_only_compatible_payment_methods_are_paired(self):
+        # Arrange: el mejor spread cruza bancos distintos
+        buys = [offer(100, 100, ["Banesco"]), offer(101, 100, ["Mercantil"])]
+        sells = [offer(110, 100, ["Mercantil"]), offer(103, 100, ["Banesco"])]
+
+        # Act
+        best = solve_arbitrage(buys, sells, target_amount=50)
+        banesco = solve_arbitrage(buys, sells, target_amount=50, payment_methods=["banesco"])
+
+        # Assert
+        assert best.payment_method == "Mercantil"
+        assert (best.buy_vwap, best.sell_vwap) == (101, 110)
+        assert (banesco.buy_vwap, banesco.sell_vwap) == (100, 103)
+        assert solve_arbitrage(buys, sells, 50, payment_methods=["Zelle"]) is None
+
+    def test_insufficient_depth_fills_common_volume(self):
+        buys = [offer(100, 30)]
+        sells = [offer(103, 500)]
+
+        solution = solve_arbitrage(buys, sells, target_amount=100)
+
+        assert solution.fillable_amount == pytest.approx(30)
+        assert not solution.fully_fillable
+        assert sum(leg["amount"] for leg in solution.sell_legs) == pytest.approx(30)
+
+    def test_max_profitable_volume_stops_where_books_cross(self):
+        buys = [offer(100, 10), offer(102, 10), offer(104, 10)]
+        sells = [offer(105, 15), offer(103, 15)]
+
+        solution = solve_arbitrage(buys, sells, target_amount=5)
+
+        # Tramo 20-30 compra a 104 y vende a 103: deja de ser rentable en 20
+        assert solution.max_profitable_volume == pytest.approx(20)
+
+
+class TestSpreadHistory:
+
+    def test_ring_buffer_wraps_in_chronological_order(self):
+        # Arrange
+        history = SpreadHistory(capacity=4)
+
+        # Act
+        for i in range(6):
+            history.append(float(i), timestamp=1000.0 + i)
+
+        # Assert
+        assert len(history) == 4
+        assert history.values().tolist() == [2.0, 3.0, 4.0, 5.0]
+        assert history.values(since_seconds=2.5, now=1005.0).tolist() == [3.0, 4.0, 5.0]
+
+    def test_stats(self):
+        history = SpreadHistory(capacity=10)
+        for value in (1.0, 1.0, 1.0, 3.0):
+            history.append(value)
+
+        stats = history.stats()
+
+        assert stats["count"] == 4 and stats["mean"] == 1.5
+        assert stats["zscore"] > 1
+
+
+class TestFinderIntegration:
+
+    def test_find_arbitrage_uses_vwap_and_flags_thin_books(self):
+        # Arrange
+        finder = P2POpportunityFinder()
+        buys = [offer(100, 20)]
+        sells = [offer(103, 200)]
+
+        # Act
+        opportunity = asyncio.run(finder._find_arbitrage(buys, sells, amount=100))
+
+        # Assert
+        assert opportunity.current_price == 100 and opportunity.target_price == 103
+        assert opportunity.potential_profit_percent == 3.0
+        assert opportunity.risk_level == "MEDIUM"
+        assert any("Profundidad insuficiente" in f for f in opportunity.risk_factors)
+        assert len(finder.historical_spreads) == 1
@@ -0,0 +1,154 @@
+"""
+SIC Ultra — P2P Order Book Fetcher Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests concurrent multi-page fetching over a shared client, bounded
+parallelism, merge/dedupe/depth ordering and merged-book caching.
+"""
+
+import asyncio
+import json
+import sys
+import os
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.infrastructure.binance.p2p as p2p
+from app.infrastructure.binance.p2p import BinanceP2PClient
+from app.infrastructure.redis_client import InMemoryTTLCache
+
+
+def make_item(adv_no, price, available, pay_type="Banesco"):
+    return {
+        "adv": {
+            "advNo": adv_no,
+            "price": str(price),
+            "surplusAmount": str(available),
+            "minSingleTransAmount": "500",
+            "maxSingleTransAmount": "50000",
+            "tradeMethods": [{"identifier": pay_type}],
+        },
+        "advertiser": {"nickName": f"trader{adv_no}", "monthFinishRate": 0.98, "monthOrderCount": 300},
+    }
+
+
+class FakeBinance:
+    """Async handler serving `full_pages` full pages per pay type, tracking concurrency."""
+
+    def __init__(self, rows=20, full_pages=2, delay=0.01):
+        self.rows = rows
+        self.full_pages = full_pages
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, request):
+        body = json.loads(request.content)
+        self.requests.append(body)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+
+        page, pay = body["page"], (body["payTypes"] or ["any"])[0]
+        count = self.rows if page <= self.full_pages else 3
+        items = [make_item(f"{pay}-{page}-{i}", 40 + page + i / 100, 10 + i, pay) for i in range(count)]
+        items.append(make_item("shared", 39.5, 100))  # Mismo anuncio visible en todas las búsquedas
+        return httpx.Response(200, json={"data": items})
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = InMemoryTTLCache()
+    monkeypatch.setattr(p2p, "get_redis_client", lambda: cache)
+    return cache
+
+
+def run_with(client: BinanceP2PClient, handler, coro_factory):
+    async def run():
+        client._bind_loop()
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return await coro_factory()
+    return asyncio.run(run())
+
+
+class TestOrderBook:
+
+    def test_pages_fetched_only_while_full_and_parallelism_bounded(self, cache):
+        # Arrange
+        fake = FakeBinance(rows=20, full_pages=2)
+        client = BinanceP2PClient(max_concurrency=3)
+
+        # Act
+        book = run_with(client, fake, lambda: client.get_order_book(
+            trade_type="BUY", pages=4, pay_types=["Banesco", "Mercantil"]
+        ))
+
+        # Assert
+        assert book["requests"] == 2 + 2 * 3  # Página 1 de cada búsqueda + páginas 2..4 de las llenas
+        assert fake.peak == 3
+        assert book["failed_requests"] == 0
+
+    def test_merged_book_sorted_deduped_with_depth(self, cache):
+        fake = FakeBinance(rows=20, full_pages=1)
+        client = BinanceP2PClient()
+
+        book = run_with(client, fake, lambda: client.get_order_book(trade_type="SELL", pages=2, pay_types=["A", "B"]))
+
+        prices = [o["price"] for o in book["offers"]]
+        assert prices == sorted(prices, reverse=True)
+        assert sum(o["adv_no"] == "shared" for o in book["offers"]) == 1
+        assert book["total_available"] == pytest.approx(sum(o["available"] for o in book["offers"]))
+        assert all(a["cum_available"] < b["cum_available"] for a, b in zip(book["offers"], book["offers"][1:]))
+
+    def test_merged_book_is_cached(self, cache):
+        fake = FakeBinance(rows=20, full_pages=1)
+        client = BinanceP2PClient()
+
+        async def twice():
+            first = await client.get_order_book(pages=3)
+            second = await client.get_order_book(pages=3)
+            return first, second
+
+        first, second = run_with(client, fake, twice)
+
+        assert second == first
+        assert len(fake.requests) == first["requests"]
+
+    def test_failed_page_does_not_break_book(self, cache):
+        client = BinanceP2PClient()
+
+        def handler(request):
+            if json.loads(request.content)["payTypes"] == ["Roto"]:
+                return httpx.Response(503)
+            return httpx.Response(200, json={"data": [make_item("x", 40, 10)]})
+
+        book = run_with(client, handler, lambda: client.get_order_book(pay_types=["Banesco", "Roto"]))
+
+        assert book["failed_requests"] == 1
+        assert [o["adv_no"] for o in book["offers"]] == ["x"]
+
+    def test_book_not_cached_when_every_page_failed(self, cache):
+        # Arrange
+        client = BinanceP2PClient()
+        calls = []
+
+        def handler(request):
+            calls.append(1)
+            return httpx.Response(503) if len(calls) == 1 else httpx.Response(200, json={"data": [make_item("x", 40, 10)]})
+
+        async def twice():
+            first = await client.get_order_book(pages=2)
+            second = await client.get_order_book(pages=2)
+            return first, second
+
+        # Act
+        first, second = run_with(client, handler, twice)
+
+        # Assert
+        assert first["offers"] == [] and first["failed_requests"] == first["requests"] == 1
+        assert [o["adv_no"] for o in second["offers"]] == ["x"]
@@ -0,0 +1,141 @@
+"""
+SIC Ultra — Vectorized Candlestick Pattern Engine Tests
+AAA Standard: Arrange → Act → Assert
+
+Parity of every vectorized mask against the existing scalar detectors
+(app.ml.candle_patterns and CandlestickAnalyzer._is_*) over a long random
+series with ties and flat candles, plus full-history analyzer usage.
+"""
+
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.candle_patterns as cp
+from app.ml.candlestick_analyzer import CandlestickAnalyzer
+from app.ml.pattern_engine import pattern_hits, pattern_masks
+
+
+def random_candles(n=3000, seed=11):
+    """Velas con precios redondeados (empates frecuentes) y algunas velas planas."""
+    rng = np.random.default_rng(seed)
+    candles, price = [], 100.0
+    for i in range(n):
+        open_ = round(price + rng.normal(0, 0.5), 1)
+        close = round(open_ + rng.normal(0, 1.0), 1)
+        high = round(max(open_, close) + abs(rng.normal(0, 0.6)) * rng.integers(0, 2), 1)
+        low = round(min(open_, close) - abs(rng.normal(0, 0.6)) * rng.integers(0, 2), 1)
+        if i % 97 == 0:
+            open_ = close = high = low = round(price, 1)
+        candles.append({"open": open_, "high": high, "low": low, "close": close, "volume": 1.0})
+        price = close
+    return candles
+
+
+CANDLES = random_candles()
+
+CLASSIC_SCALAR = {
+    "Doji": lambda w: cp.is_doji(w[-1]),
+    "Hammer": lambda w: cp.is_hammer(w[-1]),
+    "Inverted Hammer": lambda w: cp.is_inverted_hammer(w[-1]),
+    "Shooting Star": lambda w: cp.is_shooting_star(w[-1]),
+    "Hanging Man": lambda w: cp.is_hanging_man(w[-1]),
+    "BULLISH Marubozu": lambda w: cp.is_marubozu(w[-1])["direction"] == "BULLISH",
+    "BEARISH Marubozu": lambda w: cp.is_marubozu(w[-1])["direction"] == "BEARISH",
+    "Bullish Engulfing": cp.is_bullish_engulfing,
+    "Bearish Engulfing": cp.is_bearish_engulfing,
+    "Morning Star": cp.is_morning_star,
+    "Evening Star": cp.is_evening_star,
+    "Three White Soldiers": cp.is_three_white_soldiers,
+    "Three Black Crows": cp.is_three_black_crows,
+}
+
+ANALYZER = CandlestickAnalyzer()
+ANALYZER_SCALAR = {
+    "Doji": lambda c, i: ANALYZER._is_doji(c[i]),
+    "Hammer": lambda c, i: i > 0 and ANALYZER._is_hammer(c[i], c[i - 1]),
+    "Shooting Star": lambda c, i: i > 0 and ANALYZER._is_shooting_star(c[i], c[i - 1]),
+    "Bullish Engulfing": lambda c, i: i > 0 and ANALYZER._is_bullish_engulfing(c[i - 1], c[i]),
+    "Bearish Engulfing": lambda c, i: i > 0 and ANALYZER._is_bearish_engulfing(c[i - 1], c[i]),
+    "Morning Star": lambda c, i: i > 1 and ANALYZER._is_morning_star(c[i - 2], c[i - 1], c[i]),
+    "Evening Star": lambda c, i: i > 1 and ANALYZER._is_evening_star(c[i - 2], c[i - 1], c[i]),
+    "Three White Soldiers": lambda c, i: i > 1 and ANALYZER._is_three_white_soldiers(c[i - 2], c[i - 1], c[i]),
+    "Three Black Crows": lambda c, i: i > 1 and ANALYZER._is_three_black_crows(c[i - 2], c[i - 1], c[i]),
+}
+
+
+class TestParity:
+
+    @pytest.mark.parametrize("name", list(CLASSIC_SCALAR))
+    def test_classic_rules_match_candle_patterns(self, name):
+        # Arrange
+        scalar = CLASSIC_SCALAR[name]
+        expected = [i for i in range(len(CANDLES)) if scalar(CANDLES[max(0, i - 2):i + 1])]
+
+        # Act
+        hits = pattern_hits(CANDLES, rules="classic")[name]
+
+        # Assert
+        assert hits.tolist() == expected
+
+    @pytest.mark.parametrize("name", list(ANALYZER_SCALAR))
+    def test_analyzer_rules_match_candlestick_analyzer(self, name):
+        scalar = ANALYZER_SCALAR[name]
+        expected = [i for i in range(len(CANDLES)) if scalar(CANDLES, i)]
+
+        hits = pattern_hits(CANDLES, rules="analyzer")[name]
+
+        assert hits.tolist() == expected
+
+    def test_detect_all_patterns_matches_scalar_detectors(self):
+        # Arrange
+        windows = [CANDLES[i - 5:i] for i in range(5, 1500)]
+
+        # Act
+        reported = [[p["name"] for p in cp.detect_all_patterns(w)["patterns"]] for w in windows]
+
+        # Assert
+        expected = [[name for name, scalar in CLASSIC_SCALAR.items() if scalar(w[-3:])] for w in windows]
+        assert reported == expected
+
+    def test_prior_trend_matches_history_slice_rule(self):
+        def sliced(context):
+            if len(context) < 5:
+                return 0
+            return np.sign(context[-1]["close"] - context[-5]["close"])
+
+        trend = ANALYZER._prior_trend(CANDLES)
+
+        assert trend.tolist() == [sliced(CANDLES[:i]) for i in range(len(CANDLES))]
+
+    def test_every_pattern_occurs_in_fixture(self):
+        hits = pattern_hits(CANDLES, rules="analyzer")
+
+        assert all(len(idx) > 0 for idx in hits.values())
+
+
+class TestEngine:
+
+    def test_dataframe_input_matches_dicts(self):
+        frame = pd.DataFrame(CANDLES)
+
+        from_frame = pattern_masks(frame)
+        from_dicts = pattern_masks(CANDLES)
+
+        assert all(np.array_equal(from_frame[k], from_dicts[k]) for k in from_dicts)
+
+    def test_short_series(self):
+        masks = pattern_masks(CANDLES[:1], rules="classic")
+
+        assert not masks["Morning Star"].any() and not masks["Bullish Engulfing"].any()
+
+    def test_analyzer_full_history(self):
+        patterns = ANALYZER.analyze(CANDLES, window_size=None)
+
+        assert max(p.candle_index for p in patterns) > 50
+        assert all(isinstance(p.candle_index, int) for p in patterns)
@@ -0,0 +1,115 @@
+"""
+SIC Ultra — Pattern Outcome Table Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests the offline forward-return job over the feature store, persistence of the
+compact table and the agent's blend of historical and live pattern accuracy.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.trading_agent as trading_agent
+from app.ml.feature_store import FeatureStore
+from app.ml.pattern_engine import pattern_hits
+from app.ml.pattern_outcomes import PatternOutcomeTable, build_pattern_outcomes, regime_labels
+from tests.conftest import generate_candles
+
+
+START = datetime(2024, 1, 1)
+NOW = (START + timedelta(days=60)).timestamp()
+
+
+def fill_store(root, symbols=("BTCUSDT", "ETHUSDT"), n=600):
+    store = FeatureStore(root=str(root))
+    for seed, symbol in enumerate(symbols):
+        np.random.seed(seed)
+        candles = generate_candles(n, 50000, "mean_reverting", 0.01)
+        for i, candle in enumerate(candles):
+            candle["timestamp"] = START + timedelta(hours=i)
+        store.sync(symbol, "1h", candles, now=NOW)
+    return store
+
+
+class TestBuild:
+
+    def test_counts_match_brute_force_forward_returns(self, tmp_path):
+        # Arrange
+        store = fill_store(tmp_path)
+
+        # Act
+        table = build_pattern_outcomes(store)
+
+        # Assert
+        expected_n = expected_wins = 0
+        for symbol in ("BTCUSDT", "ETHUSDT"):
+            df = store.read(symbol, "1h")
+            close = df["close"].to_numpy()
+            for i in pattern_hits(df, rules="analyzer")["Bullish Engulfing"]:
+                if i + 4 < len(close):
+                    expected_n += 1
+                    expected_wins += int(close[i + 4] > close[i])
+        stats = table.lookup("Bullish Engulfing", "1h", "ALL", horizon=4)
+        assert stats["samples"] == expected_n > 0
+        assert stats["wins"] == expected_wins
+
+    def test_regime_cells_sum_to_aggregate(self, tmp_path):
+        store = fill_store(tmp_path)
+
+        table = build_pattern_outcomes(store)
+
+        assert np.array_equal(table.counts[..., :-1, :].sum(axis=2), table.counts[..., -1, :])
+        assert table.timeframes == ["1h"]
+
+    def test_regime_labels_are_causal(self, tmp_path):
+        df = fill_store(tmp_path, symbols=("BTCUSDT",)).read("BTCUSDT", "1h")
+
+        full = regime_labels(df)
+        truncated = regime_labels(df.iloc[:300])
+
+        assert np.array_equal(full[:300], truncated)
+
+
+class TestLookup:
+
+    def test_roundtrip_and_unknown_regime_falls_back_to_aggregate(self, tmp_path):
+        # Arrange
+        table = build_pattern_outcomes(fill_store(tmp_path / "store"))
+        path = str(tmp_path / "outcomes.npz")
+
+        # Act
+        table.save(path)
+        loaded = PatternOutcomeTable.load(path)
+
+        # Assert
+        assert np.array_equal(loaded.counts, table.counts)
+        assert loaded.lookup("Hammer", "1h", "NORMAL") == table.lookup("Hammer", "1h", "ALL")
+        assert loaded.lookup("Hammer", "4h") is None
+        assert loaded.accuracy("unknown", default=0.61) == 0.61
+
+    def test_agent_blends_table_prior_with_live_results(self, monkeypatch):
+        # Arrange: histórico 60% sobre 200 muestras, en vivo 10/10 aciertos
+        table = PatternOutcomeTable(["macd_golden_cross"], ["1h"])
+        table.counts[0, 0, -1, :] = 200
+        table.wins[0, 0, -1, :] = 120
+        monkeypatch.setattr(trading_agent, "get_pattern_outcomes", lambda: table)
+        memory = SimpleNamespace(data={"patterns_learned": {
+            "macd_golden_cross": {"1h": {"TRENDING": {"total": 10, "wins": 10, "losses": 0}}}
+        }})
+        learning = trading_agent.LearningEngine(memory)
+
+        # Act
+        blended = learning.get_pattern_accuracy("macd_golden_cross", "1h", "TRENDING")
+        prior_only = learning.get_pattern_accuracy("macd_golden_cross", "1h", "NORMAL")
+
+        # Assert: el prior pesa como máximo MAX_PRIOR_WEIGHT trades
+        assert blended == pytest.approx((0.6 * 50 + 10) / 60)
+        assert prior_only == pytest.approx(0.6)
+        assert learning.get_pattern_accuracy("double_top") == 0.5
@@ -0,0 +1,123 @@
+"""
+SIC Ultra — RAG Retrieval Cache Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests LRU/TTL behaviour, query normalization and KnowledgeBase.search caching.
+"""
+
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.knowledge_base as knowledge_base
+import app.ml.rag_cache as rag_cache
+from app.ml.knowledge_base import KnowledgeBase
+from app.ml.lexical_index import BM25Index
+from app.ml.rag_cache import RetrievalCache, normalize_query
+
+
+class QueryCollection:
+    """In-memory collection answering `query` with fixed documents."""
+
+    def __init__(self):
+        self.queries = 0
+
+    def count(self):
+        return 100
+
+    def get(self, include=None, ids=None, where=None):
+        return {"ids": [], "documents": [], "metadatas": []}
+
+    def query(self, query_embeddings, n_results, where, include):
+        self.queries += 1
+        return {
+            "ids": [[f"id{i}" for i in range(n_results)]],
+            "documents": [[f"doc {i}" for i in range(n_results)]],
+            "metadatas": [[{"source": "libro.txt", "title": "Libro", "category": "trading"}] * n_results],
+            "distances": [[0.1 * i for i in range(n_results)]],
+        }
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return np.ones((len(texts), 4))
+
+
+@pytest.fixture
+def kb(monkeypatch):
+    cache = RetrievalCache(max_size=8, ttl_seconds=60)
+    monkeypatch.setattr(knowledge_base, "get_retrieval_cache", lambda: cache)
+    instance = KnowledgeBase(
+        collection=QueryCollection(),
+        embedding_model=CountingEncoder(),
+        lexical_index=BM25Index()
+    )
+    instance.cache = cache
+    return instance
+
+
+class TestRetrievalCache:
+
+    def test_normalization_collapses_case_and_whitespace(self):
+        assert normalize_query("  RSI:  30,\n MACD positivo ") == "rsi: 30, macd positivo"
+
+    def test_lru_evicts_least_recently_used(self):
+        # Arrange
+        cache = RetrievalCache(max_size=2, ttl_seconds=60)
+        cache.put_embedding("a", [1.0], 0.1)
+        cache.put_embedding("b", [2.0], 0.1)
+
+        # Act
+        cache.get_embedding("a")
+        cache.put_embedding("c", [3.0], 0.1)
+
+        # Assert
+        assert cache.get_embedding("a") == [1.0]
+        assert cache.get_embedding("b") is None
+
+    def test_entries_expire_after_ttl(self, monkeypatch):
+        cache = RetrievalCache(max_size=4, ttl_seconds=10)
+        clock = [1000.0]
+        monkeypatch.setattr(rag_cache.time, "monotonic", lambda: clock[0])
+        cache.put_results("q", 3, None, [{"content": "x"}])
+
+        clock[0] += 11
+
+        assert cache.get_results("q", 3, None) is None
+
+
+class TestCachedSearch:
+
+    def test_repeated_query_skips_encode_and_query(self, kb):
+        # Act
+        first = kb.search("RSI: 30, MACD: negativo", n_results=3)
+        second = kb.search("rsi: 30,   macd: NEGATIVO", n_results=3)
+
+        # Assert
+        assert second == first
+        assert kb.embedding_model.calls == 1
+        assert kb.collection.queries == 1
+        assert kb.cache.get_stats()["result_hit_rate"] == 0.5
+        assert kb.cache.stats["encode_seconds_saved"] == kb.cache.stats["encode_seconds"] > 0
+
+    def test_invalidation_keeps_embedding(self, kb):
+        kb.search("tendencia alcista", n_results=3)
+
+        kb.cache.invalidate_results()
+        kb.search("tendencia alcista", n_results=3)
+
+        assert kb.collection.queries == 2
+        assert kb.embedding_model.calls == 1
+
+    def test_cached_results_are_copies(self, kb):
+        results = kb.search("wyckoff", n_results=2)
+        results[0]["content"] = "modificado"
+
+        assert kb.search("wyckoff", n_results=2)[0]["content"] == "doc 0"
@@ -0,0 +1,136 @@
+"""
+SIC Ultra — Regime Detector Batch Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests the reshaped Hurst exponent against the original per-subseries loop,
+reuse of precomputed indicators, the per-candle report cache and the
+multi-symbol / full-history batch modes.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.ml.regime_detector as regime_module
+from app.ml.indicators import calculate_adx, calculate_indicators
+from app.ml.regime_detector import REGIME_ORDER, RegimeDetector, hurst_exponents
+from tests.conftest import generate_candles
+
+
+def reference_hurst(prices, max_lag=20):
+    """Implementación original: un bucle por lag y por sub-serie"""
+    ts = np.array(prices)
+    lags = range(2, max_lag + 1)
+    rs_values = []
+    for lag in lags:
+        rs_list = []
+        for i in range(len(ts) // lag):
+            subseries = ts[i * lag:(i + 1) * lag]
+            cumulative = np.cumsum(subseries - np.mean(subseries))
+            s = np.std(subseries, ddof=1) if np.std(subseries, ddof=1) > 0 else 1e-10
+            rs_list.append((np.max(cumulative) - np.min(cumulative)) / s)
+        rs_values.append(np.mean(rs_list))
+    x, y = np.log(list(lags)), np.log(rs_values)
+    n = len(x)
+    hurst = (n * np.sum(x * y) - np.sum(x) * np.sum(y)) / (n * np.sum(x ** 2) - np.sum(x) ** 2)
+    return max(0.0, min(1.0, hurst))
+
+
+def timed_candles(n, scenario, seed):
+    np.random.seed(seed)
+    candles = generate_candles(n, 50000, scenario, 0.01)
+    for i, candle in enumerate(candles):
+        candle["timestamp"] = datetime(2024, 1, 1) + timedelta(hours=i)
+    return candles
+
+
+class TestHurst:
+
+    @pytest.mark.parametrize("scenario", ["trending_up", "mean_reverting", "volatile"])
+    def test_matches_reference_loop(self, scenario):
+        # Arrange
+        closes = [c["close"] for c in timed_candles(200, scenario, 3)]
+
+        # Act
+        hurst = RegimeDetector()._calculate_hurst(closes)
+
+        # Assert
+        assert hurst == pytest.approx(reference_hurst(closes), abs=1e-9)
+
+    def test_rows_are_independent(self):
+        rows = np.array([[c["close"] for c in timed_candles(120, "mean_reverting", seed)] for seed in range(4)])
+
+        batch = hurst_exponents(rows)
+
+        assert batch == pytest.approx([reference_hurst(row) for row in rows], abs=1e-9)
+
+    def test_flat_series_is_random_walk(self):
+        assert hurst_exponents(np.full((1, 100), 5.0))[0] == 0.5
+
+
+class TestDetect:
+
+    def test_reuses_precomputed_indicators(self, monkeypatch):
+        # Arrange
+        candles = timed_candles(150, "trending_up", 1)
+        closes, highs, lows = ([c[k] for c in candles] for k in ("close", "high", "low"))
+        indicators = {**calculate_indicators(candles), "adx": calculate_adx(highs, lows, closes)}
+        expected = RegimeDetector().detect(candles)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("indicador recalculado")
+
+        monkeypatch.setattr(regime_module, "calculate_adx", fail)
+        monkeypatch.setattr(regime_module, "calculate_bollinger_bands", fail)
+
+        # Act
+        report = RegimeDetector().detect(candles, indicators)
+
+        # Assert
+        assert report.regime == expected.regime and report.adx_value == expected.adx_value
+
+    def test_cache_per_symbol_and_last_candle(self):
+        detector = RegimeDetector()
+        candles = timed_candles(150, "volatile", 2)
+
+        first = detector.detect(candles, symbol="BTCUSDT")
+        again = detector.detect(candles, symbol="BTCUSDT")
+        other = detector.detect(candles, symbol="ETHUSDT")
+        advanced = detector.detect(candles + timed_candles(151, "volatile", 2)[-1:], symbol="BTCUSDT")
+
+        assert again is first
+        assert other is not first and advanced is not first
+        assert len(detector._regime_history) == 3  # Los aciertos de caché no duplican historial
+
+    def test_detect_many_matches_single_calls(self):
+        series = {f"S{seed}": timed_candles(120, "mean_reverting", seed) for seed in range(3)}
+        series["SHORT"] = series["S0"][:30]
+
+        batch = RegimeDetector().detect_many(series)
+
+        for symbol, candles in series.items():
+            single = RegimeDetector().detect(candles)
+            assert batch[symbol].regime == single.regime
+            assert batch[symbol].hurst_exponent == pytest.approx(single.hurst_exponent, abs=1e-4)
+
+
+class TestHistory:
+
+    def test_hurst_per_candle_matches_trailing_window(self):
+        # Arrange
+        candles = timed_candles(400, "trending_up", 5)
+        closes = [c["close"] for c in candles]
+
+        # Act
+        history = RegimeDetector().detect_history(candles, window=100)
+
+        # Assert
+        for i in (99, 250, 399):
+            assert history["hurst"][i] == pytest.approx(reference_hurst(closes[i - 99:i + 1]), abs=1e-9)
+        assert set(np.unique(history["regime"])) <= set(range(len(REGIME_ORDER)))
+        assert (history["regime"][:99] == REGIME_ORDER.index(REGIME_ORDER[2])).all()
@@ -2,7 +2,8 @@
 SIC Ultra — Risk Engine Unit Tests
 AAA Standard: Arrange → Act → Assert
 
-Tests Kelly Criterion, Sharpe Ratio, Z-Score, Anti-Martingale, Fee Calculator.
+Tests Kelly Criterion, Sharpe Ratio, Z-Score, Anti-Martingale, Fee Calculator,
+Monte Carlo risk engine.
 """
 
 import pytest
@@ -12,8 +13,11 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
+import numpy as np
+
 from app.ml.risk_engine import (
-    DynamicKellyEngine, AntiMartingaleGuard, FeeCalculator, PerformanceMetrics
+    DynamicKellyEngine, AntiMartingaleGuard, FeeCalculator, PerformanceMetrics,
+    MonteCarloRiskEngine
 )
 
 
@@ -314,3 +318,96 @@ class TestPerformanceMetrics:
         """30% win rate with 1:2 W/L → negative expectancy."""
         exp = self.metrics.expectancy(30, 50, 100)
         assert exp < 0, f"Should be losing, got {exp}"
+
+
+class TestMonteCarloRiskEngine:
+    """Tests for the bootstrap Monte Carlo engine (ruin, drawdown, VaR, Kelly)."""
+    
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        # 55% win rate, wins $150 / losses $100
+        self.pnls = np.where(rng.random(300) < 0.55, 150.0, -100.0).tolist()
+        self.engine = MonteCarloRiskEngine(paths=10_000, horizon=100, seed=1)
+    
+    def test_kelly_matches_closed_form_for_binary_payoff(self):
+        # Arrange
+        wins = sum(p > 0 for p in self.pnls) / len(self.pnls)
+        expected = (1.5 * wins - (1 - wins)) / 1.5
+        
+        # Act
+        report = self.engine.evaluate("s1", self.pnls, 10_000)
+        
+        # Assert
+        assert report.kelly_point == pytest.approx(expected, abs=1e-3)
+        assert 0 < report.kelly_fraction < report.kelly_point  # Percentil conservador
+    
+    def test_distribution_metrics_are_consistent(self):
+        report = self.engine.evaluate("s1", self.pnls, 10_000)
+        
+        assert report.paths == 10_000 and report.trades == 300
+        assert 0 <= report.drawdown_p50 <= report.drawdown_p95 <= 1
+        assert report.cvar_95 >= report.var_95
+        assert report.expected_pnl > 0
+        assert report.elapsed_ms < 500
+    
+    def test_small_capital_raises_risk_of_ruin(self):
+        safe = self.engine.evaluate("safe", self.pnls, 100_000)
+        fragile = self.engine.evaluate("fragile", self.pnls, 500)
+        
+        assert safe.risk_of_ruin == 0.0
+        assert fragile.risk_of_ruin > 0.05
+    
+    def test_cached_until_new_trade(self):
+        first = self.engine.evaluate("s1", self.pnls, 10_000)
+        again = self.engine.evaluate("s1", self.pnls, 10_000)
+        refreshed = self.engine.evaluate("s1", self.pnls + [-100.0], 10_000)
+        
+        assert again is first
+        assert refreshed is not first and refreshed.trades == 301
+    
+    def test_insufficient_or_one_sided_history(self):
+        assert self.engine.evaluate("few", [10, -5] * 5, 1000) is None
+        assert self.engine.evaluate("no_losses", [10.0] * 50, 1000) is None
+    
+    def test_position_size_uses_conservative_kelly_and_ruin(self):
+        # Arrange
+        kelly = DynamicKellyEngine()
+        report = self.engine.evaluate("fragile", self.pnls, 500)
+        
+        # Act
+        plain = kelly.calculate_position_size(500, 55, 150, 100, 100, max_risk_pct=1.0)
+        with_mc = kelly.calculate_position_size(500, 55, 150, 100, 100, max_risk_pct=1.0, monte_carlo=report)
+        
+        # Assert
+        assert with_mc.kelly_raw == plain.kelly_raw
+        assert with_mc.fraction_of_capital == pytest.approx(report.kelly_fraction / 2 * 0.5, abs=1e-4)
+        assert "ruina" in with_mc.reasoning
+    
+    def test_agent_sizing_shrinks_when_risk_of_ruin_is_high(self, monkeypatch):
+        # Arrange
+        from types import SimpleNamespace
+        import app.ml.trading_agent as trading_agent
+        from app.ml.trade_metrics import metrics_from_pnls
+        
+        pnls = self.pnls + [150.0]  # Sin racha de pérdidas al final
+        agent = trading_agent.TradingAgentAI.__new__(trading_agent.TradingAgentAI)
+        agent.memory = SimpleNamespace(
+            data={"trade_results": [{"pnl": p} for p in pnls]},
+            running_metrics=lambda: metrics_from_pnls(pnls)
+        )
+        agent.kelly_engine = DynamicKellyEngine()
+        agent.anti_martingale = AntiMartingaleGuard()
+        agent.monte_carlo = self.engine
+        
+        # Act
+        monkeypatch.setattr(trading_agent.settings, "risk_reference_capital", 100_000)
+        safe = agent.size_position(50.0, signal_confidence=20)
+        monkeypatch.setattr(trading_agent.settings, "risk_reference_capital", 500)
+        fragile = agent.size_position(50.0, signal_confidence=20)
+        
+        # Assert
+        assert agent._monte_carlo_report().risk_of_ruin > DynamicKellyEngine.MAX_RISK_OF_RUIN
+        assert 0 < fragile.position_size_usd < safe.position_size_usd <= 50.0
+        assert fragile.position_size_usd == pytest.approx(safe.position_size_usd / 2, abs=0.01)
+        assert "ruina" in fragile.reasoning and "ruina" not in safe.reasoning
+
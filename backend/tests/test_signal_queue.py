@@ -0,0 +1,115 @@
+"""
+SIC Ultra — Signal Queue Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests expected-value ordering, the expiry heap purge, replacement of a
+weaker pending signal by a stronger one and the depth/age metrics.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.signal_queue import SignalQueue, expected_value, risk_reward
+
+
+T0 = datetime(2024, 1, 1, 12, 0)
+PARAMS = {"min_confidence": 70, "allowed_tiers": ["S", "A", "B"]}
+
+
+def signal(symbol, confidence=80, tier="A", rr=2.0):
+    return {"symbol": symbol, "confidence": confidence, "tier": tier, "risk_reward": rr}
+
+
+class TestExpectedValue:
+
+    def test_expected_value_formula(self):
+        assert expected_value(signal("BTCUSDT", 90, "S", 2.0)) == pytest.approx(1.8)
+        assert expected_value(signal("BTCUSDT", 80, "A", 2.0)) == pytest.approx(1.28)
+
+    def test_risk_reward_from_levels(self):
+        levels = {"entry_price": 100.0, "stop_loss": 98.0, "take_profit": 106.0}
+
+        assert risk_reward(levels) == pytest.approx(3.0)
+        assert risk_reward({"risk_reward": 0}) == 1.0
+
+
+class TestSignalQueue:
+
+    def setup_method(self):
+        self.queue = SignalQueue(max_queue_size=3)
+
+    def test_executable_signals_ordered_by_expected_value(self):
+        # Arrange
+        self.queue.add_approved_signal(signal("ETHUSDT", 75, "A", 1.5), PARAMS, now=T0)
+        self.queue.add_approved_signal(signal("BTCUSDT", 90, "S", 2.5), PARAMS, now=T0)
+        self.queue.add_approved_signal(signal("SOLUSDT", 85, "B", 3.0), PARAMS, now=T0)
+
+        # Act
+        order = [d["signal"]["symbol"] for d in self.queue.get_executable_signals(now=T0)]
+
+        # Assert
+        assert order == ["BTCUSDT", "SOLUSDT", "ETHUSDT"]
+
+    def test_stronger_signal_replaces_weaker_pending(self):
+        self.queue.add_approved_signal(signal("BTCUSDT", 75), PARAMS, now=T0)
+
+        weaker = self.queue.add_approved_signal(signal("BTCUSDT", 72), PARAMS, now=T0)
+        stronger = self.queue.add_approved_signal(signal("BTCUSDT", 95), PARAMS, now=T0 + timedelta(minutes=5))
+
+        assert (weaker, stronger) == (False, True)
+        executable = self.queue.get_executable_signals(now=T0 + timedelta(minutes=5))
+        assert len(executable) == 1 and executable[0]["signal"]["confidence"] == 95
+        assert self.queue.replaced_count == 1
+
+    def test_executed_signal_blocks_symbol_until_expiry(self):
+        self.queue.add_approved_signal(signal("BTCUSDT"), PARAMS, now=T0)
+        self.queue.mark_executed("BTCUSDT", True)
+
+        blocked = self.queue.add_approved_signal(signal("BTCUSDT", 99), PARAMS, now=T0 + timedelta(hours=1))
+        reopened = self.queue.add_approved_signal(signal("BTCUSDT", 70), PARAMS, now=T0 + timedelta(hours=2))
+
+        assert not blocked and reopened
+        assert self.queue.expired_count == 1
+
+    def test_expired_signals_are_purged(self):
+        # Arrange
+        self.queue.add_approved_signal(signal("BTCUSDT"), PARAMS, now=T0)
+        self.queue.add_approved_signal(signal("ETHUSDT"), PARAMS, now=T0 + timedelta(hours=1))
+
+        # Act
+        purged = self.queue.purge_expired(T0 + timedelta(hours=2, seconds=1))
+
+        # Assert
+        assert purged == 1
+        assert list(self.queue.approved_signals) == ["ETHUSDT"]
+
+    def test_full_queue_evicts_oldest(self):
+        for minute, symbol in enumerate(["A", "B", "C", "D"]):
+            self.queue.add_approved_signal(signal(symbol), PARAMS, now=T0 + timedelta(minutes=minute))
+
+        assert sorted(self.queue.approved_signals) == ["B", "C", "D"]
+
+    def test_heaps_stay_bounded_under_churn(self):
+        queue = SignalQueue(max_queue_size=5)
+
+        for i in range(500):
+            queue.add_approved_signal(signal(f"S{i % 5}", 70 + i % 30), PARAMS, now=T0 + timedelta(seconds=i))
+
+        assert len(queue._by_expiry) <= 2 * len(queue.approved_signals) + 16
+        assert len(queue._by_value) <= 2 * len(queue.approved_signals) + 16
+
+    def test_metrics_report_depth_and_age(self):
+        self.queue.add_approved_signal(signal("BTCUSDT", 90, "S"), PARAMS, now=T0)
+        self.queue.add_approved_signal(signal("ETHUSDT"), PARAMS, now=T0 + timedelta(minutes=10))
+        self.queue.mark_executed("ETHUSDT", False)
+
+        metrics = self.queue.queue_metrics(now=T0 + timedelta(minutes=20))
+
+        assert metrics["queue_size"] == 2 and metrics["queue_depth"] == 1
+        assert metrics["oldest_pending_age_seconds"] == 1200.0
+        assert metrics["top_expected_value"] == pytest.approx(1.8)
@@ -0,0 +1,149 @@
+"""
+SIC Ultra — aggTrade Order Flow Aggregator Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests aggressor-side CVD, time-bar ring buffer rollover, per-bar footprint,
+book depth bucketed like the footprint, large-print detection, the
+trade-based volume check and hot-symbol tracking in the manager.
+"""
+
+import asyncio
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.trade_flow import TradeFlow, TradeFlowManager, default_bucket_size
+
+
+def agg(trade_id, price, qty, buyer_maker, ts_ms):
+    return {"e": "aggTrade", "a": trade_id, "p": str(price), "q": str(qty), "m": buyer_maker, "T": ts_ms}
+
+
+class TestAggregation:
+
+    def test_cvd_uses_aggressor_side_and_ignores_duplicates(self):
+        # Arrange
+        flow = TradeFlow("btcusdt", bar_seconds=60, max_bars=10, bucket_size=10)
+
+        # Act
+        flow.handle_event(agg(1, 60000, 2.0, False, 0))      # Compra agresiva
+        flow.handle_event(agg(2, 59995, 0.5, True, 1_000))   # Venta agresiva
+        flow.handle_event(agg(2, 59995, 0.5, True, 1_000))   # Duplicado
+
+        # Assert
+        assert flow.cvd() == pytest.approx(1.5)
+        assert flow.trades_total == 2
+        assert flow.bars(1) == [{"start": 0, "buy_volume": 2.0, "sell_volume": 0.5, "delta": 1.5,
+                                 "cvd": 1.5, "trades": 2}]
+
+    def test_ring_buffer_rolls_old_bars_out(self):
+        flow = TradeFlow("BTCUSDT", bar_seconds=60, max_bars=3, bucket_size=1)
+
+        for minute in range(5):
+            flow.add_trade(100.0, 1.0 + minute, False, minute * 60_000)
+
+        assert [b["buy_volume"] for b in flow.bars(10)] == [3.0, 4.0, 5.0]
+        assert flow.cvd(3) == 12.0 and flow.cvd() == 15.0
+        assert not flow.add_trade(100.0, 9.0, False, 0)  # Barra ya fuera de la ventana
+
+    def test_footprint_buckets_per_price(self):
+        flow = TradeFlow("BTCUSDT", bar_seconds=60, max_bars=5, bucket_size=10)
+
+        flow.add_trade(60001, 1.0, False, 0)
+        flow.add_trade(60009, 2.0, True, 10)
+        flow.add_trade(60015, 0.5, False, 20)
+
+        footprint = flow.footprint(1)
+
+        assert footprint == [
+            {"price": 60010, "buy_volume": 0.5, "sell_volume": 0.0, "delta": 0.5, "trades": 1},
+            {"price": 60000, "buy_volume": 1.0, "sell_volume": 2.0, "delta": -1.0, "trades": 2},
+        ]
+        assert flow.traded_at(60005) == {"volume": 3.0, "trades": 2}
+
+    def test_depth_profile_buckets_book_like_footprint(self):
+        # Arrange: bid y ask caen en el mismo bucket de 10
+        flow = TradeFlow("BTCUSDT", bar_seconds=60, max_bars=5, bucket_size=10)
+        flow.add_trade(60004, 1.0, False, 0)
+        flow.add_trade(60006, 2.0, True, 10)
+        flow.add_trade(59995, 0.5, True, 20)
+        bids = [[60004.9, 1.0], [60001.0, 2.0], [59999.0, 4.0]]
+        asks = [[60005.1, 3.0], [60012.0, 1.5]]
+
+        # Act
+        profile = flow.depth_profile(bids, asks)
+
+        # Assert
+        assert profile == [
+            {"price": 60010, "bid_volume": 0.0, "ask_volume": 1.5, "traded_volume": 0.0, "trades": 0},
+            {"price": 60000, "bid_volume": 3.0, "ask_volume": 3.0, "traded_volume": 3.0, "trades": 2},
+            {"price": 59990, "bid_volume": 4.0, "ask_volume": 0.0, "traded_volume": 0.5, "trades": 1},
+        ]
+
+    def test_default_bucket_size_scales_with_price(self):
+        assert default_bucket_size(60000) == 10
+        assert default_bucket_size(3000) == 1
+        assert default_bucket_size(0.5) == pytest.approx(0.0001)
+
+
+class TestSignals:
+
+    def test_large_print_detected_after_warmup(self):
+        # Arrange
+        flow = TradeFlow("BTCUSDT", bucket_size=10, large_factor=10)
+        for i in range(60):
+            flow.add_trade(60000, 0.01, False, i)
+
+        # Act
+        large = flow.add_trade(60000, 0.5, True, 100)
+
+        # Assert
+        assert large
+        assert flow.large_prints[-1]["side"] == "SELL" and flow.large_prints[-1]["ratio"] >= 10
+
+    def test_volume_check_compares_recent_window_to_history(self):
+        # Arrange: 4 ventanas de 15 barras; la última con volumen creciente y sesgo comprador
+        flow = TradeFlow("BTCUSDT", bar_seconds=60, max_bars=60, bucket_size=1)
+        for minute in range(60):
+            ts = minute * 60_000
+            if minute < 45:
+                flow.add_trade(100, 1.0, False, ts)
+                flow.add_trade(100, 1.0, True, ts)
+            else:
+                flow.add_trade(100, 2.0 + (minute - 45), False, ts)
+                flow.add_trade(100, 2.0, True, ts)
+
+        # Act
+        check = flow.volume_check(15)
+
+        # Assert
+        assert check["is_high"] and check["trend"] == "INCREASING"
+        assert check["delta_ratio"] > 0.1
+        assert flow.volume_check(40) is None  # Menos de 2 ventanas de historia
+
+
+class TestManager:
+
+    def test_track_validates_and_caps_hot_symbols(self):
+        # Arrange
+        async def validator(symbol):
+            return symbol != "FAKEUSDT"
+
+        manager = TradeFlowManager(symbol_validator=validator, max_symbols=1)
+        manager.running = True  # Sin stream real
+        manager.slots.pin(manager._add("BTCUSDT").symbol)
+
+        async def run():
+            with pytest.raises(ValueError):
+                await manager.track("FAKEUSDT")
+            await manager.track("ETHUSDT")
+            await manager.track("SOLUSDT")
+
+        # Act
+        asyncio.run(run())
+
+        # Assert
+        assert sorted(manager.flows) == ["BTCUSDT", "SOLUSDT"]
@@ -0,0 +1,222 @@
+"""
+SIC Ultra — Online Trade Metrics Tests
+AAA Standard: Arrange → Act → Assert
+
+Tests the Welford/drawdown/runs accumulator against the batch
+PerformanceMetrics implementation, exact merging of concatenated series and
+the persisted per (owner, source, strategy, symbol) store.
+"""
+
+import sys
+import os
+from dataclasses import asdict
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.ml.risk_engine import PerformanceMetrics
+from app.ml.trade_metrics import (
+    ALL, RunningMetrics, TradeMetricsStore, closes_position, closing_trades, metrics_from_pnls
+)
+
+
+def random_pnls(n, seed=0):
+    rng = np.random.default_rng(seed)
+    pnls = np.round(rng.normal(2, 20, n), 2)
+    pnls[rng.random(n) < 0.05] = 0.0
+    return pnls.tolist()
+
+
+def max_drawdown(pnls):
+    equity = np.concatenate([[0], np.cumsum(pnls)])
+    return float(np.max(np.maximum.accumulate(equity) - equity))
+
+
+def max_losing_streak(pnls):
+    best = current = 0
+    for pnl in pnls:
+        current = current + 1 if pnl <= 0 else 0
+        best = max(best, current)
+    return best
+
+
+class TestRunningMetrics:
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_matches_batch_metrics(self, seed):
+        # Arrange
+        pnls = random_pnls(300, seed)
+
+        # Act
+        metrics = metrics_from_pnls(pnls)
+
+        # Assert
+        assert metrics.mean == pytest.approx(np.mean(pnls))
+        assert metrics.variance == pytest.approx(np.var(pnls, ddof=1))
+        assert metrics.sharpe_ratio() == pytest.approx(PerformanceMetrics.sharpe_ratio(pnls), abs=1e-4)
+        assert metrics.z_score() == pytest.approx(PerformanceMetrics.z_score_streaks([p > 0 for p in pnls]), abs=1e-4)
+        assert metrics.max_drawdown == pytest.approx(max_drawdown(pnls))
+        assert metrics.max_losing_streak == max_losing_streak(pnls)
+        assert metrics.gross_profit == pytest.approx(sum(p for p in pnls if p > 0))
+        assert metrics.wins + metrics.losses < metrics.count  # Los trades en 0 no son ni una cosa ni otra
+
+    def test_expectancy_equals_original_formula(self):
+        pnls = random_pnls(100, 4)
+        wins = [p for p in pnls if p > 0]
+        losses = [p for p in pnls if p < 0]
+
+        metrics = metrics_from_pnls(pnls)
+
+        expected = len(wins) / len(pnls) * np.mean(wins) - len(losses) / len(pnls) * abs(np.mean(losses))
+        assert metrics.expectancy == pytest.approx(expected)
+
+    def test_empty_series(self):
+        summary = RunningMetrics().to_dict()
+
+        assert summary["total_trades"] == 0
+        assert summary["sharpe_ratio"] == 0.0 and summary["best_trade"] is None
+
+    @pytest.mark.parametrize("split", [1, 7, 50, 99])
+    def test_merge_equals_single_pass(self, split):
+        # Arrange
+        pnls = random_pnls(100, 5)
+        first, second = metrics_from_pnls(pnls[:split]), metrics_from_pnls(pnls[split:])
+
+        # Act
+        first.merge(second)
+
+        # Assert
+        expected = asdict(metrics_from_pnls(pnls))
+        merged = asdict(first)
+        merged.pop("updated_at"), expected.pop("updated_at")
+        for field in ("mean", "m2", "gross_profit", "gross_loss", "equity", "peak", "trough", "max_drawdown"):
+            assert merged.pop(field) == pytest.approx(expected.pop(field))
+        assert merged == expected
+
+    def test_merge_joins_streak_across_boundary(self):
+        first, second = metrics_from_pnls([5, -1, -1]), metrics_from_pnls([-2, -3, 4])
+
+        first.merge(second)
+
+        assert first.max_losing_streak == 4
+        assert first.runs == 3 and first.streak == 1
+
+
+# (side, market_type, reason, ¿cierra?)
+VIRTUAL_TRADES = [
+    ("BUY", "SPOT", None, False),
+    ("SELL", "SPOT", None, True),
+    ("SELL", None, "Toma de ganancias", True),  # Centinela / bot automático sin market_type
+    ("BUY", "FUTURES", "Apertura de Contrato Futuro LONG 10x", False),
+    ("SELL", "FUTURES", "Apertura de Contrato Futuro SHORT 10x", False),
+    ("SELL", "FUTURES", "Cierre de Contrato Futuro LONG 10x", True),
+    ("BUY", "FUTURES", "Cierre de Contrato Futuro SHORT 10x", True),
+]
+
+
+class TestClosingTrades:
+
+    @pytest.mark.parametrize("side,market_type,reason,closes", VIRTUAL_TRADES)
+    def test_closes_position_regardless_of_side(self, side, market_type, reason, closes):
+        assert closes_position(side, market_type, reason) is closes
+
+    def test_sql_filter_matches_predicate(self):
+        # Arrange
+        from sqlalchemy import Column, Float, Integer, String, create_engine
+        from sqlalchemy.orm import Session, declarative_base
+
+        Base = declarative_base()
+
+        class Trade(Base):
+            __tablename__ = "trades"
+            id = Column(Integer, primary_key=True)
+            side = Column(String)
+            market_type = Column(String)
+            reason = Column(String)
+            pnl = Column(Float)
+
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            db.add_all([Trade(side=s, market_type=m, reason=r) for s, m, r, _ in VIRTUAL_TRADES])
+            db.commit()
+
+            # Act
+            rows = db.query(Trade.id).filter(closing_trades(Trade)).order_by(Trade.id).all()
+
+        # Assert
+        assert [r.id for r in rows] == [i + 1 for i, t in enumerate(VIRTUAL_TRADES) if t[3]]
+
+
+class TestTradeMetricsStore:
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / "trade_metrics.json")
+
+    def test_record_updates_rollups_and_persists(self, path):
+        # Arrange
+        store = TradeMetricsStore(path)
+
+        # Act
+        store.record(1, "practice", 10.0, "manual", "btcusdt")
+        store.record(1, "practice", -4.0, "AI_AUTO", "BTCUSDT")
+        store.record(1, "practice", 6.0, "MANUAL", "ETHUSDT")
+        reloaded = TradeMetricsStore(path)
+
+        # Assert
+        assert reloaded.get(1, "practice").count == 3
+        assert reloaded.get(1, "practice", symbol="BTCUSDT").total_pnl == 6.0
+        assert reloaded.get(1, "practice", strategy="MANUAL").wins == 2
+        assert reloaded.get(1, "practice", "AI_AUTO", "BTCUSDT").losses == 1
+        assert reloaded.get(2, "practice").count == 0
+        assert set(reloaded.breakdown(1, "practice", by="symbol")) == {"BTCUSDT", "ETHUSDT"}
+
+    def test_ensure_rebuilds_scope_only_once(self, path):
+        store = TradeMetricsStore(path)
+        store.record(1, "journal", 99.0, "MANUAL", "BTCUSDT")  # Antes de reconstruir: se reemplaza
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return [(5.0, "MANUAL", "BTCUSDT"), (None, "MANUAL", "BTCUSDT"), (-2.0, None, None)]
+
+        store.ensure(1, "journal", loader)
+        store.ensure(1, "journal", loader)
+        TradeMetricsStore(path).ensure(1, "journal", loader)
+
+        assert len(calls) == 1
+        assert store.get(1, "journal").count == 3
+        assert store.get(1, "journal", symbol="UNKNOWN").total_pnl == -2.0
+
+    def test_rebuild_empty_clears_scope_after_reset(self, path):
+        # Arrange
+        store = TradeMetricsStore(path)
+        store.record(1, "practice", 10.0, "MANUAL", "BTCUSDT")
+        store.record(1, "journal", 3.0, "MANUAL", "BTCUSDT")
+
+        # Act
+        store.rebuild(1, "practice", [])
+        store.ensure(1, "practice", lambda: [(99.0, "MANUAL", "BTCUSDT")])
+        reloaded = TradeMetricsStore(path)
+
+        # Assert
+        assert reloaded.get(1, "practice").count == 0
+        assert reloaded.breakdown(1, "practice") == {}
+        assert reloaded.get(1, "journal").count == 1
+
+    def test_combined_sources_match_concatenation(self, path):
+        store = TradeMetricsStore(path)
+        journal, practice = random_pnls(30, 6), random_pnls(40, 7)
+        store.rebuild(1, "journal", [(p, "MANUAL", "BTCUSDT") for p in journal])
+        store.rebuild(1, "practice", [(p, "MANUAL", "ETHUSDT") for p in practice])
+
+        combined = store.combined(1, ("journal", "practice"))
+
+        expected = metrics_from_pnls(journal + practice)
+        assert combined.count == expected.count and combined.runs == expected.runs
+        assert combined.variance == pytest.approx(expected.variance)
+        assert combined.max_drawdown == pytest.approx(expected.max_drawdown)
+        assert store.get(1, ALL).count == 0  # No hay rollup persistido entre fuentes